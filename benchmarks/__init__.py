@@ -0,0 +1,3 @@
+"""
+Benchmarks reproducibles del pipeline de auditoría.
+"""
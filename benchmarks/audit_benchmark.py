@@ -0,0 +1,302 @@
+"""
+Benchmark offline y reproducible del pipeline de auditoría.
+
+Graba (modo record) las búsquedas vectoriales y las respuestas del LLM de una ejecución
+real contra OCI / Oracle y las reproduce (modo replay) sin red, con latencia sintética
+configurable, para medir cambios de rendimiento de forma repetible:
+
+- Tiempo total y desglose por etapa: retrieval, glosa_extraction, llm, parsing y
+  master_audit (segundos acumulados por reclamación).
+- Throughput (reclamaciones/minuto) y latencias p50/p95 por nivel de concurrencia,
+  para run_full_medical_audit y run_full_medical_audit_v2.
+
+En replay, lo que no está en las fixtures se responde de forma sintética (búsqueda
+léxica sobre el markdown, JSON válido para cada parser), por lo que el benchmark corre
+incluso sin fixtures grabadas. El catálogo de glosas se carga del respaldo local.
+
+Uso (desde la raíz del proyecto; settings exige un .env, en replay basta con valores
+de relleno):
+
+    # Grabar fixtures contra los servicios reales
+    python -m benchmarks.audit_benchmark --mode record
+
+    # Reproducir con 2.5 ± 0.5 s por llamada al LLM y 0.3 s por búsqueda
+    python -m benchmarks.audit_benchmark --mode replay --llm-latency 2.5 --llm-jitter 0.5 \\
+        --retrieval-latency 0.3 --concurrency 1,2,4 --requests 8 --output temp/bench.json
+"""
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import functools
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.replay import (
+    STAGES,
+    FixtureStore,
+    RecordingChatModel,
+    RecordingRAGTool,
+    ReplayChatModel,
+    ReplayRAGTool,
+    StageTimer,
+    SyntheticLatency,
+    timed_parser,
+)
+from services.audit import MedicalAuditService
+from services.claim_pipeline import AUDIT_RUN_PARAMS
+from services.glosas_catalog import glosas_catalog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INPUTS = ["test_data/sample_audit.md", "result/upload.md"]
+DEFAULT_FIXTURES = "benchmarks/fixtures/audit_fixtures.json"
+TARGETS = ("full", "v2")
+
+
+class _OfflineRAGFiles:
+    """RAGFilesDB sin base de datos: fuerza el respaldo local del catálogo de glosas."""
+
+    def get_file_version(self, file_id):
+        return None
+
+    def get_file_extraction(self, file_id):
+        return None
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _wrap_stage(obj: Any, method_name: str, stage: str, timer: StageTimer) -> None:
+    """Reemplaza un método de la instancia por una versión cronometrada."""
+    original = getattr(obj, method_name)
+
+    @functools.wraps(original)
+    def timed(*args, **kwargs):
+        with timer.measure(stage):
+            return original(*args, **kwargs)
+
+    setattr(obj, method_name, timed)
+
+
+def _instrument(service: MedicalAuditService, timer: StageTimer) -> None:
+    """Cronometra las etapas que no pasan por el LLM ni por la búsqueda vectorial."""
+    service.audit_output_parser = timed_parser(service.audit_output_parser, timer)
+    service.master_output_parser = timed_parser(service.master_output_parser, timer)
+    service.audit_v2_output_parser = timed_parser(service.audit_v2_output_parser, timer)
+    _wrap_stage(service, "_process_v2_result", "parsing", timer)
+    _wrap_stage(service, "_extract_relevant_glosas", "glosa_extraction", timer)
+    _wrap_stage(service, "_run_master_audit", "master_audit", timer)
+
+
+def _load_inputs(paths: List[str]) -> List[Tuple[str, str]]:
+    inputs = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            inputs.append((path, f.read()))
+    return inputs
+
+
+def build_record_service(inputs: List[Tuple[str, str]], store: FixtureStore,
+                         timer: StageTimer) -> Tuple[MedicalAuditService, List[Dict]]:
+    """Vectoriza cada entrada y envuelve el LLM y la búsqueda reales con grabadores."""
+    from services.embedding import EmbeddingService
+
+    embedding_service = EmbeddingService()
+    documents = []
+    for path, markdown in inputs:
+        vectorization_result = embedding_service.process_markdown_file(markdown, Path(path).name)
+        file_id = vectorization_result.get("file_id")
+        if not file_id:
+            raise ValueError(f"No se pudo obtener file_id de la vectorización de {path}")
+        store.put_input(path, {"file_id": file_id, "sha256": _sha256(markdown)})
+        documents.append({"name": path, "file_id": file_id, "markdown": markdown})
+        logger.info(f"[BENCH] {path} vectorizado. File ID: {file_id}")
+
+    service = MedicalAuditService()
+    service.llm = RecordingChatModel(inner=service.llm, store=store, timer=timer)
+    service.rag_tool = RecordingRAGTool(service.rag_tool, store, timer)
+    _instrument(service, timer)
+    return service, documents
+
+
+def build_replay_service(inputs: List[Tuple[str, str]], store: FixtureStore, timer: StageTimer,
+                         args: argparse.Namespace) -> Tuple[MedicalAuditService, List[Dict]]:
+    """Servicio sin red: LLM y búsqueda reproducidos de las fixtures con latencia sintética."""
+    documents = []
+    for index, (path, markdown) in enumerate(inputs, start=1):
+        info = store.get_input(path)
+        if info and info.get("sha256") != _sha256(markdown):
+            logger.warning(f"[BENCH] {path} cambió desde la grabación: las fixtures no coincidirán")
+        # Sin grabación se usan ids sintéticos negativos (no colisionan con RAG_FILES)
+        file_id = info["file_id"] if info else -index
+        documents.append({"name": path, "file_id": file_id, "markdown": markdown})
+
+    glosas_catalog.rag_files = _OfflineRAGFiles()
+    glosas_catalog.load(force=True)
+
+    llm = ReplayChatModel(
+        store=store, timer=timer,
+        latency=SyntheticLatency(args.llm_latency, args.llm_jitter, seed=args.seed),
+    )
+    rag_tool = ReplayRAGTool(
+        store, {document["file_id"]: document["markdown"] for document in documents}, timer,
+        SyntheticLatency(args.retrieval_latency, args.retrieval_jitter, seed=args.seed + 1),
+    )
+    service = MedicalAuditService(llm=llm, rag_tool=rag_tool)
+    _instrument(service, timer)
+    return service, documents
+
+
+def run_once(service: MedicalAuditService, target: str, document: Dict, v2_mode: str):
+    """Una reclamación completa con los mismos parámetros que el pipeline de producción."""
+    if target == "full":
+        return service.run_full_medical_audit(
+            files_ids=[document["file_id"]],
+            identificacion_reclamacion=Path(document["name"]).stem,
+            markdown_content=document["markdown"],
+            record_history=False,
+            **AUDIT_RUN_PARAMS
+        )
+    return service.run_full_medical_audit_v2(
+        files_ids=[document["file_id"]],
+        identificacion_reclamacion=Path(document["name"]).stem,
+        mode=v2_mode,
+        markdown_content=document["markdown"],
+    )
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percentile / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def measure_level(service: MedicalAuditService, target: str, documents: List[Dict],
+                  concurrency: int, requests: int, timer: StageTimer, v2_mode: str) -> Dict:
+    """Ejecuta `requests` reclamaciones con `concurrency` en vuelo y resume los tiempos."""
+    jobs = [documents[index % len(documents)] for index in range(requests)]
+
+    def _timed_run(document):
+        start = time.perf_counter()
+        try:
+            result = run_once(service, target, document, v2_mode)
+            success = bool(getattr(result, "success", False))
+        except Exception as e:
+            logger.error(f"[BENCH] Error auditando {document['name']}: {str(e)}")
+            success = False
+        return time.perf_counter() - start, success
+
+    timer.reset()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as executor:
+        outcomes = list(executor.map(_timed_run, jobs))
+    wall_seconds = time.perf_counter() - wall_start
+
+    latencies = [latency for latency, _ in outcomes]
+    stages = timer.snapshot()
+    return {
+        "target": target if target == "full" else f"v2/{v2_mode}",
+        "concurrency": concurrency,
+        "requests": requests,
+        "failures": sum(1 for _, success in outcomes if not success),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_minute": round(requests / wall_seconds * 60, 2) if wall_seconds else 0.0,
+        "latency_p50_seconds": round(_percentile(latencies, 50), 3),
+        "latency_p95_seconds": round(_percentile(latencies, 95), 3),
+        "stages_per_request": {
+            stage: round(values["seconds"] / requests, 4) for stage, values in stages.items()
+        },
+        "stages": stages,
+    }
+
+
+def print_report(rows: List[Dict]) -> None:
+    headers = ["target", "conc", "reqs", "fail", "wall_s", "claims/min", "p50_s", "p95_s"] + STAGES
+    table = [headers]
+    for row in rows:
+        table.append([
+            row["target"], row["concurrency"], row["requests"], row["failures"], row["wall_seconds"],
+            row["throughput_per_minute"], row["latency_p50_seconds"], row["latency_p95_seconds"],
+        ] + [row["stages_per_request"].get(stage, 0.0) for stage in STAGES])
+    widths = [max(len(str(line[column])) for line in table) for column in range(len(headers))]
+    for line in table:
+        print("  ".join(str(value).rjust(width) for value, width in zip(line, widths)))
+    print("(etapas: segundos acumulados por reclamación; con concurrencia interna pueden superar la latencia)")
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark offline del pipeline de auditoría")
+    parser.add_argument("--mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--inputs", nargs="+", default=DEFAULT_INPUTS, help="Markdown de reclamaciones")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Archivo JSON de fixtures")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="full, v2 o ambos separados por coma")
+    parser.add_argument("--v2-mode", choices=["single", "map_reduce"], default="single")
+    parser.add_argument("--concurrency", default="1,2,4", help="Niveles de concurrencia separados por coma")
+    parser.add_argument("--requests", type=int, default=0, help="Reclamaciones por nivel (default: 2 x concurrencia)")
+    parser.add_argument("--warmup", type=int, default=1, help="Reclamaciones no medidas antes de cada objetivo")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Segundos por llamada al LLM (replay)")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Variación ± de la latencia del LLM")
+    parser.add_argument("--retrieval-latency", type=float, default=0.0, help="Segundos por búsqueda vectorial (replay)")
+    parser.add_argument("--retrieval-jitter", type=float, default=0.0, help="Variación ± de la latencia de búsqueda")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de la latencia sintética")
+    parser.add_argument("--output", default=None, help="Guardar el reporte en JSON")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    targets = [target.strip() for target in args.targets.split(",") if target.strip()]
+    unknown = [target for target in targets if target not in TARGETS]
+    if unknown:
+        print(f"Objetivos no soportados: {', '.join(unknown)}")
+        return 2
+
+    timer = StageTimer()
+    inputs = _load_inputs(args.inputs)
+
+    if args.mode == "record":
+        store = FixtureStore.load(args.fixtures)
+        service, documents = build_record_service(inputs, store, timer)
+        # Una pasada secuencial por entrada y objetivo basta para grabar
+        levels, requests_per_level, warmup = [1], len(documents), 0
+    else:
+        store = FixtureStore.load(args.fixtures)
+        service, documents = build_replay_service(inputs, store, timer, args)
+        levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+        requests_per_level, warmup = args.requests, args.warmup
+
+    rows = []
+    for target in targets:
+        for document in documents[:warmup]:
+            run_once(service, target, document, args.v2_mode)
+        for concurrency in levels:
+            requests = requests_per_level or 2 * concurrency
+            rows.append(measure_level(service, target, documents, concurrency, requests, timer, args.v2_mode))
+
+    if args.mode == "record":
+        store.save()
+
+    print_report(rows)
+    if args.mode == "replay":
+        print(f"Fixtures: {store.hits['llm']} aciertos / {store.misses['llm']} sintéticas (LLM), "
+              f"{store.hits['retrieval']} aciertos / {store.misses['retrieval']} sintéticas (búsqueda)")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"mode": args.mode, "args": vars(args), "results": rows}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+"""
+Dobles de grabación y reproducción para el benchmark de auditoría.
+
+- FixtureStore: resultados de la búsqueda vectorial y respuestas del LLM grabados en
+  ejecuciones reales, indexados por la huella de la consulta / del prompt.
+- RecordingChatModel / RecordingRAGTool: envuelven los clientes reales y graban.
+- ReplayChatModel / ReplayRAGTool: reproducen lo grabado con latencia sintética
+  configurable. Lo que no está grabado se responde de forma determinista (búsqueda
+  léxica sobre el markdown, plantillas de mock_genai.responses) para poder medir sin OCI.
+- StageTimer: acumula tiempos por etapa de forma segura entre hilos.
+"""
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain.output_parsers import StructuredOutputParser
+
+from mock_genai.responses import templated_response
+from services.document_segmenter import segment_document
+from services.glosas_catalog import normalize_key
+
+logger = logging.getLogger(__name__)
+
+# Etapas reportadas por el benchmark
+STAGES = ["retrieval", "glosa_extraction", "llm", "parsing", "master_audit"]
+
+# Fragmentación equivalente a SP_RAG_EMBEDDING (utl_to_chunks: 512 caracteres, solape 51)
+CHUNK_CHARS = 512
+CHUNK_OVERLAP = 51
+
+
+class StageTimer:
+    """Tiempo acumulado y número de llamadas por etapa (seguro entre hilos)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+
+    @contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._totals[stage] = self._totals.get(stage, 0.0) + elapsed
+                self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+            self._counts.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {"seconds": round(self._totals.get(stage, 0.0), 4), "calls": self._counts.get(stage, 0)}
+                for stage in STAGES + sorted(set(self._totals) - set(STAGES))
+            }
+
+
+def _stage(timer: Optional[StageTimer], stage: str):
+    return timer.measure(stage) if timer else nullcontext()
+
+
+class SyntheticLatency:
+    """Espera uniforme en [latency - jitter, latency + jitter] con semilla fija."""
+
+    def __init__(self, latency_seconds: float = 0.0, jitter_seconds: float = 0.0, seed: int = 0):
+        self.latency_seconds = max(0.0, float(latency_seconds))
+        self.jitter_seconds = max(0.0, float(jitter_seconds))
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self) -> None:
+        if not self.latency_seconds and not self.jitter_seconds:
+            return
+        with self._lock:
+            delay = self._random.uniform(self.latency_seconds - self.jitter_seconds,
+                                         self.latency_seconds + self.jitter_seconds)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def prompt_key(messages) -> str:
+    """Huella de un prompt (lista de mensajes) para indexar respuestas grabadas."""
+    text = "\n".join(f"{message.type}:{message.content}" for message in messages)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def retrieval_key(query: str, files_ids: List[int], k: int, segment_types: Optional[List[str]] = None) -> str:
+    """Huella de una búsqueda vectorial para indexar resultados grabados."""
+    payload = json.dumps(
+        [query, sorted(files_ids or []), int(k), sorted(segment_types) if segment_types else None],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """
+    Fixtures grabadas en un archivo JSON:
+    {"inputs": {nombre: {file_id, sha256, path}}, "retrieval": {huella: contexto}, "llm": {huella: texto}}
+    """
+
+    def __init__(self, path: str, data: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.data = data or {"inputs": {}, "retrieval": {}, "llm": {}}
+        self._lock = threading.Lock()
+        self.hits = {"retrieval": 0, "llm": 0}
+        self.misses = {"retrieval": 0, "llm": 0}
+
+    @classmethod
+    def load(cls, path: str) -> "FixtureStore":
+        if not os.path.exists(path):
+            logger.warning(f"[BENCH] Sin fixtures en {path}: se usarán respuestas sintéticas")
+            return cls(path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for section in ("inputs", "retrieval", "llm"):
+            data.setdefault(section, {})
+        logger.info(f"[BENCH] Fixtures cargadas de {path}: {len(data['retrieval'])} búsquedas, {len(data['llm'])} respuestas LLM")
+        return cls(path, data)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=1, default=str)
+        os.replace(temp_path, self.path)
+        logger.info(f"[BENCH] Fixtures guardadas en {self.path}")
+
+    def _get(self, section: str, key: str):
+        with self._lock:
+            value = self.data[section].get(key)
+            if value is None:
+                self.misses[section] += 1
+            else:
+                self.hits[section] += 1
+            return value
+
+    def _put(self, section: str, key: str, value) -> None:
+        with self._lock:
+            self.data[section][key] = value
+
+    def get_llm(self, key: str) -> Optional[str]:
+        return self._get("llm", key)
+
+    def put_llm(self, key: str, content: str) -> None:
+        self._put("llm", key, content)
+
+    def get_retrieval(self, key: str) -> Optional[Dict]:
+        return self._get("retrieval", key)
+
+    def put_retrieval(self, key: str, context: Dict) -> None:
+        # Ida y vuelta por JSON: los metadatos de Oracle pueden traer tipos no serializables
+        self._put("retrieval", key, json.loads(json.dumps(context, ensure_ascii=False, default=str)))
+
+    def get_input(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            return self.data["inputs"].get(name)
+
+    def put_input(self, name: str, info: Dict) -> None:
+        self._put("inputs", name, info)
+
+
+# ============================================================================
+# MODELOS DE CHAT
+# ============================================================================
+
+def _chat_result(content: str) -> ChatResult:
+    return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+class ReplayChatModel(BaseChatModel):
+    """Modelo de chat que reproduce respuestas grabadas con latencia sintética."""
+
+    store: Any
+    timer: Any = None
+    latency: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "audit-replay"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # kwargs: parámetros de muestreo ligados con .bind(); no afectan la reproducción
+        with _stage(self.timer, "llm"):
+            content = self.store.get_llm(prompt_key(messages))
+            if content is None:
+                content = templated_response(messages[-1].content if messages else "")
+            if self.latency:
+                self.latency.sleep()
+        return _chat_result(content)
+
+
+class RecordingChatModel(BaseChatModel):
+    """Envuelve el modelo real (ChatOCIGenAI) y graba cada respuesta."""
+
+    inner: Any
+    store: Any
+    timer: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "audit-recording"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        with _stage(self.timer, "llm"):
+            response = self.inner.invoke(messages, stop=stop, **kwargs)
+        self.store.put_llm(prompt_key(messages), response.content)
+        return _chat_result(response.content)
+
+
+# ============================================================================
+# BÚSQUEDA VECTORIAL
+# ============================================================================
+
+def _tokens(text: str) -> set:
+    return {token for token in re.findall(r"\w+", normalize_key(text)) if len(token) > 3}
+
+
+def chunk_document(markdown_content: str, file_id: int) -> List[Dict]:
+    """Fragmentos de 512 caracteres (solape 51) etiquetados con su tipo de documento."""
+    segments = segment_document(markdown_content)
+    chunks = []
+    step = CHUNK_CHARS - CHUNK_OVERLAP
+    for chunk_id, offset in enumerate(range(0, max(len(markdown_content), 1), step), start=1):
+        content = markdown_content[offset:offset + CHUNK_CHARS]
+        if not content.strip():
+            continue
+        segment_type = next(
+            (segment["segment_type"] for segment in segments
+             if segment["char_start"] <= offset < segment["char_end"]),
+            None,
+        )
+        chunks.append({
+            "content": content,
+            "tokens": _tokens(content),
+            "metadata": {"file_id": file_id, "chunk_id": chunk_id, "segment_type": segment_type},
+        })
+    return chunks
+
+
+class ReplayRAGTool:
+    """
+    Sustituto de OCIRAGTool: reproduce búsquedas grabadas y, si no existen, hace una
+    búsqueda léxica sobre el markdown de cada file_id. Un lote cuesta una sola latencia
+    (un viaje a la base de datos), igual que la búsqueda por lotes real.
+    """
+
+    def __init__(self, store: FixtureStore, documents: Dict[int, str],
+                 timer: Optional[StageTimer] = None, latency: Optional[SyntheticLatency] = None):
+        self.store = store
+        self.timer = timer
+        self.latency = latency
+        self._chunks = {file_id: chunk_document(markdown, file_id) for file_id, markdown in documents.items()}
+
+    def _lexical_search(self, query: str, files_ids: List[int], k: int,
+                        segment_types: Optional[List[str]] = None) -> Dict:
+        query_tokens = _tokens(query)
+        scored = []
+        for file_id in files_ids or []:
+            for chunk in self._chunks.get(file_id, []):
+                if segment_types and chunk["metadata"]["segment_type"] not in segment_types:
+                    continue
+                overlap = len(query_tokens & chunk["tokens"])
+                if overlap:
+                    scored.append((1 - overlap / len(query_tokens), chunk))
+        scored.sort(key=lambda pair: pair[0])
+
+        documents = []
+        for index, (distance, chunk) in enumerate(scored[:k], start=1):
+            documents.append({
+                "index": index,
+                "content": chunk["content"],
+                "metadata": dict(chunk["metadata"]),
+                "score": round(distance, 4),
+                "file_id": chunk["metadata"]["file_id"],
+                "chunk_id": chunk["metadata"]["chunk_id"],
+            })
+        return {"query": query, "k_requested": k, "total_documents": len(documents), "documents": documents}
+
+    def _search(self, query: str, files_ids: List[int], k: int,
+                segment_types: Optional[List[str]] = None) -> Dict:
+        context = self.store.get_retrieval(retrieval_key(query, files_ids, k, segment_types))
+        if context is None:
+            context = self._lexical_search(query, files_ids, k, segment_types)
+        return json.loads(json.dumps(context))
+
+    def oci_vector_search_context_only(self, input: str, files_ids: list, k: int = 10) -> dict:
+        with _stage(self.timer, "retrieval"):
+            context = self._search(input, files_ids, k)
+            if self.latency:
+                self.latency.sleep()
+        return context
+
+    def oci_vector_search_context_batch(self, inputs: list, files_ids: list, k: int = 10,
+                                        segment_types: list = None, k_per_query: list = None) -> list:
+        if not inputs:
+            return []
+        with _stage(self.timer, "retrieval"):
+            contexts = [
+                self._search(query, files_ids,
+                             k_per_query[qi] if k_per_query else k,
+                             segment_types[qi] if segment_types else None)
+                for qi, query in enumerate(inputs)
+            ]
+            if self.latency:
+                self.latency.sleep()
+        return contexts
+
+
+class RecordingRAGTool:
+    """Envuelve OCIRAGTool y graba cada búsqueda con la misma huella que usa la reproducción."""
+
+    def __init__(self, inner, store: FixtureStore, timer: Optional[StageTimer] = None):
+        self.inner = inner
+        self.store = store
+        self.timer = timer
+
+    def oci_vector_search_context_only(self, input: str, files_ids: list, k: int = 10) -> dict:
+        with _stage(self.timer, "retrieval"):
+            context = self.inner.oci_vector_search_context_only(input, files_ids, k)
+        self.store.put_retrieval(retrieval_key(input, files_ids, k), context)
+        return context
+
+    def oci_vector_search_context_batch(self, inputs: list, files_ids: list, k: int = 10,
+                                        segment_types: list = None, k_per_query: list = None) -> list:
+        with _stage(self.timer, "retrieval"):
+            contexts = self.inner.oci_vector_search_context_batch(inputs, files_ids, k, segment_types, k_per_query)
+        for qi, (query, context) in enumerate(zip(inputs, contexts)):
+            self.store.put_retrieval(
+                retrieval_key(query, files_ids,
+                              k_per_query[qi] if k_per_query else k,
+                              segment_types[qi] if segment_types else None),
+                context,
+            )
+        return contexts
+
+
+# ============================================================================
+# PARSERS
+# ============================================================================
+
+class TimedStructuredOutputParser(StructuredOutputParser):
+    """StructuredOutputParser que acumula su tiempo de parseo en la etapa 'parsing'."""
+
+    timer: Any = None
+
+    def parse(self, text: str) -> Any:
+        with _stage(self.timer, "parsing"):
+            return super().parse(text)
+
+
+def timed_parser(parser: StructuredOutputParser, timer: StageTimer) -> TimedStructuredOutputParser:
+    return TimedStructuredOutputParser(response_schemas=parser.response_schemas, timer=timer)
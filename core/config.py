@@ -70,6 +70,12 @@ class Settings(BaseSettings):
     CON_ADB_DEV_SERVICE_NAME: str
     CON_ADB_WALLET_LOCATION: str
     CON_ADB_WALLET_PASSWORD: str
+    CON_ADB_POOL_ENABLED: bool = True       # Reutilizar sesiones desde un pool en lugar de abrir una conexión TLS por operación
+    CON_ADB_POOL_MIN: int = 2               # Sesiones abiertas al crear el pool
+    CON_ADB_POOL_MAX: int = 16              # Máximo de sesiones simultáneas del pool
+    CON_ADB_POOL_INCREMENT: int = 2         # Sesiones abiertas cada vez que el pool crece
+    CON_ADB_POOL_WAIT_SECONDS: float = 30.0  # Espera máxima por una sesión libre cuando el pool está lleno
+    CON_ADB_POOL_IDLE_SECONDS: int = 300    # Las sesiones inactivas por encima de min se cierran tras este tiempo
 
     # ============================================================================
     # CONFIGURACIÓN DE OCI GENERATIVE AI
@@ -79,11 +85,98 @@ class Settings(BaseSettings):
     CON_GEN_AI_CHAT_MODEL_ID: str
     CON_COMPARTMENT_ID: str
     CON_GEN_AI_CHAT_MODEL_PROVIDER: str
+    EMBEDDING_CACHE_ENABLED: bool = True    # Caché de embeddings de consultas (modelo + texto normalizado)
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 4096  # Máximo de vectores en caché (se expulsa el menos usado)
+    EMBEDDING_CACHE_TTL_SECONDS: int = 604800  # Antigüedad máxima de un vector en caché (0 = sin vencimiento)
+    EMBEDDING_CACHE_PATH: str = "temp/.embedding_cache/embeddings.db"  # Persistencia en SQLite entre reinicios (vacío = solo memoria)
+
+    # ============================================================================
+    # CONFIGURACIÓN DE RECUPERACIÓN (RAG)
+    # ============================================================================
+    RAG_SEARCH_MODE: str = "mmr"            # Recuperación de OCIRAGTool: 'mmr' o 'hybrid' (vector + Oracle Text, requiere create_rag_docs_text_index.sql)
+    RAG_MAX_FETCH_K: int = 500              # Máximo de candidatos por consulta aceptado en fetch_k
+    RAG_MMR_FETCH_K: int = 100              # Candidatos que trae la BD por consulta para re-ordenar con MMR
+    RAG_MMR_LAMBDA: float = 0.5             # Balance de MMR: 1 = solo relevancia, 0 = solo diversidad
+    RAG_HYBRID_FETCH_K: int = 50            # Candidatos por búsqueda (vector y texto) antes de fusionarlos
+    RAG_RRF_K: int = 60                     # Constante k de Reciprocal Rank Fusion (mayor = menos peso al primer puesto)
+    RAG_RETRIEVAL_MAX_WORKERS: int = 8      # Búsquedas RAG en curso como máximo desde los endpoints async y las herramientas de chat
+
+    # ============================================================================
+    # CONFIGURACIÓN DE LLM SIMULADO (PRUEBAS DE CARGA SIN RED)
+    # ============================================================================
+    LLM_BACKEND: str = "oci"                # 'oci' = servicios reales, 'mock' = chat y embeddings contra mock_genai
+    MOCK_GENAI_BASE_URL: str = "http://localhost:8090/v1"  # URL OpenAI-compatible del servidor mock_genai
+    MOCK_GENAI_LATENCY_DISTRIBUTION: str = "lognormal"  # Distribución de latencia: fixed, uniform, normal o lognormal
+    MOCK_GENAI_LATENCY_MS: float = 800      # Latencia media por llamada de chat
+    MOCK_GENAI_LATENCY_SPREAD_MS: float = 300  # Dispersión de la latencia (± en uniform, desviación estándar en normal / lognormal)
+    MOCK_GENAI_EMBED_LATENCY_MS: float = 50  # Latencia media por llamada de embeddings
+    MOCK_GENAI_ERROR_RATE: float = 0.0      # Fracción de solicitudes que responden con error (0.0 - 1.0)
+    MOCK_GENAI_ERROR_STATUS_CODES: str = "429,500,503"  # Códigos HTTP de los errores inyectados
+    MOCK_GENAI_EMBEDDING_DIM: int = 1536    # Dimensión de los embeddings simulados (debe coincidir con RAG_DOCS)
+    MOCK_GENAI_RESPONSES_PATH: str = ""     # JSON con respuestas enlatadas [{"match": regex, "response": ...}]
+
+    # ============================================================================
+    # CONFIGURACIÓN DE INVOCACIÓN RESILIENTE DEL LLM
+    # ============================================================================
+    LLM_INVOKE_TIMEOUT_SECONDS: float = 120.0  # Tiempo máximo de espera por intento de llamada al LLM
+    LLM_INVOKE_MAX_RETRIES: int = 2         # Reintentos ante errores transitorios (timeout, conexión, HTTP 408/429/5xx)
+    LLM_INVOKE_BACKOFF_SECONDS: float = 1.0  # Base del backoff exponencial entre reintentos (con jitter completo)
+    LLM_INVOKE_BACKOFF_MAX_SECONDS: float = 20.0  # Espera máxima entre reintentos
+    LLM_INVOKE_MAX_WORKERS: int = 32        # Llamadas al LLM en curso como máximo (incluye las abandonadas por timeout)
+    LLM_HEDGE_ENABLED: bool = False         # Enviar una solicitud duplicada si la llamada supera el percentil de latencia
+    LLM_HEDGE_PERCENTILE: float = 95.0      # Percentil de las latencias recientes a partir del cual se duplica la solicitud
+    LLM_HEDGE_MIN_SAMPLES: int = 20         # Latencias mínimas registradas por operación antes de duplicar solicitudes
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 2.0  # Espera mínima antes de duplicar una solicitud
+    LLM_HEDGE_WINDOW: int = 200             # Latencias recientes consideradas por operación
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5  # Fallas transitorias consecutivas que abren el circuit breaker
+    LLM_BREAKER_RESET_SECONDS: float = 30.0  # Tiempo con el breaker abierto antes de enviar una llamada de prueba
 
     # ============================================================================
     # CONFIGURACIÓN DE AUDITORÍA MÉDICA
     # ============================================================================
     AUDIT_GLOSAS_FILE_ID: int = 210  # ID del archivo con glosas oficiales en la base vectorial
+    AUDIT_MAX_CONCURRENCY: int = 4   # Máximo de auditorías ejecutadas en paralelo por solicitud (1 = secuencial)
+    AUDIT_GLOSAS_REFRESH_SECONDS: int = 300  # Intervalo mínimo entre verificaciones de versión del catálogo de glosas
+    AUDIT_GLOSAS_LOCAL_PATH: str = "HERRAMIENTA_NOTAS_ACLARATORIAS.md"  # Respaldo local del catálogo si la BD no responde
+    AUDIT_KEYWORD_GATING: bool = False      # Omitir auditorías sin términos relevantes en el markdown (pre-escaneo léxico)
+    AUDIT_RULES_ENABLED: bool = True        # Resolver auditorías especiales con validaciones deterministas (LLM solo si es ambiguo)
+    AUDIT_NUMERIC_CHECKS_ENABLED: bool = True  # Verificar totales y variación de precios MAOS sobre las tablas de facturas del OCR
+    AUDIT_MAOS_MAX_VARIANCE: float = 0.12   # Incremento máximo del valor IPS sobre el de la factura del proveedor (MAOS)
+    AUDIT_V2_SEGMENT_TOKENS: int = 6000     # Tokens por segmento en la auditoría v2 map-reduce
+    AUDIT_V2_MAP_CONCURRENCY: int = 4       # Segmentos auditados en paralelo en la auditoría v2 map-reduce
+    AUDIT_V2_TOKEN_BUDGET: int = 200000     # Tope de tokens (entrada + salida) por auditoría v2 map-reduce
+    AUDIT_SEGMENT_INDEX_ENABLED: bool = True  # Segmentar por tipo de documento al ingerir y filtrar la búsqueda de cada auditoría (requiere create_rag_segments.sql)
+    AUDIT_SEGMENT_K: int = 8                # Fragmentos por auditoría cuando la búsqueda se restringe a su segmento
+    AUDIT_ADAPTIVE_CONTEXT: bool = True     # Elegir los fragmentos de cada auditoría por relevancia y presupuesto de tokens (en vez de cortar el texto)
+    AUDIT_CONTEXT_MIN_RELATIVE_SCORE: float = 0.8  # Fracción de la similitud del mejor fragmento por debajo de la cual se deja de agregar contexto
+    AUDIT_CONTEXT_MIN_DOCUMENTS: int = 3    # Fragmentos mínimos por auditoría aunque caiga la similitud
+    AUDIT_DEADLINE_SECONDS: float = 0       # Tiempo máximo por auditoría completa; al agotarse se retorna un resultado parcial (0 = sin límite)
+    AUDIT_MAX_LLM_CALLS: int = 0            # Máximo de llamadas al LLM por auditoría completa (0 = sin límite)
+    AUDIT_DEADLINE_MARGIN_SECONDS: float = 10.0  # Tiempo mínimo estimado por auditoría para iniciarla antes del deadline
+    AUDIT_PRIORITY_OVERRIDES: str = ""      # Prioridades por auditoría, ej. 'maos:1,certificados:9' (menor = primero)
+    AUDIT_MODEL_FAST_ID: str = ""           # Modelo del perfil 'fast' para verificaciones simples (vacío = CON_GEN_AI_CHAT_MODEL_ID)
+    AUDIT_MODEL_FAST_MAX_TOKENS: int = 800  # Máximo de tokens de respuesta del perfil 'fast'
+    AUDIT_MODEL_FAST_TEMPERATURE: float = 0.0  # Temperatura del perfil 'fast'
+    AUDIT_MODEL_STRONG_ID: str = ""         # Modelo del perfil 'strong' (vacío = CON_GEN_AI_CHAT_MODEL_ID)
+    AUDIT_MODEL_STRONG_MAX_TOKENS: int = 4000  # Máximo de tokens de respuesta del perfil 'strong'
+    AUDIT_MODEL_ROUTES: str = ""            # Perfil por auditoría sobre el del registro, ej. 'v2:strong,rut_validacion:standard'
+    AUDIT_MODEL_ESCALATION: bool = True     # Repetir con el perfil siguiente (fast → standard → strong) si la respuesta no se puede parsear
+    AUDIT_CACHE_ENABLED: bool = True        # Caché de resultados para reclamaciones reenviadas
+    AUDIT_CACHE_MAX_ENTRIES: int = 256      # Máximo de resultados en caché (se expulsa el menos usado)
+    AUDIT_CACHE_TTL_SECONDS: int = 86400    # Antigüedad máxima de un resultado en caché
+    AUDIT_ANSWER_CACHE_ENABLED: bool = True  # Caché de respuestas de preguntas de auditoría (answer_audit_question)
+    AUDIT_ANSWER_CACHE_MAX_ENTRIES: int = 1024  # Máximo de respuestas en caché (se expulsa la menos usada)
+    AUDIT_ANSWER_CACHE_TTL_SECONDS: int = 3600  # Antigüedad máxima de una respuesta en caché
+    AUDIT_ANSWER_CACHE_SIMILARITY: float = 0.0  # Similitud coseno mínima para reutilizar la respuesta de una pregunta parafraseada (0 = solo coincidencia exacta)
+    AUDIT_ANSWER_CACHE_VERIFY_VERSIONS: bool = True  # Verificar en cada acierto que los archivos no cambiaron en RAG_FILES
+    AUDIT_HISTORY_ENABLED: bool = True      # Registrar cada auditoría completa en AUDIT_RUNS / AUDIT_RUN_GLOSAS (requiere create_audit_history.sql)
+    AUDIT_HISTORY_MAX_PAGE_SIZE: int = 200  # Máximo de filas por página en las consultas del historial
+    AUDIT_JOBS_DIR: str = "temp/.audit_jobs"                 # ZIPs de los lotes pendientes de auditar
+    AUDIT_JOBS_DB_PATH: str = "temp/.audit_jobs/jobs.db"     # Cola persistente de trabajos (SQLite)
+    AUDIT_JOBS_WORKERS: int = 2             # Reclamaciones auditadas en paralelo por la cola de lotes
+    AUDIT_JOBS_MAX_ATTEMPTS: int = 2        # Intentos por trabajo antes de marcarlo como fallido
+    AUDIT_JOBS_POLL_SECONDS: float = 5.0    # Espera de los trabajadores cuando la cola está vacía
+    AUDIT_JOBS_MAX_BATCH_SIZE: int = 500    # Máximo de ZIPs por lote
     
     # ============================================================================
     # CONFIGURACIÓN DE ARCHIVOS TEMPORALES
@@ -5,12 +5,13 @@ create or replace PROCEDURE SP_RAG_EMBEDDING (
         DELETE FROM RAG_DOCS WHERE FILE_ID = p_file_id;
         COMMIT;
 
-        INSERT INTO RAG_DOCS (FILE_ID, TEXT, METADATA, EMBEDDING)
+        INSERT INTO RAG_DOCS (FILE_ID, TEXT, METADATA, EMBEDDING, CHUNK_OFFSET)
         SELECT
             a.FILE_ID                  AS FILE_ID,
             TO_CLOB(ct.chunk_data)     AS TEXT,
             a.METADATA                 AS METADATA,
-            TO_VECTOR(et.embed_vector) AS EMBEDDING
+            TO_VECTOR(et.embed_vector) AS EMBEDDING,
+            ct.chunk_offset            AS CHUNK_OFFSET
         FROM VW_RAG_DOCS_FILES a
             CROSS JOIN dbms_vector_chain.utl_to_chunks(
                 a.TEXT,
@@ -53,4 +54,18 @@ create or replace PROCEDURE SP_RAG_EMBEDDING (
             a.FILE_ID = p_file_id;
         COMMIT;
 
+        -- Etiquetar cada fragmento con el tipo de documento del segmento que lo contiene
+        -- (chunk_offset es base 1; los segmentos de RAG_SEGMENTS usan offsets base 0)
+        UPDATE RAG_DOCS d
+           SET d.SEGMENT_TYPE = (
+                SELECT s.SEGMENT_TYPE
+                  FROM RAG_SEGMENTS s
+                 WHERE s.FILE_ID = d.FILE_ID
+                   AND d.CHUNK_OFFSET - 1 >= s.CHAR_START
+                   AND d.CHUNK_OFFSET - 1 <  s.CHAR_END
+                 FETCH FIRST 1 ROW ONLY
+           )
+         WHERE d.FILE_ID = p_file_id;
+        COMMIT;
+
     END;
@@ -0,0 +1,342 @@
+"""
+Módulo para la gestión del historial de auditorías (AUDIT_RUNS, AUDIT_RUN_VERDICTS y
+AUDIT_RUN_GLOSAS; ver create_audit_history.sql).
+
+Los listados usan paginación por keyset: se ordenan por id descendente y la siguiente
+página se pide con cursor = último id recibido, sin OFFSET.
+"""
+import json
+import logging
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import oracledb
+
+from database.connection import Connection
+
+logger = logging.getLogger(__name__)
+
+_RUN_COLUMNS = """
+    run_id, run_date, identificacion_reclamacion, ips_nit, payer_nit, response_format,
+    success, partial, glosa_total, master_decision, model_id, prompt_version,
+    documents_retrieved, execution_time_seconds
+"""
+
+_GLOSA_COLUMNS = """
+    entry_id, run_id, run_date, glosa_code, glosa_scope, audit_type, description,
+    item_code, item_name, item_value, identificacion_reclamacion, ips_nit, payer_nit
+"""
+
+# Columnas de agrupación permitidas en el resumen de glosas
+GLOSA_SUMMARY_GROUPS = {"ips": "ips_nit", "payer": "payer_nit", "audit_type": "audit_type", "code": "glosa_code"}
+
+
+def _iso(value: Any) -> Optional[str]:
+    return value.isoformat() if hasattr(value, "isoformat") else (str(value) if value else None)
+
+
+def _number(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _date_filters(conditions: List[str], params: Dict[str, Any],
+                  date_from: Optional[date], date_to: Optional[date]) -> None:
+    """Rango de fechas inclusivo sobre run_date (date_to cubre el día completo)."""
+    if date_from:
+        conditions.append("run_date >= :date_from")
+        params["date_from"] = datetime.combine(date_from, dt_time.min)
+    if date_to:
+        conditions.append("run_date < :date_to")
+        params["date_to"] = datetime.combine(date_to + timedelta(days=1), dt_time.min)
+
+
+def _where(conditions: List[str]) -> str:
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+class AuditHistoryDB:
+    """Clase para gestionar el historial de auditorías en Oracle."""
+
+    def __init__(self):
+        self.db_connector = Connection()
+
+    def insert_run(self, run: Dict[str, Any], verdicts: List[Dict[str, Any]],
+                   glosas: List[Dict[str, Any]]) -> int:
+        """
+        Inserta una ejecución con sus dictámenes y glosas en una sola transacción.
+
+        Returns:
+            RUN_ID de la ejecución
+        """
+        conn = None
+        try:
+            conn = self.db_connector.get_connection()
+            cursor = conn.cursor()
+
+            run_id_var = cursor.var(oracledb.NUMBER)
+            cursor.setinputsizes(result_json=oracledb.DB_TYPE_CLOB)
+            cursor.execute("""
+                INSERT INTO audit_runs (
+                    identificacion_reclamacion, ips_nit, payer_nit, response_format, success,
+                    partial, glosa_total, master_decision, model_id, prompt_version,
+                    markdown_sha256, documents_retrieved, execution_time_seconds, result_json
+                )
+                VALUES (
+                    :identificacion_reclamacion, :ips_nit, :payer_nit, :response_format, :success,
+                    :partial, :glosa_total, :master_decision, :model_id, :prompt_version,
+                    :markdown_sha256, :documents_retrieved, :execution_time_seconds, :result_json
+                )
+                RETURNING run_id INTO :run_id
+            """, {**run, "run_id": run_id_var})
+            run_id = int(run_id_var.getvalue()[0])
+
+            if verdicts:
+                cursor.setinputsizes(justification=oracledb.DB_TYPE_CLOB)
+                cursor.executemany("""
+                    INSERT INTO audit_run_verdicts (
+                        run_id, audit_type, response, estado_glosa, clasificacion,
+                        model_used, escalated, justification
+                    )
+                    VALUES (
+                        :run_id, :audit_type, :response, :estado_glosa, :clasificacion,
+                        :model_used, :escalated, :justification
+                    )
+                """, [{**verdict, "run_id": run_id} for verdict in verdicts])
+
+            if glosas:
+                # Los datos de la ejecución se repiten en cada glosa para los reportes sin join
+                cursor.executemany("""
+                    INSERT INTO audit_run_glosas (
+                        run_id, run_date, glosa_code, glosa_scope, audit_type, description,
+                        item_code, item_name, item_value, identificacion_reclamacion, ips_nit, payer_nit
+                    )
+                    SELECT :run_id, r.run_date, :glosa_code, :glosa_scope, :audit_type, :description,
+                           :item_code, :item_name, :item_value, r.identificacion_reclamacion, r.ips_nit, r.payer_nit
+                    FROM audit_runs r
+                    WHERE r.run_id = :run_id
+                """, [{**glosa, "run_id": run_id} for glosa in glosas])
+
+            conn.commit()
+            logger.info(f"[OCI][AUDIT_HISTORY] Ejecución registrada [run_id={run_id}] "
+                        f"[dictámenes={len(verdicts)}] [glosas={len(glosas)}] [SUCCESS]")
+            return run_id
+
+        except oracledb.DatabaseError as e:
+            logger.error(f"[OCI][AUDIT_HISTORY] Error al registrar la ejecución: {e}")
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def list_runs(self, identificacion_reclamacion: Optional[str] = None, ips_nit: Optional[str] = None,
+                  payer_nit: Optional[str] = None, date_from: Optional[date] = None,
+                  date_to: Optional[date] = None, glosa_total: Optional[bool] = None,
+                  cursor: Optional[int] = None, limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Ejecuciones más recientes primero.
+
+        Returns:
+            (ejecuciones, cursor de la página siguiente o None si no hay más)
+        """
+        conditions: List[str] = []
+        params: Dict[str, Any] = {"limit": limit + 1}
+        for column, value in (("identificacion_reclamacion", identificacion_reclamacion),
+                              ("ips_nit", ips_nit), ("payer_nit", payer_nit)):
+            if value:
+                conditions.append(f"{column} = :{column}")
+                params[column] = value
+        if glosa_total is not None:
+            conditions.append("glosa_total = :glosa_total")
+            params["glosa_total"] = int(glosa_total)
+        _date_filters(conditions, params, date_from, date_to)
+        if cursor:
+            conditions.append("run_id < :cursor")
+            params["cursor"] = cursor
+
+        query = f"""
+            SELECT {_RUN_COLUMNS}
+            FROM audit_runs
+            {_where(conditions)}
+            ORDER BY run_id DESC
+            FETCH FIRST :limit ROWS ONLY
+        """
+        try:
+            rows = self.db_connector.execute_select(query, params) or []
+        except Exception as e:
+            logger.error(f"[OCI][AUDIT_HISTORY] Error al listar ejecuciones: {str(e)}")
+            raise
+
+        runs = [self._run_row(row) for row in rows[:limit]]
+        next_cursor = runs[-1]["run_id"] if len(rows) > limit else None
+        return runs, next_cursor
+
+    def get_run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        """Ejecución con sus dictámenes, glosas y el resultado retornado al cliente."""
+        try:
+            row = self.db_connector.execute_select(
+                f"SELECT {_RUN_COLUMNS}, result_json FROM audit_runs WHERE run_id = :run_id",
+                {"run_id": run_id}, fetch_one=True
+            )
+            if not row:
+                return None
+            run = self._run_row(row)
+            run["result"] = json.loads(row[-1]) if row[-1] else None
+
+            verdicts = self.db_connector.execute_select("""
+                SELECT audit_type, response, estado_glosa, clasificacion, model_used, escalated, justification
+                FROM audit_run_verdicts
+                WHERE run_id = :run_id
+                ORDER BY verdict_id
+            """, {"run_id": run_id}) or []
+            run["verdicts"] = [
+                {
+                    "audit_type"   : verdict[0],
+                    "response"     : verdict[1],
+                    "estado_glosa" : verdict[2],
+                    "clasificacion": verdict[3],
+                    "model_used"   : verdict[4],
+                    "escalated"    : bool(verdict[5]),
+                    "justification": verdict[6],
+                }
+                for verdict in verdicts
+            ]
+
+            glosas = self.db_connector.execute_select(
+                f"SELECT {_GLOSA_COLUMNS} FROM audit_run_glosas WHERE run_id = :run_id ORDER BY entry_id",
+                {"run_id": run_id}
+            ) or []
+            run["glosas"] = [self._glosa_row(glosa) for glosa in glosas]
+            return run
+
+        except Exception as e:
+            logger.error(f"[OCI][AUDIT_HISTORY] Error al consultar la ejecución {run_id}: {str(e)}")
+            raise
+
+    def list_glosas(self, glosa_code: Optional[str] = None, identificacion_reclamacion: Optional[str] = None,
+                    ips_nit: Optional[str] = None, payer_nit: Optional[str] = None,
+                    audit_type: Optional[str] = None, date_from: Optional[date] = None,
+                    date_to: Optional[date] = None, cursor: Optional[int] = None,
+                    limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Glosas aplicadas, más recientes primero.
+
+        Returns:
+            (glosas, cursor de la página siguiente o None si no hay más)
+        """
+        conditions: List[str] = []
+        params: Dict[str, Any] = {"limit": limit + 1}
+        for column, value in (("glosa_code", glosa_code), ("identificacion_reclamacion", identificacion_reclamacion),
+                              ("ips_nit", ips_nit), ("payer_nit", payer_nit), ("audit_type", audit_type)):
+            if value:
+                conditions.append(f"{column} = :{column}")
+                params[column] = value
+        _date_filters(conditions, params, date_from, date_to)
+        if cursor:
+            conditions.append("entry_id < :cursor")
+            params["cursor"] = cursor
+
+        query = f"""
+            SELECT {_GLOSA_COLUMNS}
+            FROM audit_run_glosas
+            {_where(conditions)}
+            ORDER BY entry_id DESC
+            FETCH FIRST :limit ROWS ONLY
+        """
+        try:
+            rows = self.db_connector.execute_select(query, params) or []
+        except Exception as e:
+            logger.error(f"[OCI][AUDIT_HISTORY] Error al listar glosas: {str(e)}")
+            raise
+
+        glosas = [self._glosa_row(row) for row in rows[:limit]]
+        next_cursor = glosas[-1]["entry_id"] if len(rows) > limit else None
+        return glosas, next_cursor
+
+    def summarize_glosas(self, group_by: str, glosa_code: Optional[str] = None,
+                         ips_nit: Optional[str] = None, payer_nit: Optional[str] = None,
+                         date_from: Optional[date] = None, date_to: Optional[date] = None,
+                         limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Aplicaciones de glosas agrupadas por código y por prestador, pagador o tipo de auditoría.
+        """
+        group_column = GLOSA_SUMMARY_GROUPS[group_by]
+        conditions: List[str] = []
+        params: Dict[str, Any] = {"limit": limit}
+        for column, value in (("glosa_code", glosa_code), ("ips_nit", ips_nit), ("payer_nit", payer_nit)):
+            if value:
+                conditions.append(f"{column} = :{column}")
+                params[column] = value
+        _date_filters(conditions, params, date_from, date_to)
+
+        group_columns = "glosa_code" if group_column == "glosa_code" else f"glosa_code, {group_column}"
+        query = f"""
+            SELECT {group_columns},
+                   COUNT(*) AS applications,
+                   COUNT(DISTINCT run_id) AS runs,
+                   COUNT(DISTINCT identificacion_reclamacion) AS claims,
+                   SUM(item_value) AS total_value
+            FROM audit_run_glosas
+            {_where(conditions)}
+            GROUP BY {group_columns}
+            ORDER BY applications DESC, glosa_code
+            FETCH FIRST :limit ROWS ONLY
+        """
+        try:
+            rows = self.db_connector.execute_select(query, params) or []
+        except Exception as e:
+            logger.error(f"[OCI][AUDIT_HISTORY] Error al resumir glosas: {str(e)}")
+            raise
+
+        summary = []
+        offset = 1 if group_column == "glosa_code" else 2
+        for row in rows:
+            entry = {"glosa_code": row[0]}
+            if offset == 2:
+                entry[group_column] = row[1]
+            entry.update({
+                "applications": int(row[offset]),
+                "runs"        : int(row[offset + 1]),
+                "claims"      : int(row[offset + 2]),
+                "total_value" : _number(row[offset + 3]),
+            })
+            summary.append(entry)
+        return summary
+
+    @staticmethod
+    def _run_row(row: tuple) -> Dict[str, Any]:
+        return {
+            "run_id"                    : int(row[0]),
+            "run_date"                  : _iso(row[1]),
+            "identificacion_reclamacion": row[2],
+            "ips_nit"                   : row[3],
+            "payer_nit"                 : row[4],
+            "response_format"           : row[5],
+            "success"                   : bool(row[6]),
+            "partial"                   : bool(row[7]),
+            "glosa_total"               : bool(row[8]) if row[8] is not None else None,
+            "master_decision"           : row[9],
+            "model_id"                  : row[10],
+            "prompt_version"            : row[11],
+            "documents_retrieved"       : row[12],
+            "execution_time_seconds"    : _number(row[13]),
+        }
+
+    @staticmethod
+    def _glosa_row(row: tuple) -> Dict[str, Any]:
+        return {
+            "entry_id"                  : int(row[0]),
+            "run_id"                    : int(row[1]),
+            "run_date"                  : _iso(row[2]),
+            "glosa_code"                : row[3],
+            "glosa_scope"               : row[4],
+            "audit_type"                : row[5],
+            "description"               : row[6],
+            "item_code"                 : row[7],
+            "item_name"                 : row[8],
+            "item_value"                : _number(row[9]),
+            "identificacion_reclamacion": row[10],
+            "ips_nit"                   : row[11],
+            "payer_nit"                 : row[12],
+        }
@@ -1,11 +1,78 @@
 import os
 import logging
+import threading
 import oracledb
 
 from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Pool de sesiones compartido por todas las instancias de Connection (se crea al primer uso)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _connect_params() -> dict:
+    return {
+        "user"           : settings.CON_ADB_DEV_USER_NAME,
+        "password"       : settings.CON_ADB_DEV_PASSWORD,
+        "dsn"            : settings.CON_ADB_DEV_SERVICE_NAME,
+        "config_dir"     : settings.CON_ADB_WALLET_LOCATION,
+        "wallet_location": settings.CON_ADB_WALLET_LOCATION,
+        "wallet_password": settings.CON_ADB_WALLET_PASSWORD,
+    }
+
+
+def get_pool():
+    """
+    Pool de conexiones de la aplicación. Cerrar una conexión obtenida del pool la
+    devuelve al pool en lugar de terminar la sesión TLS.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = oracledb.create_pool(
+                    **_connect_params(),
+                    min=settings.CON_ADB_POOL_MIN,
+                    max=settings.CON_ADB_POOL_MAX,
+                    increment=settings.CON_ADB_POOL_INCREMENT,
+                    getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                    wait_timeout=int(settings.CON_ADB_POOL_WAIT_SECONDS * 1000),
+                    timeout=settings.CON_ADB_POOL_IDLE_SECONDS,
+                )
+                logger.info(f"[OCI][ADB] Pool de conexiones creado [min={settings.CON_ADB_POOL_MIN}] "
+                            f"[max={settings.CON_ADB_POOL_MAX}] [SUCCESS]")
+    return _pool
+
+
+def close_pool() -> None:
+    """Cierra el pool al detener la aplicación (las conexiones prestadas se fuerzan a cerrar)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            try:
+                _pool.close(force=True)
+                logger.info("[OCI][ADB] Pool de conexiones cerrado")
+            except Exception as e:
+                logger.error(f"[OCI][ADB] Error al cerrar el pool de conexiones: {e}")
+            _pool = None
+
+
+def pool_stats() -> dict:
+    """Sesiones abiertas y prestadas del pool (vacío si aún no se creó)."""
+    pool = _pool
+    if pool is None:
+        return {"enabled": settings.CON_ADB_POOL_ENABLED, "created": False}
+    return {
+        "enabled": True,
+        "created": True,
+        "opened" : pool.opened,
+        "busy"   : pool.busy,
+        "max"    : pool.max,
+    }
+
+
 class Connection:
     """
     Manages Oracle database connections.
@@ -20,11 +87,15 @@ class Connection:
 
     def get_connection(self):
         """
-        Establishes and returns a new Oracle database connection.
+        Returns an Oracle database connection: borrowed from the application pool
+        (settings.CON_ADB_POOL_ENABLED) or a new standalone one. Callers must close it;
+        closing a pooled connection releases it back to the pool.
         """
         try:
             if not self.user or not self.password or not self.dsn:
                 raise RuntimeError("Variables de entorno de ADB incompletas (usuario/clave/dsn)")
+            if settings.CON_ADB_POOL_ENABLED:
+                return get_pool().acquire()
             return oracledb.connect(
                 user=self.user,
                 password=self.password,
@@ -81,6 +152,25 @@ class Connection:
             if conn:
                 conn.close()
 
+    def execute_many(self, query: str, rows: list):
+        """
+        Ejecuta una sentencia DML para varias filas en un único viaje a la base de datos.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.executemany(query, rows)
+            conn.commit()
+        except oracledb.DatabaseError as e:
+            logger.error(f"[OCI][ADB] Error al ejecutar executemany: {e}")
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
     def execute_select(self, query: str, params: dict = None, fetch_one: bool = False):
         """
         Ejecuta una consulta SELECT de forma segura y retorna los resultados.
@@ -0,0 +1,78 @@
+-- Script de migración: historial de auditorías
+-- Ejecutar este script en la base de datos Oracle antes de habilitar AUDIT_HISTORY_ENABLED
+
+-- Una fila por auditoría completa ejecutada (/agent/glosa, /agent/process y lotes)
+CREATE TABLE AUDIT_RUNS (
+    RUN_ID                     NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    RUN_DATE                   TIMESTAMP DEFAULT SYSTIMESTAMP NOT NULL,
+    IDENTIFICACION_RECLAMACION VARCHAR2(200),
+    IPS_NIT                    VARCHAR2(20),   -- NIT del prestador (sin dígito de verificación)
+    PAYER_NIT                  VARCHAR2(20),   -- NIT del pagador (sin dígito de verificación)
+    RESPONSE_FORMAT            VARCHAR2(10),
+    SUCCESS                    NUMBER(1) NOT NULL,
+    PARTIAL                    NUMBER(1) DEFAULT 0 NOT NULL,
+    GLOSA_TOTAL                NUMBER(1),      -- 1 = la reclamación tiene glosa total
+    MASTER_DECISION            VARCHAR2(30),
+    MODEL_ID                   VARCHAR2(200),
+    PROMPT_VERSION             VARCHAR2(64),
+    MARKDOWN_SHA256            VARCHAR2(64),
+    DOCUMENTS_RETRIEVED        NUMBER,
+    EXECUTION_TIME_SECONDS     NUMBER,
+    RESULT_JSON                CLOB CHECK (RESULT_JSON IS JSON)
+);
+
+-- La paginación por keyset recorre RUN_ID descendente dentro de cada filtro: cada índice
+-- de filtro por igualdad termina en RUN_ID para leer la página en orden sin ordenar.
+-- Sin filtro de igualdad, el rango de fechas se resuelve recorriendo la clave primaria
+-- (RUN_ID crece con RUN_DATE)
+CREATE INDEX IDX_AUDIT_RUNS_DATE  ON AUDIT_RUNS (RUN_DATE, RUN_ID);
+CREATE INDEX IDX_AUDIT_RUNS_CLAIM ON AUDIT_RUNS (IDENTIFICACION_RECLAMACION, RUN_ID);
+CREATE INDEX IDX_AUDIT_RUNS_PAYER ON AUDIT_RUNS (PAYER_NIT, RUN_ID);
+CREATE INDEX IDX_AUDIT_RUNS_IPS   ON AUDIT_RUNS (IPS_NIT, RUN_ID);
+
+-- Dictamen de cada auditoría individual de una ejecución
+CREATE TABLE AUDIT_RUN_VERDICTS (
+    VERDICT_ID     NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    RUN_ID         NUMBER NOT NULL REFERENCES AUDIT_RUNS (RUN_ID) ON DELETE CASCADE,
+    AUDIT_TYPE     VARCHAR2(40) NOT NULL,
+    RESPONSE       VARCHAR2(20) NOT NULL,
+    ESTADO_GLOSA   NUMBER(1),      -- Solo auditorías especiales
+    CLASIFICACION  VARCHAR2(20),   -- Código de glosa de las auditorías especiales
+    MODEL_USED     VARCHAR2(200),  -- NULL = validación determinista
+    ESCALATED      NUMBER(1) DEFAULT 0 NOT NULL,
+    JUSTIFICATION  CLOB
+);
+
+CREATE INDEX IDX_AUDIT_VERDICTS_RUN  ON AUDIT_RUN_VERDICTS (RUN_ID);
+CREATE INDEX IDX_AUDIT_VERDICTS_TYPE ON AUDIT_RUN_VERDICTS (AUDIT_TYPE, RESPONSE);
+
+-- Glosas aplicadas por ejecución. Fecha, reclamación, prestador y pagador se repiten
+-- de AUDIT_RUNS para que los reportes por código de glosa no necesiten el join
+CREATE TABLE AUDIT_RUN_GLOSAS (
+    ENTRY_ID                   NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    RUN_ID                     NUMBER NOT NULL REFERENCES AUDIT_RUNS (RUN_ID) ON DELETE CASCADE,
+    RUN_DATE                   TIMESTAMP NOT NULL,
+    GLOSA_CODE                 VARCHAR2(20) NOT NULL,
+    GLOSA_SCOPE                VARCHAR2(10) NOT NULL,  -- 'total' o 'parcial'
+    AUDIT_TYPE                 VARCHAR2(40),
+    DESCRIPTION                VARCHAR2(4000),
+    ITEM_CODE                  VARCHAR2(100),
+    ITEM_NAME                  VARCHAR2(400),
+    ITEM_VALUE                 NUMBER,
+    IDENTIFICACION_RECLAMACION VARCHAR2(200),
+    IPS_NIT                    VARCHAR2(20),
+    PAYER_NIT                  VARCHAR2(20)
+);
+
+-- Listado (keyset por ENTRY_ID descendente): un índice por filtro de igualdad que
+-- termina en ENTRY_ID
+CREATE INDEX IDX_AUDIT_GLOSAS_CODE  ON AUDIT_RUN_GLOSAS (GLOSA_CODE, ENTRY_ID);
+CREATE INDEX IDX_AUDIT_GLOSAS_CLAIM ON AUDIT_RUN_GLOSAS (IDENTIFICACION_RECLAMACION, ENTRY_ID);
+CREATE INDEX IDX_AUDIT_GLOSAS_PAYER ON AUDIT_RUN_GLOSAS (PAYER_NIT, ENTRY_ID);
+CREATE INDEX IDX_AUDIT_GLOSAS_IPS   ON AUDIT_RUN_GLOSAS (IPS_NIT, ENTRY_ID);
+CREATE INDEX IDX_AUDIT_GLOSAS_TYPE  ON AUDIT_RUN_GLOSAS (AUDIT_TYPE, ENTRY_ID);
+CREATE INDEX IDX_AUDIT_GLOSAS_RUN   ON AUDIT_RUN_GLOSAS (RUN_ID);
+
+-- Resúmenes por código de glosa en un rango de fechas
+CREATE INDEX IDX_AUDIT_GLOSAS_DATE  ON AUDIT_RUN_GLOSAS (RUN_DATE, ENTRY_ID);
+CREATE INDEX IDX_AUDIT_GLOSAS_CODE_DATE ON AUDIT_RUN_GLOSAS (GLOSA_CODE, RUN_DATE, IPS_NIT);
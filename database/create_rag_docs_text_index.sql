@@ -0,0 +1,15 @@
+-- Script de migración: índice de texto (Oracle Text) sobre RAG_DOCS
+-- Ejecutar este script en la base de datos Oracle antes de usar RAG_SEARCH_MODE = 'hybrid'
+
+-- Sin distinción de tildes ni lista de palabras vacías: las auditorías buscan códigos
+-- (CUFE, CUPS, CUM, NIT, cédulas) y términos exactos, no solo lenguaje natural
+BEGIN
+    CTX_DDL.CREATE_PREFERENCE('RAG_DOCS_LEXER', 'BASIC_LEXER');
+    CTX_DDL.SET_ATTRIBUTE('RAG_DOCS_LEXER', 'BASE_LETTER', 'YES');
+END;
+/
+
+-- Se sincroniza en cada COMMIT de SP_RAG_EMBEDDING
+CREATE INDEX IDX_RAG_DOCS_TEXT ON RAG_DOCS (TEXT)
+    INDEXTYPE IS CTXSYS.CONTEXT
+    PARAMETERS ('LEXER RAG_DOCS_LEXER STOPLIST CTXSYS.EMPTY_STOPLIST SYNC (ON COMMIT)');
@@ -0,0 +1,24 @@
+-- Script de migración: índice de segmentos por tipo de documento
+-- Ejecutar este script en la base de datos Oracle antes de desplegar SP_RAG_EMBEDDING actualizado
+
+-- Posición del fragmento en el texto extraído y tipo de documento al que pertenece
+ALTER TABLE RAG_DOCS ADD (
+    CHUNK_OFFSET NUMBER,
+    SEGMENT_TYPE VARCHAR2(40)
+);
+
+-- Las auditorías filtran por archivo + tipo de documento
+CREATE INDEX IDX_RAG_DOCS_SEGMENT ON RAG_DOCS (FILE_ID, SEGMENT_TYPE);
+
+-- Segmentos detectados al ingerir cada archivo (offsets de caracteres en base 0, CHAR_END exclusivo)
+CREATE TABLE RAG_SEGMENTS (
+    SEGMENT_ID   NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    FILE_ID      NUMBER NOT NULL,
+    SEGMENT_TYPE VARCHAR2(40) NOT NULL,
+    PAGE_START   NUMBER,
+    PAGE_END     NUMBER,
+    CHAR_START   NUMBER NOT NULL,
+    CHAR_END     NUMBER NOT NULL
+);
+
+CREATE INDEX IDX_RAG_SEGMENTS_FILE ON RAG_SEGMENTS (FILE_ID, CHAR_START);
@@ -1,14 +1,95 @@
 """
 Módulo para la gestión de la tabla RAG_DOCS y operaciones de vectores.
 """
+import re
+import copy
+import array
+import json
 import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
 from database.connection import Connection
-from langchain_community.embeddings.oci_generative_ai import OCIGenAIEmbeddings
 from langchain_community.vectorstores import OracleVS
 from core.config import settings
+from services.llm_factory import get_embeddings
+from services.embedding_cache import cached_embeddings
 
 logger = logging.getLogger(__name__)
 
+# Clientes compartidos por la aplicación: embeddings (lee la configuración OCI y el firmante
+# una sola vez) y una plantilla de OracleVS ya inicializada (su constructor embebe una
+# consulta de prueba y verifica la tabla)
+_embeddings = None
+_embeddings_lock = threading.Lock()
+_vector_store_template: Optional[OracleVS] = None
+_vector_store_lock = threading.Lock()
+
+# Términos de la consulta de texto: palabras y códigos alfanuméricos (el lexer de Oracle
+# Text también separa en guiones y puntos)
+_TEXT_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_MAX_TEXT_TERMS = 32
+_MIN_TEXT_TERM_LENGTH = 4
+
+# Palabras funcionales y genéricas de las preguntas: el índice usa EMPTY_STOPLIST, por lo
+# que sin este filtro coinciden con casi todos los fragmentos y desplazan a los términos
+# específicos (códigos, CUFE, nombres de medicamentos)
+_TEXT_STOPWORDS = frozenset("""
+    alguna algunas alguno algunos ante antes aquel aquella aquellas aquellos aquí cada cierta
+    cierto como cómo conforme contra cual cuál cuales cuáles cualquier cuando cuanto cuya cuyo
+    dame debe deben desde dime donde dónde durante ella ellas ellos entonces entre esas esos
+    esta está estaba estado estan están estar este esto estos fueron hace hacia hasta indica
+    indique informa luego mediante mismo mucho muchos muestra nada ninguna ninguno nosotros
+    nuestra nuestro otra otras otro otros para pero poco porque puede pueden pues quien quién
+    quienes segun según sera será siempre sido sobre solo también tanto tenga tiene tienen toda
+    todas todo todos tras usted
+""".split())
+
+
+def _row_metadata(metadata: Any, file_id: int) -> Dict[str, Any]:
+    """Metadatos de un fragmento (JSON o dict) con su file_id."""
+    if isinstance(metadata, (str, bytes)):
+        try:
+            metadata = json.loads(metadata)
+        except ValueError:
+            metadata = {"raw": metadata}
+    metadata = dict(metadata or {})
+    metadata.setdefault("file_id", file_id)
+    return metadata
+
+
+def _file_filter(files_ids: List[int], params: Dict[str, Any]) -> str:
+    """Condición `d.file_id IN (...)` con sus binds agregados a params ("" sin archivos)."""
+    if not files_ids:
+        return ""
+    file_binds = []
+    for i, file_id in enumerate(files_ids):
+        params[f"f{i}"] = file_id
+        file_binds.append(f":f{i}")
+    return f"d.file_id IN ({', '.join(file_binds)})"
+
+
+def build_text_query(text: str) -> str:
+    """
+    Consulta CONTAINS de Oracle Text a partir de texto libre: cada término se escapa con
+    llaves y se combinan con ACCUM (más términos coincidentes = mayor SCORE).
+
+    Solo se conservan los términos específicos: los que contienen dígitos (códigos, CUFE,
+    NIT; al menos 2 caracteres) y las palabras de al menos 4 caracteres que no son
+    funcionales. Retorna "" si el texto no tiene ninguno.
+    """
+    terms = []
+    for term in _TEXT_TERM_RE.findall((text or "").lower()):
+        if any(char.isdigit() for char in term):
+            if len(term) >= 2:
+                terms.append(term)
+        elif len(term) >= _MIN_TEXT_TERM_LENGTH and term not in _TEXT_STOPWORDS:
+            terms.append(term)
+    terms = list(dict.fromkeys(terms))[:_MAX_TEXT_TERMS]
+    return " ACCUM ".join(f"{{{term}}}" for term in terms)
+
+
 class RAGDocsDB:
     """
     Clase de servicio para interactuar con las operaciones de la base de datos
@@ -34,21 +115,270 @@ class RAGDocsDB:
             return False
 
 
-    def get_vector_store(self) -> OracleVS:
-        """
-        Crea y devuelve una instancia de Oracle Vector Store.
-        """
-        embeddings = OCIGenAIEmbeddings(
-            model_id         = settings.CON_GEN_AI_EMB_MODEL_ID,
-            service_endpoint = settings.CON_GEN_AI_SERVICE_ENDPOINT,
-            compartment_id   = settings.CON_COMPARTMENT_ID,
-            auth_type        = "API_KEY",
-            auth_profile     = settings.OCI_PROFILE,
-        )
-        
-        # OracleVS maneja su propia conexión, por lo que le pasamos un cliente nuevo.
-        return OracleVS(
-            client             = self.db_connector.get_connection(),
-            embedding_function = embeddings,
-            table_name         = 'rag_docs'
-        )
\ No newline at end of file
+    def insert_segments(self, file_id: int, segments: List[Dict[str, Any]]) -> bool:
+        """
+        Reemplaza los segmentos por tipo de documento de un archivo en RAG_SEGMENTS.
+        Debe ejecutarse antes de SP_RAG_EMBEDDING, que etiqueta los fragmentos con ellos.
+        """
+        try:
+            self.db_connector.execute_query("DELETE FROM rag_segments WHERE file_id = :1", (file_id,))
+            if segments:
+                rows = [
+                    (file_id, segment["segment_type"], segment["page_start"], segment["page_end"],
+                     segment["char_start"], segment["char_end"])
+                    for segment in segments
+                ]
+                self.db_connector.execute_many(
+                    """
+                    INSERT INTO rag_segments (file_id, segment_type, page_start, page_end, char_start, char_end)
+                    VALUES (:1, :2, :3, :4, :5, :6)
+                    """,
+                    rows
+                )
+            logger.info(f"[OCI][RAG_DOCS] Segmentos registrados: [file_id={file_id}] [{len(segments)}] [SUCCESS]")
+            return True
+
+        except Exception as e:
+            logger.error(f"[OCI][RAG_DOCS] Error al registrar segmentos del archivo {file_id}: {str(e)}")
+            return False
+
+
+    def get_embeddings(self):
+        """
+        Devuelve el cliente de embeddings de OCI Generative AI compartido por la aplicación
+        (o el del servidor simulado si settings.LLM_BACKEND = 'mock'), detrás de la caché de
+        embeddings de consultas si settings.EMBEDDING_CACHE_ENABLED.
+        """
+        global _embeddings
+        if _embeddings is None:
+            with _embeddings_lock:
+                if _embeddings is None:
+                    _embeddings = cached_embeddings(get_embeddings())
+                    logger.info("[OCI][RAG_DOCS] Cliente de embeddings inicializado")
+        return _embeddings
+
+
+    def batch_search_candidates(self, query_vectors: List[List[float]], files_ids: List[int],
+                                fetch_k_per_query: List[int],
+                                segment_types: Optional[List[Optional[List[str]]]] = None,
+                                query_texts: Optional[List[str]] = None,
+                                with_embeddings: bool = True) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Candidatos de varias consultas en un único viaje a la BD, para re-ordenarlos
+        localmente (MMR) o fusionarlos (RRF) por consulta.
+
+        Cada vector genera una subconsulta top-fetch_k por distancia coseno y, con
+        query_texts, otra por Oracle Text (índice IDX_RAG_DOCS_TEXT); todas se combinan con
+        UNION ALL. segment_types (opcional, uno por consulta) restringe ambas búsquedas a
+        los fragmentos de esos tipos de documento (columna SEGMENT_TYPE).
+
+        Returns:
+            Una entrada por consulta, en el orden de entrada: {"vector": [...], "text": [...]},
+            cada fragmento con doc_key (ROWID), distancia coseno, SCORE de Oracle Text (solo
+            en "text") y, con with_embeddings, su embedding en "vector"
+        """
+        if not query_vectors:
+            return []
+
+        params: Dict[str, Any] = {}
+        file_filter = _file_filter(files_ids, params)
+        embedding_column = "d.embedding" if with_embeddings else "NULL"
+
+        subqueries = []
+        for qi, vector in enumerate(query_vectors):
+            params[f"v{qi}"] = array.array("f", vector)
+            params[f"k{qi}"] = fetch_k_per_query[qi]
+
+            conditions = [file_filter] if file_filter else []
+            query_segments = segment_types[qi] if segment_types else None
+            if query_segments:
+                segment_binds = []
+                for si, segment_type in enumerate(query_segments):
+                    params[f"s{qi}_{si}"] = segment_type
+                    segment_binds.append(f":s{qi}_{si}")
+                conditions.append(f"d.segment_type IN ({', '.join(segment_binds)})")
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+            subqueries.append(f"""
+                SELECT * FROM (
+                    SELECT {qi} AS query_idx, 'vector' AS source, ROWIDTOCHAR(d.ROWID) AS doc_key,
+                           d.file_id, d.text, d.metadata, {embedding_column} AS embedding,
+                           VECTOR_DISTANCE(d.embedding, :v{qi}, COSINE) AS distance, NULL AS text_score
+                    FROM rag_docs d
+                    {where_clause}
+                    ORDER BY distance
+                    FETCH FIRST :k{qi} ROWS ONLY
+                )""")
+
+            text_query = build_text_query(query_texts[qi]) if query_texts else ""
+            if text_query:
+                params[f"t{qi}"] = text_query
+                text_conditions = [f"CONTAINS(d.text, :t{qi}, {qi + 1}) > 0"] + conditions
+                subqueries.append(f"""
+                SELECT * FROM (
+                    SELECT {qi} AS query_idx, 'text' AS source, ROWIDTOCHAR(d.ROWID) AS doc_key,
+                           d.file_id, d.text, d.metadata, NULL AS embedding,
+                           VECTOR_DISTANCE(d.embedding, :v{qi}, COSINE) AS distance, SCORE({qi + 1}) AS text_score
+                    FROM rag_docs d
+                    WHERE {' AND '.join(text_conditions)}
+                    ORDER BY SCORE({qi + 1}) DESC
+                    FETCH FIRST :k{qi} ROWS ONLY
+                )""")
+
+        query = "\n UNION ALL \n".join(subqueries)
+        rows = self.db_connector.execute_select(query, params) or []
+
+        results: List[Dict[str, List[Dict[str, Any]]]] = [{"vector": [], "text": []} for _ in query_vectors]
+        for query_idx, source, doc_key, file_id, text, metadata, embedding, distance, text_score in rows:
+            if isinstance(embedding, str):
+                embedding = json.loads(embedding)
+            results[int(query_idx)][source].append({
+                "doc_key"   : doc_key,
+                "content"   : text or "",
+                "metadata"  : _row_metadata(metadata, file_id),
+                "distance"  : float(distance) if distance is not None else None,
+                "text_score": float(text_score) if text_score is not None else None,
+                "embedding" : embedding,
+            })
+
+        for result in results:
+            result["vector"].sort(key=lambda doc: doc["distance"] if doc["distance"] is not None else float("inf"))
+            result["text"].sort(key=lambda doc: -(doc["text_score"] or 0.0))
+
+        logger.info(f"[OCI][RAG_DOCS] Candidatos por lotes: {len(query_vectors)} consultas, {len(rows)} fragmentos [SUCCESS]")
+        return results
+
+
+    def similarity_search_candidates(self, query_vector: List[float], files_ids: List[int],
+                                     fetch_k: int) -> List[Dict[str, Any]]:
+        """
+        Los fetch_k fragmentos más cercanos a un vector (distancia coseno) con su embedding,
+        en un único viaje a la BD, para re-ordenarlos localmente (MMR).
+
+        A diferencia de OracleVS, el filtro por archivo se aplica en la consulta, antes del
+        top-k, por lo que siempre se obtienen hasta fetch_k fragmentos de esos archivos.
+        """
+        params: Dict[str, Any] = {"v": array.array("f", query_vector), "fetch_k": fetch_k}
+        file_filter = _file_filter(files_ids, params)
+        where_clause = f"WHERE {file_filter}" if file_filter else ""
+
+        query = f"""
+            SELECT d.file_id, d.text, d.metadata, d.embedding,
+                   VECTOR_DISTANCE(d.embedding, :v, COSINE) AS distance
+            FROM rag_docs d
+            {where_clause}
+            ORDER BY distance
+            FETCH FIRST :fetch_k ROWS ONLY
+        """
+        rows = self.db_connector.execute_select(query, params) or []
+
+        candidates = []
+        for file_id, text, metadata, embedding, distance in rows:
+            if isinstance(embedding, str):
+                embedding = json.loads(embedding)
+            candidates.append({
+                "content"  : text or "",
+                "metadata" : _row_metadata(metadata, file_id),
+                "distance" : float(distance) if distance is not None else None,
+                "embedding": embedding,
+            })
+
+        logger.info(f"[OCI][RAG_DOCS] Candidatos por similitud: {len(candidates)} de fetch_k={fetch_k} [SUCCESS]")
+        return candidates
+
+
+    def hybrid_search_candidates(self, query_vector: List[float], query_text: str, files_ids: List[int],
+                                 fetch_k: int) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Búsqueda por similitud (distancia coseno) y por palabras clave (Oracle Text, índice
+        IDX_RAG_DOCS_TEXT) en un único viaje a la BD, para fusionarlas con RRF.
+
+        Returns:
+            {"vector": [...], "text": [...]}: hasta fetch_k fragmentos por búsqueda, cada uno
+            con doc_key (ROWID), distancia coseno y, en "text", el SCORE de Oracle Text; en
+            el orden de su propia búsqueda
+        """
+        params: Dict[str, Any] = {"v": array.array("f", query_vector), "fetch_k": fetch_k}
+        file_filter = _file_filter(files_ids, params)
+        where_clause = f"WHERE {file_filter}" if file_filter else ""
+
+        subqueries = [f"""
+                SELECT * FROM (
+                    SELECT 'vector' AS source, ROWIDTOCHAR(d.ROWID) AS doc_key, d.file_id, d.text, d.metadata,
+                           VECTOR_DISTANCE(d.embedding, :v, COSINE) AS distance, NULL AS text_score
+                    FROM rag_docs d
+                    {where_clause}
+                    ORDER BY distance
+                    FETCH FIRST :fetch_k ROWS ONLY
+                )"""]
+
+        text_query = build_text_query(query_text)
+        if text_query:
+            params["text_query"] = text_query
+            conditions = ["CONTAINS(d.text, :text_query, 1) > 0"] + ([file_filter] if file_filter else [])
+            subqueries.append(f"""
+                SELECT * FROM (
+                    SELECT 'text' AS source, ROWIDTOCHAR(d.ROWID) AS doc_key, d.file_id, d.text, d.metadata,
+                           VECTOR_DISTANCE(d.embedding, :v, COSINE) AS distance, SCORE(1) AS text_score
+                    FROM rag_docs d
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY SCORE(1) DESC
+                    FETCH FIRST :fetch_k ROWS ONLY
+                )""")
+
+        query = "\n UNION ALL \n".join(subqueries)
+        rows = self.db_connector.execute_select(query, params) or []
+
+        results: Dict[str, List[Dict[str, Any]]] = {"vector": [], "text": []}
+        for source, doc_key, file_id, text, metadata, distance, text_score in rows:
+            results[source].append({
+                "doc_key"   : doc_key,
+                "content"   : text or "",
+                "metadata"  : _row_metadata(metadata, file_id),
+                "distance"  : float(distance) if distance is not None else None,
+                "text_score": float(text_score) if text_score is not None else None,
+            })
+
+        results["vector"].sort(key=lambda doc: doc["distance"] if doc["distance"] is not None else float("inf"))
+        results["text"].sort(key=lambda doc: -(doc["text_score"] or 0.0))
+
+        logger.info(f"[OCI][RAG_DOCS] Búsqueda híbrida: {len(results['vector'])} por vector, "
+                    f"{len(results['text'])} por texto (fetch_k={fetch_k}) [SUCCESS]")
+        return results
+
+
+    def _get_vector_store_template(self, connection) -> OracleVS:
+        """Instancia de OracleVS inicializada una sola vez (sin conexión propia)."""
+        global _vector_store_template
+        if _vector_store_template is None:
+            embeddings = self.get_embeddings()
+            with _vector_store_lock:
+                if _vector_store_template is None:
+                    template = OracleVS(
+                        client             = connection,
+                        embedding_function = embeddings,
+                        table_name         = 'rag_docs'
+                    )
+                    template.client = None
+                    _vector_store_template = template
+                    logger.info("[OCI][RAG_DOCS] Vector store inicializado")
+        return _vector_store_template
+
+    @contextmanager
+    def get_vector_store(self) -> Iterator[OracleVS]:
+        """
+        Oracle Vector Store sobre una conexión prestada del pool, liberada al salir:
+
+            with rag_docs_db.get_vector_store() as vector_store:
+                vector_store.similarity_search_with_score(...)
+
+        Reutiliza el cliente de embeddings y la inicialización de OracleVS; solo la
+        conexión es propia de cada uso.
+        """
+        connection = self.db_connector.get_connection()
+        try:
+            vector_store = copy.copy(self._get_vector_store_template(connection))
+            vector_store.client = connection
+            yield vector_store
+        finally:
+            connection.close()
\ No newline at end of file
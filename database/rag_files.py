@@ -2,7 +2,7 @@
 Módulo para la gestión de la tabla RAG_FILES en la base de datos.
 """
 import logging
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 
 from database.connection import Connection
 
@@ -65,6 +65,79 @@ class RAGFilesDB:
             return {}
 
 
+    def get_file_version(self, file_id: int) -> Optional[str]:
+        """
+        Obtiene una marca de versión liviana (file_version + file_date) de un archivo.
+        """
+        try:
+            query = """
+                SELECT file_version, file_date
+                FROM rag_files
+                WHERE file_id = :1
+            """
+            row = self.db_connector.execute_select(query, (file_id,), fetch_one=True)
+            if not row:
+                return None
+
+            file_date = row[1].isoformat() if hasattr(row[1], 'isoformat') else str(row[1]) if row[1] else ''
+            return f"{row[0]}|{file_date}"
+
+        except Exception as e:
+            logger.error(f"[OCI][RAG_FILES] Error al consultar versión del archivo {file_id}: {str(e)}")
+            return None
+
+    def get_files_versions(self, files_ids: List[int]) -> Dict[int, str]:
+        """
+        Marcas de versión (file_version + file_date) de varios archivos en una sola consulta.
+        Los archivos inexistentes no aparecen en el resultado.
+        """
+        if not files_ids:
+            return {}
+        try:
+            binds = ", ".join(f":{position}" for position in range(1, len(files_ids) + 1))
+            query = f"""
+                SELECT file_id, file_version, file_date
+                FROM rag_files
+                WHERE file_id IN ({binds})
+            """
+            rows = self.db_connector.execute_select(query, tuple(files_ids)) or []
+
+            versions = {}
+            for row in rows:
+                file_date = row[2].isoformat() if hasattr(row[2], 'isoformat') else str(row[2]) if row[2] else ''
+                versions[int(row[0])] = f"{row[1]}|{file_date}"
+            return versions
+
+        except Exception as e:
+            logger.error(f"[OCI][RAG_FILES] Error al consultar versiones de los archivos {files_ids}: {str(e)}")
+            raise
+
+    def get_file_extraction(self, file_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el texto extraído (file_trg_extraction) y la versión de un archivo.
+        """
+        try:
+            query = """
+                SELECT file_trg_extraction, file_version, file_date
+                FROM rag_files
+                WHERE file_id = :1
+            """
+            row = self.db_connector.execute_select(query, (file_id,), fetch_one=True)
+            if not row:
+                logger.warning(f"[OCI][RAG_FILES] Archivo no encontrado [file_id={file_id}]")
+                return None
+
+            file_date = row[2].isoformat() if hasattr(row[2], 'isoformat') else str(row[2]) if row[2] else ''
+            return {
+                'file_id'            : file_id,
+                'file_trg_extraction': row[0] or '',
+                'file_version'       : f"{row[1]}|{file_date}",
+            }
+
+        except Exception as e:
+            logger.error(f"[OCI][RAG_FILES] Error al consultar extracción del archivo {file_id}: {str(e)}")
+            return None
+
     def insert_file(self, file_data: Dict[str, Any]) -> Optional[int]:
         """
         Inserta un registro inicial para un archivo con metadatos básicos.
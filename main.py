@@ -23,6 +23,7 @@ from routers import (
     llm,
     rag_context
 )
+from services.glosas_catalog import glosas_catalog
 
 # --- Inicio: Filtro para logs de asyncio ---
 class SocketSendFilter(Filter):
@@ -92,6 +93,43 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         }
     )
 
+# Precargar el catálogo de glosas oficiales al iniciar la aplicación
+@app.on_event("startup")
+async def load_glosas_catalog():
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, glosas_catalog.load, True)
+    except Exception as e:
+        logger.error(f"[AUDIT][GLOSAS] No se pudo precargar el catálogo de glosas: {str(e)}")
+
+# Inicializar una sola vez el servicio de auditoría compartido (clientes LLM/RAG en caliente)
+@app.on_event("startup")
+async def warm_audit_service():
+    try:
+        from services.audit import get_audit_service
+        await asyncio.get_running_loop().run_in_executor(None, get_audit_service)
+    except Exception as e:
+        logger.error(f"[AUDIT] No se pudo inicializar el servicio de auditoría: {str(e)}")
+
+# Cola persistente de auditorías por lotes: recuperar trabajos interrumpidos y arrancar trabajadores
+@app.on_event("startup")
+async def start_audit_job_queue():
+    try:
+        from services.audit_jobs import audit_job_queue
+        await asyncio.get_running_loop().run_in_executor(None, audit_job_queue.start)
+    except Exception as e:
+        logger.error(f"[AUDIT][JOBS] No se pudo iniciar la cola de auditorías: {str(e)}")
+
+@app.on_event("shutdown")
+async def stop_audit_job_queue():
+    from services.audit_jobs import audit_job_queue
+    audit_job_queue.stop()
+
+# Liberar las sesiones del pool de Oracle al detener la aplicación
+@app.on_event("shutdown")
+async def close_database_pool():
+    from database.connection import close_pool
+    close_pool()
+
 # Incluir todos los routers modulares
 app.include_router(system.router, prefix="/sys")
 app.include_router(oci_rag.router, prefix="/rag")
@@ -0,0 +1,3 @@
+"""
+Servidor simulado de LLM y embeddings (OpenAI / OCI Generative AI) para pruebas de carga.
+"""
@@ -0,0 +1,186 @@
+"""
+Respuestas del servidor simulado de GenAI.
+
+- Chat: primero las respuestas enlatadas (regex sobre el prompt → texto); si ninguna
+  coincide, una plantilla con el formato que espera el parser de cada tipo de prompt
+  del backend (v2 / v2 por segmento, auditoría especial, auditoría individual).
+- Embeddings: vectores deterministas por hashing de términos, normalizados, de modo
+  que textos con vocabulario común quedan cerca (la búsqueda por similitud sigue
+  devolviendo resultados con sentido).
+- Latencia: distribuciones fixed / uniform / normal / lognormal.
+
+No depende de LangChain ni de la configuración del backend para poder reutilizarse
+en el benchmark offline.
+"""
+import re
+import json
+import math
+import random
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Aproximación de tokens por caracteres (para el campo usage)
+CHARS_PER_TOKEN = 4
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+_AMOUNT_RE = re.compile(r"^[\s\-*|]*(?P<nombre>[^\n$|]{4,80}?)[\s:|*]*\$\s?(?P<valor>\d[\d.,]*)", re.MULTILINE)
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+# ============================================================================
+# CHAT
+# ============================================================================
+
+def _json_block(payload: Dict) -> str:
+    return f"```json\n{json.dumps(payload, ensure_ascii=False, indent=2)}\n```"
+
+
+def _synthetic_items(prompt: str, limit: int = 3) -> List[Dict]:
+    """Ítems v2 a partir de las primeras líneas con valores en pesos del prompt."""
+    items = []
+    for match in _AMOUNT_RE.finditer(prompt):
+        valor = re.sub(r"[.,]\d{2}$", "", match.group("valor"))
+        valor = re.sub(r"[.,]", "", valor)
+        if not valor.isdigit():
+            continue
+        items.append({
+            "codigo": f"ITM-{len(items) + 1:03d}",
+            "nombre": match.group("nombre").strip(" :*-"),
+            "glosa_parcial": False,
+            "valor": float(valor),
+        })
+        if len(items) >= limit:
+            break
+    return items
+
+
+def templated_response(prompt: str) -> str:
+    """
+    Respuesta determinista con el formato que espera el parser de cada tipo de prompt.
+    Los prompts no reconocidos (chat, agentes) reciben un texto plano.
+    """
+    if "items_reclamados" in prompt:
+        return _json_block({
+            "identificacion_reclamacion": "",
+            "glosa_total": False,
+            "justificacion": "Respuesta simulada.",
+            "clasificacion_glosas_totales": [],
+            "items_reclamados": _synthetic_items(prompt),
+        })
+    if "estado_glosa" in prompt:
+        return _json_block({
+            "response": "Cumple",
+            "justification": "Respuesta simulada.",
+            "special_result": {
+                "identificacion_reclamacion": "",
+                "estado_glosa": 0,
+                "justificacion": "No aplica",
+                "documentos_referenciados": "No aplica",
+                "clasificacion": None,
+                "description": "No aplica",
+            },
+        })
+    if '"response"' in prompt:
+        return _json_block({"response": "Cumple", "justification": "Respuesta simulada."})
+    preview = " ".join(prompt.split())[-160:]
+    return f"Respuesta simulada para: {preview}"
+
+
+def load_canned_responses(path: Optional[str]) -> List[Tuple["re.Pattern", str]]:
+    """
+    Carga respuestas enlatadas de un JSON [{"match": regex, "response": texto u objeto}].
+    Los objetos se serializan como bloque JSON.
+    """
+    if not path:
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        canned = []
+        for entry in entries:
+            response = entry["response"]
+            if not isinstance(response, str):
+                response = _json_block(response)
+            canned.append((re.compile(entry["match"], re.IGNORECASE | re.DOTALL), response))
+        logger.info(f"[MOCK_GENAI] {len(canned)} respuestas enlatadas cargadas de {path}")
+        return canned
+    except Exception as e:
+        logger.error(f"[MOCK_GENAI] Error cargando respuestas enlatadas {path}: {str(e)}")
+        return []
+
+
+def chat_response(prompt: str, canned: Optional[List[Tuple["re.Pattern", str]]] = None) -> str:
+    for pattern, response in canned or []:
+        if pattern.search(prompt):
+            return response
+    return templated_response(prompt)
+
+
+# ============================================================================
+# EMBEDDINGS
+# ============================================================================
+
+def embed_text(text: str, dimension: int) -> List[float]:
+    """Vector determinista por hashing de términos (con signo), normalizado a norma 1."""
+    vector = [0.0] * dimension
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimension
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector))
+    if not norm:
+        vector[0] = 1.0
+        return vector
+    return [value / norm for value in vector]
+
+
+# ============================================================================
+# LATENCIA Y ERRORES
+# ============================================================================
+
+class LatencyModel:
+    """Muestreo de latencias (segundos) y de errores inyectados, seguro entre hilos."""
+
+    def __init__(self, distribution: str = "fixed", mean_ms: float = 0.0, spread_ms: float = 0.0,
+                 error_rate: float = 0.0, error_status_codes: Optional[List[int]] = None,
+                 seed: Optional[int] = None):
+        distribution = (distribution or "fixed").strip().lower()
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Distribución de latencia no soportada: {distribution}")
+        self.distribution = distribution
+        self.mean_ms = max(0.0, float(mean_ms))
+        self.spread_ms = max(0.0, float(spread_ms))
+        self.error_rate = min(1.0, max(0.0, float(error_rate)))
+        self.error_status_codes = error_status_codes or [500]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_seconds(self) -> float:
+        with self._lock:
+            if self.distribution == "uniform":
+                value = self._random.uniform(self.mean_ms - self.spread_ms, self.mean_ms + self.spread_ms)
+            elif self.distribution == "normal":
+                value = self._random.gauss(self.mean_ms, self.spread_ms)
+            elif self.distribution == "lognormal" and self.mean_ms > 0:
+                # Parámetros de la normal subyacente para la media y desviación pedidas
+                sigma2 = math.log(1 + (self.spread_ms / self.mean_ms) ** 2)
+                value = self._random.lognormvariate(math.log(self.mean_ms) - sigma2 / 2, math.sqrt(sigma2))
+            else:
+                value = self.mean_ms
+        return max(0.0, value) / 1000
+
+    def sample_error(self) -> Optional[int]:
+        """Código HTTP a devolver, o None si la solicitud debe responder con éxito."""
+        with self._lock:
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self._random.choice(self.error_status_codes)
+        return None
@@ -0,0 +1,310 @@
+"""
+Servidor simulado de LLM y embeddings para pruebas de carga sin red.
+
+Acepta las mismas formas de solicitud que los servicios reales:
+- OpenAI (ChatOpenAI / OpenAIEmbeddings y el gateway de GATEWAY_BASE_URL):
+  POST /v1/chat/completions (con stream opcional), POST /v1/embeddings, GET /v1/models
+- OCI Generative AI (API REST de inferencia):
+  POST /20231130/actions/chat (apiFormat GENERIC y COHERE), POST /20231130/actions/embedText
+
+La latencia, la tasa de errores, la dimensión de los embeddings y las respuestas
+enlatadas se configuran con las variables MOCK_GENAI_* de settings. Con LLM_BACKEND=mock
+la fábrica services.llm_factory apunta todos los clientes del backend a este servidor.
+
+Uso:
+    python -m mock_genai.server --port 8090
+    uvicorn mock_genai.server:app --host 0.0.0.0 --port 8090 --workers 2
+"""
+import json
+import time
+import uuid
+import base64
+import struct
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import Body, FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+
+from core.config import settings
+from mock_genai.responses import (
+    LatencyModel,
+    chat_response,
+    embed_text,
+    estimate_tokens,
+    load_canned_responses,
+)
+
+logger = logging.getLogger(__name__)
+
+OCI_API_VERSION = "20231130"
+MOCK_MODEL_VERSION = "mock"
+
+
+def _status_codes(value: str) -> List[int]:
+    return [int(code) for code in (value or "").split(",") if code.strip().isdigit()] or [500]
+
+
+def _embed_spread_ms() -> float:
+    """Dispersión de los embeddings proporcional a la del chat."""
+    if not settings.MOCK_GENAI_LATENCY_MS:
+        return 0.0
+    return settings.MOCK_GENAI_LATENCY_SPREAD_MS * settings.MOCK_GENAI_EMBED_LATENCY_MS / settings.MOCK_GENAI_LATENCY_MS
+
+
+chat_latency = LatencyModel(
+    settings.MOCK_GENAI_LATENCY_DISTRIBUTION,
+    settings.MOCK_GENAI_LATENCY_MS,
+    settings.MOCK_GENAI_LATENCY_SPREAD_MS,
+    settings.MOCK_GENAI_ERROR_RATE,
+    _status_codes(settings.MOCK_GENAI_ERROR_STATUS_CODES),
+)
+embed_latency = LatencyModel(
+    settings.MOCK_GENAI_LATENCY_DISTRIBUTION,
+    settings.MOCK_GENAI_EMBED_LATENCY_MS,
+    _embed_spread_ms(),
+    settings.MOCK_GENAI_ERROR_RATE,
+    _status_codes(settings.MOCK_GENAI_ERROR_STATUS_CODES),
+)
+canned_responses = load_canned_responses(settings.MOCK_GENAI_RESPONSES_PATH)
+
+# Contadores del proceso (el servidor es asíncrono y de un solo hilo)
+stats = {"chat_requests": 0, "embedding_requests": 0, "embedded_texts": 0, "injected_errors": 0}
+
+app = FastAPI(
+    title="Mock GenAI",
+    version="1.0.0",
+    description="Servidor simulado OpenAI / OCI Generative AI para pruebas de carga",
+)
+
+
+async def _simulate(latency: LatencyModel, api_name: str) -> None:
+    """Espera la latencia muestreada y, según la tasa configurada, inyecta un error HTTP."""
+    await asyncio.sleep(latency.sample_seconds())
+    status_code = latency.sample_error()
+    if status_code:
+        stats["injected_errors"] += 1
+        headers = {"retry-after": "1"} if status_code == 429 else None
+        raise HTTPException(status_code=status_code, detail=f"Error simulado en {api_name}", headers=headers)
+
+
+def _text_parts(content: Any) -> str:
+    """Texto de un contenido de mensaje: cadena o lista de partes (OpenAI / OCI GENERIC)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(
+            str(part.get("text", "")) for part in content
+            if isinstance(part, dict) and str(part.get("type", "")).lower() == "text"
+        )
+    return ""
+
+
+def _usage(prompt: str, completion: str) -> Dict[str, int]:
+    prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(completion)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+# ============================================================================
+# API OPENAI
+# ============================================================================
+
+@app.get("/health")
+async def health() -> Dict[str, Any]:
+    return {"status": "ok", **stats}
+
+
+@app.get("/v1/models")
+async def list_models() -> Dict[str, Any]:
+    models = {settings.CON_GEN_AI_CHAT_MODEL_ID, settings.CON_GEN_AI_EMB_MODEL_ID, settings.GATEWAY_OPENAI_MODEL}
+    return {
+        "object": "list",
+        "data": [{"id": model, "object": "model", "created": 0, "owned_by": "mock"} for model in sorted(models)],
+    }
+
+
+def _stream_chat(completion_id: str, model: str, content: str):
+    created = int(time.time())
+    chunks = [
+        {"delta": {"role": "assistant", "content": content}, "finish_reason": None},
+        {"delta": {}, "finish_reason": "stop"},
+    ]
+    for chunk in chunks:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, **chunk}],
+        }
+        yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def openai_chat_completions(payload: Dict[str, Any] = Body(...)):
+    stats["chat_requests"] += 1
+    await _simulate(chat_latency, "chat/completions")
+
+    messages = payload.get("messages") or []
+    prompt = "\n".join(_text_parts(message.get("content")) for message in messages if isinstance(message, dict))
+    model = payload.get("model") or settings.CON_GEN_AI_CHAT_MODEL_ID
+    content = chat_response(prompt, canned_responses)
+    completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+
+    if payload.get("stream"):
+        return StreamingResponse(_stream_chat(completion_id, model, content), media_type="text/event-stream")
+
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+        ],
+        "usage": _usage(prompt, content),
+    }
+
+
+def _openai_embedding_inputs(raw_input: Any) -> List[str]:
+    """input admite texto, lista de textos o tokens (se embeben como texto)."""
+    if isinstance(raw_input, str):
+        return [raw_input]
+    if isinstance(raw_input, list):
+        if raw_input and all(isinstance(value, int) for value in raw_input):
+            return [" ".join(str(value) for value in raw_input)]
+        return [value if isinstance(value, str) else " ".join(str(token) for token in value) for value in raw_input]
+    return []
+
+
+@app.post("/v1/embeddings")
+async def openai_embeddings(payload: Dict[str, Any] = Body(...)):
+    stats["embedding_requests"] += 1
+    await _simulate(embed_latency, "embeddings")
+
+    texts = _openai_embedding_inputs(payload.get("input"))
+    stats["embedded_texts"] += len(texts)
+    dimension = int(payload.get("dimensions") or settings.MOCK_GENAI_EMBEDDING_DIM)
+    # El cliente oficial de OpenAI pide base64 por defecto (float32 little-endian)
+    as_base64 = payload.get("encoding_format") == "base64"
+
+    data = []
+    for index, text in enumerate(texts):
+        vector = embed_text(text, dimension)
+        if as_base64:
+            vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+        data.append({"object": "embedding", "index": index, "embedding": vector})
+
+    prompt_tokens = sum(estimate_tokens(text) for text in texts)
+    return {
+        "object": "list",
+        "data": data,
+        "model": payload.get("model") or settings.CON_GEN_AI_EMB_MODEL_ID,
+        "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+    }
+
+
+# ============================================================================
+# API OCI GENERATIVE AI
+# ============================================================================
+
+def _oci_model_id(payload: Dict[str, Any]) -> str:
+    serving_mode = payload.get("servingMode") or {}
+    return serving_mode.get("modelId") or serving_mode.get("endpointId") or settings.CON_GEN_AI_CHAT_MODEL_ID
+
+
+@app.post(f"/{OCI_API_VERSION}/actions/chat")
+async def oci_chat(payload: Dict[str, Any] = Body(...)):
+    stats["chat_requests"] += 1
+    await _simulate(chat_latency, "actions/chat")
+
+    chat_request = payload.get("chatRequest") or {}
+    api_format = str(chat_request.get("apiFormat", "GENERIC")).upper()
+    model_id = _oci_model_id(payload)
+    time_created = datetime.now(timezone.utc).isoformat()
+
+    if api_format == "COHERE":
+        history = chat_request.get("chatHistory") or []
+        prompt = "\n".join(
+            [str(chat_request.get("preambleOverride") or "")]
+            + [str(turn.get("message", "")) for turn in history if isinstance(turn, dict)]
+            + [str(chat_request.get("message") or "")]
+        )
+        content = chat_response(prompt, canned_responses)
+        return {
+            "modelId": model_id,
+            "modelVersion": MOCK_MODEL_VERSION,
+            "chatResponse": {
+                "apiFormat": "COHERE",
+                "text": content,
+                "finishReason": "COMPLETE",
+                "chatHistory": history + [
+                    {"role": "USER", "message": chat_request.get("message") or ""},
+                    {"role": "CHATBOT", "message": content},
+                ],
+            },
+        }
+
+    messages = chat_request.get("messages") or []
+    prompt = "\n".join(_text_parts(message.get("content")) for message in messages if isinstance(message, dict))
+    content = chat_response(prompt, canned_responses)
+    return {
+        "modelId": model_id,
+        "modelVersion": MOCK_MODEL_VERSION,
+        "chatResponse": {
+            "apiFormat": "GENERIC",
+            "timeCreated": time_created,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "ASSISTANT", "content": [{"type": "TEXT", "text": content}]},
+                    "finishReason": "stop",
+                }
+            ],
+            "usage": {
+                "promptTokens": estimate_tokens(prompt),
+                "completionTokens": estimate_tokens(content),
+                "totalTokens": estimate_tokens(prompt) + estimate_tokens(content),
+            },
+        },
+    }
+
+
+@app.post(f"/{OCI_API_VERSION}/actions/embedText")
+async def oci_embed_text(payload: Dict[str, Any] = Body(...)):
+    stats["embedding_requests"] += 1
+    await _simulate(embed_latency, "actions/embedText")
+
+    texts = [str(text) for text in payload.get("inputs") or []]
+    stats["embedded_texts"] += len(texts)
+    return {
+        "id": uuid.uuid4().hex,
+        "embeddings": [embed_text(text, settings.MOCK_GENAI_EMBEDDING_DIM) for text in texts],
+        "modelId": _oci_model_id(payload),
+        "modelVersion": MOCK_MODEL_VERSION,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Servidor simulado OpenAI / OCI Generative AI")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+    logger.info(f"[MOCK_GENAI] Latencia chat {settings.MOCK_GENAI_LATENCY_DISTRIBUTION} "
+                f"{settings.MOCK_GENAI_LATENCY_MS}±{settings.MOCK_GENAI_LATENCY_SPREAD_MS} ms, "
+                f"errores {settings.MOCK_GENAI_ERROR_RATE:.1%}")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,9 @@ Router para el sistema de agentes de DeepAgents.
 import logging
 import json
 import time
+import asyncio
 
+from datetime import date
 from typing import List, Optional
 from pathlib import Path
 from fastapi import (
@@ -14,6 +16,7 @@ from fastapi import (
     Depends,
     status,
     File,
+    Query,
     UploadFile,
 )
 from starlette.concurrency import run_in_threadpool
@@ -23,6 +26,13 @@ from core.security import security_authenticate_user
 from services.ocr_mineru import process_file as ocr_process_file
 from services.agent import agent
 from services.tools.oci_xml_ubl_tool import OCIXMLUBLTool
+from services.audit_cache import audit_result_cache, sha256_file
+from services.claim_pipeline import AUDIT_RUN_PARAMS, audit_cache_key
+from services.audit_jobs import audit_job_queue
+from services.audit_history import audit_history
+from database.audit_history import GLOSA_SUMMARY_GROUPS
+from services.audit_registry import parse_audits_param
+from schemas.audit import AuditType
 from fastapi.responses import StreamingResponse
 from utils.utils import Utils
 from core.config import settings
@@ -35,6 +45,35 @@ security = HTTPBearer()
 utils = Utils()
 
 
+def _parse_audits_form(audits: Optional[str]) -> Optional[List[AuditType]]:
+    """Valida el parámetro 'audits' (valores de AuditType separados por coma)."""
+    try:
+        return parse_audits_param(audits)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Parámetro 'audits' inválido: '{audits}'. Valores permitidos: {', '.join(t.value for t in AuditType)}",
+        )
+
+
+def _remaining_deadline(deadline_seconds: Optional[float], request_start_time: float) -> Optional[float]:
+    """Deadline restante para la auditoría descontando el tiempo ya usado en OCR y vectorización."""
+    if not deadline_seconds or deadline_seconds <= 0:
+        return None
+    return max(0.001, deadline_seconds - (time.time() - request_start_time))
+
+
+async def _zip_source_digest(files_metadata: List[dict]) -> Optional[str]:
+    """Hash del ZIP recibido, para reutilizar el markdown de un OCR anterior."""
+    for file_info in files_metadata:
+        if Path(file_info["filename"]).suffix.lower() == ".zip":
+            try:
+                return await run_in_threadpool(sha256_file, Path(file_info["temp_path"]))
+            except Exception as e:
+                logger.warning(f"[DEEP_AGENTS][CACHE] No se pudo calcular hash del ZIP: {e}")
+    return None
+
+
 @router.post(
     "/files",
     summary="Procesar archivo ZIP y devolver agent_request",
@@ -173,6 +212,11 @@ async def files_endpoint(
     Parámetros del Feature Flag (Opcionales con Optional):
     - `use_local_md: Optional[bool]`: Activa modo archivo local (default: false)
     - `local_md_path: Optional[str]`: Ruta al archivo MD local (default: "test_data/sample_audit.md")
+    - `bypass_cache: Optional[bool]`: Ignora la caché de auditorías y fuerza OCR + auditoría (default: false)
+    - `audits: Optional[str]`: Subconjunto de auditorías separadas por coma (default: todas)
+    
+    Caché: un reenvío idéntico (mismo ZIP/markdown, prompts, modelo y parámetros) devuelve
+    el resultado guardado sin repetir OCR, vectorización ni auditorías (`from_cache=true`).
     
     Nota: Los parámetros del feature flag son completamente opcionales usando Pydantic Optional. 
     Si no se proporcionan o son None, se usan los valores por defecto.
@@ -183,6 +227,10 @@ async def glosa_endpoint(
     files: List[UploadFile] = File(..., description="Archivos adjuntos a procesar"),
     use_local_md: Optional[bool] = File(False, description="Feature flag para usar archivo MD local (opcional)"),
     local_md_path: Optional[str] = File("test_data/sample_audit.md", description="Ruta al archivo MD local (opcional)"),
+    bypass_cache: Optional[bool] = File(False, description="Ignorar la caché de auditorías y reprocesar (opcional)"),
+    audits: Optional[str] = File(None, description="Auditorías a ejecutar separadas por coma, ej. 'factura,maos' (opcional, default: todas)"),
+    deadline_seconds: Optional[float] = File(None, description="Tiempo máximo de la solicitud; al agotarse se retorna un resultado parcial (opcional)"),
+    max_llm_calls: Optional[int] = File(None, description="Máximo de llamadas al LLM; se omiten las auditorías de menor prioridad (opcional)"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ):
     """Procesa archivos y ejecuta auditoría."""
@@ -191,6 +239,7 @@ async def glosa_endpoint(
     
     try:
         security_authenticate_user("/agent/glosa", credentials)
+        selected_audits = _parse_audits_form(audits)
 
         # Validación: DEBE ser exactamente 1 archivo ZIP
         uploaded_names = [(f.filename or "").strip().lower() for f in (files or [])]
@@ -272,8 +321,15 @@ async def glosa_endpoint(
                     detail=f"Error cargando archivo local: {str(local_error)}"
                 )
         else:
+            # Reenvío del mismo ZIP: reutilizar el markdown del OCR anterior
+            source_digest = await _zip_source_digest(files_metadata)
+            cached_markdown = None if bypass_cache else audit_result_cache.get_markdown(source_digest)
+            if cached_markdown:
+                processed_files["upload.md"] = cached_markdown
+                logger.info(f"[DEEP_AGENTS][GLOSA][CACHE] upload.md recuperado de caché, se omite OCR")
+
             # Procesar solo PDFs para obtener upload.md (flujo normal)
-            for file_info in files_metadata:
+            for file_info in ([] if cached_markdown else files_metadata):
                 filename = file_info["filename"]
                 file_extension = Path(filename).suffix.lower()
                 if file_extension == ".pdf":
@@ -286,6 +342,7 @@ async def glosa_endpoint(
                     markdown_content = ocr_result.get("markdown_content")
                     if markdown_content:
                         processed_files["upload.md"] = markdown_content
+                        audit_result_cache.set_markdown(source_digest, markdown_content)
                         logger.info(
                             f"[DEEP_AGENTS][GLOSA][OCR] upload.md obtenido de: [{filename}] [SUCCESS]"
                         )
@@ -295,54 +352,62 @@ async def glosa_endpoint(
         upload_md_content = processed_files.get("upload.md")
 
         if upload_md_content:
-            logger.info(f"[DEEP_AGENTS][GLOSA] Vectorizando contenido markdown del OCR")
-
             try:
-                # Vectorizar el contenido markdown usando el servicio de embedding
-                from services.embedding import EmbeddingService
+                from services.audit import get_audit_service
 
-                embedding_service = EmbeddingService()
+                audit_service = get_audit_service()
 
-                # Vectorizar el contenido markdown directamente
-                vectorization_result = await run_in_threadpool(
-                    embedding_service.process_markdown_file, 
-                    upload_md_content,  # Contenido markdown del OCR
-                    "glosa_audit.md"    # Nombre del archivo
-                )
+                # Consultar la caché antes de vectorizar y auditar
+                cache_key = audit_cache_key(audit_service, upload_md_content, zip_filename, selected_audits)
+                audit_result = None if bypass_cache else audit_result_cache.get_result(cache_key)
 
-                # Obtener el file_id del resultado
-                file_id = vectorization_result.get("file_id")
-                if not file_id:
-                    raise Exception("No se pudo obtener file_id de la vectorización")
+                if audit_result is not None:
+                    audit_result.from_cache = True
+                    logger.info(f"[DEEP_AGENTS][GLOSA][CACHE] Auditoría recuperada de caché, se omite vectorización y LLM")
+                else:
+                    logger.info(f"[DEEP_AGENTS][GLOSA] Vectorizando contenido markdown del OCR")
 
-                logger.info(
-                    f"[DEEP_AGENTS][GLOSA] Contenido vectorizado exitosamente. File ID: {file_id}"
-                )
+                    # Vectorizar el contenido markdown usando el servicio de embedding
+                    from services.embedding import EmbeddingService
 
-                # Ejecutar auditoría médica completa usando el file_id
-                from services.audit import MedicalAuditService
+                    embedding_service = EmbeddingService()
 
-                audit_service = MedicalAuditService()
+                    # Vectorizar el contenido markdown directamente
+                    vectorization_result = await run_in_threadpool(
+                        embedding_service.process_markdown_file, 
+                        upload_md_content,  # Contenido markdown del OCR
+                        "glosa_audit.md"    # Nombre del archivo
+                    )
 
-                logger.info(
-                    f"[DEEP_AGENTS][GLOSA] Ejecutando auditoría médica completa para file_id: {file_id}"
-                )
+                    # Obtener el file_id del resultado
+                    file_id = vectorization_result.get("file_id")
+                    if not file_id:
+                        raise Exception("No se pudo obtener file_id de la vectorización")
 
-                audit_result = await run_in_threadpool(
-                    audit_service.run_full_medical_audit,
-                    files_ids=[file_id],
-                    k=15,
-                    max_context_chars=8000,
-                    run_master_audit=True,
-                    response_format="v2",  # Usar formato v2 para JSON schema
-                    identificacion_reclamacion=zip_filename
-                )
+                    logger.info(
+                        f"[DEEP_AGENTS][GLOSA] Contenido vectorizado exitosamente. File ID: {file_id}"
+                    )
 
+                    # Ejecutar auditoría médica completa usando el file_id
+                    logger.info(
+                        f"[DEEP_AGENTS][GLOSA] Ejecutando auditoría médica completa para file_id: {file_id}"
+                    )
 
+                    audit_result = await run_in_threadpool(
+                        audit_service.run_full_medical_audit,
+                        files_ids=[file_id],
+                        identificacion_reclamacion=zip_filename,
+                        audits=selected_audits,
+                        markdown_content=upload_md_content,
+                        deadline_seconds=_remaining_deadline(deadline_seconds, request_start_time),
+                        max_llm_calls=max_llm_calls,
+                        **AUDIT_RUN_PARAMS
+                    )
+                    audit_result_cache.set_result(cache_key, audit_result)
 
-                logger.info(
-                    f"[DEEP_AGENTS][GLOSA] Auditoría médica completada exitosamente"
-                )
+                    logger.info(
+                        f"[DEEP_AGENTS][GLOSA] Auditoría médica completada exitosamente"
+                    )
                 
                 # Calcular tiempo total del request
                 total_request_time = time.time() - request_start_time
@@ -396,16 +461,31 @@ async def glosa_endpoint(
 @router.post(
     "/process",
     summary="Procesar archivo ZIP y ejecutar auditoría con streaming",
-    description="Recibe archivo ZIP, lo procesa y ejecuta la auditoría con glosas en streaming",
+    description="""
+    Recibe archivo ZIP, lo procesa y ejecuta la auditoría con glosas en streaming (NDJSON).
+    
+    Eventos emitidos (una línea JSON por evento):
+    - `{"type": "stage", "stage": "ocr" | "vectorization" | "master_audit", "status": "completed", ...}`
+    - `{"type": "audit", "index", "total", "audit_name", "result"}` al terminar cada auditoría individual
+    - `{"type": "audit_skipped", "index", "total", "audit_name"}` si una auditoría se omite por deadline o presupuesto
+    - `{"type": "audit_result", "audit_data"}` con el resultado consolidado v2 al final
+    - `{"type": "error", "message"}` si ocurre un error
+    """,
     tags=["Agent"],
 )
 async def process_endpoint(
     files: List[UploadFile] = File(..., description="Archivos adjuntos a procesar"),
+    bypass_cache: Optional[bool] = File(False, description="Ignorar la caché de auditorías y reprocesar (opcional)"),
+    audits: Optional[str] = File(None, description="Auditorías a ejecutar separadas por coma, ej. 'factura,maos' (opcional, default: todas)"),
+    deadline_seconds: Optional[float] = File(None, description="Tiempo máximo de la solicitud; al agotarse se retorna un resultado parcial (opcional)"),
+    max_llm_calls: Optional[int] = File(None, description="Máximo de llamadas al LLM; se omiten las auditorías de menor prioridad (opcional)"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ):
     """Procesa archivos y ejecuta auditoría con streaming."""
+    request_start_time = time.time()
     try:
         security_authenticate_user("/agent/process", credentials)
+        selected_audits = _parse_audits_form(audits)
 
         # Validación: DEBE ser exactamente 1 archivo ZIP
         uploaded_names = [(f.filename or "").strip().lower() for f in (files or [])]
@@ -425,7 +505,6 @@ async def process_endpoint(
                 f"[DEEP_AGENTS][PROCESS] Archivos Detectado(s): {len(files_processed)} [SUCCESS]"
             )
 
-        processed_files = {}
         zip_filename_process = None  # Para capturar el nombre del archivo ZIP
 
         # Si hay ZIPs, usar utilidad para descomprimir a la carpeta temporal configurada
@@ -449,90 +528,135 @@ async def process_endpoint(
         except Exception as _e:
             logger.warning(f"[DEEP_AGENTS][PROCESS][ZIP] Error al descomprimir: {_e}")
 
-        # Procesar solo PDFs para obtener upload.md
-        for file_info in files_metadata:
-            filename = file_info["filename"]
-            file_extension = Path(filename).suffix.lower()
-            if file_extension == ".pdf":
-                # OCR bloqueante → threadpool para no bloquear otras solicitudes
-                ocr_result = await run_in_threadpool(
-                    ocr_process_file, Path(file_info["temp_path"])
-                )
-
-                # Guardar el contenido del markdown para la auditoría
-                markdown_content = ocr_result.get("markdown_content")
-                if markdown_content:
-                    processed_files["upload.md"] = markdown_content
-                    logger.info(
-                        f"[DEEP_AGENTS][PROCESS][OCR] upload.md obtenido de: [{filename}] [SUCCESS]"
-                    )
-                    break  # Solo necesitamos el primer PDF
-
         logger.info(
-            f"[DEEP_AGENTS][PROCESS] Iniciando proceso... [files={len(processed_files)}] [START]"
+            f"[DEEP_AGENTS][PROCESS] Iniciando proceso... [files={len(files_metadata)}] [START]"
         )
 
+        def _stream_chunk(chunk: dict) -> str:
+            return json.dumps(chunk, ensure_ascii=False) + "\n"
+
         async def generate_stream():
-            # Solo enviar el resultado de auditoría, sin el agente
-            upload_md_content = processed_files.get("upload.md")
-            if upload_md_content:
-                logger.info(f"[DEEP_AGENTS][PROCESS] Vectorizando contenido markdown del OCR")
-                
-                try:
-                    # Vectorizar el contenido markdown usando el servicio de embedding
+            # Eventos incrementales: etapas (OCR, vectorización, auditoría maestra), cada
+            # auditoría individual al terminar y, al final, el resultado consolidado v2
+            try:
+                # 1. OCR (o markdown de un reenvío del mismo ZIP)
+                source_digest = await _zip_source_digest(files_metadata)
+                upload_md_content = None if bypass_cache else audit_result_cache.get_markdown(source_digest)
+                if upload_md_content:
+                    logger.info(f"[DEEP_AGENTS][PROCESS][CACHE] upload.md recuperado de caché, se omite OCR")
+                    yield _stream_chunk({"type": "stage", "stage": "ocr", "status": "completed", "from_cache": True})
+                else:
+                    # Procesar solo PDFs para obtener upload.md
+                    for file_info in files_metadata:
+                        filename = file_info["filename"]
+                        file_extension = Path(filename).suffix.lower()
+                        if file_extension == ".pdf":
+                            # OCR bloqueante → threadpool para no bloquear otras solicitudes
+                            ocr_result = await run_in_threadpool(
+                                ocr_process_file, Path(file_info["temp_path"])
+                            )
+
+                            # Guardar el contenido del markdown para la auditoría
+                            markdown_content = ocr_result.get("markdown_content")
+                            if markdown_content:
+                                upload_md_content = markdown_content
+                                audit_result_cache.set_markdown(source_digest, markdown_content)
+                                logger.info(
+                                    f"[DEEP_AGENTS][PROCESS][OCR] upload.md obtenido de: [{filename}] [SUCCESS]"
+                                )
+                                yield _stream_chunk({"type": "stage", "stage": "ocr", "status": "completed", "file": filename})
+                                break  # Solo necesitamos el primer PDF
+
+                if not upload_md_content:
+                    logger.warning(
+                        "[DEEP_AGENTS][PROCESS] No se encontró upload.md - no se puede ejecutar auditoría"
+                    )
+                    yield _stream_chunk({
+                        "type": "error",
+                        "message": "No se encontró upload.md - no se puede ejecutar auditoría",
+                    })
+                    return
+
+                from services.audit import get_audit_service
+
+                audit_service = get_audit_service()
+
+                # Consultar la caché antes de vectorizar y auditar
+                cache_key = audit_cache_key(audit_service, upload_md_content, zip_filename_process, selected_audits)
+                audit_result = None if bypass_cache else audit_result_cache.get_result(cache_key)
+
+                if audit_result is not None:
+                    audit_result.from_cache = True
+                    logger.info(f"[DEEP_AGENTS][PROCESS][CACHE] Auditoría recuperada de caché, se omite vectorización y LLM")
+                else:
+                    # 2. Vectorización
+                    logger.info(f"[DEEP_AGENTS][PROCESS] Vectorizando contenido markdown del OCR")
+
                     from services.embedding import EmbeddingService
-                    from services.audit import MedicalAuditService
-                    
+
                     embedding_service = EmbeddingService()
-                    audit_service = MedicalAuditService()
-                    
-                    # Vectorizar el contenido markdown directamente
+
                     vectorization_result = await run_in_threadpool(
                         embedding_service.process_markdown_file, 
                         upload_md_content,  # Contenido markdown del OCR
                         "process_audit.md"  # Nombre del archivo
                     )
-                    
+
                     # Obtener el file_id del resultado
                     file_id = vectorization_result.get("file_id")
                     if not file_id:
                         raise Exception("No se pudo obtener file_id de la vectorización")
-                    
+
                     logger.info(f"[DEEP_AGENTS][PROCESS] Contenido vectorizado. File ID: {file_id}")
-                    
-                    # Ejecutar auditoría médica completa usando el file_id
-                    audit_result = await run_in_threadpool(
+                    yield _stream_chunk({"type": "stage", "stage": "vectorization", "status": "completed", "file_id": file_id})
+
+                    # 3. Auditorías: los eventos llegan desde los hilos de trabajo y se
+                    # reenvían al stream a través de una cola del event loop
+                    loop = asyncio.get_running_loop()
+                    events: asyncio.Queue = asyncio.Queue()
+
+                    def on_event(event_type: str, data: dict):
+                        loop.call_soon_threadsafe(events.put_nowait, (event_type, data))
+
+                    audit_task = asyncio.ensure_future(run_in_threadpool(
                         audit_service.run_full_medical_audit,
                         files_ids=[file_id],
-                        k=15,
-                        max_context_chars=8000,
-                        run_master_audit=True,
-                        response_format="v2",  # Usar formato v2 para JSON schema
-                        identificacion_reclamacion=zip_filename_process
-                    )
-                    
+                        identificacion_reclamacion=zip_filename_process,
+                        on_event=on_event,
+                        audits=selected_audits,
+                        markdown_content=upload_md_content,
+                        deadline_seconds=_remaining_deadline(deadline_seconds, request_start_time),
+                        max_llm_calls=max_llm_calls,
+                        **AUDIT_RUN_PARAMS
+                    ))
+                    audit_task.add_done_callback(lambda _: events.put_nowait(None))
+
+                    while True:
+                        event = await events.get()
+                        if event is None:
+                            break
+                        event_type, data = event
+                        if event_type == "audit":
+                            yield _stream_chunk({"type": "audit", **data})
+                        elif event_type == "audit_skipped":
+                            yield _stream_chunk({"type": "audit_skipped", **data})
+                        elif event_type == "master_audit":
+                            yield _stream_chunk({"type": "stage", "stage": "master_audit", "status": "completed", **data})
+
+                    audit_result = await audit_task
+                    audit_result_cache.set_result(cache_key, audit_result)
+
                     logger.info(f"[DEEP_AGENTS][PROCESS] Auditoría médica completada")
-                    
-                    # Enviar solo el resultado de auditoría
-                    audit_chunk = {"type": "audit_result", "audit_data": audit_result}
-                    yield json.dumps(audit_chunk) + "\n"
-                    
-                except Exception as audit_error:
-                    logger.error(f"[DEEP_AGENTS][PROCESS] Error en auditoría: {str(audit_error)}")
-                    error_chunk = {
-                        "type": "error",
-                        "message": f"Error ejecutando auditoría médica: {str(audit_error)}",
-                    }
-                    yield json.dumps(error_chunk) + "\n"
-            else:
-                logger.warning(
-                    "[DEEP_AGENTS][PROCESS] No se encontró upload.md - no se puede ejecutar auditoría"
-                )
-                error_chunk = {
+
+                # 4. Resultado consolidado
+                yield _stream_chunk({"type": "audit_result", "audit_data": audit_result.model_dump(mode="json")})
+
+            except Exception as audit_error:
+                logger.error(f"[DEEP_AGENTS][PROCESS] Error en auditoría: {str(audit_error)}")
+                yield _stream_chunk({
                     "type": "error",
-                    "message": "No se encontró upload.md - no se puede ejecutar auditoría",
-                }
-                yield json.dumps(error_chunk) + "\n"
+                    "message": f"Error ejecutando auditoría médica: {str(audit_error)}",
+                })
 
         return StreamingResponse(
             generate_stream(),
@@ -548,3 +672,267 @@ async def process_endpoint(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error en streaming: {str(e)}",
         )
+
+
+@router.post(
+    "/batch",
+    summary="Encolar un lote de reclamaciones ZIP para auditoría",
+    description="""
+    Recibe uno o varios archivos ZIP (una reclamación por ZIP), los guarda en una cola
+    persistente y retorna inmediatamente el `batch_id` y los `job_id` de cada reclamación.
+    
+    Cada trabajo ejecuta el mismo flujo de /agent/glosa (OCR → vectorización → auditoría v2)
+    en un pool acotado de trabajadores. Consultar el avance con `GET /agent/batch/{batch_id}`
+    y el resultado con `GET /agent/jobs/{job_id}/result`.
+    """,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Agent"],
+)
+async def batch_endpoint(
+    files: List[UploadFile] = File(..., description="Archivos ZIP de las reclamaciones"),
+    bypass_cache: Optional[bool] = File(False, description="Ignorar la caché de auditorías y reprocesar (opcional)"),
+    audits: Optional[str] = File(None, description="Auditorías a ejecutar separadas por coma, ej. 'factura,maos' (opcional, default: todas)"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    """Encola un lote de reclamaciones y retorna los identificadores de trabajo."""
+    try:
+        security_authenticate_user("/agent/batch", credentials)
+        selected_audits = _parse_audits_form(audits)
+
+        if not files:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Se requiere al menos 1 archivo '.zip'")
+        if len(files) > settings.AUDIT_JOBS_MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Máximo {settings.AUDIT_JOBS_MAX_BATCH_SIZE} archivos por lote",
+            )
+
+        for file in files:
+            filename = (file.filename or "").strip()
+            if not filename.lower().endswith(".zip"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Todos los archivos deben ser '.zip': [{filename}]",
+                )
+
+        # Cada ZIP se copia a disco por bloques (el lote completo no se carga en memoria)
+        claims = []
+        try:
+            for file in files:
+                filename = file.filename.strip()
+                try:
+                    upload_path = await run_in_threadpool(
+                        audit_job_queue.save_upload, file.file, settings.MAX_FILE_SIZE
+                    )
+                except ValueError as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Archivo demasiado grande: [{filename}] ({str(e)})",
+                    )
+                claims.append({"filename": filename, "path": upload_path})
+
+            batch = await run_in_threadpool(
+                audit_job_queue.submit_batch, claims, selected_audits, bool(bypass_cache)
+            )
+        except Exception:
+            await run_in_threadpool(audit_job_queue.discard_uploads, [claim["path"] for claim in claims])
+            raise
+        logger.info(f"[DEEP_AGENTS][BATCH] Lote {batch['batch_id']} encolado [jobs={batch['total_jobs']}] [SUCCESS]")
+        return batch
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[DEEP_AGENTS][BATCH] Error encolando lote: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error encolando lote: {str(e)}",
+        )
+
+
+@router.get(
+    "/batch/{batch_id}",
+    summary="Estado de un lote de auditorías",
+    tags=["Agent"],
+)
+async def batch_status_endpoint(
+    batch_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    """Retorna el conteo por estado y el estado de cada trabajo del lote."""
+    security_authenticate_user("/agent/batch", credentials)
+    batch = await run_in_threadpool(audit_job_queue.get_batch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Lote no encontrado: {batch_id}")
+    return batch
+
+
+@router.get(
+    "/jobs/{job_id}",
+    summary="Estado de un trabajo de auditoría",
+    tags=["Agent"],
+)
+async def job_status_endpoint(
+    job_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    """Retorna el estado de un trabajo (queued, running, completed, failed)."""
+    security_authenticate_user("/agent/jobs", credentials)
+    job = await run_in_threadpool(audit_job_queue.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Trabajo no encontrado: {job_id}")
+    return job
+
+
+@router.get(
+    "/jobs/{job_id}/result",
+    summary="Resultado de un trabajo de auditoría",
+    tags=["Agent"],
+)
+async def job_result_endpoint(
+    job_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    """Retorna el resultado v2 de un trabajo completado (409 si aún no termina)."""
+    security_authenticate_user("/agent/jobs", credentials)
+    job = await run_in_threadpool(audit_job_queue.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Trabajo no encontrado: {job_id}")
+    if job["status"] != "completed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"El trabajo {job_id} no está completado (estado: {job['status']}, error: {job.get('error')})",
+        )
+    return await run_in_threadpool(audit_job_queue.get_job_result, job_id)
+
+
+def _page_size(limit: int) -> int:
+    return max(1, min(limit, settings.AUDIT_HISTORY_MAX_PAGE_SIZE))
+
+
+@router.get(
+    "/history/runs",
+    summary="Historial de auditorías",
+    description="""
+    Auditorías completas registradas, más recientes primero. Paginación por keyset:
+    enviar `cursor` = `next_cursor` de la respuesta anterior (null = no hay más páginas).
+    """,
+    tags=["Agent"],
+)
+async def history_runs_endpoint(
+    identificacion_reclamacion: Optional[str] = Query(None, description="Número de la reclamación"),
+    ips_nit: Optional[str] = Query(None, description="NIT del prestador sin dígito de verificación"),
+    payer_nit: Optional[str] = Query(None, description="NIT del pagador sin dígito de verificación"),
+    date_from: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    date_to: Optional[date] = Query(None, description="Fecha final (inclusive)"),
+    glosa_total: Optional[bool] = Query(None, description="Solo reclamaciones con (true) o sin (false) glosa total"),
+    cursor: Optional[int] = Query(None, description="run_id de la última fila de la página anterior"),
+    limit: int = Query(50, description="Filas por página"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    """Lista las ejecuciones registradas con filtros."""
+    security_authenticate_user("/agent/history/runs", credentials)
+    try:
+        return await run_in_threadpool(
+            audit_history.list_runs,
+            identificacion_reclamacion=identificacion_reclamacion, ips_nit=ips_nit, payer_nit=payer_nit,
+            date_from=date_from, date_to=date_to, glosa_total=glosa_total,
+            cursor=cursor, limit=_page_size(limit),
+        )
+    except Exception as e:
+        logger.error(f"[DEEP_AGENTS][HISTORY] Error consultando historial: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error consultando historial: {str(e)}")
+
+
+@router.get(
+    "/history/runs/{run_id}",
+    summary="Detalle de una auditoría registrada",
+    tags=["Agent"],
+)
+async def history_run_endpoint(
+    run_id: int,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    """Retorna la ejecución con sus dictámenes, glosas aplicadas y el resultado entregado."""
+    security_authenticate_user("/agent/history/runs", credentials)
+    try:
+        run = await run_in_threadpool(audit_history.get_run, run_id)
+    except Exception as e:
+        logger.error(f"[DEEP_AGENTS][HISTORY] Error consultando ejecución {run_id}: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error consultando historial: {str(e)}")
+    if not run:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ejecución no encontrada: {run_id}")
+    return run
+
+
+@router.get(
+    "/history/glosas",
+    summary="Glosas aplicadas",
+    description="""
+    Glosas aplicadas en las auditorías registradas, más recientes primero, con el valor del
+    ítem cuando se conoce. Paginación por keyset con `cursor` = `next_cursor`.
+    """,
+    tags=["Agent"],
+)
+async def history_glosas_endpoint(
+    glosa_code: Optional[str] = Query(None, description="Código de la glosa, ej. 2102"),
+    identificacion_reclamacion: Optional[str] = Query(None, description="Número de la reclamación"),
+    ips_nit: Optional[str] = Query(None, description="NIT del prestador sin dígito de verificación"),
+    payer_nit: Optional[str] = Query(None, description="NIT del pagador sin dígito de verificación"),
+    audit_type: Optional[str] = Query(None, description="Tipo de auditoría (valor de AuditType)"),
+    date_from: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    date_to: Optional[date] = Query(None, description="Fecha final (inclusive)"),
+    cursor: Optional[int] = Query(None, description="entry_id de la última fila de la página anterior"),
+    limit: int = Query(50, description="Filas por página"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    """Lista las glosas aplicadas con filtros."""
+    security_authenticate_user("/agent/history/glosas", credentials)
+    try:
+        return await run_in_threadpool(
+            audit_history.list_glosas,
+            glosa_code=glosa_code, identificacion_reclamacion=identificacion_reclamacion,
+            ips_nit=ips_nit, payer_nit=payer_nit, audit_type=audit_type,
+            date_from=date_from, date_to=date_to, cursor=cursor, limit=_page_size(limit),
+        )
+    except Exception as e:
+        logger.error(f"[DEEP_AGENTS][HISTORY] Error consultando glosas: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error consultando glosas: {str(e)}")
+
+
+@router.get(
+    "/history/glosas/summary",
+    summary="Resumen de glosas aplicadas",
+    description="""
+    Aplicaciones por código de glosa agrupadas por prestador (`ips`), pagador (`payer`),
+    tipo de auditoría (`audit_type`) o solo por código (`code`), ej. cuántas veces se aplicó
+    la glosa 2102 por IPS en un rango de fechas.
+    """,
+    tags=["Agent"],
+)
+async def history_glosas_summary_endpoint(
+    group_by: str = Query("ips", description="ips, payer, audit_type o code"),
+    glosa_code: Optional[str] = Query(None, description="Código de la glosa, ej. 2102"),
+    ips_nit: Optional[str] = Query(None, description="NIT del prestador sin dígito de verificación"),
+    payer_nit: Optional[str] = Query(None, description="NIT del pagador sin dígito de verificación"),
+    date_from: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    date_to: Optional[date] = Query(None, description="Fecha final (inclusive)"),
+    limit: int = Query(100, description="Máximo de grupos"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    """Cuenta las aplicaciones de cada glosa por grupo."""
+    security_authenticate_user("/agent/history/glosas/summary", credentials)
+    if group_by not in GLOSA_SUMMARY_GROUPS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"group_by inválido: '{group_by}'. Valores permitidos: {', '.join(GLOSA_SUMMARY_GROUPS)}",
+        )
+    try:
+        return await run_in_threadpool(
+            audit_history.summarize_glosas,
+            group_by=group_by, glosa_code=glosa_code, ips_nit=ips_nit, payer_nit=payer_nit,
+            date_from=date_from, date_to=date_to, limit=_page_size(limit),
+        )
+    except Exception as e:
+        logger.error(f"[DEEP_AGENTS][HISTORY] Error resumiendo glosas: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error resumiendo glosas: {str(e)}")
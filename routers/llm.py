@@ -16,6 +16,8 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from core.config import settings
 from utils.jwt import verify_jwt_token
 from services.oci_bucket import OCIClient
+from services.llm_factory import get_oci_chat_model, is_mock_backend
+from services.llm_invoker import CircuitOpenError, InvocationTimeoutError, llm_invoker
 
 # Resolver dependencias pydantic de LangChain antes de importar ChatOCIGenAI
 from langchain_core.caches import BaseCache
@@ -100,8 +102,9 @@ def chat_completions(
     try:
         _authorize(credentials, "/llm/v1/chat/completions")
 
-        # Asegurar configuración OCI válida
-        _ensure_oci_config()
+        # Asegurar configuración OCI válida (el servidor simulado no la necesita)
+        if not is_mock_backend():
+            _ensure_oci_config()
 
         # Preparar parámetros de modelo
         model = payload.get("model")
@@ -111,14 +114,8 @@ def chat_completions(
         model_id = settings.CON_GEN_AI_CHAT_MODEL_ID
 
         # Inicializar LLM de OCI vía LangChain (no stream)
-        llm = ChatOCIGenAI(
-            model_id         = model_id,
-            service_endpoint = settings.CON_GEN_AI_SERVICE_ENDPOINT,
-            compartment_id   = settings.CON_COMPARTMENT_ID,
-            provider         = settings.CON_GEN_AI_CHAT_MODEL_PROVIDER,
-            is_stream        = False,
-            auth_type        = "API_KEY",
-            auth_profile     = settings.OCI_PROFILE,
+        llm = get_oci_chat_model(
+            model_id     = model_id,
             model_kwargs = {
                 "temperature": temperature,
                 "max_tokens": max_tokens,
@@ -141,8 +138,14 @@ def chat_completions(
         logger.info(f"[LLM][REQ] lc_chat model_id={model_id} temp={temperature} max_tokens={max_tokens} preview={prompt[:200]}")
 
         try:
-            result = llm.invoke(prompt)
+            result = llm_invoker.invoke(llm, prompt, operation="gateway")
             content = str(result)
+        except CircuitOpenError as e:
+            logger.error(f"[LLM][OCI][ERROR] {e}")
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Servicio OCI GenAI degradado, intente más tarde")
+        except InvocationTimeoutError as e:
+            logger.error(f"[LLM][OCI][ERROR] {e}")
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Tiempo de espera agotado en servicio OCI GenAI")
         except Exception as e:
             logger.error(f"[LLM][OCI][ERROR] LangChain/OCI invocation failed: {e}")
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Error en servicio OCI GenAI")
@@ -11,6 +11,7 @@ from schemas.oci_files import RAGFilesShema
 from core.security import security_authenticate_user
 from database import RAGFilesDB
 from services.embedding import EmbeddingService
+from services.answer_cache import audit_answer_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -225,6 +226,9 @@ async def delete_file_embeddings(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al eliminar el embedding del file_id: {file_id}: {str(e)}"
             )
+
+        # Las respuestas en caché que usaban el archivo dejan de ser válidas
+        audit_answer_cache.invalidate_files([file_id])
         
         return {"message": "Registros eliminados exitosamente.", "file_id": file_id}
 
@@ -8,7 +8,7 @@ from typing import List, Optional
 import json
 
 from core.security import security_authenticate_user
-from services.tools.oci_rag_tool import OCIRAGTool
+from services.tools.oci_rag_tool import SEARCH_MODES, get_rag_tool
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -24,12 +24,21 @@ async def get_rag_context_endpoint(
     input       : str = Form(..., description="Consulta para buscar contexto relevante"),
     files_ids   : str = Form("[]", description="IDs de archivos para filtrar la búsqueda (entero o array JSON)"),
     k           : int = Form(10, description="Número de documentos a recuperar (default: 10, máximo: 50)"),
+    fetch_k     : Optional[int] = Form(None, description="Candidatos re-ordenados con MMR (default: RAG_MMR_FETCH_K, máximo: RAG_MAX_FETCH_K)"),
+    lambda_mult : Optional[float] = Form(None, description="Balance de MMR: 1 = solo relevancia, 0 = solo diversidad (default: RAG_MMR_LAMBDA)"),
+    search_mode : Optional[str] = Form(None, description="Modo de búsqueda: 'mmr' o 'hybrid' (vector + palabras clave con RRF) (default: RAG_SEARCH_MODE)"),
     credentials : HTTPAuthorizationCredentials = Depends(security)
 ):
     """Endpoint para recuperar contexto RAG sin procesamiento de LLM."""
     try:
         security_authenticate_user("/rag/context", credentials)
 
+        if search_mode and search_mode.strip().lower() not in SEARCH_MODES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"search_mode inválido: {search_mode} (opciones: {', '.join(SEARCH_MODES)})"
+            )
+
         # Validar y limitar el parámetro k
         k = max(1, min(k, 50))  # Entre 1 y 50
 
@@ -55,16 +64,18 @@ async def get_rag_context_endpoint(
             logger.warning(f"[RAG][CONTEXT] Error parseando files_ids '{files_ids}': {str(e)}, usando lista vacía")
             files_ids_list = []
 
-        # Inicializar herramienta RAG
-        rag_tool = OCIRAGTool()
+        # Herramienta RAG compartida
+        rag_tool = get_rag_tool()
         
-        # Obtener contexto con k configurable
-        context = rag_tool.oci_vector_search_context_only(input, files_ids_list, k)
+        # Obtener contexto con k configurable (sin bloquear el event loop)
+        context = await rag_tool.aoci_vector_search_context_only(input, files_ids_list, k, fetch_k, lambda_mult, search_mode)
         
         logger.info(f"[RAG][CONTEXT] Contexto recuperado: {context['total_documents']} documentos (k={k}) [SUCCESS]")
         
         return context
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"[RAG][CONTEXT] Error recuperando contexto: {str(e)}")
         raise HTTPException(
@@ -113,11 +124,11 @@ async def get_raw_search_results_endpoint(
             logger.warning(f"[RAG][RAW-RESULTS] Error parseando files_ids '{files_ids}': {str(e)}, usando lista vacía")
             files_ids_list = []
 
-        # Inicializar herramienta RAG
-        rag_tool = OCIRAGTool()
+        # Herramienta RAG compartida
+        rag_tool = get_rag_tool()
         
-        # Obtener resultados brutos con k configurable
-        results = rag_tool.oci_vector_search_raw_results(input, files_ids_list, k)
+        # Obtener resultados brutos con k configurable (sin bloquear el event loop)
+        results = await rag_tool.aoci_vector_search_raw_results(input, files_ids_list, k)
         
         logger.info(f"[RAG][RAW-RESULTS] Resultados brutos recuperados: {len(results)} documentos (k={k}) [SUCCESS]")
         
@@ -15,6 +15,11 @@ import asyncio
 from fastapi.responses import StreamingResponse
 from collections import deque
 from services.oci_status import OCIStatusChecker
+from services.llm_invoker import llm_invoker
+from database.connection import pool_stats
+from database.rag_docs import RAGDocsDB
+from services.embedding_cache import CachedEmbeddings
+from core.security import security_authenticate_user
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -47,6 +52,39 @@ async def health_check():
         "version": settings.API_VERSION
     }
 
+@router.get(
+    "/metrics/llm",
+    summary="Métricas de invocación del LLM",
+    description="Llamadas, reintentos, timeouts, solicitudes duplicadas y estado del circuit breaker por operación.",
+    tags=["Sistema"]
+)
+async def get_llm_metrics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    security_authenticate_user("/sys/metrics/llm", credentials)
+    return llm_invoker.stats()
+
+@router.get(
+    "/metrics/db",
+    summary="Métricas del pool de conexiones de Oracle",
+    description="Sesiones abiertas y prestadas del pool de conexiones de la base de datos.",
+    tags=["Sistema"]
+)
+async def get_db_metrics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    security_authenticate_user("/sys/metrics/db", credentials)
+    return pool_stats()
+
+@router.get(
+    "/metrics/embeddings",
+    summary="Métricas de la caché de embeddings",
+    description="Aciertos en memoria y en disco, textos embebidos remotamente y ocupación de la caché de embeddings de consultas.",
+    tags=["Sistema"]
+)
+async def get_embeddings_metrics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    security_authenticate_user("/sys/metrics/embeddings", credentials)
+    embeddings = RAGDocsDB().get_embeddings()
+    if not isinstance(embeddings, CachedEmbeddings):
+        return {"enabled": False}
+    return embeddings.stats()
+
 @router.get(
     "/public/status_bucket",
     summary="Estado público de la conexión a OCI Bucket",
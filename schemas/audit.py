@@ -33,6 +33,18 @@ class AuditType(str, Enum):
     CONSISTENCIA_DOCUMENTO = "consistencia_documento"
     PAGADOR_ADRES = "pagador_adres"
 
+class AuditDefinition(BaseModel):
+    """Definición declarativa de una auditoría del registro"""
+    audit_type: AuditType
+    name: str = Field(description="Nombre legible de la auditoría (usado en logs y en el catálogo de glosas)")
+    prompt_method: str = Field(description="Método de MedicalAuditService que retorna el prompt")
+    default_query: str = Field(description="Consulta RAG por defecto")
+    is_special: bool = Field(default=False, description="True = auditoría especial con glosas predefinidas en el prompt")
+    keywords: List[str] = Field(default_factory=list, description="Términos del pre-escaneo léxico; vacío = siempre se ejecuta")
+    segment_types: List[str] = Field(default_factory=list, description="Tipos de documento donde busca evidencia (índice de segmentos); vacío = todo el documento")
+    priority: int = Field(default=5, description="Prioridad ante deadline o presupuesto de llamadas al LLM (menor = se ejecuta primero)")
+    model_profile: str = Field(default="standard", description="Perfil de modelo: 'fast' (verificaciones simples), 'standard' o 'strong'")
+
 class SpecialAuditResult(BaseModel):
     """Resultado específico para auditorías con formato JSON predefinido"""
     identificacion_reclamacion: str = Field(description="Número de la reclamación (nombre del archivo PDF)")
@@ -49,6 +61,34 @@ class IndividualAuditResult(BaseModel):
     justification: str = Field(description="Explicación detallada de todos los hallazgos encontrados")
     glosas_detectadas: List[Dict] = Field(default_factory=list, description="Lista de glosas oficiales detectadas del documento predefinido")
     special_result: Optional[SpecialAuditResult] = Field(default=None, description="Resultado específico para auditorías con formato JSON predefinido")
+    k_used: Optional[int] = Field(default=None, description="Fragmentos incluidos en el contexto de la auditoría")
+    context_tokens: Optional[int] = Field(default=None, description="Tokens estimados del contexto enviado al LLM")
+    model_used: Optional[str] = Field(default=None, description="Modelo que produjo el resultado (None = validación determinista)")
+    escalated: bool = Field(default=False, description="True si la respuesta se obtuvo escalando a un modelo de mayor capacidad")
+    error: bool = Field(default=False, description="True si la auditoría falló por un error técnico (timeout, circuito abierto...) y su respuesta no es un veredicto")
+
+class GlosaCatalogEntry(BaseModel):
+    """Glosa oficial del catálogo (HERRAMIENTA_NOTAS_ACLARATORIAS) ya parseada"""
+    codigo: str = Field(description="Código de la glosa (puede repetirse con distinto detalle)")
+    tipo: str = Field(default="", description="Tipo de auditoría al que aplica la glosa")
+    segmento: str = Field(default="", description="Segmento de la glosa (Financiero, Medico, Soporte & Consistencia...)")
+    detalle: str = Field(default="", description="Detalle de la glosa")
+    glosa_a_reclamacion: str = Field(default="", description="Aplicación a la reclamación o al ítem (SI/NO)")
+    aplica_a: str = Field(default="", description="'reclamacion' o 'item' según el campo de origen")
+    contexto: str = Field(default="", description="Contexto de aplicación de la glosa")
+    observaciones: str = Field(default="", description="Observaciones de la glosa")
+
+    def to_legacy_dict(self) -> Dict[str, str]:
+        """Formato de diccionario usado históricamente en glosas_detectadas"""
+        return {
+            "codigo": self.codigo,
+            "tipo": self.tipo,
+            "segmento": self.segmento,
+            "detalle": self.detalle,
+            "glosa_a_reclamacion": self.glosa_a_reclamacion,
+            "contexto": self.contexto,
+            "observaciones": self.observaciones
+        }
 
 class MasterAuditResult(BaseModel):
     """Resultado de la auditoría maestra consolidada"""
@@ -66,6 +106,7 @@ class FullAuditRequest(BaseModel):
     top_p: float = Field(default=0.75, ge=0.0, le=1.0, description="Top-p sampling parameter")
     run_master_audit: bool = Field(default=True, description="Ejecutar auditoría maestra consolidada")
     custom_queries: Optional[Dict[str, str]] = Field(default=None, description="Consultas personalizadas para cada tipo de auditoría. Ej: {'factura': 'factura IPS número 123', 'medicamentos': 'paracetamol ibuprofeno'}")
+    audits: Optional[List[AuditType]] = Field(default=None, description="Subconjunto de auditorías a ejecutar (default: todas)")
     # Nuevo parámetro para elegir formato de respuesta
     response_format: str = Field(default="v2", description="Formato de respuesta: 'v1' (formato original) o 'v2' (nuevo formato JSON)")
 
@@ -78,6 +119,10 @@ class FullAuditResponse(BaseModel):
     model_used: str
     execution_time_seconds: float
     error: Optional[str] = None
+    skipped_audits: List[AuditType] = Field(default_factory=list, description="Auditorías omitidas por el pre-escaneo léxico")
+    budget_skipped_audits: List[AuditType] = Field(default_factory=list, description="Auditorías omitidas por deadline o presupuesto de llamadas al LLM")
+    errored_audits: List[AuditType] = Field(default_factory=list, description="Auditorías que fallaron por un error técnico")
+    partial: bool = Field(default=False, description="True si el resultado es parcial por deadline, presupuesto o auditorías con error técnico")
 
 class QuestionAuditRequest(BaseModel):
     """Request para auditoría basada en pregunta específica"""
@@ -102,6 +147,8 @@ class QuestionAuditResponse(BaseModel):
     response_length: int
     execution_time_seconds: float
     error: Optional[str] = None
+    from_cache: bool = False  # Respuesta recuperada de la caché de preguntas
+    cached_query: Optional[str] = None  # Pregunta original de la respuesta en caché (difiere si se parafraseó)
 
 # Nuevos schemas para el formato JSON v2
 
@@ -151,3 +198,10 @@ class FullAuditResponseV2(BaseModel):
     model_used: str
     execution_time_seconds: float
     error: Optional[str] = None
+    from_cache: bool = Field(default=False, description="Indica si el resultado se recuperó de la caché de auditorías")
+    skipped_audits: List[AuditType] = Field(default_factory=list, description="Auditorías omitidas por el pre-escaneo léxico")
+    budget_skipped_audits: List[AuditType] = Field(default_factory=list, description="Auditorías omitidas por deadline o presupuesto de llamadas al LLM")
+    errored_audits: List[AuditType] = Field(default_factory=list, description="Auditorías que fallaron por un error técnico")
+    partial: bool = Field(default=False, description="True si el resultado es parcial por deadline, presupuesto o auditorías con error técnico")
+    segments_total: Optional[int] = Field(default=None, description="Segmentos del documento completo (modo map-reduce)")
+    segments_processed: Optional[int] = Field(default=None, description="Segmentos auditados dentro del presupuesto de tokens (modo map-reduce)")
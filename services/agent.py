@@ -12,6 +12,7 @@ from langgraph.prebuilt import InjectedState
 from deepagents import create_deep_agent
 
 from core.config import settings
+from services.llm_factory import get_gateway_chat_model
 from utils.utils import Utils
 from services.deepagents.streamer import AgentStreamer
 
@@ -46,11 +47,7 @@ class AgentService:
         try:
             self._vector_search_instance = OCIRAGTool()
             
-            self._llm = ChatOpenAI(
-                 model    = settings.GATEWAY_OPENAI_MODEL,
-                 api_key  = settings.GATEWAY_OPENAI_API_KEY,
-                 base_url = settings.GATEWAY_BASE_URL
-            )
+            self._llm = get_gateway_chat_model()
             # Establecer la ruta de los prompts
             self._prompts = "backend/services/prompts"
             
@@ -67,7 +64,7 @@ class AgentService:
     def _build_agent(self):
 
         @tool("rag_tool")
-        def call_rag(query: str, state: Annotated[DeepAgentState, InjectedState]) -> str:
+        async def call_rag(query: str, state: Annotated[DeepAgentState, InjectedState]) -> str:
             """
             @rag_tool — Buscar y citar conocimiento en documentos cargados (RAG).
 
@@ -98,7 +95,7 @@ class AgentService:
             """
             if not query:
                 return "Error: La consulta para la herramienta RAG no puede estar vacía."
-            return self._vector_search_instance.oci_vector_search(query, self._current_files_ids)
+            return await self._vector_search_instance.aoci_vector_search(query, self._current_files_ids)
 
 
         # Leer los prompts de los sub-agentes
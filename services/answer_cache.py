@@ -0,0 +1,237 @@
+"""
+Caché de respuestas de answer_audit_question.
+
+Los revisores repiten las mismas preguntas sobre los mismos archivos ("¿tiene FURIPS?",
+"¿valor total de la factura?"). La clave combina la pregunta normalizada (sin tildes,
+mayúsculas ni signos), los files_ids ordenados y los parámetros de búsqueda y muestreo;
+una pregunta repetida se responde sin búsqueda vectorial ni llamada al LLM.
+
+Opcionalmente (AUDIT_ANSWER_CACHE_SIMILARITY > 0) una pregunta parafraseada reutiliza la
+respuesta de la más parecida del mismo ámbito si la similitud coseno de sus embeddings
+supera el umbral.
+
+Invalidación: las entradas se indexan por file_id y se descartan al re-embeber o
+eliminar cualquiera de sus archivos (las preguntas sin files_ids no se guardan); además, cada acierto verifica la versión de los
+archivos en RAG_FILES (una consulta liviana), lo que cubre cambios hechos por otras
+réplicas.
+"""
+import re
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from database.rag_files import RAGFilesDB
+from services.audit_cache import TTLCache, sha256_text
+from services.glosas_catalog import normalize_key
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+class AuditAnswerCache:
+    """Caché de QuestionAuditResponse por pregunta normalizada + archivos + parámetros."""
+
+    def __init__(self):
+        self.enabled = settings.AUDIT_ANSWER_CACHE_ENABLED
+        self.similarity_threshold = settings.AUDIT_ANSWER_CACHE_SIMILARITY
+        self.verify_versions = settings.AUDIT_ANSWER_CACHE_VERIFY_VERSIONS
+        self.rag_files = RAGFilesDB()
+        self._answers = TTLCache(settings.AUDIT_ANSWER_CACHE_MAX_ENTRIES, settings.AUDIT_ANSWER_CACHE_TTL_SECONDS)
+        self._lock = threading.Lock()
+        self._keys_by_file: Dict[int, set] = {}
+        # Embeddings de las preguntas guardadas, por ámbito (archivos + parámetros)
+        self._vectors_by_scope: Dict[str, "OrderedDict[str, np.ndarray]"] = {}
+        self.semantic_hits = 0
+        self.invalidations = 0
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.enabled and self.similarity_threshold > 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Pregunta sin tildes, mayúsculas, signos ni espacios sobrantes."""
+        return " ".join(_PUNCTUATION_RE.sub(" ", normalize_key(query)).split())
+
+    @staticmethod
+    def build_scope(files_ids: List[int], **params: Any) -> str:
+        """Ámbito de una pregunta: archivos consultados + parámetros que afectan la respuesta."""
+        key_material = {
+            "files_ids": sorted(int(file_id) for file_id in files_ids or []),
+            "model_id": settings.CON_GEN_AI_CHAT_MODEL_ID,
+            "params": params,
+        }
+        return sha256_text(json.dumps(key_material, sort_keys=True, default=str))
+
+    def build_key(self, query: str, scope: str) -> str:
+        return sha256_text(f"{scope}|{self.normalize_query(query)}")
+
+    def _versions_match(self, entry: Dict[str, Any]) -> bool:
+        if not self.verify_versions or not entry["versions"]:
+            return True
+        try:
+            current = self.rag_files.get_files_versions(list(entry["versions"]))
+        except Exception:
+            # Sin poder verificar no se reutiliza la respuesta
+            return False
+        return all(current.get(file_id) == version for file_id, version in entry["versions"].items())
+
+    def _nearest(self, scope: str, query_vector: np.ndarray) -> Tuple[Optional[str], float]:
+        """Clave de la pregunta guardada más parecida del ámbito y su similitud coseno."""
+        with self._lock:
+            vectors = self._vectors_by_scope.get(scope)
+            if not vectors:
+                return None, 0.0
+            keys = list(vectors)
+            matrix = np.stack([vectors[key] for key in keys])
+        similarities = matrix @ query_vector
+        best = int(np.argmax(similarities))
+        return keys[best], float(similarities[best])
+
+    @staticmethod
+    def _unit_vector(vector: List[float]) -> Optional[np.ndarray]:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        return array / norm if norm else None
+
+    def get(self, query: str, scope: str,
+            embed_query: Optional[Callable[[str], List[float]]] = None) -> Tuple[Optional[Any], Optional[np.ndarray]]:
+        """
+        Busca una respuesta guardada: primero por coincidencia exacta de la pregunta
+        normalizada y, si está habilitado y se proporciona embed_query, por similitud.
+
+        Returns:
+            (copia de la respuesta o None, embedding de la pregunta si se calculó — para
+            reutilizarlo en set y no embeber dos veces)
+        """
+        if not self.enabled:
+            return None, None
+
+        key = self.build_key(query, scope)
+        entry = self._answers.get(key)
+        query_vector = None
+
+        if entry is None and self.semantic_enabled and embed_query is not None:
+            try:
+                query_vector = self._unit_vector(embed_query(self.normalize_query(query)))
+            except Exception as e:
+                logger.warning(f"[AUDIT][ANSWER_CACHE] No se pudo embeber la pregunta: {str(e)}")
+            if query_vector is not None:
+                nearest_key, similarity = self._nearest(scope, query_vector)
+                if nearest_key and similarity >= self.similarity_threshold:
+                    entry = self._answers.get(nearest_key)
+                    if entry is None:
+                        self._forget_vector(scope, nearest_key)
+                    else:
+                        key = nearest_key
+                        self.semantic_hits += 1
+                        logger.info(f"[AUDIT][ANSWER_CACHE] Pregunta parafraseada (similitud {similarity:.3f}) de: {entry['query'][:80]}")
+
+        if entry is None:
+            return None, query_vector
+
+        if not self._versions_match(entry):
+            logger.info(f"[AUDIT][ANSWER_CACHE] Archivos {list(entry['versions'])} modificados: respuesta descartada")
+            self._discard(key, scope, list(entry["versions"]))
+            return None, query_vector
+
+        response = entry["response"].model_copy(deep=True)
+        response.from_cache = True
+        response.cached_query = entry["query"]
+        logger.info(f"[AUDIT][ANSWER_CACHE] Respuesta recuperada de caché [key={key[:12]}] [HIT]")
+        return response, query_vector
+
+    def set(self, query: str, scope: str, files_ids: List[int], response: Any,
+            query_vector: Optional[np.ndarray] = None) -> None:
+        """
+        Guarda una respuesta exitosa con contexto (sin documentos no se guarda). Las
+        preguntas sobre todos los archivos (files_ids vacío) no se guardan: cualquier
+        ingesta o eliminación cambia su respuesta y no hay archivos con qué invalidarla.
+        """
+        if not self.enabled or not getattr(response, "success", False) or not getattr(response, "documents_retrieved", 0):
+            return
+
+        files_ids = sorted({int(file_id) for file_id in files_ids or []})
+        if not files_ids:
+            return
+        versions: Dict[int, str] = {}
+        if self.verify_versions:
+            try:
+                versions = self.rag_files.get_files_versions(files_ids)
+            except Exception:
+                return
+            if len(versions) != len(files_ids):
+                return
+
+        key = self.build_key(query, scope)
+        self._answers.set(key, {"query": query, "versions": versions, "response": response.model_copy(deep=True)})
+        with self._lock:
+            for file_id in files_ids:
+                self._keys_by_file.setdefault(file_id, set()).add((key, scope))
+            if query_vector is not None:
+                vectors = self._vectors_by_scope.setdefault(scope, OrderedDict())
+                vectors[key] = query_vector
+                while len(vectors) > self._answers.max_entries:
+                    vectors.popitem(last=False)
+        logger.info(f"[AUDIT][ANSWER_CACHE] Respuesta guardada [key={key[:12]}] [entries={len(self._answers)}]")
+
+    def _forget_vector(self, scope: str, key: str) -> None:
+        with self._lock:
+            vectors = self._vectors_by_scope.get(scope)
+            if vectors is not None:
+                vectors.pop(key, None)
+                if not vectors:
+                    self._vectors_by_scope.pop(scope, None)
+
+    def _discard(self, key: str, scope: str, files_ids: List[int]) -> None:
+        self._answers.delete(key)
+        self._forget_vector(scope, key)
+        with self._lock:
+            for file_id in files_ids:
+                keys = self._keys_by_file.get(file_id)
+                if keys is not None:
+                    keys.discard((key, scope))
+                    if not keys:
+                        self._keys_by_file.pop(file_id, None)
+
+    def invalidate_files(self, files_ids: List[int]) -> int:
+        """Descarta las respuestas que usan alguno de los archivos (re-embebidos o eliminados)."""
+        removed = set()
+        with self._lock:
+            for file_id in files_ids or []:
+                removed |= self._keys_by_file.pop(int(file_id), set())
+        for key, scope in removed:
+            self._answers.delete(key)
+            self._forget_vector(scope, key)
+        if removed:
+            self.invalidations += len(removed)
+            logger.info(f"[AUDIT][ANSWER_CACHE] {len(removed)} respuestas invalidadas por cambios en archivos {list(files_ids)}")
+        return len(removed)
+
+    def clear(self) -> None:
+        self._answers.clear()
+        with self._lock:
+            self._keys_by_file.clear()
+            self._vectors_by_scope.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._answers),
+            "hits": self._answers.hits,
+            "misses": self._answers.misses,
+            "semantic_hits": self.semantic_hits,
+            "invalidations": self.invalidations,
+            "similarity_threshold": self.similarity_threshold,
+            "max_entries": self._answers.max_entries,
+            "ttl_seconds": self._answers.ttl_seconds,
+        }
+
+
+audit_answer_cache = AuditAnswerCache()
@@ -5,7 +5,10 @@ Implementa 7 auditorías especializadas y una auditoría maestra consolidada.
 import logging
 import time
 import json
-from typing import Dict, List, Optional, Union
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
@@ -19,6 +22,23 @@ ChatOCIGenAI.model_rebuild(_types_namespace={"BaseCache": BaseCache, "Callbacks"
 
 from core.config import settings
 from services.tools.oci_rag_tool import OCIRAGTool
+from services.llm_factory import get_oci_chat_model
+from services.glosas_catalog import glosas_catalog
+from services.answer_cache import audit_answer_cache
+from services.audit_rules import evaluate_special_audit
+from services.invoice_tables import compute_numeric_findings
+from services.context_packing import pack_context
+from services.model_routing import ROUTE_V2, ModelRouter
+from services.llm_invoker import llm_invoker
+from services.audit_history import audit_history, catalog_item_code
+from services.audit_mapreduce import estimate_tokens, merge_v2_results, split_into_segments
+from services.audit_registry import (
+    AUDIT_REGISTRY,
+    get_audit_definition_by_name,
+    prescan_audits,
+    resolve_priorities,
+    select_audits,
+)
 from schemas.audit import (
     AuditResponse, AuditDecision, AuditType, 
     IndividualAuditResult, MasterAuditResult,
@@ -36,30 +56,28 @@ class MedicalAuditService:
     Implementa 7 auditorías especializadas y una auditoría maestra consolidada.
     """
 
-    def __init__(self):
-        """Inicializar servicio de auditoría médica"""
+    def __init__(self, llm: Optional[ChatOCIGenAI] = None, rag_tool: Optional[OCIRAGTool] = None):
+        """
+        Inicializar servicio de auditoría médica.
+        La instancia no guarda estado por solicitud: los parámetros de muestreo se pasan en
+        cada llamada, por lo que puede compartirse entre solicitudes concurrentes.
+        """
         try:
             # Initialize the OCI Generative AI Chat Model
-            self.llm = ChatOCIGenAI(
-                model_id         = settings.CON_GEN_AI_CHAT_MODEL_ID,
-                service_endpoint = settings.CON_GEN_AI_SERVICE_ENDPOINT,
-                compartment_id   = settings.CON_COMPARTMENT_ID,
-                provider         = settings.CON_GEN_AI_CHAT_MODEL_PROVIDER,
-                is_stream        = False,
-                auth_type        = "API_KEY",
-                auth_profile     = settings.OCI_PROFILE,
-                model_kwargs = {
-                    "temperature": 0.1,
-                    "max_tokens": 2000,
-                    "frequency_penalty": 0.0,
-                    "presence_penalty": 0.0,
-                    "top_k": 0,
-                    "top_p": 0.75,
-                }
-            )
+            self.llm = llm or get_oci_chat_model(model_kwargs={
+                "temperature": 0.1,
+                "max_tokens": 2000,
+                "frequency_penalty": 0.0,
+                "presence_penalty": 0.0,
+                "top_k": 0,
+                "top_p": 0.75,
+            })
             
+            # Modelos por auditoría (perfiles fast / standard / strong) con escalamiento
+            self.model_router = ModelRouter(self.llm)
+
             # Initialize RAG tool for vector search
-            self.rag_tool = OCIRAGTool()
+            self.rag_tool = rag_tool or OCIRAGTool()
             
             # Initialize output parsers
             self.audit_output_parser = self._get_audit_output_parser()
@@ -72,6 +90,31 @@ class MedicalAuditService:
             logger.error(f"[AUDIT] Error inicializando servicio de auditoría: {str(e)}")
             raise
 
+    def _get_llm(self, temperature: float, max_tokens: int, top_p: float):
+        """
+        LLM con parámetros de muestreo ligados a esta llamada. No modifica self.llm, por lo
+        que solicitudes concurrentes no se pisan temperature / max_tokens / top_p.
+        """
+        return self.llm.bind(temperature=temperature, max_tokens=max_tokens, top_p=top_p)
+
+    def get_prompt_version(self) -> str:
+        """
+        Huella de los prompts y consultas RAG vigentes. Cambia automáticamente al editar
+        cualquiera de ellos, invalidando los resultados guardados en caché.
+        """
+        prompts = [
+            self._get_factura_prompt(), self._get_historia_clinica_prompt(),
+            self._get_medicamentos_prompt(), self._get_examenes_prompt(),
+            self._get_procedimientos_prompt(), self._get_maos_prompt(),
+            self._get_certificados_prompt(), self._get_formularios_legales_prompt(),
+            self._get_rut_validacion_prompt(), self._get_datos_paciente_prompt(),
+            self._get_consistencia_documento_prompt(), self._get_pagador_adres_prompt(),
+            self._get_master_prompt(), self._get_comprehensive_v2_prompt(),
+            self._get_segment_v2_prompt(),
+            json.dumps([definition.model_dump(mode="json") for definition in AUDIT_REGISTRY], sort_keys=True),
+        ]
+        return hashlib.sha256("\n".join(prompts).encode("utf-8")).hexdigest()[:16]
+
     def _get_audit_output_parser(self) -> StructuredOutputParser:
         """Inicializar parser de salida estructurada para auditorías individuales"""
         response_schemas = [
@@ -608,163 +651,161 @@ Respuesta requerida:
 
     def _extract_relevant_glosas(self, audit_type: str) -> List[Dict]:
         """
-        Extraer glosas relevantes del documento de glosas predefinido según el tipo de auditoría. 
-        NO INVENTA GLOSAS - las extrae del documento oficial usando AUDIT_GLOSAS_FILE_ID.
+        Extraer glosas relevantes del catálogo de glosas predefinido según el tipo de auditoría.
+        NO INVENTA GLOSAS - las toma del documento oficial (AUDIT_GLOSAS_FILE_ID), parseado
+        una sola vez en memoria y refrescado solo cuando cambia la versión del archivo.
         """
         try:
-            logger.info(f"[AUDIT] Extrayendo glosas relevantes para tipo: {audit_type} desde file_id: {settings.AUDIT_GLOSAS_FILE_ID}")
-            
-            # Buscar el documento de glosas oficial con consulta más específica
-            search_query = f"Tipo: {audit_type} glosa detalle segmento"
-            
-            glosas_context = self.rag_tool.oci_vector_search_context_only(
-                input=search_query,
-                files_ids=[settings.AUDIT_GLOSAS_FILE_ID],  # Documento con las glosas predefinidas
-                k=50  # Más glosas para asegurar cobertura completa
-            )
-            
-            if not glosas_context or not glosas_context.get("documents"):
-                logger.warning(f"[AUDIT] No se encontró contexto de glosas para {audit_type}")
-                return []
-            
-            # Construir el texto completo de las glosas desde los documentos
-            glosas_text_parts = []
-            logger.info(f"[AUDIT] Procesando {len(glosas_context['documents'])} documentos recuperados:")
-            
-            for i, doc in enumerate(glosas_context["documents"]):
-                file_id = doc.get("file_id")
-                chunk_id = doc.get("chunk_id")
-                content = doc.get("content", "")
-                
-                logger.info(f"[AUDIT]   Doc {i+1}: file_id={file_id}, chunk_id={chunk_id}, caracteres={len(content)}")
-                
-                if file_id == settings.AUDIT_GLOSAS_FILE_ID:  # Verificar que sea del archivo correcto
-                    glosas_text_parts.append(content)
-                    # Log del contenido del chunk para debugging
-                    logger.info(f"[AUDIT]     Contenido chunk {chunk_id}: {content[:300]}...")
-                else:
-                    logger.warning(f"[AUDIT]     Doc {i+1} no pertenece al file_id {settings.AUDIT_GLOSAS_FILE_ID}, ignorando")
-            
-            glosas_text = "\n\n".join(glosas_text_parts)
-            
-            if not glosas_text.strip():
-                logger.warning(f"[AUDIT] No se encontró contenido de glosas para {audit_type}")
-                return []
-            
-            logger.info(f"[AUDIT] Contexto de glosas obtenido: {len(glosas_text)} caracteres total")
-            logger.info(f"[AUDIT] Contexto completo para {audit_type}:")
-            logger.info(f"[AUDIT] {'-'*80}")
-            logger.info(f"[AUDIT] {glosas_text}")
-            logger.info(f"[AUDIT] {'-'*80}")
-            
-            # Procesar el texto para extraer glosas manualmente
-            glosas_extraidas = []
-            
-            # Dividir el texto en secciones por "### Glosa:"
-            secciones = glosas_text.split("### Glosa:")
-            
-            for seccion in secciones[1:]:  # Saltar la primera sección vacía
-                try:
-                    lines = seccion.strip().split('\n')
-                    if not lines:
-                        continue
-                    
-                    # Extraer código de glosa (primera línea)
-                    codigo_line = lines[0].strip()
-                    codigo = codigo_line.split()[0] if codigo_line else ""
-                    
-                    # Buscar información específica
-                    tipo = ""
-                    segmento = ""
-                    detalle = ""
-                    glosa_a_reclamacion = ""
-                    contexto = ""
-                    observaciones = ""
-                    
-                    for line in lines:
-                        line = line.strip()
-                        if line.startswith("- **Tipo:**"):
-                            tipo = line.replace("- **Tipo:**", "").strip()
-                        elif line.startswith("- **SEGMENTO:**"):
-                            segmento = line.replace("- **SEGMENTO:**", "").strip()
-                        elif line.startswith("- **Detalle de glosa:**"):
-                            detalle = line.replace("- **Detalle de glosa:**", "").strip()
-                        elif line.startswith("- **Glosa a reclamacion:**"):
-                            glosa_a_reclamacion = line.replace("- **Glosa a reclamacion:**", "").strip()
-                        elif line.startswith("- **Glosa a ITEM:**"):
-                            glosa_a_reclamacion = line.replace("- **Glosa a ITEM:**", "").strip()
-                        elif line.startswith("- **Contexto:**"):
-                            contexto = line.replace("- **Contexto:**", "").strip()
-                        elif line.startswith("- **Observacion:**"):
-                            observaciones = line.replace("- **Observacion:**", "").strip()
-                    
-                    # Solo incluir si el tipo coincide exactamente
-                    if tipo.lower() == audit_type.lower() and codigo and detalle:
-                        glosa = {
-                            "codigo": codigo,
-                            "tipo": tipo,
-                            "segmento": segmento,
-                            "detalle": detalle,
-                            "glosa_a_reclamacion": glosa_a_reclamacion,
-                            "contexto": contexto,
-                            "observaciones": observaciones
-                        }
-                        glosas_extraidas.append(glosa)
-                        
-                except Exception as e:
-                    logger.warning(f"[AUDIT] Error procesando sección de glosa: {str(e)}")
-                    continue
-            
-            logger.info(f"[AUDIT] Glosas extraídas para {audit_type}: {len(glosas_extraidas)} glosas oficiales")
-            
-            # Log de las primeras glosas para debugging
-            for i, glosa in enumerate(glosas_extraidas[:3]):
-                logger.info(f"[AUDIT] Glosa {i+1}: {glosa['codigo']} - {glosa['detalle'][:50]}...")
-            
+            glosas = glosas_catalog.get_by_tipo(audit_type)
+            glosas_extraidas = [glosa.to_legacy_dict() for glosa in glosas]
+
+            logger.info(f"[AUDIT] Glosas extraídas para {audit_type}: {len(glosas_extraidas)} glosas oficiales (catálogo versión {glosas_catalog.version})")
             return glosas_extraidas
-                
+
         except Exception as e:
             logger.error(f"[AUDIT] Error extrayendo glosas para {audit_type}: {str(e)}")
             return []
 
+    def _resolve_search_query(self, audit_name: str, is_special: bool, search_query: str = None) -> str:
+        """Consulta RAG de una auditoría: la personalizada si existe, si no la predefinida."""
+        if search_query:
+            return search_query
+        definition = get_audit_definition_by_name(audit_name)
+        if definition:
+            return definition.default_query
+        if is_special:
+            return f"{audit_name.lower()} auditoría"
+        return f"auditoría {audit_name.lower()}"
+
+    def _prefetch_audit_contexts(self, queries: List[str], files_ids: List[int], k: int,
+                                 segment_types: Optional[List[List[str]]] = None) -> Optional[List[Dict]]:
+        """
+        Recuperar por adelantado el contexto de todas las auditorías: un solo embedding
+        de las consultas y un solo viaje a la base de datos; cada consulta se re-ordena con
+        el modo de búsqueda configurado (settings.RAG_SEARCH_MODE: MMR o híbrida con RRF).
+
+        Con segment_types (uno por consulta) cada auditoría busca solo en sus tipos de
+        documento con k reducido (settings.AUDIT_SEGMENT_K). Las consultas cuyo segmento no
+        existe en el documento, o todas si el índice de segmentos no está disponible,
+        vuelven a la búsqueda general sobre todo el documento.
+        Retorna None si la búsqueda por lotes falla (cada auditoría buscará por su cuenta).
+        """
+        try:
+            start = time.time()
+            if settings.AUDIT_SEGMENT_INDEX_ENABLED and segment_types and any(segment_types):
+                contexts = self._prefetch_segmented_contexts(queries, files_ids, k, segment_types)
+            else:
+                contexts = self.rag_tool.oci_vector_search_context_batch(queries, files_ids, k)
+            logger.info(f"[AUDIT] Contexto precargado para {len(queries)} consultas en {time.time() - start:.2f} segundos")
+            return contexts
+        except Exception as e:
+            logger.warning(f"[AUDIT] Falló la búsqueda por lotes, se usará búsqueda individual: {str(e)}")
+            return None
+
+    def _prefetch_segmented_contexts(self, queries: List[str], files_ids: List[int], k: int,
+                                     segment_types: List[List[str]]) -> List[Dict]:
+        """Búsqueda por lotes restringida al segmento de cada auditoría, con respaldo general."""
+        k_per_query = [min(k, settings.AUDIT_SEGMENT_K) if segments else k for segments in segment_types]
+        try:
+            contexts = self.rag_tool.oci_vector_search_context_batch(
+                queries, files_ids, k, segment_types=segment_types, k_per_query=k_per_query
+            )
+        except Exception as e:
+            logger.warning(f"[AUDIT] Índice de segmentos no disponible, se usará búsqueda general: {str(e)}")
+            return self.rag_tool.oci_vector_search_context_batch(queries, files_ids, k)
+
+        missing = [
+            index for index, (segments, context) in enumerate(zip(segment_types, contexts))
+            if segments and not context.get("documents")
+        ]
+        if missing:
+            fallback = self.rag_tool.oci_vector_search_context_batch([queries[index] for index in missing], files_ids, k)
+            for index, context in zip(missing, fallback):
+                contexts[index] = context
+
+        logger.info(f"[AUDIT] Búsqueda por segmento: {len(queries) - len(missing)} consultas filtradas, "
+                    f"{len(missing)} con búsqueda general")
+        return contexts
+
+    def _escalate_on_parse_error(self, response, prompt, inputs: Dict, parser, audit_name: str,
+                                 escalation: Optional[Dict] = None) -> Tuple[Any, Optional[str]]:
+        """
+        Si el parser no interpreta la respuesta y hay un modelo de escalamiento, repite la
+        llamada una vez con ese modelo.
+
+        Returns:
+            (respuesta a usar, model_id del escalamiento o None si no se escaló)
+        """
+        if not escalation:
+            return response, None
+        try:
+            parser.parse(response.content)
+            return response, None
+        except Exception as parse_error:
+            logger.warning(f"[AUDIT][ROUTING] Respuesta no interpretable en {audit_name} ({str(parse_error)[:120]}); "
+                           f"escalando a {escalation['model_id']} (perfil {escalation['profile']})")
+        return llm_invoker.invoke(prompt | escalation["llm"], inputs, operation="audit"), escalation["model_id"]
+
+    def _build_audit_context(self, context_result: Dict, max_context_chars: int, audit_name: str) -> Dict:
+        """
+        Contexto de una auditoría a partir de los fragmentos recuperados.
+
+        Con settings.AUDIT_ADAPTIVE_CONTEXT se eligen los fragmentos por relevancia y
+        presupuesto de tokens (pack_context); si no, se concatenan todos y se corta el texto
+        en max_context_chars.
+
+        Returns:
+            {context, k_used, k_candidates, context_tokens, stop_reason}
+        """
+        documents = (context_result or {}).get("documents") or []
+        if settings.AUDIT_ADAPTIVE_CONTEXT:
+            packed = pack_context(documents, max_context_chars)
+            logger.info(f"[AUDIT] Contexto adaptativo para {audit_name}: {packed['k_used']}/{packed['k_candidates']} fragmentos, "
+                        f"~{packed['context_tokens']} tokens (corte: {packed['stop_reason']})")
+            return packed
+
+        context = "\n\n".join(f"Documento {doc['index']}:\n{doc['content']}" for doc in documents)
+        if len(context) > max_context_chars:
+            context = context[:max_context_chars] + "...[contexto truncado]"
+        return {
+            "context": context,
+            "k_used": len(documents),
+            "k_candidates": len(documents),
+            "context_tokens": estimate_tokens(context),
+            "stop_reason": None,
+        }
+
     def _run_special_audit(self, prompt_template: str, audit_name: str, 
                           files_ids: List[int], search_query: str = None, 
-                          k: int = 10, max_context_chars: int = 5000) -> Dict:
+                          k: int = 10, max_context_chars: int = 5000,
+                          prefetched_context: Optional[Dict] = None, llm=None,
+                          escalation: Optional[Dict] = None) -> Dict:
         """
         Ejecutar una auditoría especial que NO requiere extracción de glosas del vector store.
         Estas auditorías tienen las glosas predefinidas en el prompt.
+        escalation: modelo con el que se repite la llamada si la respuesta no se puede parsear.
         """
         try:
             logger.info(f"[AUDIT] Ejecutando auditoría especial: {audit_name}")
             
             # Obtener contexto usando búsqueda vectorial normal (para el contenido de los documentos)
-            if not search_query:
-                # Consultas predefinidas para auditorías especiales
-                search_queries = {
-                    "Formularios Legales": "formulario único reclamación prestadores servicios salud FURIPS transporte movilización víctimas",
-                    "RUT Validación": "registro único tributario RUT DIAN fecha expedición NIT",
-                    "Datos Paciente": "paciente identificación nombre documento número fecha nacimiento",
-                    "Consistencia Documento": "número documento identificación paciente CC TI CE pasaporte",
-                    "Pagador ADRES": "pagador NIT ADRES administradora recursos sistema seguridad social"
-                }
-                search_query = search_queries.get(audit_name, f"{audit_name.lower()} auditoría")
+            search_query = self._resolve_search_query(audit_name, True, search_query)
             
-            # Búsqueda vectorial para obtener el contexto de los documentos
-            context_result = self.rag_tool.oci_vector_search_context_only(
-                input=search_query,
-                files_ids=files_ids,
-                k=k
-            )
+            # Búsqueda vectorial para obtener el contexto de los documentos (si no viene precargado)
+            if prefetched_context is not None:
+                context_result = prefetched_context
+            else:
+                context_result = self.rag_tool.oci_vector_search_context_only(
+                    input=search_query,
+                    files_ids=files_ids,
+                    k=k
+                )
             
-            if not context_result or not context_result.get("documents"):
+            packed = self._build_audit_context(context_result, max_context_chars, audit_name)
+            context = packed["context"]
+            if not context:
                 logger.warning(f"[AUDIT] No se encontró contexto para {audit_name}")
                 context = "No se encontró información relevante en los documentos proporcionados."
-            else:
-                context = context_result.get("context", "")
-            
-            # Truncar contexto si excede el límite
-            if len(context) > max_context_chars:
-                context = context[:max_context_chars] + "...[contexto truncado]"
             
             logger.info(f"[AUDIT] Contexto recuperado para {audit_name}: {len(context)} caracteres de {context_result.get('total_documents', 0)} documentos")
             
@@ -778,8 +819,11 @@ Respuesta requerida:
             )
             
             # Create the chain (sin parser estructurado por defecto)
-            chain = prompt | self.llm
-            response = chain.invoke({"context": context})
+            chain = prompt | (llm or self.llm)
+            response = llm_invoker.invoke(chain, {"context": context}, operation="audit")
+            response, escalated_model = self._escalate_on_parse_error(
+                response, prompt, {"context": context}, self.audit_output_parser, audit_name, escalation
+            )
             
             # Intentar parsear como JSON usando el parser estructurado
             try:
@@ -821,6 +865,12 @@ Respuesta requerida:
             
             # Las auditorías especiales NO tienen glosas_detectadas del vector store
             processed_result["glosas_detectadas"] = []
+            processed_result["documents_retrieved"] = context_result.get("total_documents", 0) if context_result else 0
+            processed_result["k_used"] = packed["k_used"]
+            processed_result["context_tokens"] = packed["context_tokens"]
+            if escalated_model:
+                processed_result["model_used"] = escalated_model
+                processed_result["escalated"] = True
             
             logger.info(f"[AUDIT] Auditoría especial {audit_name} completada: {processed_result['response']}")
             return processed_result
@@ -831,6 +881,7 @@ Respuesta requerida:
                 "response": "No cumple",
                 "justification": f"Error en auditoría especial {audit_name}: {str(e)}",
                 "glosas_detectadas": [],
+                "error": True,
                 "special_result": {
                     "identificacion_reclamacion": "error_procesamiento",
                     "estado_glosa": 1,
@@ -843,46 +894,44 @@ Respuesta requerida:
 
     def _run_specialized_audit(self, prompt_template: str, audit_name: str, 
                              files_ids: List[int], search_query: str = None, k: int = 10, 
-                             max_context_chars: int = 5000) -> Dict:
-        """Ejecutar una auditoría especializada usando un prompt específico"""
+                             max_context_chars: int = 5000,
+                             prefetched_context: Optional[Dict] = None, llm=None,
+                             numeric_findings: Optional[Dict] = None,
+                             escalation: Optional[Dict] = None) -> Dict:
+        """
+        Ejecutar una auditoría especializada usando un prompt específico.
+        Con numeric_findings (FACTURA / MAOS) los hallazgos numéricos precalculados se
+        anteponen al contexto y su dictamen 'No cumple' prevalece sobre el del LLM.
+        escalation: modelo con el que se repite la llamada si la respuesta no se puede parsear.
+        """
         try:
             logger.info(f"[AUDIT] Ejecutando auditoría especializada: {audit_name}")
             
             # Si no se proporciona search_query, usar consultas predefinidas
-            if not search_query:
-                search_queries = {
-                    "Factura": "factura médica número fecha emisión CUFE valor total detalle cargos",
-                    "Historia Clínica": "historia clínica triage motivo consulta diagnóstico notas médicas órdenes epicrisis",
-                    "Medicamentos": "órdenes médicas medicamentos administración enfermería firma médico CUM",
-                    "Exámenes": "exámenes laboratorio imágenes diagnósticas CUPS informe especialista",
-                    "Procedimientos": "procedimientos quirúrgicos nota operatoria cirujano anestesiólogo",
-                    "MAOS": "materiales osteosíntesis factura proveedor CUFE proveedor incremento 12%",
-                    "Certificados": "certificado autoridad policía SOAT ECAT documentación legal"
-                }
-                search_query = search_queries.get(audit_name, f"auditoría {audit_name.lower()}")
-            
-            logger.info(f"[AUDIT] Búsqueda RAG para {audit_name}: '{search_query}' en archivos {files_ids}")
+            search_query = self._resolve_search_query(audit_name, False, search_query)
             
-            # Get specialized context for this audit using RAG tool
-            context_result = self.rag_tool.oci_vector_search_context_only(search_query, files_ids, k)
+            if prefetched_context is not None:
+                context_result = prefetched_context
+            else:
+                logger.info(f"[AUDIT] Búsqueda RAG para {audit_name}: '{search_query}' en archivos {files_ids}")
+                
+                # Get specialized context for this audit using RAG tool
+                context_result = self.rag_tool.oci_vector_search_context_only(search_query, files_ids, k)
             
-            if context_result["total_documents"] == 0:
+            if context_result["total_documents"] == 0 and not numeric_findings:
                 logger.warning(f"[AUDIT] No se encontró contexto relevante para auditoría {audit_name}")
                 return {
                     "response": "No cumple",
                     "justification": f"No se encontró información relevante para la auditoría de {audit_name}. Consulta: '{search_query}'"
                 }
             
-            # Build context string from documents
-            context_parts = []
-            for doc in context_result["documents"]:
-                context_parts.append(f"Documento {doc['index']}:\n{doc['content']}")
-            
-            context = "\n\n".join(context_parts)
-            
-            # Limit context to max_context_chars
-            if len(context) > max_context_chars:
-                context = context[:max_context_chars] + "...[contexto truncado]"
+            # Contexto por relevancia dentro del presupuesto (o corte simple en max_context_chars)
+            packed = self._build_audit_context(context_result, max_context_chars, audit_name)
+            context = packed["context"]
+
+            # Hallazgos numéricos fuera del límite de contexto: el LLM solo redacta la justificación
+            if numeric_findings:
+                context = f"{numeric_findings['summary']}\n\n{context}"
             
             logger.info(f"[AUDIT] Contexto recuperado para {audit_name}: {len(context)} caracteres de {context_result['total_documents']} documentos")
             
@@ -897,10 +946,13 @@ Respuesta requerida:
             )
             
             # Create the chain (sin parser para manejar errores mejor)
-            chain = prompt | self.llm
+            chain = prompt | (llm or self.llm)
             
             # Run the chain
-            response = chain.invoke({"context": context})
+            response = llm_invoker.invoke(chain, {"context": context}, operation="audit")
+            response, escalated_model = self._escalate_on_parse_error(
+                response, prompt, {"context": context}, self.audit_output_parser, audit_name, escalation
+            )
             
             # Intentar parsear la respuesta con manejo de errores mejorado
             try:
@@ -930,8 +982,19 @@ Respuesta requerida:
                     "justification": response_text[:1000] + "..." if len(response_text) > 1000 else response_text
                 }
             
+            numeric_response = (numeric_findings or {}).get("response")
+            if numeric_response and processed_result["response"] != numeric_response:
+                logger.info(f"[AUDIT] {audit_name}: dictamen numérico '{numeric_response}' prevalece sobre '{processed_result['response']}'")
+                processed_result["response"] = numeric_response
+
             # AGREGAR LAS GLOSAS EXTRAÍDAS AL RESULTADO
             processed_result["glosas_detectadas"] = relevant_glosas
+            processed_result["documents_retrieved"] = context_result["total_documents"]
+            processed_result["k_used"] = packed["k_used"]
+            processed_result["context_tokens"] = packed["context_tokens"]
+            if escalated_model:
+                processed_result["model_used"] = escalated_model
+                processed_result["escalated"] = True
             
             logger.info(f"[AUDIT] Auditoría {audit_name} completada: {processed_result['response']} con {len(relevant_glosas)} glosas oficiales")
             return processed_result
@@ -940,16 +1003,102 @@ Respuesta requerida:
             logger.error(f"[AUDIT] Error en auditoría {audit_name}: {str(e)}")
             return {
                 "response": "No cumple",
-                "justification": f"Error en auditoría de {audit_name}: {str(e)}"
+                "justification": f"Error en auditoría de {audit_name}: {str(e)}",
+                "error": True
             }
 
+    def _emit_event(self, on_event: Optional[Callable[[str, Dict], None]], event_type: str, data: Dict) -> None:
+        """Notificar un evento de progreso; un error del callback nunca interrumpe la auditoría."""
+        if on_event is None:
+            return
+        try:
+            on_event(event_type, data)
+        except Exception as e:
+            logger.warning(f"[AUDIT] Error notificando evento '{event_type}': {str(e)}")
+
+    def _execute_audit(self, audit_type: AuditType, prompt_template: str, audit_name: str,
+                       is_special: bool, files_ids: List[int], search_query: str = None,
+                       k: int = 10, max_context_chars: int = 5000,
+                       prefetched_context: Optional[Dict] = None, llm=None,
+                       precomputed_result: Optional[Dict] = None,
+                       numeric_findings: Optional[Dict] = None,
+                       route: Optional[Dict] = None) -> Tuple[IndividualAuditResult, int]:
+        """
+        Ejecutar una auditoría del plan y construir su IndividualAuditResult.
+        Cualquier error queda aislado en la propia auditoría y se reporta como 'No cumple'
+        con error=True (no es un veredicto: el resultado completo queda parcial).
+        Si se recibe precomputed_result (validación determinista) no se invoca el LLM.
+        numeric_findings son los hallazgos numéricos de las tablas de facturas de la auditoría.
+        route (ModelRouter.route) define el modelo de la auditoría y su escalamiento; tiene
+        precedencia sobre llm.
+
+        Returns:
+            Tupla (resultado de la auditoría, documentos recuperados en su búsqueda)
+        """
+        try:
+            escalation = None
+            if route is not None:
+                llm, escalation = route["llm"], route["escalation"]
+
+            if precomputed_result is not None:
+                result = precomputed_result
+            elif is_special:
+                result = self._run_special_audit(
+                    prompt_template, audit_name, files_ids, search_query, k, max_context_chars,
+                    prefetched_context, llm, escalation=escalation
+                )
+            else:
+                result = self._run_specialized_audit(
+                    prompt_template, audit_name, files_ids, search_query, k, max_context_chars,
+                    prefetched_context, llm, numeric_findings, escalation=escalation
+                )
+
+            model_used = None
+            if precomputed_result is None:
+                model_used = result.get("model_used") or (route["model_id"] if route else settings.CON_GEN_AI_CHAT_MODEL_ID)
+
+            individual_audit = IndividualAuditResult(
+                audit_type=audit_type,
+                response=AuditResponse(result["response"]),
+                justification=result["justification"],
+                glosas_detectadas=result.get("glosas_detectadas", []),
+                special_result=result.get("special_result") if is_special else None,
+                k_used=result.get("k_used"),
+                context_tokens=result.get("context_tokens"),
+                model_used=model_used,
+                escalated=result.get("escalated", False),
+                error=result.get("error", False)
+            )
+            return individual_audit, result.get("documents_retrieved", 0)
+
+        except Exception as e:
+            logger.error(f"[AUDIT] Error construyendo resultado de auditoría {audit_name}: {str(e)}")
+            return IndividualAuditResult(
+                audit_type=audit_type,
+                response=AuditResponse.NO_CUMPLE,
+                justification=f"Error en auditoría de {audit_name}: {str(e)}",
+                glosas_detectadas=[],
+                error=True
+            ), 0
+
     def run_full_medical_audit(self, files_ids: List[int] = None, k: int = 10,
                              max_context_chars: int = 5000, temperature: float = 0.1,
                              max_tokens: int = 2000, top_p: float = 0.75,
                              run_master_audit: bool = True, custom_queries: Dict[str, str] = None,
-                             response_format: str = "v1", identificacion_reclamacion: str = None) -> Union[FullAuditResponse, FullAuditResponseV2]:
+                             response_format: str = "v1", identificacion_reclamacion: str = None,
+                             max_concurrent_audits: Optional[int] = None,
+                             on_event: Optional[Callable[[str, Dict], None]] = None,
+                             audits: Optional[List[AuditType]] = None,
+                             markdown_content: Optional[str] = None,
+                             keyword_gating: Optional[bool] = None,
+                             use_rules: Optional[bool] = None,
+                             deadline_seconds: Optional[float] = None,
+                             max_llm_calls: Optional[int] = None,
+                             priorities: Optional[Dict[str, int]] = None,
+                             numeric_checks: Optional[bool] = None,
+                             record_history: bool = True) -> Union[FullAuditResponse, FullAuditResponseV2]:
         """
-        Ejecutar auditoría médica completa con 12 auditorías especializadas
+        Ejecutar auditoría médica completa con las auditorías del registro (12 por defecto)
         
         Args:
             files_ids: Lista de IDs de archivos para filtrar la búsqueda
@@ -960,6 +1109,25 @@ Respuesta requerida:
             top_p: Top-p sampling parameter
             run_master_audit: Ejecutar auditoría maestra consolidada
             response_format: Formato de respuesta 'v1' (original) o 'v2' (nuevo JSON)
+            max_concurrent_audits: Máximo de auditorías en vuelo simultáneamente
+                (default: settings.AUDIT_MAX_CONCURRENCY; 1 = ejecución secuencial)
+            on_event: Callback opcional on_event(tipo, datos) invocado a medida que termina cada
+                auditoría ("audit") y la auditoría maestra ("master_audit"). Puede llamarse desde
+                hilos de trabajo, por lo que debe ser thread-safe.
+            audits: Subconjunto de auditorías a ejecutar (AuditType o sus valores; default: todas)
+            markdown_content: Markdown extraído del documento, usado para el pre-escaneo léxico
+            keyword_gating: Omitir auditorías sin términos relevantes en markdown_content
+                (default: settings.AUDIT_KEYWORD_GATING; requiere markdown_content)
+            use_rules: Resolver las auditorías especiales con validaciones deterministas sobre
+                markdown_content y usar el LLM solo en casos ambiguos (default: settings.AUDIT_RULES_ENABLED)
+            deadline_seconds: Tiempo máximo de la auditoría (default: settings.AUDIT_DEADLINE_SECONDS; 0 = sin límite).
+                Las auditorías que no alcanzan a iniciar o terminar se omiten y el resultado es parcial
+            max_llm_calls: Máximo de llamadas al LLM (default: settings.AUDIT_MAX_LLM_CALLS; 0 = sin límite).
+                Las auditorías de menor prioridad quedan fuera; la auditoría maestra no consume llamadas
+            priorities: Prioridad por auditoría ({tipo: int}, menor = primero) sobre la del registro
+            numeric_checks: Calcular sobre las tablas de markdown_content la consistencia de totales
+                y la variación de precios MAOS y entregarlas a esas auditorías (default: settings.AUDIT_NUMERIC_CHECKS_ENABLED)
+            record_history: Registrar la ejecución en el historial de auditorías (requiere settings.AUDIT_HISTORY_ENABLED)
             
         Returns:
             FullAuditResponse (v1) o FullAuditResponseV2 (v2) con resultados de todas las auditorías
@@ -972,197 +1140,220 @@ Respuesta requerida:
             if files_ids is None:
                 files_ids = []
                 
-            # Update LLM parameters
-            self.llm.model_kwargs.update({
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "top_p": top_p,
-            })
+            # Plan de auditorías desde el registro declarativo, en orden determinista
+            definitions = select_audits(audits)
+            skipped_audits = []
+            if keyword_gating is None:
+                keyword_gating = settings.AUDIT_KEYWORD_GATING
+            if keyword_gating and markdown_content:
+                definitions, skipped = prescan_audits(definitions, markdown_content)
+                skipped_audits = [definition.audit_type for definition in skipped]
+
+            audit_plan = [
+                (definition.audit_type, getattr(self, definition.prompt_method)(), definition.name, definition.is_special)
+                for definition in definitions
+            ]
 
-            # Run 7 specialized audits
-            logger.info("[AUDIT] Ejecutando 7 auditorías especializadas...")
-            
-            individual_audits = []
-            
-            # 1. Factura audit
-            factura_query = custom_queries.get("factura") if custom_queries else None
-            factura_result = self._run_specialized_audit(
-                self._get_factura_prompt(), "Factura", files_ids, factura_query, k, max_context_chars
-            )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.FACTURA,
-                response=AuditResponse(factura_result["response"]),
-                justification=factura_result["justification"],
-                glosas_detectadas=factura_result.get("glosas_detectadas", [])
-            ))
-            
-            # 2. Historia clínica audit
-            historia_query = custom_queries.get("historia_clinica") if custom_queries else None
-            historia_result = self._run_specialized_audit(
-                self._get_historia_clinica_prompt(), "Historia Clínica", files_ids, historia_query, k, max_context_chars
-            )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.HISTORIA_CLINICA,
-                response=AuditResponse(historia_result["response"]),
-                justification=historia_result["justification"],
-                glosas_detectadas=historia_result.get("glosas_detectadas", [])
-            ))
-            
-            # 3. Medicamentos audit
-            medicamentos_query = custom_queries.get("medicamentos") if custom_queries else None
-            medicamentos_result = self._run_specialized_audit(
-                self._get_medicamentos_prompt(), "Medicamentos", files_ids, medicamentos_query, k, max_context_chars
-            )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.MEDICAMENTOS,
-                response=AuditResponse(medicamentos_result["response"]),
-                justification=medicamentos_result["justification"],
-                glosas_detectadas=medicamentos_result.get("glosas_detectadas", [])
-            ))
-            
-            # 4. Exámenes audit
-            examenes_query = custom_queries.get("examenes") if custom_queries else None
-            examenes_result = self._run_specialized_audit(
-                self._get_examenes_prompt(), "Exámenes", files_ids, examenes_query, k, max_context_chars
-            )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.EXAMENES,
-                response=AuditResponse(examenes_result["response"]),
-                justification=examenes_result["justification"],
-                glosas_detectadas=examenes_result.get("glosas_detectadas", [])
-            ))
-            
-            # 5. Procedimientos audit
-            procedimientos_query = custom_queries.get("procedimientos") if custom_queries else None
-            procedimientos_result = self._run_specialized_audit(
-                self._get_procedimientos_prompt(), "Procedimientos", files_ids, procedimientos_query, k, max_context_chars
-            )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.PROCEDIMIENTOS,
-                response=AuditResponse(procedimientos_result["response"]),
-                justification=procedimientos_result["justification"],
-                glosas_detectadas=procedimientos_result.get("glosas_detectadas", [])
-            ))
-            
-            # 6. MAOS audit
-            maos_query = custom_queries.get("maos") if custom_queries else None
-            maos_result = self._run_specialized_audit(
-                self._get_maos_prompt(), "MAOS", files_ids, maos_query, k, max_context_chars
-            )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.MAOS,
-                response=AuditResponse(maos_result["response"]),
-                justification=maos_result["justification"],
-                glosas_detectadas=maos_result.get("glosas_detectadas", [])
-            ))
-            
-            # 7. Certificados audit
-            certificados_query = custom_queries.get("certificados") if custom_queries else None
-            certificados_result = self._run_specialized_audit(
-                self._get_certificados_prompt(), "Certificados", files_ids, certificados_query, k, max_context_chars
-            )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.CERTIFICADOS,
-                response=AuditResponse(certificados_result["response"]),
-                justification=certificados_result["justification"],
-                glosas_detectadas=certificados_result.get("glosas_detectadas", [])
-            ))
-
-            # 8. Formularios Legales audit (especial - sin glosas del vector store)
-            formularios_query = custom_queries.get("formularios_legales") if custom_queries else None
-            formularios_result = self._run_special_audit(
-                self._get_formularios_legales_prompt(), "Formularios Legales", files_ids, formularios_query, k, max_context_chars
-            )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.FORMULARIOS_LEGALES,
-                response=AuditResponse(formularios_result["response"]),
-                justification=formularios_result["justification"],
-                glosas_detectadas=formularios_result.get("glosas_detectadas", []),
-                special_result=formularios_result.get("special_result")
-            ))
-            
-            # 9. RUT Validación audit (especial - sin glosas del vector store)
-            rut_query = custom_queries.get("rut_validacion") if custom_queries else None
-            rut_result = self._run_special_audit(
-                self._get_rut_validacion_prompt(), "RUT Validación", files_ids, rut_query, k, max_context_chars
-            )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.RUT_VALIDACION,
-                response=AuditResponse(rut_result["response"]),
-                justification=rut_result["justification"],
-                glosas_detectadas=rut_result.get("glosas_detectadas", []),
-                special_result=rut_result.get("special_result")
-            ))
-            
-            # 10. Datos Paciente audit (especial - sin glosas del vector store)
-            datos_query = custom_queries.get("datos_paciente") if custom_queries else None
-            datos_result = self._run_special_audit(
-                self._get_datos_paciente_prompt(), "Datos Paciente", files_ids, datos_query, k, max_context_chars
-            )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.DATOS_PACIENTE,
-                response=AuditResponse(datos_result["response"]),
-                justification=datos_result["justification"],
-                glosas_detectadas=datos_result.get("glosas_detectadas", []),
-                special_result=datos_result.get("special_result")
-            ))
-            
-            # 11. Consistencia Documento audit (especial - sin glosas del vector store)
-            consistencia_query = custom_queries.get("consistencia_documento") if custom_queries else None
-            consistencia_result = self._run_special_audit(
-                self._get_consistencia_documento_prompt(), "Consistencia Documento", files_ids, consistencia_query, k, max_context_chars
-            )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.CONSISTENCIA_DOCUMENTO,
-                response=AuditResponse(consistencia_result["response"]),
-                justification=consistencia_result["justification"],
-                glosas_detectadas=consistencia_result.get("glosas_detectadas", []),
-                special_result=consistencia_result.get("special_result")
-            ))
-            
-            # 12. Pagador ADRES audit (especial - sin glosas del vector store)
-            pagador_query = custom_queries.get("pagador_adres") if custom_queries else None
-            pagador_result = self._run_special_audit(
-                self._get_pagador_adres_prompt(), "Pagador ADRES", files_ids, pagador_query, k, max_context_chars
+            # Modelo de cada auditoría según su perfil, con parámetros de muestreo ligados a
+            # esta llamada (sin modificar el LLM compartido)
+            routes = [
+                self.model_router.route(audit_type.value, temperature, max_tokens, top_p)
+                for audit_type, _, _, _ in audit_plan
+            ]
+
+            if max_concurrent_audits is None:
+                max_concurrent_audits = settings.AUDIT_MAX_CONCURRENCY
+            max_workers = max(1, min(int(max_concurrent_audits), len(audit_plan)))
+
+            # Auditorías especiales resueltas por reglas deterministas (sin RAG ni LLM)
+            if use_rules is None:
+                use_rules = settings.AUDIT_RULES_ENABLED
+            rule_results = {}
+            if use_rules and markdown_content:
+                for index, (audit_type, _, _, is_special) in enumerate(audit_plan):
+                    if is_special:
+                        verdict = evaluate_special_audit(audit_type, markdown_content, identificacion_reclamacion)
+                        if verdict is not None:
+                            rule_results[index] = verdict
+                logger.info(f"[AUDIT] Auditorías especiales resueltas por reglas: {len(rule_results)}")
+
+            # Hallazgos numéricos de las tablas de facturas (FACTURA y MAOS)
+            if numeric_checks is None:
+                numeric_checks = settings.AUDIT_NUMERIC_CHECKS_ENABLED
+            numeric_findings = {}
+            if numeric_checks and markdown_content and any(
+                audit_type in (AuditType.FACTURA, AuditType.MAOS) for audit_type, _, _, _ in audit_plan
+            ):
+                numeric_findings = compute_numeric_findings(markdown_content, settings.AUDIT_MAOS_MAX_VARIANCE)
+
+            # Planificación por prioridad: las auditorías resueltas por reglas no consumen LLM;
+            # el resto se ordena por prioridad y se recorta al presupuesto de llamadas
+            if deadline_seconds is None:
+                deadline_seconds = settings.AUDIT_DEADLINE_SECONDS
+            if max_llm_calls is None:
+                max_llm_calls = settings.AUDIT_MAX_LLM_CALLS
+            deadline_at = start_time + deadline_seconds if deadline_seconds and deadline_seconds > 0 else None
+
+            priority_by_type = resolve_priorities(definitions, priorities)
+            llm_indices = sorted(
+                (index for index in range(len(audit_plan)) if index not in rule_results),
+                key=lambda index: (priority_by_type[audit_plan[index][0]], index)
             )
-            individual_audits.append(IndividualAuditResult(
-                audit_type=AuditType.PAGADOR_ADRES,
-                response=AuditResponse(pagador_result["response"]),
-                justification=pagador_result["justification"],
-                glosas_detectadas=pagador_result.get("glosas_detectadas", []),
-                special_result=pagador_result.get("special_result")
-            ))
+            budget_skipped = set()
+            if max_llm_calls and max_llm_calls > 0 and len(llm_indices) > max_llm_calls:
+                budget_skipped.update(llm_indices[max_llm_calls:])
+                llm_indices = llm_indices[:max_llm_calls]
+                logger.warning(f"[AUDIT] Presupuesto de {max_llm_calls} llamadas al LLM: se omiten {len(budget_skipped)} auditorías de menor prioridad")
+            run_order = sorted(rule_results) + llm_indices
+
+            # Consultas RAG de cada auditoría y recuperación de todo el contexto por adelantado
+            search_queries = [
+                self._resolve_search_query(
+                    audit_name, is_special,
+                    custom_queries.get(audit_type.value) if custom_queries else None
+                )
+                for audit_type, _, audit_name, is_special in audit_plan
+            ]
+            prefetched_contexts = {}
+            if llm_indices:
+                contexts = self._prefetch_audit_contexts(
+                    [search_queries[index] for index in llm_indices], files_ids, k,
+                    [definitions[index].segment_types for index in llm_indices]
+                )
+                if contexts:
+                    prefetched_contexts = dict(zip(llm_indices, contexts))
+
+            logger.info(f"[AUDIT] Ejecutando {len(run_order)} auditorías (concurrencia máxima: {max_workers}"
+                        f"{f', deadline: {deadline_seconds}s' if deadline_at else ''})...")
+
+            audit_durations: List[float] = []
+
+            def _estimated_audit_seconds() -> float:
+                observed = sum(audit_durations) / len(audit_durations) if audit_durations else 0.0
+                return max(settings.AUDIT_DEADLINE_MARGIN_SECONDS, observed)
+
+            # Al vencer el deadline se cancela la ejecución: las auditorías pendientes no
+            # empiezan y el resultado de las que siguen en curso se descarta sin notificarlo.
+            # completed y cancelled se actualizan bajo el mismo lock, de modo que cada
+            # auditoría termina notificada como "audit" o como "audit_skipped", nunca ambas
+            cancelled = threading.Event()
+            completed_lock = threading.Lock()
+            completed: Dict[int, Tuple[IndividualAuditResult, int]] = {}
+
+            def _run_planned_audit(index):
+                audit_type, prompt_template, audit_name, is_special = audit_plan[index]
+                if cancelled.is_set():
+                    return None
+                if deadline_at and index not in rule_results and time.time() + _estimated_audit_seconds() > deadline_at:
+                    return None  # No alcanza a terminar antes del deadline
+                audit_start = time.time()
+                outcome = self._execute_audit(
+                    audit_type, prompt_template, audit_name, is_special,
+                    files_ids, search_queries[index], k, max_context_chars,
+                    prefetched_contexts.get(index), None, rule_results.get(index),
+                    numeric_findings.get(audit_type), routes[index]
+                )
+                if index not in rule_results:
+                    audit_durations.append(time.time() - audit_start)
+                with completed_lock:
+                    if cancelled.is_set():
+                        logger.warning(f"[AUDIT] Auditoría {audit_name} terminó después del deadline, se descarta")
+                        return None
+                    completed[index] = outcome
+                    self._emit_event(on_event, "audit", {
+                        "index": index,
+                        "total": len(audit_plan),
+                        "audit_name": audit_name,
+                        "result": outcome[0].model_dump(mode="json"),
+                    })
+                return outcome
+
+            # Las auditorías son independientes entre sí: se lanzan en orden de prioridad y se
+            # recogen en el orden del plan para mantener una salida determinista. Con deadline
+            # no se espera a las que siguen en curso al vencer (su resultado se descarta)
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="audit")
+            try:
+                futures = {index: executor.submit(_run_planned_audit, index) for index in run_order}
+                timeout = max(0.0, deadline_at - time.time()) if deadline_at else None
+                wait(list(futures.values()), timeout=timeout)
+            finally:
+                with completed_lock:
+                    cancelled.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+
+            audit_outcomes = []
+            for index in range(len(audit_plan)):
+                outcome = completed.get(index)
+                if outcome is None:
+                    if index not in budget_skipped:
+                        logger.warning(f"[AUDIT] Auditoría {audit_plan[index][2]} omitida por deadline")
+                    budget_skipped.add(index)
+                    self._emit_event(on_event, "audit_skipped", {
+                        "index": index,
+                        "total": len(audit_plan),
+                        "audit_name": audit_plan[index][2],
+                    })
+                    continue
+                audit_outcomes.append(outcome)
 
+            individual_audits = [outcome[0] for outcome in audit_outcomes]
+            documents_retrieved = sum(outcome[1] for outcome in audit_outcomes)
+            budget_skipped_audits = [audit_plan[index][0] for index in sorted(budget_skipped)]
+
+            # La auditoría maestra es determinista (no llama al LLM): consolida siempre los
+            # resultados disponibles, fuera del presupuesto de llamadas y del deadline
             master_audit = None
             if run_master_audit:
                 logger.info("[AUDIT] Ejecutando auditoría maestra consolidada...")
                 master_audit = self._run_master_audit(individual_audits)
+                self._emit_event(on_event, "master_audit", {"result": master_audit.model_dump(mode="json")})
+            errored_audits = [audit.audit_type for audit in individual_audits if audit.error]
+            partial = bool(budget_skipped_audits or errored_audits)
 
             execution_time = time.time() - start_time
             
-            # Get documents retrieved count (estimate from last search)
-            documents_retrieved = sum([
-                len(self.rag_tool.oci_vector_search_context_only("auditoría médica", files_ids, k)["documents"])
-                for _ in range(12)  # Approximate count for all 12 audits (7 traditional + 5 special)
-            ])
-
             logger.info(f"[AUDIT] Auditoría médica completa finalizada en {execution_time:.2f} segundos")
-            logger.info(f"[AUDIT] Total auditorías ejecutadas: {len(individual_audits)} (7 tradicionales + 5 especiales)")
+            logger.info(f"[AUDIT] Total auditorías ejecutadas: {len(individual_audits)} (omitidas por pre-escaneo: {len(skipped_audits)}, "
+                        f"por deadline/presupuesto: {len(budget_skipped_audits)}, con error: {len(errored_audits)})")
 
             # Retornar formato según solicitud
             if response_format == "v2":
-                return self._generate_v2_response(
+                response = self._generate_v2_response(
                     individual_audits, master_audit, documents_retrieved, execution_time, identificacion_reclamacion
                 )
+                response.skipped_audits = skipped_audits
+                response.budget_skipped_audits = budget_skipped_audits
+                response.errored_audits = errored_audits
+                response.partial = partial
             else:
-                return FullAuditResponse(
+                response = FullAuditResponse(
                     success=True,
                     individual_audits=individual_audits,
                     master_audit=master_audit,
                     documents_retrieved=documents_retrieved,
                     model_used=settings.CON_GEN_AI_CHAT_MODEL_ID,
-                    execution_time_seconds=execution_time
+                    execution_time_seconds=execution_time,
+                    skipped_audits=skipped_audits,
+                    budget_skipped_audits=budget_skipped_audits,
+                    errored_audits=errored_audits,
+                    partial=partial
+                )
+
+            # Registrar la ejecución en el historial (en segundo plano); las auditorías con
+            # error técnico no son veredictos, por lo que esa ejecución no se registra
+            if errored_audits:
+                logger.warning(f"[AUDIT] Auditorías con error técnico, la ejecución no se registra en el historial: "
+                               f"{', '.join(audit.value for audit in errored_audits)}")
+            elif record_history:
+                audit_history.record_run(
+                    response, individual_audits,
+                    master_audit=master_audit,
+                    identificacion_reclamacion=identificacion_reclamacion,
+                    markdown_content=markdown_content,
+                    prompt_version=self.get_prompt_version(),
+                    response_format=response_format,
                 )
+            return response
 
         except Exception as e:
             execution_time = time.time() - start_time
@@ -1279,7 +1470,8 @@ Respuesta requerida:
     def answer_audit_question(self, query: str, files_ids: List[int] = None, 
                             k: int = 10, max_context_chars: int = 5000,
                             temperature: float = 0.1, max_tokens: int = 2000,
-                            top_p: float = 0.75, use_structured_output: bool = True) -> QuestionAuditResponse:
+                            top_p: float = 0.75, use_structured_output: bool = True,
+                            use_cache: bool = True) -> QuestionAuditResponse:
         """
         Responder una pregunta específica de auditoría usando RAG
         
@@ -1292,6 +1484,8 @@ Respuesta requerida:
             max_tokens: Máximo de tokens para respuesta
             top_p: Top-p sampling parameter
             use_structured_output: Usar salida estructurada JSON
+            use_cache: Reutilizar la respuesta de una pregunta igual (o parafraseada) sobre
+                los mismos archivos y parámetros
             
         Returns:
             QuestionAuditResponse con la respuesta a la pregunta
@@ -1303,13 +1497,22 @@ Respuesta requerida:
             
             if files_ids is None:
                 files_ids = []
+
+            # Preguntas repetidas sobre los mismos archivos se responden desde caché
+            cache_scope = audit_answer_cache.build_scope(
+                files_ids, k=k, max_context_chars=max_context_chars, temperature=temperature,
+                max_tokens=max_tokens, top_p=top_p, use_structured_output=use_structured_output
+            )
+            query_vector = None
+            if use_cache:
+                cached_answer, query_vector = audit_answer_cache.get(query, cache_scope, self._embed_question)
+                if cached_answer is not None:
+                    cached_answer.query = query
+                    cached_answer.execution_time_seconds = time.time() - start_time
+                    return cached_answer
                 
-            # Update LLM parameters
-            self.llm.model_kwargs.update({
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "top_p": top_p,
-            })
+            # Parámetros de muestreo ligados a esta llamada (sin modificar el LLM compartido)
+            llm = self._get_llm(temperature, max_tokens, top_p)
             
             # Get relevant context from vector search
             context_result = self.rag_tool.oci_vector_search_context_only(query, files_ids, k)
@@ -1405,10 +1608,10 @@ Responde ÚNICAMENTE usando el formato JSON esperado con "Cumple" o "No cumple"
                 )
                 
                 # Create the chain
-                chain = prompt_template | self.llm | self.audit_output_parser
+                chain = prompt_template | llm | self.audit_output_parser
                 
                 # Run the chain
-                structured_result = chain.invoke({"query": query, "context": context})
+                structured_result = llm_invoker.invoke(chain, {"query": query, "context": context}, operation="audit_question")
                 
                 # Convert list results to strings if necessary
                 def ensure_string(value):
@@ -1480,15 +1683,15 @@ Analiza la información proporcionada de manera general sin citar documentos esp
                 ])
                 
                 # Create the chain
-                chain = prompt | self.llm | StrOutputParser()
+                chain = prompt | llm | StrOutputParser()
                 
                 # Run the chain
-                response = chain.invoke({"query": query, "context": context})
+                response = llm_invoker.invoke(chain, {"query": query, "context": context}, operation="audit_question")
                 answer = response.strip()
 
             execution_time = time.time() - start_time
 
-            return QuestionAuditResponse(
+            question_response = QuestionAuditResponse(
                 success=True,
                 answer=answer,
                 context_used=context,
@@ -1499,6 +1702,9 @@ Analiza la información proporcionada de manera general sin citar documentos esp
                 response_length=len(str(answer)),
                 execution_time_seconds=execution_time
             )
+            if use_cache:
+                audit_answer_cache.set(query, cache_scope, files_ids, question_response, query_vector)
+            return question_response
 
         except Exception as e:
             execution_time = time.time() - start_time
@@ -1516,28 +1722,51 @@ Analiza la información proporcionada de manera general sin citar documentos esp
                 error=str(e)
             )
 
+    def _embed_question(self, text: str) -> List[float]:
+        """Embedding de una pregunta para la coincidencia semántica de la caché de respuestas."""
+        return self.rag_tool.rag_docs_db.get_embeddings().embed_query(text)
+
     def run_full_medical_audit_v2(self, files_ids: List[int] = None, k: int = 30,
                                 max_context_chars: int = 8000, temperature: float = 0.1,
                                 max_tokens: int = 4000, top_p: float = 0.75, 
-                                identificacion_reclamacion: str = None) -> FullAuditResponseV2:
+                                identificacion_reclamacion: str = None,
+                                mode: str = "single", markdown_content: Optional[str] = None,
+                                segment_tokens: Optional[int] = None,
+                                max_parallel_segments: Optional[int] = None,
+                                token_budget: Optional[int] = None) -> FullAuditResponseV2:
         """
         Ejecutar auditoría médica completa con respuesta directa en formato v2
         Este método optimiza la auditoría para generar directamente el formato JSON v2
+
+        Args:
+            mode: 'single' (top-k por similitud truncado a max_context_chars, una llamada)
+                o 'map_reduce' (documento completo dividido en segmentos auditados en paralelo)
+            markdown_content: Documento completo para el modo map_reduce (default: texto
+                extraído de files_ids en RAG_FILES)
+            segment_tokens: Tokens por segmento (default: settings.AUDIT_V2_SEGMENT_TOKENS)
+            max_parallel_segments: Segmentos en vuelo simultáneamente (default: settings.AUDIT_V2_MAP_CONCURRENCY)
+            token_budget: Tope de tokens (entrada + salida) de todas las llamadas map
+                (default: settings.AUDIT_V2_TOKEN_BUDGET)
         """
         start_time = time.time()
         
         try:
-            logger.info("[AUDIT] Iniciando auditoría médica completa v2 con formato JSON directo")
+            logger.info(f"[AUDIT] Iniciando auditoría médica completa v2 con formato JSON directo (modo: {mode})")
             
             if files_ids is None:
                 files_ids = []
                 
-            # Update LLM parameters for comprehensive analysis
-            self.llm.model_kwargs.update({
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "top_p": top_p,
-            })
+            # Modelo de la ruta v2 con parámetros de muestreo ligados a esta llamada
+            route = self.model_router.route(ROUTE_V2, temperature, max_tokens, top_p)
+            llm = route["llm"]
+
+            if mode == "map_reduce":
+                return self._run_v2_map_reduce(
+                    llm, files_ids, markdown_content, route["max_tokens"], identificacion_reclamacion,
+                    segment_tokens, max_parallel_segments, token_budget, start_time, route
+                )
+            if mode != "single":
+                raise ValueError(f"Modo de auditoría v2 no soportado: {mode}")
 
             # Realizar búsqueda comprehensiva para obtener todo el contexto relevante
             comprehensive_query = "factura médica historia clínica órdenes medicamentos exámenes procedimientos MAOS certificados formularios RUT ADRES pagador FURIPS SOAT"
@@ -1580,12 +1809,14 @@ Analiza la información proporcionada de manera general sin citar documentos esp
                 }
             )
             
-            # Create chain with v2 parser
-            chain = prompt_template | self.llm | self.audit_v2_output_parser
-            
-            # Execute comprehensive audit
-            logger.info("[AUDIT] Ejecutando auditoría comprehensiva con formato v2")
-            result = chain.invoke({"context": context})
+            # Execute comprehensive audit (si la respuesta no se puede parsear se escala de modelo)
+            logger.info(f"[AUDIT] Ejecutando auditoría comprehensiva con formato v2 (modelo: {route['model_id']})")
+            response = llm_invoker.invoke(prompt_template | llm, {"context": context}, operation="audit_v2")
+            response, escalated_model = self._escalate_on_parse_error(
+                response, prompt_template, {"context": context}, self.audit_v2_output_parser,
+                "v2", route["escalation"]
+            )
+            result = self.audit_v2_output_parser.parse(response.content)
             
             # Process and validate result
             audit_result = self._process_v2_result(result, identificacion_reclamacion)
@@ -1598,7 +1829,7 @@ Analiza la información proporcionada de manera general sin citar documentos esp
                 success=True,
                 audit_result=audit_result,
                 documents_retrieved=context_result["total_documents"],
-                model_used=settings.CON_GEN_AI_CHAT_MODEL_ID,
+                model_used=escalated_model or route["model_id"],
                 execution_time_seconds=execution_time
             )
             
@@ -1698,6 +1929,147 @@ EJEMPLO DE FORMATO ESPERADO:
 
 IMPORTANTE: Responde ÚNICAMENTE con el JSON en el formato especificado, sin texto adicional."""
 
+    def _get_segment_v2_prompt(self) -> str:
+        """Prompt map del modo map-reduce: audita un segmento del documento completo"""
+        return """Eres un auditor médico especializado en cuentas médicas de accidentes de tránsito (AT/ECAT) en Colombia.
+
+TAREA: Analiza UN SEGMENTO de una reclamación médica ({segment_info}) y extrae en formato JSON los ítems facturados y las glosas con evidencia en este segmento.
+
+SEGMENTO A ANALIZAR:
+{context}
+
+INSTRUCCIONES:
+1. **ÍTEMS FACTURADOS**: Extrae TODOS los servicios, medicamentos, exámenes, procedimientos y MAOS que aparezcan facturados en este segmento, con su nombre y valor exacto en números enteros. Asigna códigos ITM-001, ITM-002, etc.
+2. **GLOSAS PARCIALES**: Solo para ítems de este segmento con evidencia explícita:
+   - Medicamentos sin orden médica (código 326)
+   - Exámenes sin informe (código 332)
+   - Procedimientos sin nota operatoria (código 101)
+   - Facturación sin soporte (código 816)
+   - MAOS sin justificación (código 299)
+3. **GLOSAS TOTALES**: Repórtalas SOLO si el segmento contiene evidencia positiva (por ejemplo un pagador distinto a ADRES o un RUT vencido). NO reportes glosas por ausencia de documentos: otros segmentos de la reclamación pueden contenerlos.
+
+REGLAS IMPORTANTES:
+- identificacion_reclamacion: Usar nombre del archivo principal
+- glosa_total: true solo si reportas glosas totales con evidencia en este segmento
+- Códigos de glosas totales: String; códigos de glosas parciales: números enteros
+- Valores: números enteros sin decimales
+- Referencias: formato "archivo.pdf/pagina" usando las páginas del segmento
+- Items sin glosas: NO incluir campo "clasificacion_glosas"
+- Si el segmento no contiene ítems facturados, retorna "items_reclamados": []
+
+{format_instructions}
+
+IMPORTANTE: Responde ÚNICAMENTE con el JSON en el formato especificado, sin texto adicional."""
+
+    def _load_full_document(self, files_ids: List[int]) -> str:
+        """Texto completo extraído (RAG_FILES) de los archivos indicados, en orden."""
+        from database.rag_files import RAGFilesDB
+
+        rag_files_db = RAGFilesDB()
+        documents = []
+        for file_id in files_ids:
+            extraction = rag_files_db.get_file_extraction(file_id)
+            if extraction and extraction["file_trg_extraction"]:
+                documents.append(extraction["file_trg_extraction"])
+        return "\n\n".join(documents)
+
+    def _run_v2_map_reduce(self, llm, files_ids: List[int], markdown_content: Optional[str],
+                           max_tokens: int, identificacion_reclamacion: Optional[str],
+                           segment_tokens: Optional[int], max_parallel_segments: Optional[int],
+                           token_budget: Optional[int], start_time: float,
+                           route: Optional[Dict] = None) -> FullAuditResponseV2:
+        """
+        Auditoría v2 map-reduce: cada segmento del documento completo se audita en paralelo
+        y los resultados parciales se fusionan y deduplican en un único AuditResponseV2.
+        Los segmentos que exceden el presupuesto de tokens no se envían al modelo.
+        Con route, los segmentos cuya respuesta no se puede parsear se repiten con el modelo
+        de escalamiento.
+        """
+        model_used = route["model_id"] if route else settings.CON_GEN_AI_CHAT_MODEL_ID
+        escalation = route["escalation"] if route else None
+        segment_tokens = segment_tokens or settings.AUDIT_V2_SEGMENT_TOKENS
+        max_parallel_segments = max_parallel_segments or settings.AUDIT_V2_MAP_CONCURRENCY
+        token_budget = token_budget or settings.AUDIT_V2_TOKEN_BUDGET
+
+        document = markdown_content or self._load_full_document(files_ids)
+        segments = split_into_segments(document, segment_tokens)
+        if not segments:
+            return FullAuditResponseV2(
+                success=False,
+                audit_result=None,
+                documents_retrieved=0,
+                model_used=model_used,
+                execution_time_seconds=time.time() - start_time,
+                error="No se encontraron documentos para analizar"
+            )
+
+        prompt_template = PromptTemplate(
+            template=self._get_segment_v2_prompt(),
+            input_variables=["context", "segment_info"],
+            partial_variables={
+                "format_instructions": self.audit_v2_output_parser.get_format_instructions()
+            }
+        )
+        prompt_tokens = estimate_tokens(prompt_template.format(context="", segment_info=""))
+
+        # Presupuesto: cada llamada consume el prompt, el segmento y hasta max_tokens de salida
+        planned, tokens_planned = [], 0
+        for segment in segments:
+            call_tokens = prompt_tokens + segment["tokens"] + max_tokens
+            if tokens_planned + call_tokens > token_budget:
+                break
+            planned.append(segment)
+            tokens_planned += call_tokens
+        if len(planned) < len(segments):
+            logger.warning(f"[AUDIT][V2][MAP] Presupuesto de {token_budget} tokens agotado: se auditan {len(planned)} de {len(segments)} segmentos")
+
+        logger.info(f"[AUDIT][V2][MAP] {len(planned)} segmentos (~{tokens_planned} tokens, concurrencia máxima: {max_parallel_segments})")
+
+        chain = prompt_template | llm
+
+        def _audit_segment(segment):
+            if segment["page_start"] is not None:
+                segment_info = f"segmento {segment['index'] + 1} de {len(segments)}, páginas {segment['page_start']}-{segment['page_end']}"
+            else:
+                segment_info = f"segmento {segment['index'] + 1} de {len(segments)}"
+            inputs = {"context": segment["text"], "segment_info": segment_info}
+            try:
+                response, _ = self._escalate_on_parse_error(
+                    llm_invoker.invoke(chain, inputs, operation="audit_v2_map"), prompt_template, inputs, self.audit_v2_output_parser,
+                    f"v2 segmento {segment['index'] + 1}", escalation
+                )
+                return self.audit_v2_output_parser.parse(response.content)
+            except Exception as e:
+                logger.error(f"[AUDIT][V2][MAP] Error en segmento {segment['index'] + 1}: {str(e)}")
+                return None
+
+        workers = max(1, min(int(max_parallel_segments), len(planned) or 1))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audit-v2-map") as executor:
+            partial_results = list(executor.map(_audit_segment, planned))
+
+        successful = [result for result in partial_results if isinstance(result, dict)]
+        successful_indexes = [
+            segment["index"] for segment, result in zip(planned, partial_results) if isinstance(result, dict)
+        ]
+        if planned and not successful:
+            raise ValueError("Ningún segmento pudo ser auditado")
+
+        merged = merge_v2_results(successful, successful_indexes)
+        audit_result = self._process_v2_result(merged, identificacion_reclamacion)
+
+        execution_time = time.time() - start_time
+        logger.info(f"[AUDIT][V2][REDUCE] {len(audit_result.items_reclamados)} ítems fusionados de {len(successful)} segmentos en {execution_time:.2f} segundos")
+
+        return FullAuditResponseV2(
+            success=True,
+            audit_result=audit_result,
+            documents_retrieved=len(successful),
+            model_used=model_used,
+            execution_time_seconds=execution_time,
+            segments_total=len(segments),
+            segments_processed=len(successful)
+        )
+
     def _process_v2_result(self, result: Dict, identificacion_reclamacion: str = None) -> AuditResponseV2:
         """Procesar y validar el resultado v2"""
         try:
@@ -1830,7 +2202,7 @@ IMPORTANTE: Responde ÚNICAMENTE con el JSON en el formato especificado, sin tex
                     for glosa in audit.glosas_detectadas:
                         # Crear item con glosa parcial
                         item = ItemReclamado(
-                            codigo=f"{audit.audit_type.value.upper()}_001",
+                            codigo=catalog_item_code(audit.audit_type.value),
                             nombre=f"Servicio de {audit.audit_type.value}",
                             glosa_parcial=True,
                             valor=0.0,  # Valor por defecto, debería extraerse de la factura
@@ -1888,3 +2260,19 @@ IMPORTANTE: Responde ÚNICAMENTE con el JSON en el formato especificado, sin tex
                 execution_time_seconds=execution_time,
                 error=str(e)
             )
+
+
+# Instancia única de la aplicación: clientes (LLM, RAG, parsers) se crean una sola vez
+# y se comparten entre solicitudes concurrentes
+_audit_service: Optional[MedicalAuditService] = None
+_audit_service_lock = threading.Lock()
+
+
+def get_audit_service() -> MedicalAuditService:
+    """Obtener (creando en el primer uso) el servicio de auditoría compartido."""
+    global _audit_service
+    if _audit_service is None:
+        with _audit_service_lock:
+            if _audit_service is None:
+                _audit_service = MedicalAuditService()
+    return _audit_service
@@ -0,0 +1,157 @@
+"""
+Caché de resultados de auditoría direccionada por contenido.
+
+Las reclamaciones reenviadas (timeouts, refrescos de la UI) producen el mismo markdown;
+la clave combina el hash del markdown con la versión de los prompts, el modelo y los
+parámetros de muestreo, de modo que un reenvío idéntico devuelve el resultado guardado
+sin repetir vectorización ni las llamadas al LLM. Adicionalmente se guarda el markdown
+por hash del archivo fuente (ZIP) para poder omitir también el OCR.
+"""
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def sha256_text(text: str) -> str:
+    """Hash SHA-256 (hex) de un texto."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Hash SHA-256 (hex) del contenido de un archivo, leído por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TTLCache:
+    """Caché LRU en memoria con expiración por antigüedad y tamaño máximo (thread-safe)."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, value = item
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class AuditResultCache:
+    """Caché de FullAuditResponseV2 por hash de markdown + versión de prompts + modelo + muestreo."""
+
+    def __init__(self):
+        self.enabled = settings.AUDIT_CACHE_ENABLED
+        self._results = TTLCache(settings.AUDIT_CACHE_MAX_ENTRIES, settings.AUDIT_CACHE_TTL_SECONDS)
+        self._markdown_by_source = TTLCache(settings.AUDIT_CACHE_MAX_ENTRIES, settings.AUDIT_CACHE_TTL_SECONDS)
+
+    @staticmethod
+    def build_key(markdown_content: str, prompt_version: str, model_id: str,
+                  temperature: float, max_tokens: int, top_p: float, **params: Any) -> str:
+        """
+        Construye la clave de caché. `params` incluye cualquier otro parámetro que
+        afecte el resultado (k, max_context_chars, identificacion_reclamacion...).
+        """
+        key_material = {
+            "markdown": sha256_text(markdown_content),
+            "prompt_version": prompt_version,
+            "model_id": model_id,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": top_p,
+            "params": params,
+        }
+        return sha256_text(json.dumps(key_material, sort_keys=True, default=str))
+
+    def get_result(self, key: str) -> Optional[Any]:
+        """Retorna una copia del resultado guardado o None."""
+        if not self.enabled:
+            return None
+        result = self._results.get(key)
+        if result is None:
+            return None
+        logger.info(f"[AUDIT][CACHE] Resultado recuperado de caché [key={key[:12]}] [HIT]")
+        return result.model_copy(deep=True)
+
+    def set_result(self, key: str, result: Any) -> None:
+        """Guarda un resultado exitoso y completo (los fallidos, parciales o con auditorías en error no se guardan)."""
+        if (not self.enabled or not getattr(result, "success", False) or getattr(result, "partial", False)
+                or getattr(result, "errored_audits", None)):
+            return
+        self._results.set(key, result.model_copy(deep=True))
+        logger.info(f"[AUDIT][CACHE] Resultado guardado [key={key[:12]}] [entries={len(self._results)}]")
+
+    def get_markdown(self, source_digest: str) -> Optional[str]:
+        """Markdown ya extraído por OCR para un archivo fuente (hash del ZIP)."""
+        if not self.enabled or not source_digest:
+            return None
+        markdown_content = self._markdown_by_source.get(source_digest)
+        if markdown_content is not None:
+            logger.info(f"[AUDIT][CACHE] Markdown recuperado de caché para fuente [{source_digest[:12]}] [HIT]")
+        return markdown_content
+
+    def set_markdown(self, source_digest: str, markdown_content: str) -> None:
+        if not self.enabled or not source_digest or not markdown_content:
+            return
+        self._markdown_by_source.set(source_digest, markdown_content)
+
+    def clear(self) -> None:
+        self._results.clear()
+        self._markdown_by_source.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._results),
+            "sources": len(self._markdown_by_source),
+            "hits": self._results.hits,
+            "misses": self._results.misses,
+            "max_entries": self._results.max_entries,
+            "ttl_seconds": self._results.ttl_seconds,
+        }
+
+
+audit_result_cache = AuditResultCache()
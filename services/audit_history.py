@@ -0,0 +1,193 @@
+"""
+Historial persistente de auditorías.
+
+Cada auditoría completa (/agent/glosa, /agent/process y la cola de lotes) se registra en
+Oracle: metadatos de la ejecución, dictamen de cada auditoría individual y las glosas
+aplicadas con el valor del ítem. Los reportes ("¿cuántas veces se aplicó la glosa 2102
+por IPS este mes?") consultan estas tablas en lugar de repetir auditorías.
+
+Glosas registradas (solo las aplicadas, nunca el catálogo de glosas de cada tipo):
+- Auditorías especiales con estado_glosa = 1: su código de clasificación, glosa total.
+- Ítems de la respuesta v2 con clasificacion_glosas: cada código, glosa parcial con el
+  ítem. Los ítems que _generate_v2_response arma a partir del catálogo de una auditoría
+  tradicional (catalog_item_code) no son glosas aplicadas y no se registran.
+
+La escritura se hace en un hilo propio para no agregar latencia a la auditoría; un error
+al registrar se informa en el log y no afecta la respuesta.
+"""
+import re
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from database.audit_history import AuditHistoryDB
+from schemas.audit import AuditType
+from services.audit_cache import sha256_text
+
+logger = logging.getLogger(__name__)
+
+GLOSA_SCOPE_TOTAL = "total"
+GLOSA_SCOPE_PARCIAL = "parcial"
+
+_NIT_NUMBER = r"(\d{1,3}(?:[\.\s]?\d{3}){2})\s*-?\s*\d?"
+_PAYER_NIT_RE = re.compile(r"\b(?:cliente|pagador|adquiriente|entidad responsable del pago)\b\s*:?\s*(?:nit\s*:?\s*)?" + _NIT_NUMBER, re.IGNORECASE)
+_NIT_RE = re.compile(r"\bnit\b(?:\s*o\s*c\.?\s*c\.?)?\s*[:.]?\s*" + _NIT_NUMBER, re.IGNORECASE)
+
+
+def _digits(value: str) -> str:
+    return re.sub(r"\D", "", value)
+
+
+def extract_claim_parties(markdown_content: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    NIT del pagador (campo Cliente/Pagador de la factura) y del prestador (primer NIT
+    distinto del pagador), sin dígito de verificación.
+    """
+    text = markdown_content or ""
+    payer_match = _PAYER_NIT_RE.search(text)
+    payer_nit = _digits(payer_match.group(1)) if payer_match else None
+    ips_nit = None
+    for match in _NIT_RE.finditer(text):
+        candidate = _digits(match.group(1))
+        if candidate != payer_nit:
+            ips_nit = candidate
+            break
+    return {"ips_nit": ips_nit, "payer_nit": payer_nit}
+
+
+def catalog_item_code(audit_type: str) -> str:
+    """Código del ítem que la respuesta v2 arma con el catálogo de glosas de una auditoría."""
+    return f"{audit_type.upper()}_001"
+
+
+_CATALOG_ITEM_CODES = {catalog_item_code(audit_type.value) for audit_type in AuditType}
+
+
+def _applied_item_glosas(response: Any) -> List[Tuple[Any, Any]]:
+    """(ítem, glosa) aplicados en la respuesta v2, sin los ítems armados con el catálogo."""
+    applied = []
+    audit_result = getattr(response, "audit_result", None)
+    for item in getattr(audit_result, "items_reclamados", None) or []:
+        if str(item.codigo) in _CATALOG_ITEM_CODES or not item.glosa_parcial:
+            continue
+        for glosa in item.clasificacion_glosas or []:
+            applied.append((item, glosa))
+    return applied
+
+
+def build_history_records(response: Any, individual_audits: List[Any], master_audit: Any = None,
+                          identificacion_reclamacion: Optional[str] = None,
+                          markdown_content: Optional[str] = None, prompt_version: Optional[str] = None,
+                          response_format: str = "v2") -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Filas de AUDIT_RUNS, AUDIT_RUN_VERDICTS y AUDIT_RUN_GLOSAS de una auditoría completa.
+
+    Returns:
+        (ejecución, dictámenes, glosas)
+    """
+    audit_result = getattr(response, "audit_result", None)
+    glosa_total = getattr(audit_result, "glosa_total", None)
+    parties = extract_claim_parties(markdown_content)
+
+    run = {
+        "identificacion_reclamacion": identificacion_reclamacion or getattr(audit_result, "identificacion_reclamacion", None),
+        "ips_nit"                   : parties["ips_nit"],
+        "payer_nit"                 : parties["payer_nit"],
+        "response_format"           : response_format,
+        "success"                   : int(bool(response.success)),
+        "partial"                   : int(bool(getattr(response, "partial", False))),
+        "glosa_total"               : int(glosa_total) if glosa_total is not None else None,
+        "master_decision"           : master_audit.decision.value if master_audit is not None else None,
+        "model_id"                  : response.model_used,
+        "prompt_version"            : prompt_version,
+        "markdown_sha256"           : sha256_text(markdown_content) if markdown_content else None,
+        "documents_retrieved"       : response.documents_retrieved,
+        "execution_time_seconds"    : round(float(response.execution_time_seconds), 3),
+        "result_json"               : json.dumps(response.model_dump(mode="json"), ensure_ascii=False),
+    }
+
+    verdicts: List[Dict[str, Any]] = []
+    glosas: List[Dict[str, Any]] = []
+    for audit in individual_audits or []:
+        special = audit.special_result
+        verdicts.append({
+            "audit_type"   : audit.audit_type.value,
+            "response"     : audit.response.value,
+            "estado_glosa" : special.estado_glosa if special is not None else None,
+            "clasificacion": special.clasificacion if special is not None else None,
+            "model_used"   : audit.model_used,
+            "escalated"    : int(audit.escalated),
+            "justification": audit.justification,
+        })
+
+        if special is not None and special.estado_glosa == 1:
+            glosas.append({
+                "glosa_code" : str(special.clasificacion or "999"),
+                "glosa_scope": GLOSA_SCOPE_TOTAL,
+                "audit_type" : audit.audit_type.value,
+                "description": (special.description or "")[:4000],
+                "item_code"  : None,
+                "item_name"  : None,
+                "item_value" : None,
+            })
+
+    for item, glosa in _applied_item_glosas(response):
+        glosas.append({
+            "glosa_code" : str(glosa.codigo),
+            "glosa_scope": GLOSA_SCOPE_PARCIAL,
+            "audit_type" : None,
+            "description": (glosa.descripcion or "")[:4000],
+            "item_code"  : item.codigo,
+            "item_name"  : item.nombre[:400],
+            "item_value" : float(item.valor),
+        })
+
+    return run, verdicts, glosas
+
+
+class AuditHistoryService:
+    """Registro asíncrono y consultas del historial de auditorías."""
+
+    def __init__(self):
+        self.enabled = settings.AUDIT_HISTORY_ENABLED
+        self.db = AuditHistoryDB()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audit-history")
+
+    def record_run(self, response: Any, individual_audits: List[Any], **kwargs: Any) -> None:
+        """
+        Programa el registro de una auditoría completa (ver build_history_records).
+        Retorna de inmediato; los errores solo se registran en el log.
+        """
+        if not self.enabled or response is None:
+            return
+        try:
+            run, verdicts, glosas = build_history_records(response, individual_audits, **kwargs)
+        except Exception as e:
+            logger.error(f"[AUDIT][HISTORY] Error preparando el registro de la auditoría: {str(e)}")
+            return
+        self._executor.submit(self._persist, run, verdicts, glosas)
+
+    def _persist(self, run: Dict[str, Any], verdicts: List[Dict[str, Any]], glosas: List[Dict[str, Any]]) -> None:
+        try:
+            self.db.insert_run(run, verdicts, glosas)
+        except Exception as e:
+            logger.error(f"[AUDIT][HISTORY] No se pudo registrar la auditoría de {run.get('identificacion_reclamacion')}: {str(e)}")
+
+    def list_runs(self, **filters: Any) -> Dict[str, Any]:
+        runs, next_cursor = self.db.list_runs(**filters)
+        return {"items": runs, "next_cursor": next_cursor}
+
+    def get_run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        return self.db.get_run(run_id)
+
+    def list_glosas(self, **filters: Any) -> Dict[str, Any]:
+        glosas, next_cursor = self.db.list_glosas(**filters)
+        return {"items": glosas, "next_cursor": next_cursor}
+
+    def summarize_glosas(self, **filters: Any) -> List[Dict[str, Any]]:
+        return self.db.summarize_glosas(**filters)
+
+
+audit_history = AuditHistoryService()
@@ -0,0 +1,356 @@
+"""
+Cola persistente de auditorías por lotes (SQLite) con un pool acotado de trabajadores.
+
+Cada ZIP de un lote se guarda en disco y se registra como trabajo en SQLite; los
+trabajadores ejecutan el mismo flujo de /agent/glosa (OCR → vectorización → auditoría)
+y guardan el resultado v2. Los trabajos que quedaron 'running' por un reinicio vuelven
+a la cola al arrancar.
+"""
+import json
+import uuid
+import shutil
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from core.config import settings
+from schemas.audit import AuditType
+from utils.utils import Utils
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# Cargas de /agent/batch: se copian a disco por bloques antes de registrar el lote
+_UPLOADS_DIR = "uploads"
+_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_batches (
+    batch_id    TEXT PRIMARY KEY,
+    total_jobs  INTEGER NOT NULL,
+    created_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS audit_jobs (
+    job_id        TEXT PRIMARY KEY,
+    batch_id      TEXT NOT NULL,
+    filename      TEXT NOT NULL,
+    zip_path      TEXT NOT NULL,
+    identificacion TEXT,
+    audits        TEXT,
+    bypass_cache  INTEGER NOT NULL DEFAULT 0,
+    status        TEXT NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    error         TEXT,
+    result_json   TEXT,
+    created_at    TEXT NOT NULL,
+    started_at    TEXT,
+    finished_at   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_audit_jobs_status ON audit_jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_audit_jobs_batch ON audit_jobs (batch_id);
+"""
+
+_JOB_COLUMNS = (
+    "job_id, batch_id, filename, identificacion, audits, status, attempts, error, "
+    "created_at, started_at, finished_at"
+)
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+class AuditJobQueue:
+    """Cola durable de trabajos de auditoría y su pool de trabajadores."""
+
+    def __init__(self, db_path: Optional[str] = None, jobs_dir: Optional[str] = None,
+                 workers: Optional[int] = None):
+        self.jobs_dir = Path(jobs_dir or settings.AUDIT_JOBS_DIR)
+        self.db_path = Path(db_path or settings.AUDIT_JOBS_DB_PATH)
+        self.workers = max(1, int(workers or settings.AUDIT_JOBS_WORKERS))
+        self.max_attempts = max(1, settings.AUDIT_JOBS_MAX_ATTEMPTS)
+        self.poll_seconds = settings.AUDIT_JOBS_POLL_SECONDS
+        self._db_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._initialized = False
+
+    # ------------------------------------------------------------------ #
+    # Persistencia
+    # ------------------------------------------------------------------ #
+    @contextmanager
+    def _session(self):
+        """Conexión SQLite por operación: confirma al salir (o revierte ante error) y se cierra."""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        if self._initialized:
+            return
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._db_lock, self._session() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        self._initialized = True
+
+    def _row_to_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = {key: row[key] for key in row.keys() if key not in ("result_json", "zip_path", "bypass_cache")}
+        job["audits"] = job["audits"].split(",") if job.get("audits") else None
+        return job
+
+    # ------------------------------------------------------------------ #
+    # API de la cola
+    # ------------------------------------------------------------------ #
+    def save_upload(self, source: BinaryIO, max_bytes: int) -> Path:
+        """
+        Copia por bloques un ZIP subido al directorio de carga de la cola, sin cargarlo
+        completo en memoria. Lanza ValueError (y descarta la copia) si supera max_bytes.
+        """
+        self._init_db()
+        upload_dir = self.jobs_dir / _UPLOADS_DIR
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        upload_path = upload_dir / f"{uuid.uuid4().hex}.zip"
+        size = 0
+        try:
+            with open(upload_path, "wb") as f:
+                while chunk := source.read(_UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"más de {max_bytes} bytes")
+                    f.write(chunk)
+        except BaseException:
+            upload_path.unlink(missing_ok=True)
+            raise
+        return upload_path
+
+    def discard_uploads(self, paths: List[Path]) -> None:
+        """Elimina los ZIP guardados con save_upload que no llegaron a encolarse."""
+        for path in paths:
+            try:
+                Path(path).unlink(missing_ok=True)
+            except Exception as e:
+                logger.warning(f"[AUDIT][JOBS] No se pudo eliminar la carga {path}: {e}")
+
+    def submit_batch(self, claims: List[Dict[str, Any]], audits: Optional[List[AuditType]] = None,
+                     bypass_cache: bool = False) -> Dict[str, Any]:
+        """
+        Registra un lote. `claims` es una lista de {"filename", "path"} con el ZIP de cada
+        reclamación guardado con save_upload (se mueve al directorio del lote).
+        Si el registro falla, los ZIP vuelven a su ruta original (el llamador puede
+        descartarlos con discard_uploads) y se elimina el directorio del lote.
+        Retorna el batch_id y los trabajos creados (estado 'queued').
+        """
+        self._init_db()
+        batch_id = uuid.uuid4().hex
+        batch_dir = self.jobs_dir / batch_id
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        audits_value = ",".join(audit.value for audit in audits) if audits else None
+
+        jobs = []
+        rows = []
+        moved = []
+        try:
+            for claim in claims:
+                job_id = uuid.uuid4().hex
+                filename = Path(claim["filename"]).name
+                zip_path = batch_dir / f"{job_id}.zip"
+                Path(claim["path"]).replace(zip_path)
+                moved.append((Path(claim["path"]), zip_path))
+                created_at = _now()
+                rows.append((job_id, batch_id, filename, str(zip_path), Path(filename).stem,
+                             audits_value, int(bool(bypass_cache)), JOB_QUEUED, created_at))
+                jobs.append({"job_id": job_id, "filename": filename, "status": JOB_QUEUED})
+
+            with self._db_lock, self._session() as conn:
+                conn.execute(
+                    "INSERT INTO audit_batches (batch_id, total_jobs, created_at) VALUES (?, ?, ?)",
+                    (batch_id, len(rows), _now())
+                )
+                conn.executemany(
+                    """INSERT INTO audit_jobs (job_id, batch_id, filename, zip_path, identificacion,
+                                               audits, bypass_cache, status, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    rows
+                )
+        except Exception:
+            for upload_path, zip_path in moved:
+                try:
+                    zip_path.replace(upload_path)
+                except Exception as e:
+                    logger.warning(f"[AUDIT][JOBS] No se pudo devolver la carga {zip_path}: {e}")
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            logger.error(f"[AUDIT][JOBS] No se pudo registrar el lote {batch_id}, se revierten las cargas")
+            raise
+
+        logger.info(f"[AUDIT][JOBS] Lote {batch_id} registrado con {len(rows)} trabajo(s) [QUEUED]")
+        self._wakeup.set()
+        return {"batch_id": batch_id, "total_jobs": len(rows), "jobs": jobs}
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        self._init_db()
+        with self._session() as conn:
+            row = conn.execute(f"SELECT {_JOB_COLUMNS} FROM audit_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def get_job_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Resultado v2 (dict) de un trabajo completado, o None si no existe / no ha terminado."""
+        self._init_db()
+        with self._session() as conn:
+            row = conn.execute("SELECT result_json FROM audit_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row["result_json"]) if row and row["result_json"] else None
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Resumen del lote con conteo por estado y el estado de cada trabajo."""
+        self._init_db()
+        with self._session() as conn:
+            batch = conn.execute("SELECT * FROM audit_batches WHERE batch_id = ?", (batch_id,)).fetchone()
+            if not batch:
+                return None
+            rows = conn.execute(
+                f"SELECT {_JOB_COLUMNS} FROM audit_jobs WHERE batch_id = ? ORDER BY created_at", (batch_id,)
+            ).fetchall()
+
+        jobs = [self._row_to_job(row) for row in rows]
+        counts = {status: 0 for status in (JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED)}
+        for job in jobs:
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+
+        return {
+            "batch_id": batch_id,
+            "created_at": batch["created_at"],
+            "total_jobs": batch["total_jobs"],
+            "status_counts": counts,
+            "finished": counts[JOB_QUEUED] == 0 and counts[JOB_RUNNING] == 0,
+            "jobs": jobs,
+        }
+
+    # ------------------------------------------------------------------ #
+    # Trabajadores
+    # ------------------------------------------------------------------ #
+    def _claim_next_job(self) -> Optional[sqlite3.Row]:
+        """Toma atómicamente el trabajo en cola más antiguo y lo marca 'running'."""
+        with self._db_lock, self._session() as conn:
+            row = conn.execute(
+                "SELECT * FROM audit_jobs WHERE status = ? ORDER BY created_at LIMIT 1", (JOB_QUEUED,)
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE audit_jobs SET status = ?, attempts = attempts + 1, started_at = ? WHERE job_id = ?",
+                (JOB_RUNNING, _now(), row["job_id"])
+            )
+            return row
+
+    def _finish_job(self, job_id: str, status: str, result_json: Optional[str] = None,
+                    error: Optional[str] = None) -> None:
+        with self._db_lock, self._session() as conn:
+            conn.execute(
+                "UPDATE audit_jobs SET status = ?, result_json = ?, error = ?, finished_at = ? WHERE job_id = ?",
+                (status, result_json, error, _now(), job_id)
+            )
+
+    def _process_job(self, job: sqlite3.Row) -> None:
+        from services.claim_pipeline import run_claim_audit
+
+        job_id = job["job_id"]
+        audits = [AuditType(value) for value in job["audits"].split(",")] if job["audits"] else None
+        logger.info(f"[AUDIT][JOBS] Procesando trabajo {job_id} ({job['filename']}) intento {job['attempts'] + 1}")
+
+        retry = False
+        try:
+            audit_result = run_claim_audit(
+                Path(job["zip_path"]),
+                identificacion_reclamacion=job["identificacion"],
+                audits=audits,
+                bypass_cache=bool(job["bypass_cache"])
+            )
+            if not audit_result.success:
+                raise RuntimeError(audit_result.error or "La auditoría terminó sin éxito")
+            if audit_result.errored_audits:
+                raise RuntimeError("Auditorías con error técnico: "
+                                   + ", ".join(audit.value for audit in audit_result.errored_audits))
+
+            self._finish_job(job_id, JOB_COMPLETED, result_json=audit_result.model_dump_json())
+            logger.info(f"[AUDIT][JOBS] Trabajo {job_id} completado [SUCCESS]")
+
+        except Exception as e:
+            retry = job["attempts"] + 1 < self.max_attempts
+            if retry:
+                self._finish_job(job_id, JOB_QUEUED, error=str(e))
+                logger.warning(f"[AUDIT][JOBS] Trabajo {job_id} falló, se reintentará: {str(e)}")
+            else:
+                self._finish_job(job_id, JOB_FAILED, error=str(e))
+                logger.error(f"[AUDIT][JOBS] Trabajo {job_id} falló definitivamente: {str(e)}")
+
+        finally:
+            # Los archivos descomprimidos no se reutilizan; el ZIP se conserva solo para el
+            # reintento (en estado final el resultado queda en la BD)
+            Utils.cleanup_extracted_zip(Path(job["zip_path"]))
+            if not retry:
+                try:
+                    Path(job["zip_path"]).unlink(missing_ok=True)
+                except Exception as e:
+                    logger.warning(f"[AUDIT][JOBS] No se pudo eliminar el ZIP del trabajo {job_id}: {e}")
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self._claim_next_job()
+            except Exception as e:
+                logger.error(f"[AUDIT][JOBS] Error leyendo la cola: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+                continue
+
+            self._process_job(job)
+
+    def recover(self) -> int:
+        """Devuelve a la cola los trabajos que quedaron 'running' (reinicio del proceso)."""
+        self._init_db()
+        with self._db_lock, self._session() as conn:
+            cursor = conn.execute(
+                "UPDATE audit_jobs SET status = ?, started_at = NULL WHERE status = ?", (JOB_QUEUED, JOB_RUNNING)
+            )
+            recovered = cursor.rowcount
+        if recovered:
+            logger.info(f"[AUDIT][JOBS] {recovered} trabajo(s) interrumpido(s) devueltos a la cola")
+        return recovered
+
+    def start(self) -> None:
+        """Inicializa la BD, recupera trabajos interrumpidos y arranca el pool de trabajadores."""
+        if self._threads:
+            return
+        self.recover()
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"audit-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"[AUDIT][JOBS] Pool de trabajadores iniciado ({self.workers} trabajador(es)) [db={self.db_path}]")
+
+    def stop(self) -> None:
+        """Detiene los trabajadores (el trabajo en curso termina; lo pendiente sigue en la cola)."""
+        self._stop.set()
+        self._wakeup.set()
+        self._threads = []
+
+
+audit_job_queue = AuditJobQueue()
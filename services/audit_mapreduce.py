@@ -0,0 +1,190 @@
+"""
+Utilidades del modo map-reduce de la auditoría v2.
+
+El documento completo (markdown del OCR) se divide en segmentos acotados por tokens
+respetando los límites de página ("## Página N"); cada segmento se audita por separado
+(map) y los resultados parciales se fusionan y deduplican en un único AuditResponseV2
+(reduce).
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from services.document_segmenter import split_pages
+from services.glosas_catalog import normalize_key
+
+logger = logging.getLogger(__name__)
+
+# Aproximación de tokens por caracteres (no hay tokenizador del modelo disponible localmente)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación de tokens de un texto (≈ 4 caracteres por token)."""
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _split_oversized(text: str, max_chars: int) -> List[str]:
+    """Parte un texto mayor que max_chars por párrafos y, si hace falta, por corte duro."""
+    pieces, current = [], ""
+    for paragraph in text.split("\n\n"):
+        while len(paragraph) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        candidate = f"{current}\n\n{paragraph}" if current else paragraph
+        if len(candidate) > max_chars:
+            pieces.append(current)
+            current = paragraph
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_segments(markdown_content: str, segment_tokens: int) -> List[Dict[str, Any]]:
+    """
+    Agrupa páginas consecutivas en segmentos de hasta segment_tokens tokens.
+
+    Returns:
+        Lista de segmentos {index, text, page_start, page_end, tokens}
+    """
+    max_chars = max(1, int(segment_tokens)) * CHARS_PER_TOKEN
+    segments: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+
+    def _flush():
+        if current and current["text"].strip():
+            current["index"] = len(segments)
+            current["tokens"] = estimate_tokens(current["text"])
+            segments.append(current)
+
+    for page in split_pages(markdown_content):
+        if len(page["text"]) > max_chars:
+            _flush()
+            current = None
+            for piece in _split_oversized(page["text"], max_chars):
+                current = {"text": piece, "page_start": page["page"], "page_end": page["page"]}
+                _flush()
+            current = None
+            continue
+
+        if current and len(current["text"]) + len(page["text"]) <= max_chars:
+            current["text"] += page["text"]
+            current["page_end"] = page["page"] if page["page"] is not None else current["page_end"]
+        else:
+            _flush()
+            current = {"text": page["text"], "page_start": page["page"], "page_end": page["page"]}
+    _flush()
+    return segments
+
+
+def _dedupe_references(references: List[str]) -> List[str]:
+    return list(dict.fromkeys(ref for ref in references if ref))
+
+
+def _item_key(item: Dict[str, Any]) -> tuple:
+    """Identidad de un ítem entre segmentos vecinos: nombre normalizado y valor."""
+    try:
+        valor = int(float(item.get("valor", 0) or 0))
+    except (TypeError, ValueError):
+        valor = 0
+    return normalize_key(str(item.get("nombre", ""))), valor
+
+
+def merge_v2_results(partial_results: List[Dict[str, Any]],
+                     segment_indexes: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    Fusiona los resultados parciales (dicts con el formato v2) de cada segmento.
+
+    - Glosas totales: una por código, uniendo referencias.
+    - Ítems: un ítem de un segmento se fusiona con uno igual (nombre + valor) del segmento
+      inmediatamente anterior, cuando una tabla continúa en la página siguiente y el
+      modelo lo reporta en ambos; cada ocurrencia del segmento anterior se usa una sola
+      vez. Los ítems repetidos dentro de un mismo segmento, o en segmentos no contiguos,
+      son líneas distintas de la factura y se conservan. Las glosas parciales se unen por
+      código y los ítems se renumeran ITM-001, ITM-002... en orden de aparición.
+
+    Args:
+        partial_results: Resultados parciales en orden de segmento
+        segment_indexes: Índice de segmento de cada resultado (default: posiciones
+            consecutivas); un segmento fallido entre dos resultados los deja no contiguos
+    """
+    if segment_indexes is None:
+        segment_indexes = list(range(len(partial_results)))
+
+    glosas_totales: Dict[str, Dict[str, Any]] = {}
+    items: List[Dict[str, Any]] = []
+    justificaciones: List[str] = []
+    # Ocurrencias del segmento anterior aún no fusionadas, por clave de ítem
+    previous_index: Optional[int] = None
+    previous_items: Dict[tuple, List[Dict[str, Any]]] = {}
+
+    for result, segment_index in zip(partial_results, segment_indexes):
+        if not isinstance(result, dict):
+            continue
+        available = previous_items if previous_index is not None and segment_index == previous_index + 1 else {}
+        current_items: Dict[tuple, List[Dict[str, Any]]] = {}
+
+        for glosa in result.get("clasificacion_glosas_totales", []) or []:
+            if not isinstance(glosa, dict):
+                continue
+            codigo = str(glosa.get("codigo", "999"))
+            if codigo in glosas_totales:
+                merged = glosas_totales[codigo]
+                merged["referencias"] = _dedupe_references(merged["referencias"] + list(glosa.get("referencias", []) or []))
+            else:
+                glosas_totales[codigo] = dict(glosa, codigo=codigo, referencias=list(glosa.get("referencias", []) or []))
+
+        if result.get("glosa_total") and result.get("justificacion"):
+            justificaciones.append(str(result["justificacion"]))
+
+        for item in result.get("items_reclamados", []) or []:
+            if not isinstance(item, dict):
+                continue
+            key = _item_key(item)
+            if available.get(key):
+                merged = available[key].pop(0)
+            else:
+                merged = dict(item, clasificacion_glosas=[])
+                items.append(merged)
+            current_items.setdefault(key, []).append(merged)
+            glosas_by_code = {str(glosa.get("codigo")): glosa for glosa in merged["clasificacion_glosas"]}
+            for glosa in item.get("clasificacion_glosas", []) or []:
+                if not isinstance(glosa, dict):
+                    continue
+                existing = glosas_by_code.get(str(glosa.get("codigo")))
+                if existing:
+                    existing["referencias"] = _dedupe_references(
+                        list(existing.get("referencias", []) or []) + list(glosa.get("referencias", []) or [])
+                    )
+                else:
+                    copied = dict(glosa, referencias=list(glosa.get("referencias", []) or []))
+                    merged["clasificacion_glosas"].append(copied)
+                    glosas_by_code[str(glosa.get("codigo"))] = copied
+            merged["glosa_parcial"] = bool(merged["clasificacion_glosas"]) or bool(merged.get("glosa_parcial"))
+
+        previous_index, previous_items = segment_index, current_items
+
+    merged_items = []
+    for position, item in enumerate(items, start=1):
+        item["codigo"] = f"ITM-{position:03d}"
+        if not item["clasificacion_glosas"]:
+            item.pop("clasificacion_glosas")
+            item["glosa_parcial"] = False
+        merged_items.append(item)
+
+    glosa_total = bool(glosas_totales)
+    if glosa_total:
+        justificacion = " ".join(dict.fromkeys(justificaciones)) or "La reclamación presenta glosas totales que impiden su aprobación."
+    else:
+        justificacion = "La reclamación ha sido procesada sin glosas totales."
+
+    return {
+        "glosa_total": glosa_total,
+        "justificacion": justificacion,
+        "clasificacion_glosas_totales": list(glosas_totales.values()),
+        "items_reclamados": merged_items,
+    }
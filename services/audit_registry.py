@@ -0,0 +1,232 @@
+"""
+Registro declarativo de las auditorías de la cuenta médica.
+
+Cada auditoría se describe con su AuditType, nombre, método de prompt, consulta RAG por
+defecto, si es especial (glosas predefinidas en el prompt), los términos del
+pre-escaneo léxico que permiten omitir auditorías que no pueden encontrar nada, los
+tipos de documento (segmentos) donde busca su evidencia, su prioridad cuando el
+deadline o el presupuesto de llamadas al LLM no alcanzan para todas y su perfil de
+modelo (services.model_routing).
+"""
+import re
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from schemas.audit import AuditDefinition, AuditType
+from services.glosas_catalog import normalize_key
+
+logger = logging.getLogger(__name__)
+
+# Los términos del pre-escaneo coinciden al inicio de una palabra ("farmac" → "farmacia");
+# los de menos de 4 caracteres ("mg", "rx", "cum") solo como palabra completa
+_MIN_PREFIX_KEYWORD_LENGTH = 4
+
+
+# Orden determinista de ejecución: 7 auditorías tradicionales + 5 especiales
+AUDIT_REGISTRY: List[AuditDefinition] = [
+    AuditDefinition(
+        audit_type=AuditType.FACTURA,
+        name="Factura",
+        prompt_method="_get_factura_prompt",
+        default_query="factura médica número fecha emisión CUFE valor total detalle cargos",
+        segment_types=["factura"],
+        priority=2,
+    ),
+    AuditDefinition(
+        audit_type=AuditType.HISTORIA_CLINICA,
+        name="Historia Clínica",
+        prompt_method="_get_historia_clinica_prompt",
+        default_query="historia clínica triage motivo consulta diagnóstico notas médicas órdenes epicrisis",
+        segment_types=["historia_clinica", "epicrisis"],
+        priority=5,
+    ),
+    AuditDefinition(
+        audit_type=AuditType.MEDICAMENTOS,
+        name="Medicamentos",
+        prompt_method="_get_medicamentos_prompt",
+        default_query="órdenes médicas medicamentos administración enfermería firma médico CUM",
+        keywords=["medicamento", "farmac", "dosis", "mg", "ampolla", "tableta", "capsula", "jarabe", "cum"],
+        segment_types=["ordenes_medicas", "historia_clinica", "epicrisis", "factura"],
+        priority=4,
+    ),
+    AuditDefinition(
+        audit_type=AuditType.EXAMENES,
+        name="Exámenes",
+        prompt_method="_get_examenes_prompt",
+        default_query="exámenes laboratorio imágenes diagnósticas CUPS informe especialista",
+        keywords=["examen", "laboratorio", "radiograf", "rx", "tomograf", "ecograf", "resonancia",
+                  "hemograma", "imagen diagnostica", "imagenes diagnosticas", "paraclinico"],
+        segment_types=["resultados_examenes", "historia_clinica", "factura"],
+        priority=4,
+    ),
+    AuditDefinition(
+        audit_type=AuditType.PROCEDIMIENTOS,
+        name="Procedimientos",
+        prompt_method="_get_procedimientos_prompt",
+        default_query="procedimientos quirúrgicos nota operatoria cirujano anestesiólogo",
+        keywords=["procedimiento", "quirurg", "cirug", "cirujano", "nota operatoria", "anestesi", "sutura"],
+        segment_types=["historia_clinica", "epicrisis", "factura"],
+        priority=3,
+    ),
+    AuditDefinition(
+        audit_type=AuditType.MAOS,
+        name="MAOS",
+        prompt_method="_get_maos_prompt",
+        default_query="materiales osteosíntesis factura proveedor CUFE proveedor incremento 12%",
+        keywords=["osteosintesis", "maos", "tornillo", "implante", "clavo", "protesis",
+                  "factura de proveedor", "factura del proveedor", "factura proveedor", "material quirurgico"],
+        segment_types=["factura", "factura_proveedor"],
+        priority=3,
+    ),
+    AuditDefinition(
+        audit_type=AuditType.CERTIFICADOS,
+        name="Certificados",
+        prompt_method="_get_certificados_prompt",
+        default_query="certificado autoridad policía SOAT ECAT documentación legal",
+        segment_types=["soat", "furips", "otro"],
+        priority=5,
+    ),
+    AuditDefinition(
+        audit_type=AuditType.FORMULARIOS_LEGALES,
+        name="Formularios Legales",
+        prompt_method="_get_formularios_legales_prompt",
+        default_query="formulario único reclamación prestadores servicios salud FURIPS transporte movilización víctimas",
+        is_special=True,
+        segment_types=["furips"],
+        priority=1,
+        model_profile="fast",
+    ),
+    AuditDefinition(
+        audit_type=AuditType.RUT_VALIDACION,
+        name="RUT Validación",
+        prompt_method="_get_rut_validacion_prompt",
+        default_query="registro único tributario RUT DIAN fecha expedición NIT",
+        is_special=True,
+        segment_types=["rut"],
+        priority=1,
+        model_profile="fast",
+    ),
+    AuditDefinition(
+        audit_type=AuditType.DATOS_PACIENTE,
+        name="Datos Paciente",
+        prompt_method="_get_datos_paciente_prompt",
+        default_query="paciente identificación nombre documento número fecha nacimiento",
+        is_special=True,
+        segment_types=["factura", "historia_clinica"],
+        priority=2,
+        model_profile="fast",
+    ),
+    AuditDefinition(
+        audit_type=AuditType.CONSISTENCIA_DOCUMENTO,
+        name="Consistencia Documento",
+        prompt_method="_get_consistencia_documento_prompt",
+        default_query="número documento identificación paciente CC TI CE pasaporte",
+        is_special=True,
+        priority=2,
+    ),
+    AuditDefinition(
+        audit_type=AuditType.PAGADOR_ADRES,
+        name="Pagador ADRES",
+        prompt_method="_get_pagador_adres_prompt",
+        default_query="pagador NIT ADRES administradora recursos sistema seguridad social",
+        is_special=True,
+        segment_types=["factura", "furips"],
+        priority=1,
+        model_profile="fast",
+    ),
+]
+
+_BY_TYPE = {definition.audit_type: definition for definition in AUDIT_REGISTRY}
+_BY_NAME = {definition.name: definition for definition in AUDIT_REGISTRY}
+
+
+def get_audit_definition(audit_type: AuditType) -> AuditDefinition:
+    """Definición de una auditoría por su AuditType."""
+    return _BY_TYPE[AuditType(audit_type)]
+
+
+def get_audit_definition_by_name(name: str) -> Optional[AuditDefinition]:
+    """Definición de una auditoría por su nombre legible ("Historia Clínica", "MAOS"...)."""
+    return _BY_NAME.get(name)
+
+
+def select_audits(audits: Optional[Iterable] = None) -> List[AuditDefinition]:
+    """
+    Subconjunto de auditorías a ejecutar, en el orden del registro.
+    Acepta AuditType o sus valores ("factura", "maos"...); None o vacío = todas.
+    Lanza ValueError si algún tipo no existe.
+    """
+    if not audits:
+        return list(AUDIT_REGISTRY)
+    requested = {AuditType(str(getattr(audit, "value", audit)).strip()) for audit in audits}
+    return [definition for definition in AUDIT_REGISTRY if definition.audit_type in requested]
+
+
+def parse_audits_param(audits: Optional[str]) -> Optional[List[AuditType]]:
+    """Convierte un parámetro 'factura,maos,...' en lista de AuditType (None si viene vacío)."""
+    if not audits or not audits.strip():
+        return None
+    return [AuditType(value.strip()) for value in audits.split(",") if value.strip()]
+
+
+def parse_priority_overrides(value: Optional[str]) -> Dict[AuditType, int]:
+    """
+    Convierte 'maos:1,certificados:9' en {AuditType: prioridad}. Las entradas inválidas
+    se ignoran con una advertencia.
+    """
+    overrides: Dict[AuditType, int] = {}
+    for entry in (value or "").split(","):
+        if not entry.strip():
+            continue
+        try:
+            audit_type, priority = entry.split(":", 1)
+            overrides[AuditType(audit_type.strip())] = int(priority)
+        except ValueError:
+            logger.warning(f"[AUDIT][REGISTRY] Prioridad inválida ignorada: '{entry.strip()}'")
+    return overrides
+
+
+def resolve_priorities(definitions: List[AuditDefinition],
+                       overrides: Optional[Dict] = None) -> Dict[AuditType, int]:
+    """
+    Prioridad efectiva de cada auditoría: la del registro, sobrescrita por
+    settings.AUDIT_PRIORITY_OVERRIDES y luego por `overrides` (AuditType o su valor -> int).
+    """
+    from core.config import settings
+
+    priorities = {definition.audit_type: definition.priority for definition in definitions}
+    priorities.update(parse_priority_overrides(settings.AUDIT_PRIORITY_OVERRIDES))
+    for audit_type, priority in (overrides or {}).items():
+        priorities[AuditType(getattr(audit_type, "value", audit_type))] = int(priority)
+    return priorities
+
+
+def _keyword_pattern(keywords: Iterable[str]) -> "re.Pattern":
+    """Expresión que busca cualquiera de los términos normalizados en límites de palabra."""
+    alternatives = []
+    for term in keywords:
+        term = normalize_key(term)
+        suffix = r"\b" if len(term) < _MIN_PREFIX_KEYWORD_LENGTH else ""
+        alternatives.append(rf"\b{re.escape(term)}{suffix}")
+    return re.compile("|".join(alternatives))
+
+
+def prescan_audits(definitions: List[AuditDefinition],
+                   markdown_content: str) -> Tuple[List[AuditDefinition], List[AuditDefinition]]:
+    """
+    Pre-escaneo léxico del markdown extraído. Las auditorías con términos definidos se
+    omiten si ninguno aparece en el documento (comparación sin tildes ni mayúsculas, por
+    palabras: "cum" no coincide con "documento" ni "cumple").
+
+    Returns:
+        Tupla (auditorías a ejecutar, auditorías omitidas)
+    """
+    normalized = normalize_key(markdown_content)
+    selected, skipped = [], []
+    for definition in definitions:
+        if definition.keywords and not _keyword_pattern(definition.keywords).search(normalized):
+            skipped.append(definition)
+            logger.info(f"[AUDIT][REGISTRY] Auditoría {definition.name} omitida: ningún término del pre-escaneo en el documento")
+        else:
+            selected.append(definition)
+    return selected, skipped
@@ -0,0 +1,201 @@
+"""
+Validadores deterministas (reglas) para las auditorías especiales.
+
+Revisan el markdown completo del OCR con expresiones regulares y resuelven sin LLM los
+casos claros (presencia del FURIPS, NIT de ADRES, consistencia del número de documento,
+ausencia de RUT). Cuando el resultado es ambiguo retornan None y la auditoría especial
+se ejecuta con el LLM como siempre.
+"""
+import re
+import logging
+from collections import Counter
+from typing import Dict, List, Optional
+
+from schemas.audit import AuditResponse, AuditType
+from services.glosas_catalog import normalize_key
+
+logger = logging.getLogger(__name__)
+
+NO_APLICA = "No aplica"
+
+# FURIPS / formulario de transporte (glosa 332)
+_FURIPS_TITLES = [
+    "formulario unico de reclamacion de los prestadores de servicios de salud",
+    "formulario unico de reclamacion de gastos de transporte y movilizacion de victimas",
+    "furips",
+    "furtran",
+]
+_FURIPS_HINTS = ["formulario unico", "reclamacion de los prestadores", "movilizacion de victimas"]
+
+# Pagador ADRES (glosa 815)
+_ADRES_NIT_RE = re.compile(r"\b901\s?\.?\s?037\s?\.?\s?916(?:\s?-\s?1)?\b")
+_ADRES_NAMES = ["adres", "administradora de los recursos del sistema general de seguridad social"]
+
+# RUT (glosa 816)
+_RUT_RE = re.compile(r"\bRUT\b")
+_RUT_TITLES = ["registro unico tributario"]
+
+# Número de documento del paciente (glosa 326): abreviaturas en mayúscula para no confundir
+# con texto libre; celdas HTML intermedias de las tablas del OCR se toleran
+_DOC_ID_RE = re.compile(
+    r"\b(CC|C\.C\.?|TI|T\.I\.?|CE|C\.E\.?|RC|R\.C\.?)"
+    r"\s*(?:No\.?\s*)?(?:Doc\.?\s*)?:?\s*(?:</?t[dr][^>]*>\s*)*"
+    r"([0-9][0-9.]{5,14})\b"
+)
+_DOC_ID_LONG_RE = re.compile(
+    r"c[ée]dula\s+de\s+ciudadan[ií]a\s*(?:No\.?\s*)?:?\s*([0-9][0-9.]{5,14})\b", re.IGNORECASE
+)
+
+
+def _special_result(identificacion: str, con_glosa: bool, justificacion: str,
+                    documentos: str, clasificacion: str, description: str) -> Dict:
+    """special_result con el mismo formato que piden los prompts de auditorías especiales."""
+    return {
+        "identificacion_reclamacion": identificacion,
+        "estado_glosa": 1 if con_glosa else 0,
+        "justificacion": justificacion if con_glosa else NO_APLICA,
+        "documentos_referenciados": documentos if con_glosa else NO_APLICA,
+        "clasificacion": clasificacion if con_glosa else None,
+        "description": description if con_glosa else NO_APLICA,
+    }
+
+
+def _verdict(cumple: bool, justification: str, special_result: Dict) -> Dict:
+    return {
+        "response": AuditResponse.CUMPLE.value if cumple else AuditResponse.NO_CUMPLE.value,
+        "justification": f"[Validación determinista] {justification}",
+        "special_result": special_result,
+        "glosas_detectadas": [],
+        "documents_retrieved": 0,
+    }
+
+
+def check_formularios_legales(markdown_content: str, identificacion: str) -> Optional[Dict]:
+    """Glosa 332: debe existir el FURIPS o el formulario de gastos de transporte."""
+    text = normalize_key(markdown_content)
+    found = [title for title in _FURIPS_TITLES if title in text]
+    if found:
+        return _verdict(True, f"Se encontró el formulario: '{found[0]}'",
+                        _special_result(identificacion, False, "", "", "332", ""))
+    if any(hint in text for hint in _FURIPS_HINTS):
+        return None  # Posible título con errores de OCR: decide el LLM
+    return _verdict(
+        False,
+        "No se encontró el Formulario Único de Reclamación de los Prestadores de Servicios de Salud ni el Formulario Único de Reclamación de Gastos de Transporte y Movilización de Víctimas",
+        _special_result(
+            identificacion, True,
+            "Se glosa la reclamación por accidente de tránsito debido a la ausencia del Formulario Único de Reclamación de los Prestadores de Servicios de Salud (FURIPS) y del Formulario Único de Reclamación de Gastos de Transporte y Movilización de Víctimas, documentos obligatorios según la normatividad vigente para el cobro ante la ADRES.",
+            "Formulario Único de Reclamación de los Prestadores de Servicios de Salud ni el Formulario Único de Reclamación de Gastos de Transporte y Movilización de Víctimas",
+            "332",
+            "Ausencia, enmendaduras, incompletitud o ilegibilidad en el soporte del detalle de cargos, incluyendo la omisión de documentos obligatorios exigidos por la normatividad para el tipo de reclamación."
+        )
+    )
+
+
+def check_pagador_adres(markdown_content: str, identificacion: str) -> Optional[Dict]:
+    """Glosa 815: el pagador debe ser ADRES (NIT 901.037.916-1 y denominación oficial)."""
+    text = normalize_key(markdown_content)
+    nit_found = bool(_ADRES_NIT_RE.search(markdown_content))
+    name_found = any(re.search(rf"\b{re.escape(name)}\b", text) for name in _ADRES_NAMES)
+
+    if nit_found and name_found:
+        return _verdict(True, "El pagador de la factura corresponde a la ADRES. NIT: 901.037.916-1, Nombre: ADRES",
+                        _special_result(identificacion, False, "", "", "815", ""))
+    if not nit_found and not name_found:
+        return _verdict(
+            False,
+            "El pagador no corresponde a la ADRES. No se encontró el NIT 901.037.916-1 ni la denominación de la ADRES en los documentos",
+            _special_result(
+                identificacion, True,
+                "Se devuelve la reclamación por accidente de tránsito debido a que en los documentos presentados (factura, FURIPS) el NIT y/o nombre del pagador no corresponde a la ADRES, por lo que la entidad no es competente para el pago según la normatividad vigente.",
+                "Factura / FURIPS",
+                "815",
+                "La factura o reclamación se presenta a una entidad diferente a la responsable del pago."
+            )
+        )
+    return None  # Solo NIT o solo nombre: decide el LLM
+
+
+def check_rut_validacion(markdown_content: str, identificacion: str) -> Optional[Dict]:
+    """
+    Glosa 816: la ausencia total del RUT se resuelve por reglas; si el RUT existe, la
+    vigencia (3 meses frente a la factura) la valida el LLM.
+    """
+    text = normalize_key(markdown_content)
+    if _RUT_RE.search(markdown_content) or any(title in text for title in _RUT_TITLES):
+        return None
+    return _verdict(
+        False,
+        "No se encontró el documento RUT",
+        _special_result(
+            identificacion, True,
+            "Se devuelve la reclamación por accidente de tránsito debido a la ausencia del Registro Único Tributario (RUT) o porque el documento no cumple con la vigencia mínima de tres (3) meses exigida por la normatividad vigente para radicación ante la ADRES.",
+            "RUT",
+            "816",
+            "Falta de soporte obligatorio para la radicación."
+        )
+    )
+
+
+def extract_document_ids(markdown_content: str) -> Counter:
+    """Números de documento de identidad encontrados (solo dígitos) con su frecuencia."""
+    numbers: List[str] = []
+    for match in _DOC_ID_RE.finditer(markdown_content):
+        numbers.append(match.group(2))
+    for match in _DOC_ID_LONG_RE.finditer(markdown_content):
+        numbers.append(match.group(1))
+    digits = (re.sub(r"\D", "", number) for number in numbers)
+    return Counter(number for number in digits if len(number) >= 6)
+
+
+def check_consistencia_documento(markdown_content: str, identificacion: str) -> Optional[Dict]:
+    """
+    Glosa 326: si todos los documentos muestran un único número de identificación se
+    resuelve como 'Cumple'; varios números distintos o ninguno quedan para el LLM
+    (pueden ser acompañantes, profesionales o NIT mal rotulados).
+    """
+    document_ids = extract_document_ids(markdown_content)
+    if len(document_ids) == 1:
+        number, count = next(iter(document_ids.items()))
+        return _verdict(True, f"Consistencia verificada. El número de documento del paciente ({number}) es el mismo en todos los documentos ({count} menciones)",
+                        _special_result(identificacion, False, "", "", "326", ""))
+    return None
+
+
+def check_datos_paciente(markdown_content: str, identificacion: str) -> Optional[Dict]:
+    """
+    Glosa 814: requiere comparar contra los datos del paciente de la factura XML, que no
+    forman parte del markdown; siempre decide el LLM.
+    """
+    return None
+
+
+_SPECIAL_RULES = {
+    AuditType.FORMULARIOS_LEGALES: check_formularios_legales,
+    AuditType.PAGADOR_ADRES: check_pagador_adres,
+    AuditType.RUT_VALIDACION: check_rut_validacion,
+    AuditType.CONSISTENCIA_DOCUMENTO: check_consistencia_documento,
+    AuditType.DATOS_PACIENTE: check_datos_paciente,
+}
+
+
+def evaluate_special_audit(audit_type: AuditType, markdown_content: str,
+                           identificacion_reclamacion: Optional[str] = None) -> Optional[Dict]:
+    """
+    Evalúa las reglas de una auditoría especial. Retorna un resultado con el formato de
+    _run_special_audit si el caso es concluyente, o None si debe decidir el LLM.
+    """
+    rule = _SPECIAL_RULES.get(audit_type)
+    if rule is None or not markdown_content:
+        return None
+    try:
+        verdict = rule(markdown_content, identificacion_reclamacion or "archivo_no_identificado")
+    except Exception as e:
+        logger.warning(f"[AUDIT][RULES] Error evaluando reglas de {audit_type.value}: {str(e)}")
+        return None
+
+    if verdict is None:
+        logger.info(f"[AUDIT][RULES] {audit_type.value}: resultado ambiguo, se usará el LLM")
+    else:
+        logger.info(f"[AUDIT][RULES] {audit_type.value}: resuelto por reglas -> {verdict['response']}")
+    return verdict
@@ -23,6 +23,7 @@ from langchain_openai import ChatOpenAI
 ChatOpenAI.model_rebuild(_types_namespace={"BaseCache": BaseCache, "Callbacks": Callbacks})
 
 from core.config import settings
+from services.llm_factory import get_gateway_chat_model
 from services.tools.oci_rag_tool import OCIRAGTool
 from services.tools.oci_select_ai_tool import OCISelectAITool
 
@@ -48,11 +49,7 @@ class ChatService:
             self._vector_search_instance = OCIRAGTool()
             self._select_ai_instance = OCISelectAITool()
             
-            self._llm = ChatOpenAI(
-                model    = settings.GATEWAY_OPENAI_MODEL,
-                api_key  = settings.GATEWAY_OPENAI_API_KEY,
-                base_url = settings.GATEWAY_BASE_URL
-            )
+            self._llm = get_gateway_chat_model()
             
             # Construir el grafo de LangGraph
             self._build_graph()
@@ -73,7 +70,7 @@ class ChatService:
 
         # --- TOOLS  ---
         @tool("rag_tool")
-        def call_rag(query: str) -> str:
+        async def call_rag(query: str) -> str:
             """
             @rag_tool — Buscar y citar conocimiento en documentos cargados (RAG).
 
@@ -104,7 +101,7 @@ class ChatService:
             """
             if not query:
                 return "Error: La consulta para la herramienta RAG no puede estar vacía."
-            return self._vector_search_instance.oci_vector_search(query, self._current_files_ids)
+            return await self._vector_search_instance.aoci_vector_search(query, self._current_files_ids)
 
 
         @tool("select_ai_tool")
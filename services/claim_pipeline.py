@@ -0,0 +1,121 @@
+"""
+Pipeline de auditoría de una reclamación (ZIP): OCR → vectorización → auditoría completa.
+
+Versión síncrona del flujo de /agent/glosa, usada por los trabajadores de la cola de
+lotes. Comparte con los endpoints los parámetros de la auditoría y la clave de caché.
+"""
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+from core.config import settings
+from schemas.audit import AuditType, FullAuditResponseV2
+from services.audit_cache import audit_result_cache, sha256_file
+from utils.utils import Utils
+
+logger = logging.getLogger(__name__)
+
+# Parámetros de la auditoría completa usados por /glosa, /process y los lotes (forman parte de la clave de caché)
+AUDIT_RUN_PARAMS = {
+    "k": 15,
+    "max_context_chars": 8000,
+    "temperature": 0.1,
+    "max_tokens": 2000,
+    "top_p": 0.75,
+    "run_master_audit": True,
+    "response_format": "v2",  # Usar formato v2 para JSON schema
+}
+
+
+def audit_cache_key(audit_service, markdown_content: str, identificacion_reclamacion: Optional[str],
+                    audits: Optional[List[AuditType]] = None) -> str:
+    """Clave de caché: hash del markdown + versión de prompts + modelo + parámetros de la auditoría."""
+    params = dict(AUDIT_RUN_PARAMS)
+    params["audits"] = sorted(audit.value for audit in audits) if audits else None
+    params["keyword_gating"] = settings.AUDIT_KEYWORD_GATING
+    params["rules"] = settings.AUDIT_RULES_ENABLED
+    return audit_result_cache.build_key(
+        markdown_content,
+        audit_service.get_prompt_version(),
+        settings.CON_GEN_AI_CHAT_MODEL_ID,
+        params.pop("temperature"),
+        params.pop("max_tokens"),
+        params.pop("top_p"),
+        identificacion_reclamacion=identificacion_reclamacion,
+        **params,
+    )
+
+
+def extract_claim_markdown(zip_path: Path, bypass_cache: bool = False,
+                           temp_dir_name: str = ".agent_files") -> Optional[str]:
+    """
+    Obtiene el markdown de la reclamación: de la caché si el mismo ZIP ya pasó por OCR,
+    si no descomprime el ZIP y ejecuta OCR sobre el primer PDF (los archivos descomprimidos
+    se eliminan al terminar).
+    """
+    from services.ocr_mineru import process_file as ocr_process_file
+
+    source_digest = sha256_file(zip_path)
+    markdown_content = None if bypass_cache else audit_result_cache.get_markdown(source_digest)
+    if markdown_content:
+        return markdown_content
+
+    extracted = Utils.extract_zip_to_temp(zip_path, temp_dir_name)
+    try:
+        for file_info in extracted:
+            if Path(file_info["filename"]).suffix.lower() != ".pdf":
+                continue
+            ocr_result = ocr_process_file(Path(file_info["temp_path"]))
+            markdown_content = ocr_result.get("markdown_content")
+            if markdown_content:
+                audit_result_cache.set_markdown(source_digest, markdown_content)
+                logger.info(f"[AUDIT][PIPELINE][OCR] upload.md obtenido de: [{file_info['filename']}] [SUCCESS]")
+                return markdown_content
+    finally:
+        # Las copias temporales y la carpeta descomprimida solo se usan para el OCR
+        Utils.cleanup_extracted_zip(zip_path, extracted, temp_dir_name)
+
+    return None
+
+
+def run_claim_audit(zip_path: Path, identificacion_reclamacion: Optional[str] = None,
+                    audits: Optional[List[AuditType]] = None,
+                    bypass_cache: bool = False) -> FullAuditResponseV2:
+    """
+    Ejecuta el flujo completo de /agent/glosa para un ZIP ya guardado en disco.
+    Lanza excepción si no se obtiene markdown o falla la vectorización.
+    """
+    from services.audit import get_audit_service
+    from services.embedding import EmbeddingService
+
+    zip_path = Path(zip_path)
+    if identificacion_reclamacion is None:
+        identificacion_reclamacion = zip_path.stem
+
+    markdown_content = extract_claim_markdown(zip_path, bypass_cache)
+    if not markdown_content:
+        raise ValueError("No se encontró upload.md - no se puede ejecutar auditoría")
+
+    audit_service = get_audit_service()
+    cache_key = audit_cache_key(audit_service, markdown_content, identificacion_reclamacion, audits)
+    audit_result = None if bypass_cache else audit_result_cache.get_result(cache_key)
+    if audit_result is not None:
+        audit_result.from_cache = True
+        return audit_result
+
+    vectorization_result = EmbeddingService().process_markdown_file(markdown_content, "glosa_audit.md")
+    file_id = vectorization_result.get("file_id")
+    if not file_id:
+        raise ValueError("No se pudo obtener file_id de la vectorización")
+
+    logger.info(f"[AUDIT][PIPELINE] Reclamación {identificacion_reclamacion} vectorizada. File ID: {file_id}")
+
+    audit_result = audit_service.run_full_medical_audit(
+        files_ids=[file_id],
+        identificacion_reclamacion=identificacion_reclamacion,
+        audits=audits,
+        markdown_content=markdown_content,
+        **AUDIT_RUN_PARAMS
+    )
+    audit_result_cache.set_result(cache_key, audit_result)
+    return audit_result
@@ -0,0 +1,100 @@
+"""
+Selección adaptativa del contexto de cada auditoría.
+
+En lugar de concatenar los k fragmentos recuperados y cortar el texto en
+max_context_chars, los candidatos se ordenan por similitud y se agregan completos
+mientras su similitud no caiga por debajo de una fracción de la del mejor fragmento
+(AUDIT_CONTEXT_MIN_RELATIVE_SCORE) y quepan en el presupuesto de tokens. Cada auditoría
+termina con los fragmentos que realmente aportan y el k elegido queda en su resultado.
+
+Los candidatos sin puntaje conservan el orden de recuperación y solo se limitan por
+presupuesto.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+from services.audit_mapreduce import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+TRUNCATED_MARKER = "...[contexto truncado]"
+
+STOP_SCORE = "score"
+STOP_BUDGET = "budget"
+STOP_EXHAUSTED = "exhausted"
+
+
+def similarity(document: Dict[str, Any]) -> Optional[float]:
+    """Similitud coseno de un fragmento a partir de su distancia (None si no tiene puntaje)."""
+    distance = document.get("score")
+    return 1.0 - float(distance) if distance is not None else None
+
+
+def pack_context(documents: List[Dict[str, Any]], max_context_chars: int,
+                 min_relative_score: Optional[float] = None,
+                 min_documents: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Arma el contexto con los fragmentos más relevantes que caben en el presupuesto.
+
+    Args:
+        documents: Fragmentos recuperados ({content, score=distancia coseno, ...})
+        max_context_chars: Presupuesto del contexto (se convierte a tokens, ≈ 4 caracteres por token)
+        min_relative_score: Fracción de la similitud del mejor fragmento por debajo de la cual
+            se deja de agregar (default: settings.AUDIT_CONTEXT_MIN_RELATIVE_SCORE)
+        min_documents: Fragmentos que se incluyen siempre que quepan, aunque caiga la
+            similitud (default: settings.AUDIT_CONTEXT_MIN_DOCUMENTS)
+
+    Returns:
+        {context, k_used, k_candidates, context_tokens, stop_reason}
+    """
+    if min_relative_score is None:
+        min_relative_score = settings.AUDIT_CONTEXT_MIN_RELATIVE_SCORE
+    if min_documents is None:
+        min_documents = settings.AUDIT_CONTEXT_MIN_DOCUMENTS
+    token_budget = max(1, max_context_chars // CHARS_PER_TOKEN)
+
+    # Orden por relevancia; los fragmentos sin puntaje mantienen su posición relativa al final
+    ranked = sorted(
+        enumerate(documents),
+        key=lambda item: (similarity(item[1]) is None, -(similarity(item[1]) or 0.0), item[0])
+    )
+    best = similarity(ranked[0][1]) if ranked else None
+    cutoff = best * min_relative_score if best is not None and best > 0 else None
+
+    selected: List[str] = []
+    seen = set()
+    used_tokens = 0
+    stop_reason = STOP_EXHAUSTED
+    for _, document in ranked:
+        content = (document.get("content") or "").strip()
+        if not content or content in seen:
+            continue
+        score = similarity(document)
+        if cutoff is not None and score is not None and score < cutoff and len(selected) >= min_documents:
+            stop_reason = STOP_SCORE
+            break
+        tokens = estimate_tokens(content)
+        if used_tokens + tokens > token_budget:
+            # Un fragmento más chico y menos relevante aún puede caber
+            stop_reason = STOP_BUDGET
+            continue
+        seen.add(content)
+        selected.append(content)
+        used_tokens += tokens
+
+    if not selected and ranked:
+        # Ningún fragmento cabe completo: se recorta el más relevante
+        content = (ranked[0][1].get("content") or "").strip()
+        selected.append(content[:max_context_chars] + TRUNCATED_MARKER)
+        used_tokens = token_budget
+        stop_reason = STOP_BUDGET
+
+    context = "\n\n".join(f"Documento {index}:\n{content}" for index, content in enumerate(selected, start=1))
+    return {
+        "context": context,
+        "k_used": len(selected),
+        "k_candidates": len(documents),
+        "context_tokens": used_tokens,
+        "stop_reason": stop_reason,
+    }
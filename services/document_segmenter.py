@@ -0,0 +1,121 @@
+"""
+Segmentador de reclamaciones por tipo de documento.
+
+Clasifica cada página del markdown del OCR ("## Página N") en un tipo de documento
+(factura, historia clínica, epicrisis, órdenes médicas, resultados de exámenes, FURIPS,
+SOAT, RUT, factura de proveedor) a partir de los títulos de su encabezado y agrupa las
+páginas consecutivas del mismo tipo en segmentos con rango de páginas y de caracteres.
+Los segmentos se guardan en RAG_SEGMENTS al ingerir el archivo y SP_RAG_EMBEDDING
+etiqueta cada fragmento de RAG_DOCS con su SEGMENT_TYPE según su CHUNK_OFFSET.
+"""
+import re
+import logging
+from typing import Any, Dict, List
+
+from services.glosas_catalog import normalize_key
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_OTHER = "otro"
+
+# Títulos que identifican cada tipo de documento, en orden de prioridad ante empates
+SEGMENT_SIGNATURES: Dict[str, List[str]] = {
+    "furips": ["formulario unico de reclamacion", "furips", "furtran"],
+    "rut": ["registro unico tributario", "formulario del rut"],
+    "soat": ["seguro obligatorio de accidentes de transito", "poliza soat", "certificado soat"],
+    "factura": ["factura electronica de venta", "factura electronica", "fecha factura", "factura de venta", "cufe"],
+    "epicrisis": ["epicrisis"],
+    "resultados_examenes": ["valores de referencia", "hematologia", "microbiologia", "imagenologia",
+                            "laboratorio clinico", "examen :"],
+    "ordenes_medicas": ["hoja de tratamiento", "ordenes medicas", "orden medica", "formula medica",
+                        "administracion de medicamentos", "control de medicamentos"],
+    "historia_clinica": ["historia clinica", "ingreso a uci", "informe quirurgico", "nota de anestesi",
+                         "nota operatoria", "evolucion", "triage", "enfermeria"],
+}
+
+SEGMENT_TYPES = list(SEGMENT_SIGNATURES) + ["factura_proveedor", SEGMENT_OTHER]
+
+# Caracteres del inicio de cada página donde se buscan los títulos
+_HEADER_CHARS = 1500
+
+# Una factura cuyo cliente no es ADRES es la factura de un proveedor (MAOS)
+_ADRES_MARKERS = ["901037916", "adres", "administradora de los recursos"]
+
+_PAGE_RE = re.compile(r"^#{1,3}\s*P[áa]gina\s+(\d+)\b.*$", re.MULTILINE | re.IGNORECASE)
+
+
+def split_pages(markdown_content: str) -> List[Dict[str, Any]]:
+    """
+    Divide el markdown por los encabezados de página del OCR.
+
+    Returns:
+        Lista de páginas {page, start, end, text}; page es None para el texto previo al
+        primer encabezado o si el documento no tiene encabezados.
+    """
+    markdown_content = markdown_content or ""
+    matches = list(_PAGE_RE.finditer(markdown_content))
+    if not matches:
+        return [{"page": None, "start": 0, "end": len(markdown_content), "text": markdown_content}]
+
+    pages = []
+    if matches[0].start() > 0 and markdown_content[:matches[0].start()].strip():
+        pages.append({"page": None, "start": 0, "end": matches[0].start(),
+                      "text": markdown_content[:matches[0].start()]})
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(markdown_content)
+        pages.append({"page": int(match.group(1)), "start": match.start(), "end": end,
+                      "text": markdown_content[match.start():end]})
+    return pages
+
+
+def classify_page(page_text: str) -> str:
+    """
+    Tipo de documento de una página según el título que aparece primero en su encabezado.
+    Retorna SEGMENT_OTHER si ningún título coincide.
+    """
+    normalized = normalize_key(page_text)
+    header = normalized[:_HEADER_CHARS]
+
+    best_type, best_position = None, None
+    for segment_type, signatures in SEGMENT_SIGNATURES.items():
+        positions = [header.find(signature) for signature in signatures if signature in header]
+        if positions and (best_position is None or min(positions) < best_position):
+            best_type, best_position = segment_type, min(positions)
+
+    if best_type is None:
+        return SEGMENT_OTHER
+    if best_type == "factura" and not any(marker in normalized for marker in _ADRES_MARKERS):
+        return "factura_proveedor"
+    return best_type
+
+
+def segment_document(markdown_content: str) -> List[Dict[str, Any]]:
+    """
+    Segmenta el documento por tipo. Las páginas sin título reconocible (continuaciones,
+    imágenes escaneadas) heredan el tipo de la página anterior.
+
+    Returns:
+        Lista de segmentos {segment_type, page_start, page_end, char_start, char_end}
+        con offsets de caracteres en base 0 y char_end exclusivo.
+    """
+    segments: List[Dict[str, Any]] = []
+    for page in split_pages(markdown_content):
+        segment_type = classify_page(page["text"])
+        if segment_type == SEGMENT_OTHER and segments:
+            segment_type = segments[-1]["segment_type"]
+
+        if segments and segments[-1]["segment_type"] == segment_type:
+            segments[-1]["page_end"] = page["page"] if page["page"] is not None else segments[-1]["page_end"]
+            segments[-1]["char_end"] = page["end"]
+        else:
+            segments.append({
+                "segment_type": segment_type,
+                "page_start": page["page"],
+                "page_end": page["page"],
+                "char_start": page["start"],
+                "char_end": page["end"],
+            })
+
+    logger.info(f"[SEGMENTER] Documento segmentado en {len(segments)} segmentos: "
+                f"{', '.join(sorted({segment['segment_type'] for segment in segments}))}")
+    return segments
@@ -11,6 +11,8 @@ from schemas.oci_files import RAGFilesShema
 from services.oci_bucket import OCIClient
 from database import RAGFilesDB, RAGDocsDB
 from services.ocr_mineru import process_file as ocr_process_file
+from services.document_segmenter import segment_document
+from services.answer_cache import audit_answer_cache
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +39,20 @@ class EmbeddingService:
             logger.error(f"[OCI][RAG] Error al inicializar Agente: {str(e)}")
             raise
     
+    def _index_segments(self, file_id: int, text: str):
+        """Registra los segmentos por tipo de documento antes de generar los embeddings."""
+        if not settings.AUDIT_SEGMENT_INDEX_ENABLED or not file_id or not text:
+            return
+        try:
+            self.rag_docs_db.insert_segments(file_id, segment_document(text))
+        except Exception as e:
+            logger.error(f"[OCI][RAG] Error segmentando el archivo con ID {file_id}: {str(e)}")
+
+    def _embed_file(self, file_id: int):
+        """Genera los embeddings del archivo e invalida las respuestas en caché que lo usan."""
+        self.rag_docs_db.call_embedding_procedure(file_id)
+        audit_answer_cache.invalidate_files([file_id])
+
     def process_file(self, file_path: str) -> dict:
         """Procesa un archivo desde OCI Object Storage y devuelve un objeto tipo OCIObjectRAG."""
         try:
@@ -85,8 +101,9 @@ class EmbeddingService:
             # Insertar archivo en la base de datos
             file_id = self.rag_files_db.insert_file(file_data)            
                         
-            # Generar embeddings vectoriales
-            self.rag_docs_db.call_embedding_procedure(file_id)
+            # Segmentar por tipo de documento y generar embeddings vectoriales
+            self._index_segments(file_id, ocr_result.get('file_trg_extraction'))
+            self._embed_file(file_id)
 
             # Eliminar archivo temporal
             Path(temp_file_path).unlink(missing_ok=True)
@@ -160,8 +177,9 @@ class EmbeddingService:
             # Insertar archivo en la base de datos
             file_id = self.rag_files_db.insert_file(file_data)            
                         
-            # Generar embeddings vectoriales
-            self.rag_docs_db.call_embedding_procedure(file_id)
+            # Segmentar por tipo de documento y generar embeddings vectoriales
+            self._index_segments(file_id, file_trg_extraction)
+            self._embed_file(file_id)
             
             # Construir respuesta compatible con backend.schemas.oci_bucket.OCIObjectRAG
             return {
@@ -232,8 +250,9 @@ class EmbeddingService:
             # Insertar archivo en la base de datos
             file_id = self.rag_files_db.insert_file(file_data)            
                         
-            # Generar embeddings vectoriales
-            self.rag_docs_db.call_embedding_procedure(file_id)
+            # Segmentar por tipo de documento y generar embeddings vectoriales
+            self._index_segments(file_id, file_trg_extraction)
+            self._embed_file(file_id)
             
             # Construir respuesta compatible con backend.schemas.oci_bucket.OCIObjectRAG
             return {
@@ -272,6 +291,7 @@ class EmbeddingService:
         """
         try:
             self.rag_docs_db.delete_embeddings(file_id)
+            audit_answer_cache.invalidate_files([file_id])
             logger.info(f"[OCI][RAG] Embeddings eliminados para el archivo con ID: {file_id}")
         except Exception as e:
             logger.error(f"[OCI][RAG] Error al eliminar embeddings para el archivo con ID {file_id}: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,233 @@
+"""
+Caché de embeddings de consultas delante del cliente de OCI Generative AI.
+
+El motor de auditoría embebe en cada reclamación las mismas consultas fijas (search_queries
+de las auditorías especializadas y especiales, "Tipo: ... glosa detalle segmento" del
+catálogo de glosas); cada una es una llamada remota. CachedEmbeddings implementa la
+interfaz Embeddings de LangChain y responde desde una caché LRU con TTL direccionada por
+(modelo, texto normalizado): solo los textos ausentes se envían al cliente real, en un
+único lote.
+
+Opcionalmente (EMBEDDING_CACHE_PATH) los vectores se guardan también en SQLite, de modo
+que la caché sobrevive a los reinicios. Un error del almacenamiento en disco se informa en
+el log y no afecta la búsqueda.
+"""
+import time
+import array
+import sqlite3
+import logging
+import threading
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from core.config import settings
+from services.audit_cache import TTLCache, sha256_text
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_embeddings (
+    cache_key   TEXT PRIMARY KEY,
+    model_id    TEXT NOT NULL,
+    vector      BLOB NOT NULL,
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_query_embeddings_created ON query_embeddings (created_at);
+"""
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings con caché LRU + TTL en memoria y persistencia opcional en SQLite (thread-safe)."""
+
+    def __init__(self, embeddings: Embeddings, model_id: str, max_entries: int, ttl_seconds: int,
+                 db_path: Optional[str] = None):
+        self.embeddings = embeddings
+        self.model_id = model_id
+        self.ttl_seconds = ttl_seconds
+        self._vectors = TTLCache(max_entries, ttl_seconds)
+        self._db_path = Path(db_path) if db_path else None
+        self._db_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.disk_hits = 0
+        self.remote_calls = 0
+        self.remote_texts = 0
+        if self._db_path is not None:
+            self._init_db()
+
+    # ------------------------------------------------------------------ #
+    # Claves
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Texto en forma Unicode NFC y sin espacios sobrantes (es también el que se embebe)."""
+        return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+    def build_key(self, normalized_text: str) -> str:
+        return sha256_text(f"{self.model_id}|{normalized_text}")
+
+    # ------------------------------------------------------------------ #
+    # Persistencia
+    # ------------------------------------------------------------------ #
+    @contextmanager
+    def _session(self):
+        """Conexión SQLite por operación: confirma al salir (o revierte ante error) y se cierra."""
+        conn = sqlite3.connect(str(self._db_path), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        """Crea la tabla y descarta los vectores vencidos y los que exceden el tamaño máximo."""
+        try:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._db_lock, self._session() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                if self.ttl_seconds:
+                    conn.execute("DELETE FROM query_embeddings WHERE created_at < ?",
+                                 (time.time() - self.ttl_seconds,))
+                conn.execute(
+                    """DELETE FROM query_embeddings WHERE cache_key NOT IN (
+                           SELECT cache_key FROM query_embeddings ORDER BY created_at DESC LIMIT ?)""",
+                    (self._vectors.max_entries,)
+                )
+                stored = conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            logger.info(f"[EMBEDDINGS][CACHE] Caché persistente en {self._db_path} [entries={stored}]")
+        except Exception as e:
+            logger.error(f"[EMBEDDINGS][CACHE] No se pudo abrir la caché persistente {self._db_path}: {str(e)}")
+            self._db_path = None
+
+    def _load(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Vectores vigentes guardados en disco para las claves indicadas."""
+        if self._db_path is None or not keys:
+            return {}
+        min_created_at = time.time() - self.ttl_seconds if self.ttl_seconds else 0
+        try:
+            with self._session() as conn:
+                rows = conn.execute(
+                    f"SELECT cache_key, vector FROM query_embeddings "
+                    f"WHERE cache_key IN ({', '.join('?' for _ in keys)}) AND created_at >= ?",
+                    (*keys, min_created_at)
+                ).fetchall()
+        except Exception as e:
+            logger.error(f"[EMBEDDINGS][CACHE] Error leyendo la caché persistente: {str(e)}")
+            return {}
+        return {key: array.array("d", blob).tolist() for key, blob in rows}
+
+    def _store(self, entries: Dict[str, List[float]]) -> None:
+        if self._db_path is None or not entries:
+            return
+        now = time.time()
+        rows = [(key, self.model_id, array.array("d", vector).tobytes(), now) for key, vector in entries.items()]
+        try:
+            with self._db_lock, self._session() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO query_embeddings (cache_key, model_id, vector, created_at) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+        except Exception as e:
+            logger.error(f"[EMBEDDINGS][CACHE] Error guardando en la caché persistente: {str(e)}")
+
+    # ------------------------------------------------------------------ #
+    # Interfaz Embeddings
+    # ------------------------------------------------------------------ #
+    def _embed(self, texts: List[str], query: bool) -> List[List[float]]:
+        normalized = [self.normalize_text(text) for text in texts]
+        keys = [self.build_key(text) for text in normalized]
+
+        found: Dict[str, List[float]] = {}
+        for key in dict.fromkeys(keys):
+            vector = self._vectors.get(key)
+            if vector is not None:
+                found[key] = vector
+
+        stored = self._load([key for key in dict.fromkeys(keys) if key not in found])
+        for key, vector in stored.items():
+            self._vectors.set(key, vector)
+        found.update(stored)
+
+        # Textos ausentes, sin repetir, en el orden de entrada
+        pending = {key: text for key, text in zip(keys, normalized) if key not in found}
+        if pending:
+            pending_texts = list(pending.values())
+            if query and len(pending_texts) == 1:
+                vectors = [self.embeddings.embed_query(pending_texts[0])]
+            else:
+                vectors = self.embeddings.embed_documents(pending_texts)
+            computed = dict(zip(pending, vectors))
+            for key, vector in computed.items():
+                self._vectors.set(key, vector)
+            self._store(computed)
+            found.update(computed)
+
+        with self._stats_lock:
+            self.disk_hits += len(stored)
+            if pending:
+                self.remote_calls += 1
+                self.remote_texts += len(pending)
+        logger.debug(f"[EMBEDDINGS][CACHE] {len(texts)} texto(s): {len(pending)} embebido(s) remotamente, "
+                     f"{len(stored)} desde disco")
+
+        return [list(found[key]) for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts), query=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], query=True)[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Aciertos (memoria y disco), textos embebidos remotamente y ocupación de la caché."""
+        memory_hits = self._vectors.hits
+        with self._stats_lock:
+            disk_hits = self.disk_hits
+            remote_calls = self.remote_calls
+            remote_texts = self.remote_texts
+        lookups = memory_hits + disk_hits + remote_texts
+        return {
+            "enabled": True,
+            "model_id": self.model_id,
+            "entries": len(self._vectors),
+            "max_entries": self._vectors.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": self._db_path is not None,
+            "memory_hits": memory_hits,
+            "disk_hits": disk_hits,
+            "misses": remote_texts,
+            "remote_calls": remote_calls,
+            "hit_rate": round((memory_hits + disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        """Vacía la caché en memoria y la persistente."""
+        self._vectors.clear()
+        if self._db_path is None:
+            return
+        try:
+            with self._db_lock, self._session() as conn:
+                conn.execute("DELETE FROM query_embeddings")
+        except Exception as e:
+            logger.error(f"[EMBEDDINGS][CACHE] Error vaciando la caché persistente: {str(e)}")
+
+
+def cached_embeddings(embeddings: Embeddings) -> Embeddings:
+    """
+    Envuelve el cliente de embeddings con la caché configurada (EMBEDDING_CACHE_*), o lo
+    retorna tal cual si la caché está deshabilitada. El modelo de la clave incluye el
+    backend, para que los vectores simulados no se mezclen con los reales en disco.
+    """
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return embeddings
+    return CachedEmbeddings(
+        embeddings,
+        model_id    = f"{settings.LLM_BACKEND}:{settings.CON_GEN_AI_EMB_MODEL_ID}",
+        max_entries = settings.EMBEDDING_CACHE_MAX_ENTRIES,
+        ttl_seconds = settings.EMBEDDING_CACHE_TTL_SECONDS,
+        db_path     = settings.EMBEDDING_CACHE_PATH or None,
+    )
@@ -0,0 +1,210 @@
+"""
+Catálogo en memoria de las glosas oficiales (HERRAMIENTA_NOTAS_ACLARATORIAS).
+
+El documento de glosas se parsea una sola vez a entradas tipadas e indexadas por
+Tipo, Segmento y código. Solo se vuelve a parsear cuando cambia la versión del
+archivo fuente (AUDIT_GLOSAS_FILE_ID) en RAG_FILES.
+"""
+import os
+import re
+import time
+import logging
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+
+from core.config import settings
+from database.rag_files import RAGFilesDB
+from schemas.audit import GlosaCatalogEntry
+
+logger = logging.getLogger(__name__)
+
+# Encabezado de cada glosa y campos "- **Campo:** valor" del documento oficial
+_GLOSA_HEADER_RE = re.compile(r"^###\s*Glosa:\s*(\S+)", re.MULTILINE)
+_FIELD_RE = re.compile(r"^-\s*\*\*(?P<name>[^*]+?):\*\*\s*(?P<value>.*)$")
+
+_FIELD_MAP = {
+    "tipo": "tipo",
+    "segmento": "segmento",
+    "detalle de glosa": "detalle",
+    "glosa a reclamacion": "glosa_a_reclamacion",
+    "glosa a item": "glosa_a_reclamacion",
+    "contexto": "contexto",
+    "observacion": "observaciones",
+    "observacion.1": "observaciones",
+}
+
+
+def normalize_key(value: str) -> str:
+    """Normaliza un texto para indexar: minúsculas, sin tildes y sin espacios sobrantes."""
+    if not value:
+        return ""
+    text = unicodedata.normalize("NFKD", value)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+def parse_glosas_markdown(text: str) -> List[GlosaCatalogEntry]:
+    """
+    Parsea el markdown del catálogo de glosas a entradas tipadas.
+    Soporta campos multilínea (viñetas ●) y códigos repetidos como entradas distintas.
+    """
+    entries: List[GlosaCatalogEntry] = []
+    if not text:
+        return entries
+
+    headers = list(_GLOSA_HEADER_RE.finditer(text))
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        body = text[header.end():end]
+
+        fields: Dict[str, List[str]] = {}
+        aplica_a = ""
+        current: Optional[str] = None
+
+        for raw_line in body.splitlines():
+            line = raw_line.strip()
+            if line == "---":
+                current = None
+                continue
+
+            match = _FIELD_RE.match(line)
+            if match:
+                name = normalize_key(match.group("name"))
+                current = _FIELD_MAP.get(name)
+                if current is None:
+                    continue
+                if name == "glosa a item":
+                    aplica_a = "item"
+                elif name == "glosa a reclamacion":
+                    aplica_a = aplica_a or "reclamacion"
+                fields.setdefault(current, []).append(match.group("value").strip())
+            elif current and line:
+                # Continuación de un campo multilínea
+                fields[current][-1] = f"{fields[current][-1]}\n{line}".strip()
+
+        values = {key: "\n".join(v for v in parts if v) for key, parts in fields.items()}
+        if not values.get("detalle"):
+            logger.warning(f"[AUDIT][GLOSAS] Glosa {header.group(1)} sin detalle, ignorada")
+            continue
+
+        entries.append(GlosaCatalogEntry(codigo=header.group(1), aplica_a=aplica_a, **values))
+
+    return entries
+
+
+class GlosasCatalog:
+    """Catálogo de glosas oficiales parseado e indexado en memoria."""
+
+    def __init__(self, file_id: Optional[int] = None):
+        self.file_id = file_id if file_id is not None else settings.AUDIT_GLOSAS_FILE_ID
+        self.rag_files = RAGFilesDB()
+        self._lock = threading.Lock()
+        self._entries: List[GlosaCatalogEntry] = []
+        self._by_tipo: Dict[str, List[GlosaCatalogEntry]] = {}
+        self._by_segmento: Dict[str, List[GlosaCatalogEntry]] = {}
+        self._by_codigo: Dict[str, List[GlosaCatalogEntry]] = {}
+        self._version: Optional[str] = None
+        self._last_check = 0.0
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._version
+
+    @property
+    def entries(self) -> List[GlosaCatalogEntry]:
+        self._ensure_fresh()
+        return list(self._entries)
+
+    def _index(self, entries: List[GlosaCatalogEntry], version: str) -> None:
+        """Reemplaza atómicamente las entradas e índices del catálogo."""
+        by_tipo: Dict[str, List[GlosaCatalogEntry]] = {}
+        by_segmento: Dict[str, List[GlosaCatalogEntry]] = {}
+        by_codigo: Dict[str, List[GlosaCatalogEntry]] = {}
+
+        for entry in entries:
+            by_tipo.setdefault(normalize_key(entry.tipo), []).append(entry)
+            by_codigo.setdefault(entry.codigo, []).append(entry)
+            # Segmentos compuestos ("Financiero / Medico") se indexan en cada parte
+            for segmento in entry.segmento.split("/"):
+                if segmento.strip():
+                    by_segmento.setdefault(normalize_key(segmento), []).append(entry)
+
+        self._entries = entries
+        self._by_tipo = by_tipo
+        self._by_segmento = by_segmento
+        self._by_codigo = by_codigo
+        self._version = version
+
+    def _load_local(self) -> bool:
+        """Carga el catálogo desde el respaldo local (solo si aún no hay datos)."""
+        path = settings.AUDIT_GLOSAS_LOCAL_PATH
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            self._index(parse_glosas_markdown(text), f"local|{os.path.getmtime(path)}")
+            logger.info(f"[AUDIT][GLOSAS] Catálogo cargado desde respaldo local {path}: {len(self._entries)} glosas")
+            return True
+        except Exception as e:
+            logger.error(f"[AUDIT][GLOSAS] Error cargando respaldo local {path}: {str(e)}")
+            return False
+
+    def load(self, force: bool = False) -> bool:
+        """
+        Carga (o recarga) el catálogo desde RAG_FILES si la versión del archivo cambió.
+        """
+        with self._lock:
+            # Otro hilo pudo haber verificado la versión mientras se esperaba el lock
+            now = time.monotonic()
+            if not force and self._last_check and now - self._last_check < settings.AUDIT_GLOSAS_REFRESH_SECONDS:
+                return False
+            self._last_check = now
+
+            version = self.rag_files.get_file_version(self.file_id)
+            if version is None:
+                if not self._entries:
+                    return self._load_local()
+                return False
+            if not force and version == self._version:
+                return False
+
+            data = self.rag_files.get_file_extraction(self.file_id)
+            if not data or not data.get("file_trg_extraction"):
+                logger.warning(f"[AUDIT][GLOSAS] Archivo {self.file_id} sin extracción disponible")
+                if not self._entries:
+                    return self._load_local()
+                return False
+
+            entries = parse_glosas_markdown(data["file_trg_extraction"])
+            self._index(entries, data["file_version"])
+            logger.info(f"[AUDIT][GLOSAS] Catálogo cargado [file_id={self.file_id}] [version={self._version}]: {len(entries)} glosas, {len(self._by_tipo)} tipos")
+            return True
+
+    def _ensure_fresh(self) -> None:
+        """Verifica la versión del archivo fuente como máximo cada AUDIT_GLOSAS_REFRESH_SECONDS."""
+        if self._last_check and time.monotonic() - self._last_check < settings.AUDIT_GLOSAS_REFRESH_SECONDS:
+            return
+        try:
+            self.load()
+        except Exception as e:
+            logger.error(f"[AUDIT][GLOSAS] Error refrescando catálogo de glosas: {str(e)}")
+
+    def get_by_tipo(self, tipo: str) -> List[GlosaCatalogEntry]:
+        """Glosas cuyo Tipo coincide (sin distinguir tildes ni mayúsculas)."""
+        self._ensure_fresh()
+        return list(self._by_tipo.get(normalize_key(tipo), []))
+
+    def get_by_segmento(self, segmento: str) -> List[GlosaCatalogEntry]:
+        """Glosas de un segmento (los segmentos compuestos aparecen en cada parte)."""
+        self._ensure_fresh()
+        return list(self._by_segmento.get(normalize_key(segmento), []))
+
+    def get_by_codigo(self, codigo: str) -> List[GlosaCatalogEntry]:
+        """Todas las entradas de un código (p. ej. 2102 tiene varias)."""
+        self._ensure_fresh()
+        return list(self._by_codigo.get(str(codigo).strip(), []))
+
+
+glosas_catalog = GlosasCatalog()
@@ -0,0 +1,540 @@
+"""
+Validaciones numéricas sobre las tablas de facturas extraídas por el OCR.
+
+MinerU entrega cada tabla como HTML (<table>) dentro del markdown, por página. Este
+módulo convierte las filas de las facturas en arreglos numéricos (código, cantidad, valor
+unitario, subtotal) y calcula en bloque:
+
+- Consistencia de cada línea: cantidad × valor unitario = subtotal.
+- Totales declarados (SUBTOTAL / TOTAL) frente a la suma de las líneas que los preceden.
+- Variación de precio de los materiales de osteosíntesis (MAOS) de la factura de la IPS
+  frente a la factura del proveedor (máximo settings.AUDIT_MAOS_MAX_VARIANCE).
+
+Los hallazgos se agregan al contexto de las auditorías de FACTURA y MAOS como indicios
+que el LLM contrasta con el documento. Solo se informan descuadres de líneas cuya
+cantidad, valor unitario y subtotal se leyeron de columnas numéricas; las cantidades
+tomadas de la descripción ("X 25 ML", "1 GR") no se verifican.
+"""
+import re
+import logging
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from schemas.audit import AuditResponse, AuditType
+from services.document_segmenter import segment_document, split_pages
+from services.glosas_catalog import normalize_key
+
+logger = logging.getLogger(__name__)
+
+IPS_SEGMENT = "factura"
+SUPPLIER_SEGMENT = "factura_proveedor"
+
+# Tolerancia de redondeo al comparar valores: máx(1 peso, 0.5 %)
+_ABSOLUTE_TOLERANCE = 1.0
+_RELATIVE_TOLERANCE = 0.005
+
+# Cantidad máxima plausible de una línea de factura
+_MAX_QUANTITY = 10000
+
+# Rango de la razón IPS / proveedor dentro del cual dos líneas se consideran el mismo material
+_MATCH_RATIO_RANGE = (0.5, 2.0)
+
+# Términos de la descripción que identifican materiales de osteosíntesis (sin espacios, el
+# OCR suele partir las palabras: "TOR NILLO AUTORROS CANTE")
+_MAOS_TERMS = [
+    "osteosintesis", "placa", "tornillo", "alambre", "cerclaje", "clavo", "grapa", "malla",
+    "arandela", "tuerca", "perno", "anclaje", "fijador", "protesis", "implante", "injerto",
+]
+
+_TABLE_RE = re.compile(r"<table\b.*?</table>", re.IGNORECASE | re.DOTALL)
+_NUMBER_RE = re.compile(r"(?<![\w.,/:\-])(\$\s?)?(\d[\d.,]*\d|\d)(?![\w/:\-])")
+_CODE_RE = re.compile(r"\b(?=[A-Z0-9_\-]*\d)(?:[A-Z]+\d[A-Z0-9]*(?:[_\-][A-Z0-9]+)*|\d+(?:[_\-][A-Z0-9]+)+|[1-9]\d{3,})\b")
+_LETTERS_RE = re.compile(r"[A-Za-zÁÉÍÓÚÑáéíóúñ]{3,}")
+_TOTAL_LABEL_RE = re.compile(r"\b(sub\s*total|total|neto a pagar|valor a pagar)\b")
+_HEADER_RE = re.compile(r"\b(cantidad|cant)\b")
+_AMOUNT_TEXT_RE = re.compile(r"\$?\s?\d{1,3}(?:[.,]\d{3})+(?:[.,]\d{1,2})?|\b\d+[.,]\d{2}\b")
+_AMOUNT_LABELS_RE = re.compile(r"\b(cantidad|valor|sub\s*total)\b", re.IGNORECASE)
+_NUMERIC_CELL_RE = re.compile(r"[\s$\d.,_]*\d[\s$\d.,_]*")
+
+# Cantidad máxima que se infiere de una fila con solo dos columnas numéricas (cantidad y
+# valor total, sin valor unitario): sin separador de miles
+_MAX_INFERRED_QUANTITY = 999
+
+
+class _TableParser(HTMLParser):
+    """Filas de una tabla HTML como listas de textos de celda."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: List[List[str]] = []
+        self._cell: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self.rows.append([])
+        elif tag in ("td", "th"):
+            if not self.rows:
+                self.rows.append([])
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th") and self._cell is not None:
+            self.rows[-1].append(" ".join("".join(self._cell).split()))
+            self._cell = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def parse_amount(token: str) -> Optional[Tuple[float, bool]]:
+    """
+    Interpreta un número de factura en formato 1,234.56 / 1.234,56 / 1234 / $ 940,580.
+
+    Returns:
+        (valor, con_formato_de_valor) o None si no es un número válido (fechas, rangos).
+        con_formato_de_valor indica separadores de miles, dos decimales o signo $.
+    """
+    has_currency = token.startswith("$")
+    digits = token.lstrip("$").strip()
+    separators = [char for char in digits if char in ".,"]
+    if not separators:
+        return float(digits), has_currency
+
+    if "," in separators and "." in separators:
+        decimal_separator = digits[max(digits.rfind(","), digits.rfind("."))]
+        thousands_separator = "," if decimal_separator == "." else "."
+        integer_part, _, decimals = digits.rpartition(decimal_separator)
+        groups = integer_part.split(thousands_separator)
+        if decimal_separator in integer_part or len(decimals) > 2:
+            return None
+    else:
+        separator = separators[0]
+        parts = digits.split(separator)
+        if len(parts) == 2 and len(parts[1]) in (1, 2):
+            return float(f"{parts[0]}.{parts[1]}"), True
+        groups, decimals = parts, ""
+
+    if not 1 <= len(groups[0]) <= 3 or any(len(group) != 3 for group in groups[1:]):
+        return None
+    value = float("".join(groups) + (f".{decimals}" if decimals else ""))
+    return value, True
+
+
+def _row_numbers(text: str) -> List[Tuple[float, bool]]:
+    # Un guion bajo aislado antes del número es ruido del OCR ("_90,400.00"); en códigos ("7035_M") se conserva
+    text = re.sub(r"(?<!\w)_+", " ", text)
+    numbers = []
+    for match in _NUMBER_RE.finditer(text):
+        parsed = parse_amount(f"{match.group(1) or ''}{match.group(2)}")
+        if parsed is not None:
+            numbers.append((parsed[0], parsed[1] or bool(match.group(1))))
+    return numbers
+
+
+def _cell_numbers(cells: List[str]) -> List[Tuple[float, bool, int, bool]]:
+    """
+    Números de una fila en orden de aparición: (valor, con_formato_de_valor, celda,
+    celda_numérica). Una celda es numérica si solo contiene números (una columna de
+    cantidad o valores, no la descripción).
+    """
+    numbers = []
+    for cell_index, cell in enumerate(cells):
+        numeric_cell = bool(_NUMERIC_CELL_RE.fullmatch(cell or ""))
+        for value, formatted in _row_numbers(cell or ""):
+            numbers.append((value, formatted, cell_index, numeric_cell))
+    return numbers
+
+
+def _within_tolerance(expected: float, actual: float) -> bool:
+    return abs(expected - actual) <= max(_ABSOLUTE_TOLERANCE, _RELATIVE_TOLERANCE * abs(actual))
+
+
+def parse_line(cells: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Interpreta una fila como línea de factura (cantidad, valor unitario, subtotal).
+
+    Las celdas del OCR llegan combinadas ("0.00 3,694,300.00"), por lo que se busca la
+    terna (cantidad, valor, subtotal) en orden de aparición que cuadra; si ninguna cuadra
+    se toman los dos últimos valores como valor y subtotal y la línea queda inconsistente.
+    Una fila con solo dos columnas numéricas, una cantidad sin separador de miles y un
+    valor ("6.00 | 294,000.00"), se lee como cantidad y valor total.
+
+    verified indica que cantidad, valor unitario y subtotal se leyeron de columnas
+    numéricas y son plausibles; las cantidades tomadas de la descripción ("X 25 ML") o
+    supuestas no lo son.
+    Retorna None si la fila no tiene al menos dos valores con formato de moneda.
+    """
+    text = " ".join(cell for cell in cells if cell)
+    numbers = _cell_numbers(cells)
+    amounts = [index for index, (value, formatted, _, _) in enumerate(numbers) if formatted and value > 0]
+    if len(amounts) < 2:
+        return None
+
+    def _is_quantity(index: int) -> bool:
+        value = numbers[index][0]
+        return 0 < value <= _MAX_QUANTITY and float(value).is_integer()
+
+    def _from_column(*indexes: int) -> bool:
+        return all(numbers[index][3] for index in indexes)
+
+    quantity, unit_value, subtotal, verified = None, None, None, False
+    for subtotal_index in reversed(amounts):
+        for unit_index in reversed([index for index in amounts if index < subtotal_index]):
+            for quantity_index in reversed(range(unit_index)):
+                if not _is_quantity(quantity_index):
+                    continue
+                if _within_tolerance(numbers[quantity_index][0] * numbers[unit_index][0], numbers[subtotal_index][0]):
+                    quantity, unit_value, subtotal = (numbers[quantity_index][0], numbers[unit_index][0],
+                                                      numbers[subtotal_index][0])
+                    verified = _from_column(quantity_index, unit_index, subtotal_index)
+                    break
+            if quantity is not None:
+                break
+        if quantity is not None:
+            break
+
+    numeric_cells = [index for index, cell in enumerate(cells) if _NUMERIC_CELL_RE.fullmatch(cell or "")]
+    column_numbers = [index for index, number in enumerate(numbers) if number[3]]
+    # Las filas sin descripción son fragmentos de una línea partida por el OCR
+    described = any(_LETTERS_RE.search(cell or "") for cell in cells)
+    if quantity is None and described and len(numeric_cells) == 2 and len(column_numbers) == 2:
+        first, last = column_numbers
+        if (numbers[first][2] != numbers[last][2] and _is_quantity(first)
+                and numbers[first][0] <= _MAX_INFERRED_QUANTITY and numbers[last][0] > numbers[first][0]):
+            quantity, subtotal = numbers[first][0], numbers[last][0]
+            unit_value, verified = subtotal / quantity, True
+
+    if quantity is None:
+        unit_index, subtotal_index = amounts[-2], amounts[-1]
+        unit_value, subtotal = numbers[unit_index][0], numbers[subtotal_index][0]
+        quantities = [index for index in range(unit_index) if _is_quantity(index)]
+        if not quantities and unit_value != subtotal:
+            # Fila incompleta (celdas partidas en varias filas): no es una línea confiable
+            return None
+        quantity = numbers[quantities[-1]][0] if quantities else 1.0
+        # Un subtotal menor que el valor unitario es una lectura del OCR con dígitos perdidos
+        verified = (bool(quantities) and _from_column(quantities[-1], unit_index, subtotal_index)
+                    and subtotal >= unit_value)
+        # Columnas "Valor" y "Vr. Prestadora" con el total de la línea (sin valor unitario)
+        if unit_value == subtotal and quantity > 1:
+            unit_value = subtotal / quantity
+
+    code_match = _CODE_RE.search(text)
+    code = code_match.group(0) if code_match else ""
+    description = " ".join(
+        cell for cell in cells if _LETTERS_RE.search(cell) and cell != code
+    ).replace(code, "")
+    description = _AMOUNT_LABELS_RE.sub(" ", _AMOUNT_TEXT_RE.sub(" ", description))
+    return {
+        "code": code,
+        "description": " ".join(description.split()).strip(" -|>:")[:80],
+        "quantity": quantity,
+        "unit_value": unit_value,
+        "subtotal": subtotal,
+        "verified": verified,
+    }
+
+
+def _declared_total(cells: List[str]) -> Optional[float]:
+    amounts = [value for value, formatted in _row_numbers(" ".join(cells)) if formatted and value > 0]
+    return amounts[-1] if len(amounts) == 1 else None
+
+
+def extract_invoice_tables(markdown_content: str) -> List[Dict[str, Any]]:
+    """
+    Tablas HTML de las páginas de facturas (IPS y proveedor).
+
+    Returns:
+        Lista de {page, segment_type, rows} en orden del documento
+    """
+    segments = segment_document(markdown_content)
+    tables = []
+    for page in split_pages(markdown_content):
+        segment_type = next(
+            (segment["segment_type"] for segment in segments
+             if segment["char_start"] <= page["start"] < segment["char_end"]),
+            None
+        )
+        if segment_type not in (IPS_SEGMENT, SUPPLIER_SEGMENT):
+            continue
+        for table_html in _TABLE_RE.findall(page["text"]):
+            parser = _TableParser()
+            parser.feed(table_html)
+            tables.append({"page": page["page"], "segment_type": segment_type, "rows": parser.rows})
+    return tables
+
+
+def build_invoice_frames(tables: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, np.ndarray]], List[Dict[str, Any]]]:
+    """
+    Líneas de factura por tipo de segmento como arreglos columnares y totales declarados.
+
+    Un total declarado (fila SUBTOTAL / TOTAL con un único valor, o un valor suelto tras
+    una etiqueta de subtotal) se compara con la suma de las líneas que lo preceden en el
+    mismo segmento: un subtotal desde el último encabezado de grupo ("Cantidad") o
+    subtotal; un total desde el inicio de la factura o el último total.
+
+    Returns:
+        ({segment_type: {code, description, page, quantity, unit_value, subtotal, verified}},
+         [{segment_type, page, label, declared, computed}])
+    """
+    lines: Dict[str, List[Dict[str, Any]]] = {IPS_SEGMENT: [], SUPPLIER_SEGMENT: []}
+    declared_totals: List[Dict[str, Any]] = []
+    group_total, invoice_total, current_segment, pending_label = 0.0, 0.0, None, None
+
+    for table in tables:
+        if table["segment_type"] != current_segment:
+            group_total, invoice_total, current_segment, pending_label = 0.0, 0.0, table["segment_type"], None
+
+        for cells in table["rows"]:
+            row_text = normalize_key(" ".join(cells))
+            if _HEADER_RE.search(row_text):
+                group_total = 0.0
+
+            line = parse_line(cells)
+            label = _TOTAL_LABEL_RE.search(row_text)
+            if line is not None:
+                line["page"] = table["page"]
+                lines[current_segment].append(line)
+                group_total += line["subtotal"]
+                invoice_total += line["subtotal"]
+                pending_label = label.group(1) if label else None
+                continue
+
+            declared = _declared_total(cells)
+            if declared is not None and (label or pending_label):
+                label_text = label.group(1) if label else pending_label
+                is_subtotal = label_text.startswith("sub")
+                computed = group_total if is_subtotal else invoice_total
+                if computed > 0:
+                    declared_totals.append({
+                        "segment_type": current_segment,
+                        "page": table["page"],
+                        "label": " ".join(label_text.split()).upper(),
+                        "declared": declared,
+                        "computed": computed,
+                    })
+                group_total, pending_label = 0.0, None
+                if not is_subtotal:
+                    invoice_total = 0.0
+            elif label:
+                pending_label = label.group(1)
+
+    frames = {}
+    for segment_type, segment_lines in lines.items():
+        frames[segment_type] = {
+            "code": np.array([line["code"] for line in segment_lines], dtype=object),
+            "description": np.array([line["description"] for line in segment_lines], dtype=object),
+            "page": np.array([line["page"] or 0 for line in segment_lines], dtype=np.int64),
+            "quantity": np.array([line["quantity"] for line in segment_lines], dtype=np.float64),
+            "unit_value": np.array([line["unit_value"] for line in segment_lines], dtype=np.float64),
+            "subtotal": np.array([line["subtotal"] for line in segment_lines], dtype=np.float64),
+            "verified": np.array([line["verified"] for line in segment_lines], dtype=bool),
+        }
+    return frames, declared_totals
+
+
+def check_line_totals(frame: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Índices de las líneas verificadas (valores leídos de columnas numéricas) cuyo
+    cantidad × valor unitario no coincide con el subtotal.
+    """
+    expected = frame["quantity"] * frame["unit_value"]
+    tolerance = np.maximum(_ABSOLUTE_TOLERANCE, _RELATIVE_TOLERANCE * np.abs(frame["subtotal"]))
+    return np.flatnonzero(frame["verified"] & (np.abs(expected - frame["subtotal"]) > tolerance))
+
+
+def _maos_mask(frame: Dict[str, np.ndarray]) -> np.ndarray:
+    compact = [normalize_key(str(description)).replace(" ", "") for description in frame["description"]]
+    return np.array([any(term in text for term in _MAOS_TERMS) for text in compact], dtype=bool)
+
+
+def check_maos_variance(ips_frame: Dict[str, np.ndarray], supplier_frame: Dict[str, np.ndarray],
+                        max_variance: float) -> Dict[str, Any]:
+    """
+    Compara el valor unitario de cada material de osteosíntesis facturado por la IPS con el
+    de la factura del proveedor.
+
+    Las líneas del proveedor se agrupan por valor unitario (un mismo tornillo suele venir en
+    varios lotes) y cada línea de la IPS se asigna al grupo de valor más cercano con
+    unidades disponibles, empezando por las de mayor subtotal. Las líneas repetidas de la
+    IPS (mismo código, cantidad y subtotal en la factura y en el detalle de materiales) se
+    cuentan una vez.
+
+    Returns:
+        {matched: [...], unmatched: [...], exceeded: [...]} con valores, variación y páginas
+    """
+    mask = _maos_mask(ips_frame)
+    ips_index = np.flatnonzero(mask)
+    if ips_index.size:
+        code_digits = [int(re.sub(r"\D", "", str(code)) or 0) for code in ips_frame["code"][ips_index]]
+        keys = np.round(np.stack([ips_frame["quantity"][ips_index], ips_frame["subtotal"][ips_index],
+                                  np.array(code_digits, dtype=np.float64)], axis=1))
+        _, first = np.unique(keys, axis=0, return_index=True)
+        ips_index = ips_index[np.sort(first)]
+        ips_index = ips_index[np.argsort(-ips_frame["subtotal"][ips_index], kind="stable")]
+
+    supplier_units, inverse = np.unique(supplier_frame["unit_value"], return_inverse=True)
+    available = np.bincount(inverse, weights=supplier_frame["quantity"], minlength=supplier_units.size)
+    supplier_pages = [sorted({int(page) for page in supplier_frame["page"][inverse == group]})
+                      for group in range(supplier_units.size)]
+
+    ips_units = ips_frame["unit_value"][ips_index]
+    ratios = ips_units[:, None] / supplier_units[None, :] if supplier_units.size else np.empty((ips_index.size, 0))
+    plausible = (ratios >= _MATCH_RATIO_RANGE[0]) & (ratios <= _MATCH_RATIO_RANGE[1])
+    distance = np.where(plausible, np.abs(np.log(np.where(plausible, ratios, 1.0))), np.inf)
+
+    matched, unmatched = [], []
+    for row, line_index in enumerate(ips_index):
+        quantity = ips_frame["quantity"][line_index]
+        candidates = np.where(available >= quantity - 1e-9, distance[row], np.inf)
+        line = {
+            "code": ips_frame["code"][line_index],
+            "description": ips_frame["description"][line_index],
+            "page": int(ips_frame["page"][line_index]),
+            "quantity": float(quantity),
+            "ips_unit_value": float(ips_units[row]),
+        }
+        if not candidates.size or not np.isfinite(candidates.min()):
+            unmatched.append(line)
+            continue
+        group = int(np.argmin(candidates))
+        available[group] -= quantity
+        line["supplier_unit_value"] = float(supplier_units[group])
+        line["supplier_pages"] = supplier_pages[group]
+        matched.append(line)
+
+    if matched:
+        ips_values = np.array([line["ips_unit_value"] for line in matched])
+        supplier_values = np.array([line["supplier_unit_value"] for line in matched])
+        variances = (ips_values - supplier_values) / supplier_values
+        for line, variance in zip(matched, variances):
+            line["variance"] = float(variance)
+    exceeded = [line for line in matched if line["variance"] > max_variance + 1e-9]
+    return {"matched": matched, "unmatched": unmatched, "exceeded": exceeded}
+
+
+def _money(value: float) -> str:
+    return f"${value:,.2f}"
+
+
+def _line_label(frame: Dict[str, np.ndarray], index: int) -> str:
+    name = frame["description"][index] or frame["code"][index] or "línea"
+    return f"'{name}' (página {int(frame['page'][index])})"
+
+
+def _totals_findings(declared_totals: List[Dict[str, Any]], segment_type: str) -> Tuple[List[str], int]:
+    findings, mismatches = [], 0
+    for total in declared_totals:
+        if total["segment_type"] != segment_type:
+            continue
+        if _within_tolerance(total["computed"], total["declared"]):
+            findings.append(f"{total['label']} declarado {_money(total['declared'])} en página {total['page']}: "
+                            f"coincide con la suma de sus líneas")
+        else:
+            mismatches += 1
+            findings.append(f"{total['label']} declarado {_money(total['declared'])} en página {total['page']}: "
+                            f"la suma de sus líneas es {_money(total['computed'])} "
+                            f"(diferencia {_money(total['declared'] - total['computed'])})")
+    return findings, mismatches
+
+
+def _line_findings(frame: Dict[str, np.ndarray]) -> List[str]:
+    findings = []
+    for index in check_line_totals(frame):
+        findings.append(
+            f"Posible descuadre en la línea {_line_label(frame, index)}: {frame['quantity'][index]:g} × "
+            f"{_money(frame['unit_value'][index])} = {_money(frame['quantity'][index] * frame['unit_value'][index])}, "
+            f"subtotal leído {_money(frame['subtotal'][index])} (puede ser un error del OCR)"
+        )
+    unverified = int((~frame["verified"]).sum())
+    if unverified:
+        findings.append(f"{unverified} líneas no verificadas (cantidad tomada de la descripción o valores ilegibles): "
+                        f"no se comprueba su cantidad × valor unitario")
+    return findings
+
+
+def _summary(title: str, findings: List[str], response: Optional[str], reason: str) -> str:
+    lines = [
+        f"HALLAZGOS NUMÉRICOS PRECALCULADOS ({title}). Indicios calculados sobre las tablas de la "
+        f"factura extraídas por OCR, que puede leer mal dígitos o columnas: confirma cada uno en el "
+        f"documento antes de usarlo en la justificación y no gloses solo con base en ellos.",
+    ]
+    lines.extend(f"- {finding}" for finding in findings)
+    if response:
+        lines.append(f"Dictamen numérico: {response} ({reason})")
+    return "\n".join(lines)
+
+
+def compute_numeric_findings(markdown_content: str, max_variance: float) -> Dict[AuditType, Dict[str, Any]]:
+    """
+    Hallazgos numéricos de las auditorías de FACTURA y MAOS.
+
+    Returns:
+        {AuditType: {summary, response, findings}}; response es 'No cumple' cuando los
+        cálculos lo determinan (material por encima del máximo de variación) y None si la
+        decisión queda en manos del LLM. Vacío si no hay tablas.
+    """
+    try:
+        tables = extract_invoice_tables(markdown_content)
+        if not tables:
+            return {}
+        frames, declared_totals = build_invoice_frames(tables)
+        ips_frame, supplier_frame = frames[IPS_SEGMENT], frames[SUPPLIER_SEGMENT]
+        results: Dict[AuditType, Dict[str, Any]] = {}
+
+        if ips_frame["subtotal"].size:
+            findings = [f"Líneas de la factura de la IPS analizadas: {ips_frame['subtotal'].size} "
+                        f"(suma de subtotales {_money(float(ips_frame['subtotal'].sum()))})"]
+            findings.extend(_line_findings(ips_frame))
+            # Las filas que el OCR fusiona o parte descuadran algunos totales: en la factura
+            # las diferencias se informan pero la decisión queda en manos del LLM
+            total_findings, _ = _totals_findings(declared_totals, IPS_SEGMENT)
+            findings.extend(total_findings)
+            results[AuditType.FACTURA] = {
+                "findings": findings,
+                "response": None,
+                "summary": _summary("factura", findings, None, ""),
+            }
+
+        maos_lines = int(_maos_mask(ips_frame).sum()) if ips_frame["subtotal"].size else 0
+        if maos_lines:
+            findings, response, reason = [], None, ""
+            if not supplier_frame["subtotal"].size:
+                findings.append(f"{maos_lines} líneas de materiales de osteosíntesis en la factura de la IPS; "
+                                f"no se encontraron tablas de factura de proveedor")
+            else:
+                findings.extend(_line_findings(supplier_frame))
+                total_findings, mismatches = _totals_findings(declared_totals, SUPPLIER_SEGMENT)
+                findings.extend(total_findings)
+                variance = check_maos_variance(ips_frame, supplier_frame, max_variance)
+                for line in variance["matched"]:
+                    status = "SUPERA el" if line in variance["exceeded"] else "dentro del"
+                    findings.append(
+                        f"Material '{line['description'] or line['code']}' x{line['quantity']:g}: IPS "
+                        f"{_money(line['ips_unit_value'])} (página {line['page']}) vs proveedor "
+                        f"{_money(line['supplier_unit_value'])} (página {', '.join(map(str, line['supplier_pages']))}): "
+                        f"variación {line['variance']:+.2%}, {status} máximo de {max_variance:.0%}"
+                    )
+                for line in variance["unmatched"]:
+                    findings.append(f"Material '{line['description'] or line['code']}' x{line['quantity']:g} "
+                                    f"(página {line['page']}, {_money(line['ips_unit_value'])}): sin línea "
+                                    f"equivalente en la factura del proveedor")
+                if variance["exceeded"]:
+                    response = AuditResponse.NO_CUMPLE.value
+                    reason = f"{len(variance['exceeded'])} materiales superan el {max_variance:.0%} sobre el valor del proveedor"
+            results[AuditType.MAOS] = {
+                "findings": findings,
+                "response": response,
+                "summary": _summary("MAOS", findings, response, reason),
+            }
+
+        logger.info(f"[AUDIT][NUMERIC] {len(tables)} tablas de facturas: {ips_frame['subtotal'].size} líneas IPS, "
+                    f"{supplier_frame['subtotal'].size} líneas de proveedor, {len(declared_totals)} totales declarados")
+        return results
+
+    except Exception as e:
+        logger.error(f"[AUDIT][NUMERIC] Error calculando hallazgos numéricos: {str(e)}")
+        return {}
@@ -0,0 +1,112 @@
+"""
+Fábrica de clientes de chat y de embeddings.
+
+Centraliza la construcción de ChatOCIGenAI (auditoría, RAG, VLM del OCR), ChatOpenAI
+(chat y deep agent vía GATEWAY_BASE_URL) y OCIGenAIEmbeddings. Con
+settings.LLM_BACKEND = 'mock' todos se sustituyen por clientes OpenAI-compatibles que
+apuntan al servidor simulado (python -m mock_genai.server), para pruebas de carga sin red.
+
+Los embeddings que Oracle calcula dentro de SP_RAG_EMBEDDING (utl_to_embeddings) no
+pasan por esta fábrica: la ingesta sigue requiriendo la base de datos configurada.
+"""
+import logging
+from typing import Any, Dict, Optional
+
+# Primero importar las dependencias para resolver referencias circulares
+from langchain_core.caches import BaseCache
+from langchain_core.callbacks.manager import Callbacks
+from langchain_community.chat_models import ChatOCIGenAI
+from langchain_community.embeddings.oci_generative_ai import OCIGenAIEmbeddings
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from core.config import settings
+
+# Reconstruir los modelos Pydantic para evitar el error de clase no definida
+ChatOCIGenAI.model_rebuild(_types_namespace={"BaseCache": BaseCache, "Callbacks": Callbacks})
+ChatOpenAI.model_rebuild(_types_namespace={"BaseCache": BaseCache, "Callbacks": Callbacks})
+
+logger = logging.getLogger(__name__)
+
+MOCK_API_KEY = "mock"
+
+# Parámetros de muestreo que ChatOpenAI recibe como argumentos propios (el resto va en model_kwargs)
+_OPENAI_SAMPLING_PARAMS = ("temperature", "max_tokens", "top_p", "frequency_penalty", "presence_penalty")
+
+
+def is_mock_backend() -> bool:
+    """True si los clientes deben apuntar al servidor simulado mock_genai."""
+    return (settings.LLM_BACKEND or "").strip().lower() == "mock"
+
+
+def _mock_chat_model(model: str, model_kwargs: Optional[Dict[str, Any]] = None,
+                     max_retries: int = 2) -> ChatOpenAI:
+    model_kwargs = dict(model_kwargs or {})
+    sampling = {name: model_kwargs.pop(name) for name in _OPENAI_SAMPLING_PARAMS if name in model_kwargs}
+    return ChatOpenAI(
+        model        = model,
+        api_key      = MOCK_API_KEY,
+        base_url     = settings.MOCK_GENAI_BASE_URL,
+        model_kwargs = model_kwargs,
+        max_retries  = max_retries,
+        **sampling
+    )
+
+
+def get_oci_chat_model(model_kwargs: Optional[Dict[str, Any]] = None,
+                       model_id: Optional[str] = None):
+    """
+    Modelo de chat de OCI Generative AI (o su sustituto simulado).
+
+    Args:
+        model_kwargs: Parámetros de muestreo por defecto del modelo
+        model_id: Modelo a usar (default: settings.CON_GEN_AI_CHAT_MODEL_ID)
+    """
+    model_id = model_id or settings.CON_GEN_AI_CHAT_MODEL_ID
+    if is_mock_backend():
+        logger.info(f"[LLM][FACTORY] Chat simulado ({model_id}) en {settings.MOCK_GENAI_BASE_URL}")
+        # Los reintentos los hace llm_invoker (sin reintentos propios del cliente OpenAI)
+        return _mock_chat_model(model_id, model_kwargs, max_retries=0)
+
+    return ChatOCIGenAI(
+        model_id         = model_id,
+        service_endpoint = settings.CON_GEN_AI_SERVICE_ENDPOINT,
+        compartment_id   = settings.CON_COMPARTMENT_ID,
+        provider         = settings.CON_GEN_AI_CHAT_MODEL_PROVIDER,
+        is_stream        = False,
+        auth_type        = "API_KEY",
+        auth_profile     = settings.OCI_PROFILE,
+        model_kwargs     = model_kwargs
+    )
+
+
+def get_gateway_chat_model() -> ChatOpenAI:
+    """Modelo de chat OpenAI-compatible del gateway (o del servidor simulado)."""
+    if is_mock_backend():
+        logger.info(f"[LLM][FACTORY] Gateway simulado ({settings.GATEWAY_OPENAI_MODEL}) en {settings.MOCK_GENAI_BASE_URL}")
+        return _mock_chat_model(settings.GATEWAY_OPENAI_MODEL)
+
+    return ChatOpenAI(
+        model    = settings.GATEWAY_OPENAI_MODEL,
+        api_key  = settings.GATEWAY_OPENAI_API_KEY,
+        base_url = settings.GATEWAY_BASE_URL
+    )
+
+
+def get_embeddings():
+    """Cliente de embeddings de OCI Generative AI (o del servidor simulado)."""
+    if is_mock_backend():
+        return OpenAIEmbeddings(
+            model                      = settings.CON_GEN_AI_EMB_MODEL_ID,
+            api_key                    = MOCK_API_KEY,
+            base_url                   = settings.MOCK_GENAI_BASE_URL,
+            # Enviar el texto tal cual (sin tokenizar con tiktoken)
+            check_embedding_ctx_length = False,
+        )
+
+    return OCIGenAIEmbeddings(
+        model_id         = settings.CON_GEN_AI_EMB_MODEL_ID,
+        service_endpoint = settings.CON_GEN_AI_SERVICE_ENDPOINT,
+        compartment_id   = settings.CON_COMPARTMENT_ID,
+        auth_type        = "API_KEY",
+        auth_profile     = settings.OCI_PROFILE,
+    )
@@ -0,0 +1,299 @@
+"""
+Invocación resiliente del LLM.
+
+Todas las llamadas a OCI Generative AI de la auditoría, el RAG, el VLM del OCR y el
+gateway /llm pasan por llm_invoker.invoke(runnable, inputs, operation=...):
+
+- Timeout por llamada (settings.LLM_INVOKE_TIMEOUT_SECONDS): la llamada corre en un pool
+  propio y quien la invoca deja de esperar al vencer el plazo. La llamada abandonada no se
+  puede interrumpir; termina en segundo plano ocupando un hilo del pool, que está acotado
+  (settings.LLM_INVOKE_MAX_WORKERS).
+- Reintentos con backoff exponencial y jitter completo, solo ante errores transitorios
+  (timeouts, conexión, HTTP 408/429/5xx).
+- Solicitud duplicada (hedging, opcional): si la llamada supera el percentil p95 de las
+  latencias recientes de la misma operación, se envía una copia y se usa la primera
+  respuesta.
+- Circuit breaker compartido: tras LLM_BREAKER_FAILURE_THRESHOLD fallas transitorias
+  consecutivas las llamadas fallan de inmediato (CircuitOpenError) durante
+  LLM_BREAKER_RESET_SECONDS; luego una llamada de prueba decide si se cierra.
+
+Los contadores por operación y el estado del breaker se consultan en stats()
+(GET /sys/metrics/llm).
+"""
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, Optional
+
+import numpy as np
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+_TRANSIENT_MARKERS = (
+    "timed out", "timeout", "too many requests", "rate limit", "service unavailable",
+    "bad gateway", "gateway timeout", "internal server error", "connection reset",
+    "connection aborted", "connection refused", "remote end closed",
+)
+_TRANSIENT_TYPE_MARKERS = ("timeout", "connection", "ratelimit", "serviceunavailable")
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+_COUNTERS = ("calls", "successes", "failures", "retries", "timeouts", "hedges", "hedge_wins", "rejected")
+
+
+class InvocationTimeoutError(TimeoutError):
+    """El LLM no respondió dentro del timeout de la llamada."""
+
+
+class CircuitOpenError(RuntimeError):
+    """El circuit breaker está abierto: el endpoint se considera degradado."""
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for candidate in (error, getattr(error, "response", None)):
+        for attribute in ("status", "status_code", "http_status"):
+            value = getattr(candidate, attribute, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """True si el error amerita reintentar (timeout, conexión, HTTP 408/429/5xx)."""
+    seen = set()
+    current: Optional[BaseException] = error
+    # Los clientes de LangChain pueden envolver el error original
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if isinstance(current, CircuitOpenError):
+            return False
+        if isinstance(current, (TimeoutError, ConnectionError)):
+            return True
+        status_code = _status_code(current)
+        if status_code is not None:
+            return status_code in TRANSIENT_STATUS_CODES
+        type_name = type(current).__name__.lower()
+        if any(marker in type_name for marker in _TRANSIENT_TYPE_MARKERS):
+            return True
+        message = str(current).lower()
+        if any(marker in message for marker in _TRANSIENT_MARKERS):
+            return True
+        current = current.__cause__ or current.__context__
+    return False
+
+
+class CircuitBreaker:
+    """Breaker de tres estados (cerrado, abierto, semiabierto) por fallas transitorias consecutivas."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_seconds = float(reset_seconds)
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True si la llamada puede salir; en semiabierto se deja pasar una sola llamada de prueba."""
+        with self._lock:
+            if self.state == BREAKER_OPEN:
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    return False
+                self.state = BREAKER_HALF_OPEN
+                self._probe_in_flight = False
+                logger.info("[LLM][BREAKER] Semiabierto: se envía una llamada de prueba")
+            if self.state == BREAKER_HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record(self, healthy: bool) -> None:
+        """Registra el resultado de una llamada (healthy=False solo para fallas transitorias)."""
+        with self._lock:
+            self._probe_in_flight = False
+            if healthy:
+                if self.state != BREAKER_CLOSED:
+                    logger.info("[LLM][BREAKER] Endpoint recuperado: breaker cerrado")
+                self.state = BREAKER_CLOSED
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            if self.state == BREAKER_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != BREAKER_OPEN:
+                    self.times_opened += 1
+                self.state = BREAKER_OPEN
+                self.opened_at = time.monotonic()
+                logger.warning(f"[LLM][BREAKER] Abierto tras {self.consecutive_failures} fallas consecutivas; "
+                               f"llamadas rechazadas durante {self.reset_seconds:.1f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_for = time.monotonic() - self.opened_at if self.state == BREAKER_OPEN else None
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "open_for_seconds": round(open_for, 1) if open_for is not None else None,
+                "failure_threshold": self.failure_threshold,
+                "reset_seconds": self.reset_seconds,
+            }
+
+
+class ResilientLLMInvoker:
+    """Ejecuta runnables de LangChain con timeout, reintentos, hedging y circuit breaker."""
+
+    def __init__(self):
+        self.timeout_seconds = settings.LLM_INVOKE_TIMEOUT_SECONDS
+        self.max_retries = max(0, settings.LLM_INVOKE_MAX_RETRIES)
+        self.backoff_seconds = settings.LLM_INVOKE_BACKOFF_SECONDS
+        self.backoff_max_seconds = settings.LLM_INVOKE_BACKOFF_MAX_SECONDS
+        self.hedge_enabled = settings.LLM_HEDGE_ENABLED
+        self.hedge_percentile = settings.LLM_HEDGE_PERCENTILE
+        self.hedge_min_samples = settings.LLM_HEDGE_MIN_SAMPLES
+        self.hedge_min_delay_seconds = settings.LLM_HEDGE_MIN_DELAY_SECONDS
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURE_THRESHOLD, settings.LLM_BREAKER_RESET_SECONDS)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, settings.LLM_INVOKE_MAX_WORKERS),
+                                            thread_name_prefix="llm-invoke")
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def _count(self, operation: str, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(operation, dict.fromkeys(_COUNTERS, 0))
+            counters[counter] += amount
+
+    def _record_latency(self, operation: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(operation, deque(maxlen=settings.LLM_HEDGE_WINDOW)).append(seconds)
+
+    def latency_percentile(self, operation: str) -> Optional[float]:
+        """Percentil LLM_HEDGE_PERCENTILE de las latencias recientes (None si hay pocas muestras)."""
+        with self._lock:
+            samples = list(self._latencies.get(operation, ()))
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return float(np.percentile(samples, self.hedge_percentile))
+
+    def _backoff(self, attempt: int) -> float:
+        # Jitter completo: espera aleatoria entre 0 y el tope exponencial del intento
+        return random.uniform(0, min(self.backoff_max_seconds, self.backoff_seconds * (2 ** attempt)))
+
+    def _call(self, runnable, inputs: Any, operation: str, timeout: float, hedge: bool) -> Any:
+        deadline = time.monotonic() + timeout
+        primary = self._executor.submit(runnable.invoke, inputs)
+        pending = {primary}
+
+        hedge_delay = self.latency_percentile(operation) if hedge else None
+        if hedge_delay is not None:
+            hedge_delay = max(hedge_delay, self.hedge_min_delay_seconds)
+            if hedge_delay < timeout:
+                done, _ = wait(pending, timeout=hedge_delay)
+                if not done:
+                    self._count(operation, "hedges")
+                    logger.info(f"[LLM][INVOKE] {operation}: sin respuesta tras {hedge_delay:.1f}s (p{self.hedge_percentile:.0f}); enviando solicitud duplicada")
+                    pending.add(self._executor.submit(runnable.invoke, inputs))
+
+        first_error: Optional[BaseException] = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    if future is not primary:
+                        self._count(operation, "hedge_wins")
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                first_error = first_error or error
+
+        if not pending and first_error is not None:
+            raise first_error
+        for future in pending:
+            future.cancel()
+        self._count(operation, "timeouts")
+        raise InvocationTimeoutError(f"{operation}: el LLM no respondió en {timeout:.1f}s")
+
+    def invoke(self, runnable, inputs: Any, operation: str = "llm",
+               timeout: Optional[float] = None, hedge: Optional[bool] = None) -> Any:
+        """
+        Invoca runnable.invoke(inputs) con timeout, reintentos, hedging y circuit breaker.
+
+        Args:
+            runnable: Cadena o modelo de LangChain (cualquier objeto con invoke)
+            inputs: Entrada de la llamada
+            operation: Nombre de la operación para métricas y latencias (ej. 'audit', 'rag', 'vlm')
+            timeout: Timeout de cada intento en segundos (default: settings.LLM_INVOKE_TIMEOUT_SECONDS)
+            hedge: Habilitar la solicitud duplicada (default: settings.LLM_HEDGE_ENABLED)
+
+        Raises:
+            CircuitOpenError: Si el breaker está abierto
+            InvocationTimeoutError: Si el último intento no respondió a tiempo
+            Exception: El error del último intento o el primer error no transitorio
+        """
+        timeout = timeout or self.timeout_seconds
+        hedge = self.hedge_enabled if hedge is None else hedge
+        self._count(operation, "calls")
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count(operation, "rejected")
+                raise CircuitOpenError(f"{operation}: circuit breaker abierto, endpoint de GenAI degradado")
+
+            started = time.monotonic()
+            try:
+                result = self._call(runnable, inputs, operation, timeout, hedge)
+            except Exception as error:
+                transient = is_transient_error(error)
+                # Un error no transitorio (ej. solicitud inválida) indica que el endpoint responde
+                self.breaker.record(healthy=not transient)
+                if not transient or attempt >= self.max_retries:
+                    self._count(operation, "failures")
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                self._count(operation, "retries")
+                logger.warning(f"[LLM][INVOKE] {operation}: error transitorio ({type(error).__name__}: {str(error)[:120]}); "
+                               f"reintento {attempt}/{self.max_retries} en {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self.breaker.record(healthy=True)
+            self._record_latency(operation, time.monotonic() - started)
+            self._count(operation, "successes")
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            operations = {operation: dict(counters) for operation, counters in self._counters.items()}
+        for operation, counters in operations.items():
+            percentile = self.latency_percentile(operation)
+            counters["latency_percentile_seconds"] = round(percentile, 3) if percentile is not None else None
+        return {
+            "breaker": self.breaker.stats(),
+            "timeout_seconds": self.timeout_seconds,
+            "max_retries": self.max_retries,
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_percentile": self.hedge_percentile,
+            "totals": {counter: sum(counters[counter] for counters in operations.values()) for counter in _COUNTERS},
+            "operations": operations,
+        }
+
+
+llm_invoker = ResilientLLMInvoker()
@@ -0,0 +1,56 @@
+"""
+Re-ranking por Maximal Marginal Relevance (MMR) vectorizado.
+
+La base de datos devuelve en una sola consulta los fetch_k candidatos más cercanos con su
+embedding; la selección se hace localmente con NumPy. En cada paso se elige el candidato
+que maximiza
+
+    lambda_mult · sim(consulta, c) − (1 − lambda_mult) · max sim(c, seleccionados)
+
+manteniendo un vector con la máxima similitud de cada candidato a los ya seleccionados,
+de modo que cada paso es una sola multiplicación matriz-vector sobre los fetch_k
+candidatos (sin bucles de Python por par).
+"""
+from typing import List, Sequence
+
+import numpy as np
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def mmr_select(query_vector: Sequence[float], candidate_vectors: Sequence[Sequence[float]],
+               k: int, lambda_mult: float = 0.5) -> List[int]:
+    """
+    Índices de los k candidatos elegidos por MMR, en orden de selección.
+
+    Args:
+        query_vector: Embedding de la consulta
+        candidate_vectors: Embeddings de los candidatos (misma dimensión)
+        k: Candidatos a seleccionar
+        lambda_mult: 1 = solo relevancia, 0 = solo diversidad
+    """
+    if k <= 0 or len(candidate_vectors) == 0:
+        return []
+
+    candidates = _unit_rows(np.asarray(candidate_vectors, dtype=np.float32))
+    query = _unit_rows(np.asarray(query_vector, dtype=np.float32))
+    relevance = candidates @ query
+    k = min(k, len(candidates))
+
+    selected = [int(np.argmax(relevance))]
+    max_redundancy = candidates @ candidates[selected[0]]
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_redundancy, candidates @ candidates[best], out=max_redundancy)
+
+    return selected
@@ -0,0 +1,124 @@
+"""
+Enrutamiento de modelos por auditoría.
+
+Cada auditoría del registro declara un perfil de modelo (AuditDefinition.model_profile);
+la auditoría v2 usa la ruta "v2". Los perfiles definen modelo, max_tokens y temperatura:
+
+- fast: verificaciones simples (¿hay FURIPS?, ¿el pagador es ADRES?) con un modelo más
+  rápido y económico (settings.AUDIT_MODEL_FAST_ID) y salida corta.
+- standard: el modelo por defecto con los parámetros de la solicitud.
+- strong: modelo de mayor capacidad (settings.AUDIT_MODEL_STRONG_ID) y salida larga.
+
+Si el parser no logra interpretar la respuesta, la auditoría se repite una vez con el
+perfil siguiente (fast → standard → strong), siempre que cambie el modelo o max_tokens.
+settings.AUDIT_MODEL_ROUTES sobrescribe el perfil de cualquier ruta.
+"""
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from core.config import settings
+from services.audit_registry import AUDIT_REGISTRY
+from services.llm_factory import get_oci_chat_model
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FAST = "fast"
+PROFILE_STANDARD = "standard"
+PROFILE_STRONG = "strong"
+MODEL_PROFILES = (PROFILE_FAST, PROFILE_STANDARD, PROFILE_STRONG)
+
+ESCALATION_PATH = {PROFILE_FAST: PROFILE_STANDARD, PROFILE_STANDARD: PROFILE_STRONG, PROFILE_STRONG: None}
+
+ROUTE_V2 = "v2"
+
+
+@lru_cache(maxsize=8)
+def parse_route_overrides(value: Optional[str]) -> Dict[str, str]:
+    """
+    Convierte 'v2:strong,rut_validacion:standard' en {ruta: perfil}. Las entradas inválidas
+    se ignoran con una advertencia.
+    """
+    overrides: Dict[str, str] = {}
+    for entry in (value or "").split(","):
+        if not entry.strip():
+            continue
+        route, _, profile = entry.partition(":")
+        profile = profile.strip().lower()
+        if not route.strip() or profile not in MODEL_PROFILES:
+            logger.warning(f"[AUDIT][ROUTING] Ruta de modelo inválida ignorada: '{entry.strip()}'")
+            continue
+        overrides[route.strip().lower()] = profile
+    return overrides
+
+
+def resolve_profile(route: str) -> str:
+    """Perfil de una ruta (valor de AuditType o 'v2'): registro, luego settings.AUDIT_MODEL_ROUTES."""
+    routes = {definition.audit_type.value: definition.model_profile for definition in AUDIT_REGISTRY}
+    routes[ROUTE_V2] = PROFILE_STANDARD
+    routes.update(parse_route_overrides(settings.AUDIT_MODEL_ROUTES or ""))
+    return routes.get(str(getattr(route, "value", route)).lower(), PROFILE_STANDARD)
+
+
+def profile_params(profile: str, temperature: float, max_tokens: int) -> Dict[str, Any]:
+    """Modelo, max_tokens y temperatura de un perfil a partir de los parámetros de la solicitud."""
+    if profile == PROFILE_FAST:
+        return {
+            "model_id": settings.AUDIT_MODEL_FAST_ID or settings.CON_GEN_AI_CHAT_MODEL_ID,
+            "max_tokens": min(max_tokens, settings.AUDIT_MODEL_FAST_MAX_TOKENS),
+            "temperature": settings.AUDIT_MODEL_FAST_TEMPERATURE,
+        }
+    if profile == PROFILE_STRONG:
+        return {
+            "model_id": settings.AUDIT_MODEL_STRONG_ID or settings.CON_GEN_AI_CHAT_MODEL_ID,
+            "max_tokens": max(max_tokens, settings.AUDIT_MODEL_STRONG_MAX_TOKENS),
+            "temperature": temperature,
+        }
+    return {"model_id": settings.CON_GEN_AI_CHAT_MODEL_ID, "max_tokens": max_tokens, "temperature": temperature}
+
+
+class ModelRouter:
+    """Clientes de chat por modelo (uno por model_id, reutilizados) y rutas con escalamiento."""
+
+    def __init__(self, default_llm):
+        self.default_llm = default_llm
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _client(self, model_id: str):
+        # El modelo por defecto es el LLM del servicio (puede ser uno inyectado en pruebas)
+        if model_id == settings.CON_GEN_AI_CHAT_MODEL_ID:
+            return self.default_llm
+        with self._lock:
+            if model_id not in self._clients:
+                logger.info(f"[AUDIT][ROUTING] Inicializando cliente para el modelo {model_id}")
+                self._clients[model_id] = get_oci_chat_model(model_id=model_id)
+            return self._clients[model_id]
+
+    def _bind(self, profile: str, temperature: float, max_tokens: int, top_p: float) -> Dict[str, Any]:
+        params = profile_params(profile, temperature, max_tokens)
+        llm = self._client(params["model_id"]).bind(
+            temperature=params["temperature"], max_tokens=params["max_tokens"], top_p=top_p
+        )
+        return {"profile": profile, "model_id": params["model_id"], "max_tokens": params["max_tokens"], "llm": llm}
+
+    def route(self, route: str, temperature: float, max_tokens: int, top_p: float) -> Dict[str, Any]:
+        """
+        Modelo de una ruta con parámetros de muestreo ligados a la llamada.
+
+        Returns:
+            {profile, model_id, max_tokens, llm, escalation}; escalation es el modelo del
+            perfil siguiente ({profile, model_id, max_tokens, llm}) o None si no hay uno
+            distinto o el escalamiento está deshabilitado
+        """
+        routed = self._bind(resolve_profile(route), temperature, max_tokens, top_p)
+        routed["escalation"] = None
+        next_profile = ESCALATION_PATH.get(routed["profile"]) if settings.AUDIT_MODEL_ESCALATION else None
+        while next_profile:
+            candidate = self._bind(next_profile, temperature, max_tokens, top_p)
+            if (candidate["model_id"], candidate["max_tokens"]) != (routed["model_id"], routed["max_tokens"]):
+                routed["escalation"] = candidate
+                break
+            next_profile = ESCALATION_PATH.get(next_profile)
+        return routed
@@ -62,6 +62,7 @@ class OCIStatusChecker:
 
     def _get_database_status_sync(self) -> Dict:
         """Lógica de obtención de estado de la base de datos (síncrona)."""
+        connection = None
         try:
             connection = self.db_connection.get_connection()
             cursor = connection.cursor()
@@ -93,6 +94,9 @@ class OCIStatusChecker:
         except Exception as e:
             # Re-lanzamos la excepción para que el wrapper asíncrono la capture
             raise e
+        finally:
+            if connection is not None:
+                connection.close()
 
     def get_database_status(self) -> Dict:
         """Punto de entrada síncrono para mantener compatibilidad si es necesario."""
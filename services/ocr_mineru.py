@@ -146,20 +146,12 @@ def _fmt_hms(total_seconds: int) -> str:
 
 class VLMAnalyzer:
     def call_vlm(self, image_path: Path) -> Optional[str]:
-        from core.config import settings
+        from services.llm_factory import get_oci_chat_model
+        from services.llm_invoker import llm_invoker
 
         try:
             # Initialize the LLM model
-            llm = ChatOCIGenAI(
-                model_id=settings.CON_GEN_AI_CHAT_MODEL_ID,
-                service_endpoint=settings.CON_GEN_AI_SERVICE_ENDPOINT,
-                compartment_id=settings.CON_COMPARTMENT_ID,
-                provider=settings.CON_GEN_AI_CHAT_MODEL_PROVIDER,
-                is_stream=False,
-                auth_type="API_KEY",
-                auth_profile=settings.OCI_PROFILE,
-                model_kwargs={"temperature": 1},
-            )
+            llm = get_oci_chat_model(model_kwargs={"temperature": 1})
 
             # Prompt template
             prompt_template = ChatPromptTemplate.from_messages(
@@ -193,8 +185,8 @@ class VLMAnalyzer:
                 )
                 return None
 
-            # Invoke the chain for the single image
-            result = chain.invoke({"input_imagen": encoded_image})
+            # Invoke the chain for the single image (timeout, retries and circuit breaker)
+            result = llm_invoker.invoke(chain, {"input_imagen": encoded_image}, operation="vlm")
 
             content = str(result)
             if content.startswith("```markdown"):
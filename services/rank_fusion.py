@@ -0,0 +1,22 @@
+"""
+Fusión de rankings por Reciprocal Rank Fusion (RRF).
+
+Cada lista aporta 1 / (k + posición) a los documentos que contiene (posición en base 1);
+los documentos se ordenan por la suma. No depende de la escala de los puntajes de cada
+búsqueda (distancia coseno, SCORE de Oracle Text), solo de su orden.
+"""
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """
+    Fusiona listas ordenadas de claves (de mejor a peor).
+
+    Returns:
+        [(clave, puntaje RRF)] de mayor a menor; los empates conservan el orden de aparición
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for position, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + position)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,10 +1,15 @@
 """
 Tool Vector Search para búsqueda de vectores en Oracle Database.
 """
+import asyncio
 import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from starlette.concurrency import run_in_threadpool
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains import create_retrieval_chain
 
 # Primero importar las dependencias para resolver referencias circulares
 from langchain_core.caches import BaseCache
@@ -16,10 +21,107 @@ from langchain_community.chat_models import ChatOCIGenAI
 ChatOCIGenAI.model_rebuild(_types_namespace={"BaseCache": BaseCache, "Callbacks": Callbacks})
 
 from database.rag_docs import RAGDocsDB
+from services.llm_factory import get_oci_chat_model
+from services.llm_invoker import llm_invoker
+from services.mmr import mmr_select
+from services.rank_fusion import reciprocal_rank_fusion
 from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+SEARCH_MODE_MMR = "mmr"
+SEARCH_MODE_HYBRID = "hybrid"
+SEARCH_MODES = (SEARCH_MODE_MMR, SEARCH_MODE_HYBRID)
+
+# Pool acotado de la API async: las búsquedas corren fuera del event loop y como máximo
+# settings.RAG_RETRIEVAL_MAX_WORKERS ocupan a la vez una conexión de la base de datos
+_retrieval_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.RAG_RETRIEVAL_MAX_WORKERS), thread_name_prefix="rag-retrieval"
+)
+_shared_tool = None
+_shared_tool_lock = threading.Lock()
+
+def _resolve_search_mode(search_mode: str = None) -> str:
+    """Modo de búsqueda a usar (settings.RAG_SEARCH_MODE por defecto), validado."""
+    search_mode = (search_mode or settings.RAG_SEARCH_MODE).strip().lower()
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"Modo de búsqueda no soportado: {search_mode} (opciones: {', '.join(SEARCH_MODES)})")
+    return search_mode
+
+
+def _resolve_fetch_k(k: int, fetch_k: int, default: int) -> int:
+    """Candidatos por búsqueda: fetch_k o el valor por defecto, hasta RAG_MAX_FETCH_K y nunca menos de k."""
+    return max(k, min(fetch_k or default, settings.RAG_MAX_FETCH_K))
+
+
+def _mmr_rerank(query_vector: list, candidates: list, k: int, lambda_mult: float = None) -> list:
+    """Los k candidatos (con embedding) elegidos por MMR, en orden de selección."""
+    lambda_mult = settings.RAG_MMR_LAMBDA if lambda_mult is None else min(max(lambda_mult, 0.0), 1.0)
+    selected = mmr_select(query_vector, [doc["embedding"] for doc in candidates], k, lambda_mult)
+    return [
+        {"content": candidates[i]["content"], "metadata": candidates[i]["metadata"], "distance": candidates[i]["distance"]}
+        for i in selected
+    ]
+
+
+def _fuse_candidates(candidates: dict, k: int) -> list:
+    """Los k primeros fragmentos de la fusión RRF de las búsquedas por vector y por texto."""
+    docs = {}
+    ranks = {"vector": {}, "text": {}}
+    for source in ("vector", "text"):
+        for position, doc in enumerate(candidates[source], start=1):
+            docs.setdefault(doc["doc_key"], doc)
+            ranks[source][doc["doc_key"]] = position
+
+    fused = reciprocal_rank_fusion(
+        [[doc["doc_key"] for doc in candidates[source]] for source in ("vector", "text")],
+        k=settings.RAG_RRF_K
+    )
+    return [
+        {
+            "content": docs[doc_key]["content"],
+            "metadata": docs[doc_key]["metadata"],
+            "distance": docs[doc_key]["distance"],
+            "rrf_score": round(rrf_score, 6),
+            "vector_rank": ranks["vector"].get(doc_key),
+            "text_rank": ranks["text"].get(doc_key),
+        }
+        for doc_key, rrf_score in fused[:k]
+    ]
+
+
+def _context_info(query: str, k: int, retrieved_docs: list) -> dict:
+    """Contexto de una búsqueda con la forma de oci_vector_search_context_only."""
+    context_info = {
+        "query": query,
+        "k_requested": k,
+        "total_documents": len(retrieved_docs),
+        "documents": []
+    }
+
+    for i, doc in enumerate(retrieved_docs):
+        # Extract metadata and content from each document
+        doc_info = {
+            "index": i + 1,
+            "content": doc["content"],
+            "metadata": doc["metadata"],
+            # Cosine distance to the query; fused results have no comparable score and keep their order
+            "score": doc["distance"] if "rrf_score" not in doc else None,
+            "file_id": doc["metadata"].get('file_id', None),
+            "chunk_id": doc["metadata"].get('chunk_id', None)
+        }
+        if "rrf_score" in doc:
+            doc_info.update({
+                "distance": doc["distance"],
+                "rrf_score": doc["rrf_score"],
+                "vector_rank": doc["vector_rank"],
+                "text_rank": doc["text_rank"],
+            })
+        context_info["documents"].append(doc_info)
+
+    return context_info
+
+
 class OCIRAGTool:
     """
     Servicio para ejecutar búsqueda de vectores en Oracle Database.
@@ -29,15 +131,7 @@ class OCIRAGTool:
         self.rag_docs_db = RAGDocsDB()
         
         # Initialize the OCI Generative AI Chat Model
-        self.llm = ChatOCIGenAI(
-            model_id         = settings.CON_GEN_AI_CHAT_MODEL_ID,
-            service_endpoint = settings.CON_GEN_AI_SERVICE_ENDPOINT,
-            compartment_id   = settings.CON_COMPARTMENT_ID,
-            provider         = settings.CON_GEN_AI_CHAT_MODEL_PROVIDER,
-            is_stream        = False,
-            auth_type        = "API_KEY",
-            auth_profile     = settings.OCI_PROFILE
-        )
+        self.llm = get_oci_chat_model()
 
     def oci_vector_search(self, input: str, files_ids: list) -> str:
         """
@@ -49,19 +143,27 @@ class OCIRAGTool:
         Returns:
             str: The answer generated by the retrieval-augmented generation (RAG) chain.
         """
-        
-        # Create a vector store from the Oracle connection and embeddings
-        vector_store = self.rag_docs_db.get_vector_store()
-
-        retriever = vector_store.as_retriever(
-            search_type="mmr",
-            search_kwargs={
-                "k": 10,         # Número de chunks relevantes que se devuelven
-                "fetch_k": 20,   # Número de candidatos iniciales desde los cuales aplicar MMR
-                "filter": {"file_id": files_ids} # Limita la búsqueda al archivo específico
-            }
-        )
+        return self.generate_answer(input, self.retrieve_documents(input, files_ids))
 
+    def retrieve_documents(self, input: str, files_ids: list, k: int = 10) -> list:
+        """
+        Retrieves the relevant documents for the RAG answer (settings.RAG_SEARCH_MODE).
+
+        Returns:
+            list: LangChain Documents with the fragment content and metadata.
+        """
+        return [
+            Document(page_content=doc["content"], metadata=doc["metadata"])
+            for doc in self.search(input, files_ids, k=k)
+        ]
+
+    def generate_answer(self, input: str, retrieved_docs: list) -> str:
+        """
+        Generates the answer to the question from the retrieved documents with the LLM.
+
+        Returns:
+            str: The answer generated by the retrieval-augmented generation (RAG) chain.
+        """
         # Define a prompt template for retrieval-augmented generation (RAG) using the retrieved context fragments
         prompt = ChatPromptTemplate.from_messages(
             [
@@ -81,19 +183,83 @@ class OCIRAGTool:
 
         # Create a chain that uses the LLM to combine the retrieved documents into a final answer
         question_answer_chain = create_stuff_documents_chain(self.llm, prompt)
+
+        # Generate the answer from the retrieved context (timeout, retries and circuit breaker)
+        content = llm_invoker.invoke(
+            question_answer_chain, {"input": input, "context": retrieved_docs}, operation="rag"
+        )
         
-        # Build the full retrieval chain that first retrieves documents and then uses them to answer the input query
-        rag_chain = create_retrieval_chain(retriever, question_answer_chain)
+        return content
 
-        # Invoke the retrieval chain with the given input query to generate a response
-        response = rag_chain.invoke({"input": input})
+    def mmr_search(self, input: str, files_ids: list, k: int = 10, fetch_k: int = None,
+                   lambda_mult: float = None) -> list:
+        """
+        Maximal Marginal Relevance search: the fetch_k nearest chunks and their embeddings
+        are fetched in a single SQL call and re-ranked locally with NumPy.
+        
+        Args:
+            input (str): The input query to search for relevant documents.
+            files_ids (list): List of file IDs to filter the search.
+            k (int): Number of documents to return (default: 10).
+            fetch_k (int): Candidates to re-rank (default: settings.RAG_MMR_FETCH_K,
+                capped at settings.RAG_MAX_FETCH_K, never below k).
+            lambda_mult (float): 1 = relevance only, 0 = diversity only
+                (default: settings.RAG_MMR_LAMBDA).
+            
+        Returns:
+            list: Selected chunks ({content, metadata, distance}) in MMR order.
+        """
+        fetch_k = _resolve_fetch_k(k, fetch_k, settings.RAG_MMR_FETCH_K)
+        query_vector = self.rag_docs_db.get_embeddings().embed_query(input)
+        candidates = self.rag_docs_db.similarity_search_candidates(query_vector, files_ids, fetch_k)
+        return _mmr_rerank(query_vector, candidates, k, lambda_mult)
 
-        # Extract the generated answer from the chain's response
-        content = response['answer']
+    def hybrid_search(self, input: str, files_ids: list, k: int = 10, fetch_k: int = None) -> list:
+        """
+        Hybrid search: vector similarity and Oracle Text keyword search (exact codes such as
+        CUFE, CUPS, CUM, NIT or ID numbers) run in a single SQL call and are fused with
+        Reciprocal Rank Fusion.
         
-        return content
+        Args:
+            input (str): The input query to search for relevant documents.
+            files_ids (list): List of file IDs to filter the search.
+            k (int): Number of documents to return (default: 10).
+            fetch_k (int): Candidates per search before fusion (default: settings.RAG_HYBRID_FETCH_K,
+                capped at settings.RAG_MAX_FETCH_K, never below k).
+            
+        Returns:
+            list: Selected chunks ({content, metadata, distance, rrf_score, vector_rank, text_rank})
+                  in fused order; a rank is None when the chunk was not found by that search.
+        """
+        fetch_k = _resolve_fetch_k(k, fetch_k, settings.RAG_HYBRID_FETCH_K)
+        query_vector = self.rag_docs_db.get_embeddings().embed_query(input)
+        candidates = self.rag_docs_db.hybrid_search_candidates(query_vector, input, files_ids, fetch_k)
+        return _fuse_candidates(candidates, k)
+
+    def search(self, input: str, files_ids: list, k: int = 10, search_mode: str = None,
+               fetch_k: int = None, lambda_mult: float = None) -> list:
+        """
+        Retrieves the chunks for a query with the selected search mode.
+        
+        Args:
+            search_mode (str): 'mmr' or 'hybrid' (default: settings.RAG_SEARCH_MODE). If the
+                hybrid search fails (e.g. the Oracle Text index does not exist) MMR is used.
+            fetch_k (int): Candidates per search (see mmr_search / hybrid_search).
+            lambda_mult (float): MMR relevance/diversity balance (MMR only).
+            
+        Returns:
+            list: Selected chunks ({content, metadata, distance, ...}).
+        """
+        if _resolve_search_mode(search_mode) == SEARCH_MODE_HYBRID:
+            try:
+                return self.hybrid_search(input, files_ids, k, fetch_k)
+            except Exception as e:
+                logger.error(f"[RAG][HYBRID] Error en la búsqueda híbrida, se usa MMR: {str(e)}")
+        return self.mmr_search(input, files_ids, k, fetch_k, lambda_mult)
 
-    def oci_vector_search_context_only(self, input: str, files_ids: list, k: int = 10) -> dict:
+    def oci_vector_search_context_only(self, input: str, files_ids: list, k: int = 10,
+                                       fetch_k: int = None, lambda_mult: float = None,
+                                       search_mode: str = None) -> dict:
         """
         Performs a vector search and returns only the retrieved context without LLM processing.
         
@@ -101,47 +267,79 @@ class OCIRAGTool:
             input (str): The input query to search for relevant documents.
             files_ids (list): List of file IDs to filter the search.
             k (int): Number of documents to retrieve (default: 10).
+            fetch_k (int): Candidates per search (default: settings.RAG_MMR_FETCH_K or
+                settings.RAG_HYBRID_FETCH_K).
+            lambda_mult (float): MMR relevance/diversity balance (default: settings.RAG_MMR_LAMBDA).
+            search_mode (str): 'mmr' or 'hybrid' (default: settings.RAG_SEARCH_MODE).
             
         Returns:
             dict: Dictionary containing the retrieved context and metadata.
         """
         
-        # Create a vector store from the Oracle connection and embeddings
-        vector_store = self.rag_docs_db.get_vector_store()
-
-        retriever = vector_store.as_retriever(
-            search_type="mmr",
-            search_kwargs={
-                "k": k,           # Número de chunks relevantes que se devuelven
-                "fetch_k": min(k * 2, 20),   # Número de candidatos iniciales desde los cuales aplicar MMR
-                "filter": {"file_id": files_ids} # Limita la búsqueda al archivo específico
-            }
-        )
-
         # Retrieve documents without LLM processing
-        retrieved_docs = retriever.get_relevant_documents(input)
-        
-        # Prepare context information
-        context_info = {
-            "query": input,
-            "k_requested": k,
-            "total_documents": len(retrieved_docs),
-            "documents": []
-        }
-        
-        for i, doc in enumerate(retrieved_docs):
-            # Extract metadata and content from each document
-            doc_info = {
-                "index": i + 1,
-                "content": doc.page_content,
-                "metadata": doc.metadata,
-                "score": getattr(doc, 'score', None),  # Score if available
-                "file_id": doc.metadata.get('file_id', None),
-                "chunk_id": doc.metadata.get('chunk_id', None)
-            }
-            context_info["documents"].append(doc_info)
+        retrieved_docs = self.search(input, files_ids, k, search_mode, fetch_k, lambda_mult)
+        return _context_info(input, k, retrieved_docs)
+
+    def oci_vector_search_context_batch(self, inputs: list, files_ids: list, k: int = 10,
+                                        segment_types: list = None, k_per_query: list = None,
+                                        search_mode: str = None) -> list:
+        """
+        Performs several searches at once: all queries are embedded in a single embedding
+        call and their candidates are fetched in a single database round trip; each query
+        is then re-ranked with MMR or fused with RRF like oci_vector_search_context_only.
         
-        return context_info
+        Args:
+            inputs (list): Input queries to search for relevant documents.
+            files_ids (list): List of file IDs to filter the search.
+            k (int): Number of documents to retrieve per query (default: 10).
+            segment_types (list): Optional document types to restrict each query to
+                (one list or None per query).
+            k_per_query (list): Optional number of documents to retrieve for each query.
+            search_mode (str): 'mmr' or 'hybrid' (default: settings.RAG_SEARCH_MODE). If the
+                hybrid search fails (e.g. the Oracle Text index does not exist) MMR is used.
+            
+        Returns:
+            list: One context dict per query, in input order, with the same shape as
+                  oci_vector_search_context_only.
+        """
+        if not inputs:
+            return []
+
+        k_values = list(k_per_query) if k_per_query else [k] * len(inputs)
+
+        # Embed all queries in one call
+        query_vectors = self.rag_docs_db.get_embeddings().embed_documents(list(inputs))
+
+        retrieved = None
+        if _resolve_search_mode(search_mode) == SEARCH_MODE_HYBRID:
+            try:
+                batch_candidates = self.rag_docs_db.batch_search_candidates(
+                    query_vectors, files_ids,
+                    [_resolve_fetch_k(k_query, None, settings.RAG_HYBRID_FETCH_K) for k_query in k_values],
+                    segment_types, query_texts=list(inputs), with_embeddings=False
+                )
+                retrieved = [
+                    _fuse_candidates(candidates, k_query)
+                    for candidates, k_query in zip(batch_candidates, k_values)
+                ]
+            except Exception as e:
+                logger.error(f"[RAG][HYBRID] Error en la búsqueda híbrida por lotes, se usa MMR: {str(e)}")
+
+        if retrieved is None:
+            batch_candidates = self.rag_docs_db.batch_search_candidates(
+                query_vectors, files_ids,
+                [_resolve_fetch_k(k_query, None, settings.RAG_MMR_FETCH_K) for k_query in k_values],
+                segment_types
+            )
+            retrieved = [
+                _mmr_rerank(query_vector, candidates["vector"], k_query)
+                for query_vector, candidates, k_query in zip(query_vectors, batch_candidates, k_values)
+            ]
+
+        return [
+            _context_info(query, k_query, docs)
+            for query, k_query, docs in zip(inputs, k_values, retrieved)
+        ]
 
     def oci_vector_search_raw_results(self, input: str, files_ids: list, k: int = 10) -> list:
         """
@@ -156,15 +354,13 @@ class OCIRAGTool:
             list: List of raw search results with scores and metadata.
         """
         
-        # Create a vector store from the Oracle connection and embeddings
-        vector_store = self.rag_docs_db.get_vector_store()
-
-        # Use similarity search with score to get raw results
-        search_results = vector_store.similarity_search_with_score(
-            input,
-            k=k,
-            filter={"file_id": files_ids}
-        )
+        # Use similarity search with score to get raw results on a pooled connection
+        with self.rag_docs_db.get_vector_store() as vector_store:
+            search_results = vector_store.similarity_search_with_score(
+                input,
+                k=k,
+                filter={"file_id": files_ids}
+            )
         
         # Format results
         formatted_results = []
@@ -179,4 +375,43 @@ class OCIRAGTool:
             }
             formatted_results.append(result)
         
-        return formatted_results
\ No newline at end of file
+        return formatted_results
+
+    async def _run_in_executor(self, method, *args, **kwargs):
+        """Runs a blocking search on the bounded retrieval executor and awaits its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_retrieval_executor, functools.partial(method, *args, **kwargs))
+
+    async def aoci_vector_search(self, input: str, files_ids: list) -> str:
+        """
+        Async version of oci_vector_search: only the search runs on the bounded retrieval
+        executor; the LLM answer is generated on the default threadpool, so slow answers
+        do not hold retrieval workers.
+        """
+        retrieved_docs = await self._run_in_executor(self.retrieve_documents, input, files_ids)
+        return await run_in_threadpool(self.generate_answer, input, retrieved_docs)
+
+    async def aoci_vector_search_context_only(self, input: str, files_ids: list, k: int = 10,
+                                              fetch_k: int = None, lambda_mult: float = None,
+                                              search_mode: str = None) -> dict:
+        """Async version of oci_vector_search_context_only."""
+        return await self._run_in_executor(
+            self.oci_vector_search_context_only, input, files_ids, k, fetch_k, lambda_mult, search_mode
+        )
+
+    async def aoci_vector_search_raw_results(self, input: str, files_ids: list, k: int = 10) -> list:
+        """Async version of oci_vector_search_raw_results."""
+        return await self._run_in_executor(self.oci_vector_search_raw_results, input, files_ids, k)
+
+
+def get_rag_tool() -> OCIRAGTool:
+    """
+    Shared OCIRAGTool instance for the API endpoints (the chat model and the database
+    helpers are created once instead of on every request).
+    """
+    global _shared_tool
+    if _shared_tool is None:
+        with _shared_tool_lock:
+            if _shared_tool is None:
+                _shared_tool = OCIRAGTool()
+    return _shared_tool
@@ -0,0 +1,27 @@
+"""
+Configuración común de las pruebas: las variables obligatorias de Settings reciben valores
+de relleno (las pruebas no se conectan a OCI ni a la base de datos).
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+for _name in (
+    "SECRET_KEY", "GATEWAY_BASE_URL", "GATEWAY_OPENAI_MODEL", "GATEWAY_OPENAI_API_KEY", "HF_TOKEN",
+    "CON_ADB_DEV_USER_NAME", "CON_ADB_DEV_PASSWORD", "CON_ADB_DEV_SERVICE_NAME",
+    "CON_ADB_WALLET_LOCATION", "CON_ADB_WALLET_PASSWORD",
+    "CON_GEN_AI_SERVICE_ENDPOINT", "CON_GEN_AI_EMB_MODEL_ID", "CON_GEN_AI_CHAT_MODEL_ID",
+    "CON_COMPARTMENT_ID", "CON_GEN_AI_CHAT_MODEL_PROVIDER",
+):
+    os.environ.setdefault(_name, "test")
+
+
+@pytest.fixture(scope="session")
+def upload_markdown() -> str:
+    """Markdown real de una reclamación extraído por OCR (result/upload.md)."""
+    return (ROOT_DIR / "result" / "upload.md").read_text(encoding="utf-8")
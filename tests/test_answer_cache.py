@@ -0,0 +1,40 @@
+"""Pruebas de la caché de respuestas de preguntas de auditoría."""
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.answer_cache import AuditAnswerCache
+
+
+@pytest.fixture
+def cache():
+    cache = AuditAnswerCache()
+    cache.enabled = True
+    cache.verify_versions = True
+    cache.similarity_threshold = 0
+    cache.rag_files = MagicMock()
+    cache.rag_files.get_files_versions.side_effect = lambda files_ids: {file_id: "v1" for file_id in files_ids}
+    return cache
+
+
+def _response():
+    response = MagicMock(success=True, documents_retrieved=3)
+    response.model_copy.side_effect = lambda deep: MagicMock(success=True)
+    return response
+
+
+def test_pregunta_sobre_todos_los_archivos_no_se_guarda(cache):
+    scope = cache.build_scope([])
+    cache.set("¿Tiene FURIPS?", scope, [], _response())
+
+    assert cache.get("¿Tiene FURIPS?", scope)[0] is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_pregunta_normalizada_se_reutiliza_e_invalida_por_archivo(cache):
+    scope = cache.build_scope([7])
+    cache.set("¿Tiene FURIPS?", scope, [7], _response())
+
+    assert cache.get("tiene furips", scope)[0] is not None
+    assert cache.invalidate_files([7]) == 1
+    assert cache.get("tiene furips", scope)[0] is None
@@ -0,0 +1,107 @@
+"""Pruebas del presupuesto de llamadas, el deadline y los errores técnicos de la auditoría completa."""
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.config import settings
+from schemas.audit import AuditResponse, AuditType, IndividualAuditResult
+from services import audit as audit_module
+from services.audit import MedicalAuditService
+from services.audit_cache import AuditResultCache
+from services.llm_invoker import CircuitOpenError
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = MedicalAuditService(llm=MagicMock(), rag_tool=MagicMock())
+    executed = []
+
+    def _execute_audit(audit_type, *args):
+        executed.append(audit_type)
+        return IndividualAuditResult(audit_type=audit_type, response=AuditResponse.CUMPLE, justification="ok"), 1
+
+    monkeypatch.setattr(service, "_execute_audit", _execute_audit)
+    monkeypatch.setattr(service, "_prefetch_audit_contexts", lambda *args, **kwargs: None)
+    service.executed = executed
+    return service
+
+
+def _run(service, **kwargs):
+    return service.run_full_medical_audit(
+        files_ids=[1], audits=[AuditType.FACTURA, AuditType.MEDICAMENTOS], record_history=False,
+        use_rules=False, numeric_checks=False, keyword_gating=False, **kwargs
+    )
+
+
+def test_maestra_no_consume_el_presupuesto_de_llamadas(service):
+    response = _run(service, max_llm_calls=2)
+
+    assert len(service.executed) == 2
+    assert response.master_audit is not None
+    assert not response.partial
+
+
+def test_maestra_consolida_los_resultados_disponibles_al_agotar_el_presupuesto(service):
+    response = _run(service, max_llm_calls=1)
+
+    assert len(service.executed) == 1
+    assert response.master_audit is not None
+    assert response.partial
+    assert len(response.budget_skipped_audits) == 1
+
+
+def test_auditoria_con_error_tecnico_no_se_cachea_ni_se_registra(monkeypatch):
+    service = MedicalAuditService(llm=MagicMock(), rag_tool=MagicMock())
+    recorded = []
+
+    def _run_specialized_audit(prompt_template, audit_name, *args, **kwargs):
+        if audit_name == "Medicamentos":
+            raise CircuitOpenError("circuito abierto")
+        return {"response": "Cumple", "justification": "ok"}
+
+    monkeypatch.setattr(service, "_run_specialized_audit", _run_specialized_audit)
+    monkeypatch.setattr(service, "_prefetch_audit_contexts", lambda *args, **kwargs: None)
+    monkeypatch.setattr(audit_module.audit_history, "record_run", lambda *args, **kwargs: recorded.append(args))
+
+    response = service.run_full_medical_audit(
+        files_ids=[1], audits=[AuditType.FACTURA, AuditType.MEDICAMENTOS], record_history=True,
+        use_rules=False, numeric_checks=False, keyword_gating=False
+    )
+
+    assert response.success
+    assert response.partial
+    assert response.errored_audits == [AuditType.MEDICAMENTOS]
+    assert recorded == []
+
+    cache = AuditResultCache()
+    cache.enabled = True
+    cache.set_result("clave", response)
+    assert cache.get_result("clave") is None
+
+
+def test_deadline_descarta_las_auditorias_en_curso(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_DEADLINE_MARGIN_SECONDS", 0)
+    service = MedicalAuditService(llm=MagicMock(), rag_tool=MagicMock())
+    release = threading.Event()
+    executed = []
+
+    def _execute_audit(audit_type, *args):
+        executed.append(audit_type)
+        release.wait(5)
+        return IndividualAuditResult(audit_type=audit_type, response=AuditResponse.CUMPLE, justification="ok"), 1
+
+    monkeypatch.setattr(service, "_execute_audit", _execute_audit)
+    monkeypatch.setattr(service, "_prefetch_audit_contexts", lambda *args, **kwargs: None)
+    events = []
+
+    response = _run(service, deadline_seconds=0.2, max_concurrent_audits=1,
+                    on_event=lambda event_type, data: events.append((event_type, data.get("index"))))
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name.startswith("audit_"):
+            thread.join(5)
+
+    assert executed == [AuditType.FACTURA]
+    assert response.partial
+    assert [event for event in events if event[0] != "master_audit"] == [("audit_skipped", 0), ("audit_skipped", 1)]
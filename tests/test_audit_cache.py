@@ -0,0 +1,35 @@
+"""Pruebas de la caché LRU con TTL compartida por las cachés de auditoría."""
+from services import audit_cache
+from services.audit_cache import TTLCache, sha256_file, sha256_text
+
+
+def test_lru_descarta_la_entrada_menos_usada():
+    cache = TTLCache(max_entries=2, ttl_seconds=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2
+
+
+def test_entradas_vencidas_cuentan_como_fallo(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(audit_cache.time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=10, ttl_seconds=60)
+    cache.set("a", 1)
+
+    now[0] += 30
+    assert cache.get("a") == 1
+    now[0] += 31
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 0)
+
+
+def test_sha256_file_coincide_con_el_texto(tmp_path):
+    path = tmp_path / "reclamacion.zip"
+    path.write_bytes("contenido".encode("utf-8"))
+
+    assert sha256_file(path, chunk_size=3) == sha256_text("contenido")
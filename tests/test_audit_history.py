@@ -0,0 +1,56 @@
+"""Pruebas de las filas del historial de auditorías (glosas aplicadas)."""
+from unittest.mock import MagicMock
+
+from conftest import ROOT_DIR
+from schemas.audit import (AuditResponse, AuditResponseV2, AuditType, FullAuditResponseV2,
+                           GlosaParcialClassification, IndividualAuditResult, ItemReclamado,
+                           SpecialAuditResult)
+from services.audit import MedicalAuditService
+from services.audit_history import build_history_records
+from services.glosas_catalog import parse_glosas_markdown
+
+
+def _catalog(tipo):
+    entries = parse_glosas_markdown((ROOT_DIR / "HERRAMIENTA_NOTAS_ACLARATORIAS.md").read_text(encoding="utf-8"))
+    return [entry.to_legacy_dict() for entry in entries if entry.tipo.lower() == tipo]
+
+
+def _special(audit_type, clasificacion):
+    return IndividualAuditResult(
+        audit_type=audit_type, response=AuditResponse.NO_CUMPLE, justification="Sin RUT",
+        special_result=SpecialAuditResult(identificacion_reclamacion="RC-1", estado_glosa=1, justificacion="Sin RUT",
+                                          documentos_referenciados="RUT", clasificacion=clasificacion,
+                                          description="Falta de soporte")
+    )
+
+
+def test_factura_no_cumple_no_registra_el_catalogo():
+    catalog = _catalog("factura")
+    factura = IndividualAuditResult(audit_type=AuditType.FACTURA, response=AuditResponse.NO_CUMPLE,
+                                    justification="Falta el CUFE", glosas_detectadas=catalog)
+    audits = [factura, _special(AuditType.RUT_VALIDACION, "816")]
+    service = MedicalAuditService(llm=MagicMock(), rag_tool=MagicMock())
+    response = service._generate_v2_response(audits, None, 3, 1.0, "RC-1")
+
+    _, verdicts, glosas = build_history_records(response, audits, identificacion_reclamacion="RC-1")
+
+    assert len(catalog) > 1
+    assert len(verdicts) == 2
+    assert [(glosa["glosa_code"], glosa["glosa_scope"]) for glosa in glosas] == [("816", "total")]
+
+
+def test_glosas_parciales_de_los_items_v2():
+    item = ItemReclamado(codigo="890201", nombre="CONSULTA", glosa_parcial=True, valor=79100,
+                         clasificacion_glosas=[GlosaParcialClassification(codigo=2102, descripcion="Tarifa",
+                                                                          justificacion="Mayor valor")])
+    response = FullAuditResponseV2(
+        success=True, documents_retrieved=3, model_used="test", execution_time_seconds=1.0,
+        audit_result=AuditResponseV2(identificacion_reclamacion="RC-1", glosa_total=False, justificacion="",
+                                     items_reclamados=[item])
+    )
+
+    _, _, glosas = build_history_records(response, [])
+
+    assert [(glosa["glosa_code"], glosa["item_code"], glosa["item_value"]) for glosa in glosas] == [
+        ("2102", "890201", 79100.0)
+    ]
@@ -0,0 +1,118 @@
+"""Pruebas de la cola de lotes: carga por bloques y limpieza de archivos temporales."""
+import io
+import sqlite3
+import sys
+import types
+import zipfile
+from pathlib import Path
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.config import settings
+from schemas.audit import AuditType
+from services import claim_pipeline
+from services.audit_jobs import JOB_COMPLETED, JOB_QUEUED, AuditJobQueue
+from utils.utils import Utils
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TEMP_DIR", str(tmp_path / "temp"))
+    monkeypatch.setattr(settings, "AUDIT_JOBS_MAX_ATTEMPTS", 2)
+    return AuditJobQueue(db_path=str(tmp_path / "jobs.db"), jobs_dir=str(tmp_path / "jobs"), workers=1)
+
+
+def _zip_bytes():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("reclamacion.pdf", b"%PDF-1.4")
+    return buffer.getvalue()
+
+
+def _completed(errored_audits=()):
+    result = MagicMock(success=True, errored_audits=list(errored_audits))
+    result.model_dump_json.return_value = "{}"
+    return result
+
+
+def _submit(queue):
+    path = queue.save_upload(io.BytesIO(_zip_bytes()), max_bytes=1024 * 1024)
+    batch = queue.submit_batch([{"filename": "RC-1.zip", "path": path}])
+    return queue._claim_next_job(), batch
+
+
+def test_carga_mayor_al_limite_se_descarta(queue):
+    with pytest.raises(ValueError):
+        queue.save_upload(io.BytesIO(b"x" * 2048), max_bytes=1024)
+
+    assert not any((queue.jobs_dir / "uploads").iterdir())
+
+
+def test_lote_mueve_la_carga_al_directorio_del_lote(queue):
+    job, batch = _submit(queue)
+
+    assert job["zip_path"].startswith(str(queue.jobs_dir / batch["batch_id"]))
+    assert not any((queue.jobs_dir / "uploads").iterdir())
+
+
+def test_lote_no_registrado_devuelve_las_cargas(queue, monkeypatch):
+    paths = [queue.save_upload(io.BytesIO(_zip_bytes()), max_bytes=1024 * 1024) for _ in range(2)]
+    queue._init_db()
+
+    def _failing_session():
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(queue, "_session", _failing_session)
+    with pytest.raises(sqlite3.OperationalError):
+        queue.submit_batch([{"filename": f"RC-{i}.zip", "path": path} for i, path in enumerate(paths)])
+
+    assert [entry.name for entry in queue.jobs_dir.iterdir()] == ["uploads"]
+    assert all(Path(path).exists() for path in paths)
+    queue.discard_uploads(paths)
+    assert not any((queue.jobs_dir / "uploads").iterdir())
+
+
+def test_trabajo_terminado_elimina_zip_y_archivos_descomprimidos(queue, monkeypatch):
+    job, _ = _submit(queue)
+
+    def _run_claim_audit(zip_path, **kwargs):
+        Utils.extract_zip_to_temp(zip_path)
+        raise RuntimeError("OCR no disponible")
+
+    monkeypatch.setattr(claim_pipeline, "run_claim_audit", _run_claim_audit)
+
+    queue._process_job(job)
+    # Primer intento: el ZIP se conserva para el reintento; lo descomprimido no
+    assert queue.get_job(job["job_id"])["status"] == JOB_QUEUED
+    assert Path(job["zip_path"]).exists()
+    assert not list(Path(settings.TEMP_DIR).rglob("*_unzipped"))
+
+    monkeypatch.setattr(claim_pipeline, "run_claim_audit", lambda zip_path, **kwargs: _completed())
+    queue._process_job(queue._claim_next_job())
+    assert queue.get_job(job["job_id"])["status"] == JOB_COMPLETED
+    assert not Path(job["zip_path"]).exists()
+
+
+def test_trabajo_con_auditorias_en_error_no_se_completa(queue, monkeypatch):
+    job, _ = _submit(queue)
+    monkeypatch.setattr(claim_pipeline, "run_claim_audit",
+                        lambda zip_path, **kwargs: _completed([AuditType.MEDICAMENTOS]))
+
+    queue._process_job(job)
+
+    stored = queue.get_job(job["job_id"])
+    assert stored["status"] == JOB_QUEUED
+    assert "medicamentos" in stored["error"]
+
+
+def test_ocr_elimina_las_copias_temporales(queue, tmp_path, monkeypatch):
+    job, _ = _submit(queue)
+    ocr = types.SimpleNamespace(process_file=lambda path: {"markdown_content": "# reclamación"})
+    monkeypatch.setitem(sys.modules, "services.ocr_mineru", ocr)
+    monkeypatch.setattr(claim_pipeline.audit_result_cache, "get_markdown", lambda digest: None)
+    monkeypatch.setattr(claim_pipeline.audit_result_cache, "set_markdown", lambda digest, content: None)
+
+    assert claim_pipeline.extract_claim_markdown(Path(job["zip_path"])) == "# reclamación"
+    assert [path for path in (tmp_path / "temp").rglob("*") if path.is_file()] == []
@@ -0,0 +1,77 @@
+"""Pruebas del modo map-reduce de la auditoría v2 (segmentación y fusión de resultados)."""
+from services.audit_mapreduce import estimate_tokens, merge_v2_results, split_into_segments
+
+
+def _item(nombre, valor, glosas=None):
+    item = {"codigo": "X", "nombre": nombre, "valor": valor, "glosa_parcial": bool(glosas)}
+    if glosas:
+        item["clasificacion_glosas"] = [{"codigo": codigo, "referencias": [ref]} for codigo, ref in glosas]
+    return item
+
+
+def _result(*items):
+    return {"glosa_total": False, "clasificacion_glosas_totales": [], "items_reclamados": list(items)}
+
+
+def test_items_repetidos_en_un_segmento_se_conservan():
+    merged = merge_v2_results([_result(_item("CONSULTA", 100), _item("CONSULTA", 100))])
+
+    assert [item["nombre"] for item in merged["items_reclamados"]] == ["CONSULTA", "CONSULTA"]
+    assert sum(item["valor"] for item in merged["items_reclamados"]) == 200
+
+
+def test_item_repetido_en_segmentos_vecinos_se_fusiona_una_vez():
+    merged = merge_v2_results([
+        _result(_item("CONSULTA", 100), _item("Hemograma", 35000, [("2101", "pág. 2")])),
+        _result(_item("hemograma ", 35000, [("2101", "pág. 3"), ("3201", "pág. 3")]), _item("CONSULTA", 100)),
+    ])
+
+    items = merged["items_reclamados"]
+    # El hemograma del borde entre segmentos se reporta una vez con las glosas de ambos;
+    # la segunda CONSULTA se fusiona con la del segmento anterior (una sola ocurrencia)
+    assert [(item["codigo"], item["nombre"]) for item in items] == [("ITM-001", "CONSULTA"), ("ITM-002", "Hemograma")]
+    glosas = {glosa["codigo"]: glosa["referencias"] for glosa in items[1]["clasificacion_glosas"]}
+    assert glosas == {"2101": ["pág. 2", "pág. 3"], "3201": ["pág. 3"]}
+    assert items[1]["glosa_parcial"] is True
+    assert items[0]["glosa_parcial"] is False
+
+
+def test_cada_ocurrencia_del_segmento_anterior_se_usa_una_vez():
+    merged = merge_v2_results([
+        _result(_item("CONSULTA", 100), _item("CONSULTA", 100)),
+        _result(_item("CONSULTA", 100), _item("CONSULTA", 100), _item("CONSULTA", 100)),
+    ])
+
+    assert len(merged["items_reclamados"]) == 3
+
+
+def test_segmentos_no_contiguos_no_se_fusionan():
+    results = [_result(_item("CONSULTA", 100)), _result(_item("CONSULTA", 100))]
+
+    assert len(merge_v2_results(results, [0, 2])["items_reclamados"]) == 2
+    assert len(merge_v2_results(results, [0, 1])["items_reclamados"]) == 1
+
+
+def test_glosas_totales_se_unen_por_codigo():
+    first = {"glosa_total": True, "justificacion": "Sin FURIPS.",
+             "clasificacion_glosas_totales": [{"codigo": 101, "referencias": ["pág. 1"]}], "items_reclamados": []}
+    second = {"glosa_total": True, "justificacion": "Sin FURIPS.",
+              "clasificacion_glosas_totales": [{"codigo": "101", "referencias": ["pág. 1", "pág. 9"]}], "items_reclamados": []}
+
+    merged = merge_v2_results([first, second])
+
+    assert merged["glosa_total"] is True
+    assert merged["justificacion"] == "Sin FURIPS."
+    assert merged["clasificacion_glosas_totales"] == [{"codigo": "101", "referencias": ["pág. 1", "pág. 9"]}]
+
+
+def test_split_into_segments_respeta_paginas_y_presupuesto():
+    markdown = "".join(f"## Página {page}\n\n{'texto ' * 200}\n\n" for page in range(1, 6))
+
+    segments = split_into_segments(markdown, segment_tokens=700)
+
+    assert len(segments) > 1
+    assert all(segment["tokens"] <= 700 for segment in segments)
+    assert segments[0]["page_start"] == 1 and segments[-1]["page_end"] == 5
+    assert [segment["index"] for segment in segments] == list(range(len(segments)))
+    assert estimate_tokens("abcd" * 10) == 10
@@ -0,0 +1,40 @@
+"""Pruebas del pre-escaneo léxico del registro de auditorías."""
+from schemas.audit import AuditType
+from services.audit_registry import AUDIT_REGISTRY, prescan_audits
+
+# Reclamación de transporte sin medicamentos: "documento", "cumple", "programa" o
+# "informe" no deben activar Medicamentos ni Exámenes
+CLAIM_SIN_MEDICAMENTOS = """
+FORMULARIO ÚNICO DE RECLAMACIÓN (FURIPS). Documento de identidad del paciente: CC 1234567.
+El prestador cumple con el programa de transporte de víctimas; informe de la ambulancia y
+imagen del certificado de la autoridad adjuntos. Administración de recursos: ADRES.
+"""
+
+
+def _skipped(markdown_content):
+    _, skipped = prescan_audits(AUDIT_REGISTRY, markdown_content)
+    return {definition.audit_type for definition in skipped}
+
+
+def test_reclamacion_sin_medicamentos_no_activa_medicamentos():
+    skipped = _skipped(CLAIM_SIN_MEDICAMENTOS)
+
+    assert AuditType.MEDICAMENTOS in skipped
+    assert AuditType.EXAMENES in skipped
+
+
+def test_terminos_cortos_solo_como_palabra_completa():
+    assert AuditType.MEDICAMENTOS not in _skipped("DEXAMETASONA FOSFATO 4 MG AMPOLLA")
+    assert AuditType.MEDICAMENTOS not in _skipped("Código CUM del producto")
+    assert AuditType.EXAMENES not in _skipped("RX de tobillo")
+
+
+def test_terminos_largos_coinciden_como_prefijo_sin_tildes():
+    assert AuditType.MEDICAMENTOS not in _skipped("Despachado por la FARMACIA central")
+    assert AuditType.PROCEDIMIENTOS not in _skipped("Nota QUIRÚRGICA del cirujano")
+
+
+def test_formas_en_singular_activan_examenes():
+    assert AuditType.EXAMENES not in _skipped("Examen de sangre del paciente")
+    assert AuditType.EXAMENES not in _skipped("Se adjunta resultado de examen")
+    assert AuditType.EXAMENES not in _skipped("Imagen diagnóstica de control")
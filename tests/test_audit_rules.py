@@ -0,0 +1,31 @@
+"""Pruebas de los validadores deterministas de las auditorías especiales."""
+from schemas.audit import AuditResponse, AuditType
+from services.audit_rules import evaluate_special_audit, extract_document_ids
+
+
+def test_reclamacion_real(upload_markdown):
+    verdicts = {audit_type: evaluate_special_audit(audit_type, upload_markdown, "RC-1") for audit_type in AuditType}
+
+    assert verdicts[AuditType.PAGADOR_ADRES]["response"] == AuditResponse.CUMPLE
+    assert verdicts[AuditType.CONSISTENCIA_DOCUMENTO]["response"] == AuditResponse.CUMPLE
+    assert verdicts[AuditType.FORMULARIOS_LEGALES]["special_result"]["clasificacion"] == "332"
+    assert verdicts[AuditType.RUT_VALIDACION]["special_result"]["clasificacion"] == "816"
+    # Los datos del paciente requieren la factura XML: decide el LLM
+    assert verdicts[AuditType.DATOS_PACIENTE] is None
+    assert extract_document_ids(upload_markdown).most_common(1)[0][0] == "77151487"
+
+
+def test_pagador_ambiguo_lo_decide_el_llm():
+    assert evaluate_special_audit(AuditType.PAGADOR_ADRES, "Cliente: NIT 901.037.916-1") is None
+    verdict = evaluate_special_audit(AuditType.PAGADOR_ADRES, "Cliente: SEGUROS DEL ESTADO NIT 860.009.578-6")
+    assert verdict["special_result"]["clasificacion"] == "815"
+
+
+def test_varios_documentos_del_paciente_lo_decide_el_llm():
+    markdown_content = "Paciente CC 77151487 ... Acompañante CC 1065000111"
+
+    assert evaluate_special_audit(AuditType.CONSISTENCIA_DOCUMENTO, markdown_content) is None
+
+
+def test_rut_presente_deja_la_vigencia_al_llm():
+    assert evaluate_special_audit(AuditType.RUT_VALIDACION, "REGISTRO ÚNICO TRIBUTARIO - DIAN") is None
@@ -0,0 +1,43 @@
+"""Pruebas de la selección adaptativa del contexto de cada auditoría."""
+from services.context_packing import STOP_BUDGET, STOP_EXHAUSTED, STOP_SCORE, TRUNCATED_MARKER, pack_context
+
+
+def _doc(content, distance=None):
+    return {"content": content, "score": distance}
+
+
+def test_se_detiene_cuando_cae_la_similitud():
+    packed = pack_context(
+        [_doc("b" * 40, 0.5), _doc("a" * 40, 0.1), _doc("c" * 40, 0.8)],
+        max_context_chars=1000, min_relative_score=0.5, min_documents=1
+    )
+
+    assert packed["stop_reason"] == STOP_SCORE
+    assert packed["k_used"] == 2
+    assert packed["context"].index("a" * 40) < packed["context"].index("b" * 40)
+
+
+def test_fragmento_que_no_cabe_deja_pasar_uno_mas_chico():
+    packed = pack_context(
+        [_doc("a" * 40, 0.1), _doc("b" * 400, 0.2), _doc("c" * 40, 0.3)],
+        max_context_chars=100, min_relative_score=0.0, min_documents=1
+    )
+
+    assert packed["stop_reason"] == STOP_BUDGET
+    assert packed["k_used"] == 2
+    assert "b" * 400 not in packed["context"]
+
+
+def test_repetidos_y_sin_puntaje():
+    packed = pack_context([_doc("igual"), _doc("igual"), _doc("otro")], max_context_chars=1000,
+                          min_relative_score=0.9, min_documents=1)
+
+    assert packed["stop_reason"] == STOP_EXHAUSTED
+    assert packed["k_used"] == 2
+
+
+def test_ninguno_cabe_se_recorta_el_mejor():
+    packed = pack_context([_doc("x" * 500, 0.1)], max_context_chars=40, min_relative_score=0.5, min_documents=1)
+
+    assert packed["context"].endswith("x" * 40 + TRUNCATED_MARKER)
+    assert packed["k_used"] == 1
@@ -0,0 +1,31 @@
+"""Pruebas de la segmentación del documento por tipo."""
+from services.document_segmenter import classify_page, segment_document, split_pages
+
+
+def test_reclamacion_real_por_segmentos(upload_markdown):
+    segments = segment_document(upload_markdown)
+
+    assert [(segment["segment_type"], segment["page_start"], segment["page_end"]) for segment in segments[:3]] == [
+        ("factura", 1, 5), ("factura_proveedor", 6, 6), ("resultados_examenes", 7, 25)
+    ]
+    assert segments[-1]["segment_type"] == "ordenes_medicas"
+    # Segmentos contiguos que cubren el documento completo
+    assert segments[0]["char_start"] == 0 and segments[-1]["char_end"] == len(upload_markdown)
+    assert all(previous["char_end"] == current["char_start"] for previous, current in zip(segments, segments[1:]))
+
+
+def test_paginas_sin_titulo_heredan_el_tipo_anterior():
+    markdown_content = "## Página 1\nEPICRISIS\nResumen\n## Página 2\ncontinuación sin título\n"
+
+    assert [(segment["segment_type"], segment["page_end"]) for segment in segment_document(markdown_content)] == [
+        ("epicrisis", 2)
+    ]
+
+
+def test_factura_sin_adres_es_de_proveedor():
+    assert classify_page("FACTURA ELECTRÓNICA DE VENTA\nCliente: ADRES NIT 901037916") == "factura"
+    assert classify_page("FACTURA ELECTRÓNICA DE VENTA\nCliente: CLINICA SAN JUAN") == "factura_proveedor"
+
+
+def test_documento_sin_encabezados_es_una_pagina():
+    assert split_pages("texto") == [{"page": None, "start": 0, "end": 5, "text": "texto"}]
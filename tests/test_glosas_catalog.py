@@ -0,0 +1,34 @@
+"""Pruebas del parseo del catálogo de glosas (HERRAMIENTA_NOTAS_ACLARATORIAS.md)."""
+from conftest import ROOT_DIR
+from services.glosas_catalog import normalize_key, parse_glosas_markdown
+
+
+def test_catalogo_oficial_conserva_codigos_repetidos():
+    entries = parse_glosas_markdown((ROOT_DIR / "HERRAMIENTA_NOTAS_ACLARATORIAS.md").read_text(encoding="utf-8"))
+
+    assert len(entries) == 157
+    assert sum(entry.codigo == "2102" for entry in entries) == 24
+    assert {entry.aplica_a for entry in entries} == {"item", "reclamacion"}
+
+
+def test_campos_multilinea_y_aplicacion():
+    entries = parse_glosas_markdown("""
+### Glosa: 1001
+- **Tipo:** Factura
+- **Segmento:** Soporte & Consistencia
+- **Detalle de Glosa:** Inconsistencia con la BDUA:
+● Nombre de víctima no corresponde.
+- **Glosa a Ítem:** SI
+---
+### Glosa: 1002
+- **Tipo:** Factura
+""")
+
+    assert len(entries) == 1  # La glosa sin detalle se ignora
+    assert entries[0].detalle == "Inconsistencia con la BDUA:\n● Nombre de víctima no corresponde."
+    assert entries[0].aplica_a == "item"
+    assert entries[0].glosa_a_reclamacion == "SI"
+
+
+def test_normalize_key_sin_tildes_ni_espacios():
+    assert normalize_key("  Glosa a  RECLAMACIÓN ") == "glosa a reclamacion"
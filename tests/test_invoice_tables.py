@@ -0,0 +1,60 @@
+"""Pruebas de la lectura de líneas de factura y de los hallazgos numéricos precalculados."""
+import pytest
+
+from services.invoice_tables import IPS_SEGMENT, _line_findings, build_invoice_frames, check_line_totals, parse_line
+
+# Filas reales de result/upload.md que el OCR combina, parte o lee con dígitos perdidos
+OCR_ROWS = [
+    ["29523-1", "SOLUCION SALINA 0.9 X 25 ML", "10.00", "2,400.00", "24,00000"],
+    ["19490", "GLUCOSA (EN SUERO LCR OTRO FLUIDO)", "3.00", "20,700.00", "6,100.00"],
+    ["", "DEXAMETASONA FOSFATO 4 MG AMPOLLA", "", "3,500.00 21,000.00"],
+    ["19959764-1", "CEFTRIAXONA 1 GR VIAL", "6.00", "294,000.00"],
+    ["16206 DECORTICACION O CURETAJE OSEO EN HUESO FACIAL 39006 39006 GRUPO 08 SERVICIOS PROFESIONALES "
+     "DE CIRUJANO O GINECOOBST", "", "1.00", "323,300.00"],
+]
+
+
+def _frames(rows):
+    frames, _ = build_invoice_frames([{"page": 1, "segment_type": IPS_SEGMENT, "rows": rows}])
+    return frames[IPS_SEGMENT]
+
+
+def test_linea_consistente_se_verifica():
+    line = parse_line(["7028_M", "TORNILLO AUTOPERFORANTE", "4.00", "360,900.00 1,443,600.00"])
+
+    assert (line["quantity"], line["unit_value"], line["subtotal"]) == (4.0, 360900.0, 1443600.0)
+    assert line["verified"]
+
+
+@pytest.mark.parametrize("cells", [OCR_ROWS[0], OCR_ROWS[1], OCR_ROWS[2]])
+def test_cantidad_de_la_descripcion_o_valores_ilegibles_no_se_verifican(cells):
+    assert not parse_line(cells)["verified"]
+
+
+@pytest.mark.parametrize("cells, quantity, unit_value", [(OCR_ROWS[3], 6.0, 49000.0), (OCR_ROWS[4], 1.0, 323300.0)])
+def test_columnas_de_cantidad_y_valor_total(cells, quantity, unit_value):
+    line = parse_line(cells)
+
+    assert (line["quantity"], line["unit_value"]) == (quantity, unit_value)
+    assert line["verified"]
+
+
+def test_fragmento_sin_descripcion_no_es_linea():
+    assert parse_line(["19985517-2", "", "6.00", "49,000.00"]) is None
+
+
+def test_filas_del_ocr_no_generan_descuadres():
+    frame = _frames(OCR_ROWS)
+
+    assert len(check_line_totals(frame)) == 0
+    findings = _line_findings(frame)
+    assert not any("descuadre" in finding for finding in findings)
+    assert findings == ["3 líneas no verificadas (cantidad tomada de la descripción o valores ilegibles): "
+                        "no se comprueba su cantidad × valor unitario"]
+
+
+def test_descuadre_verificado_se_reporta_como_indicio():
+    frame = _frames([["1031", "JERINGA 5ml CON AGUJA 21G x 1 1/2", "5.00", "600.00 3,600.00"]])
+
+    assert check_line_totals(frame).tolist() == [0]
+    assert _line_findings(frame)[0].startswith("Posible descuadre en la línea")
@@ -0,0 +1,50 @@
+"""Pruebas del circuit breaker de la capa de invocación del LLM."""
+from services import llm_invoker
+from services.llm_invoker import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker
+
+
+def _breaker(monkeypatch, now):
+    monkeypatch.setattr(llm_invoker.time, "monotonic", lambda: now[0])
+    return CircuitBreaker(failure_threshold=2, reset_seconds=30)
+
+
+def test_abre_tras_fallas_consecutivas_y_rechaza(monkeypatch):
+    now = [0.0]
+    breaker = _breaker(monkeypatch, now)
+    breaker.record(False)
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == BREAKER_CLOSED
+
+    breaker.record(False)
+    assert breaker.state == BREAKER_OPEN
+    assert not breaker.allow()
+
+
+def test_semiabierto_deja_pasar_una_sola_prueba(monkeypatch):
+    now = [0.0]
+    breaker = _breaker(monkeypatch, now)
+    breaker.record(False)
+    breaker.record(False)
+
+    now[0] += 31
+    assert breaker.allow()
+    assert breaker.state == BREAKER_HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record(True)
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.allow()
+
+
+def test_prueba_fallida_vuelve_a_abrir(monkeypatch):
+    now = [0.0]
+    breaker = _breaker(monkeypatch, now)
+    breaker.record(False)
+    breaker.record(False)
+
+    now[0] += 31
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.stats()["times_opened"] == 2
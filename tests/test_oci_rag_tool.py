@@ -0,0 +1,84 @@
+"""Pruebas de la herramienta RAG: pool acotado de la API async y búsqueda por lotes (MMR e híbrida)."""
+import asyncio
+import threading
+
+from core.config import settings
+from services.tools.oci_rag_tool import OCIRAGTool
+
+
+class _FakeTool(OCIRAGTool):
+    def __init__(self):
+        self.threads = {}
+
+    def retrieve_documents(self, input, files_ids, k=10):
+        self.threads["retrieve"] = threading.current_thread().name
+        return ["doc"]
+
+    def generate_answer(self, input, retrieved_docs):
+        self.threads["generate"] = threading.current_thread().name
+        return f"{input}:{len(retrieved_docs)}"
+
+
+def test_solo_la_busqueda_ocupa_el_pool_de_recuperacion():
+    tool = _FakeTool()
+
+    assert asyncio.run(tool.aoci_vector_search("pregunta", [1])) == "pregunta:1"
+    assert tool.threads["retrieve"].startswith("rag-retrieval")
+    assert not tool.threads["generate"].startswith("rag-retrieval")
+
+
+class _FakeDocsDB:
+    def __init__(self, fail_hybrid=False):
+        self.fail_hybrid = fail_hybrid
+        self.calls = []
+
+    def get_embeddings(self):
+        class _Embeddings:
+            def embed_documents(self, texts):
+                return [[1.0, 0.0] for _ in texts]
+        return _Embeddings()
+
+    def batch_search_candidates(self, query_vectors, files_ids, fetch_k_per_query, segment_types=None,
+                                query_texts=None, with_embeddings=True):
+        self.calls.append({"fetch_k": fetch_k_per_query, "query_texts": query_texts})
+        if query_texts and self.fail_hybrid:
+            raise RuntimeError("DRG-10599: la columna no está indexada")
+        vector = [
+            {"doc_key": "a", "content": "A", "metadata": {"file_id": 1}, "distance": 0.0, "embedding": [1.0, 0.0]},
+            {"doc_key": "b", "content": "B", "metadata": {"file_id": 1}, "distance": 0.0001, "embedding": [0.99, 0.01]},
+            {"doc_key": "c", "content": "C", "metadata": {"file_id": 1}, "distance": 0.3, "embedding": [0.7, 0.7]},
+        ]
+        text = [dict(vector[2], text_score=10.0)] if query_texts else []
+        return [{"vector": vector, "text": text} for _ in query_vectors]
+
+
+def _batch_tool(db):
+    tool = OCIRAGTool.__new__(OCIRAGTool)
+    tool.rag_docs_db = db
+    return tool
+
+
+def test_busqueda_por_lotes_reordena_con_mmr(monkeypatch):
+    monkeypatch.setattr(settings, "RAG_SEARCH_MODE", "mmr")
+    monkeypatch.setattr(settings, "RAG_MMR_LAMBDA", 0.3)
+    db = _FakeDocsDB()
+
+    contexts = _batch_tool(db).oci_vector_search_context_batch(["q1", "q2"], [1], k=2, k_per_query=[2, 1])
+
+    assert db.calls == [{"fetch_k": [settings.RAG_MMR_FETCH_K] * 2, "query_texts": None}]
+    assert [doc["content"] for doc in contexts[0]["documents"]] == ["A", "C"]
+    assert [doc["content"] for doc in contexts[1]["documents"]] == ["A"]
+
+
+def test_busqueda_por_lotes_hibrida_y_respaldo_mmr(monkeypatch):
+    monkeypatch.setattr(settings, "RAG_SEARCH_MODE", "hybrid")
+    monkeypatch.setattr(settings, "RAG_MMR_LAMBDA", 0.3)
+
+    contexts = _batch_tool(_FakeDocsDB()).oci_vector_search_context_batch(["CUFE 123"], [1], k=2)
+    assert [doc["content"] for doc in contexts[0]["documents"]] == ["C", "A"]
+    assert contexts[0]["documents"][0]["text_rank"] == 1
+
+    db = _FakeDocsDB(fail_hybrid=True)
+    contexts = _batch_tool(db).oci_vector_search_context_batch(["CUFE 123"], [1], k=2)
+    assert [call["query_texts"] for call in db.calls] == [["CUFE 123"], None]
+    assert [doc["content"] for doc in contexts[0]["documents"]] == ["A", "C"]
@@ -0,0 +1,52 @@
+"""Pruebas de la recuperación híbrida: consulta de Oracle Text, fusión RRF y re-ranking MMR."""
+import numpy as np
+import pytest
+
+from database.rag_docs import build_text_query
+from services.mmr import mmr_select
+from services.rank_fusion import reciprocal_rank_fusion
+
+
+def test_consulta_de_texto_conserva_solo_terminos_especificos():
+    query = build_text_query("¿Cuál es el CUFE de la factura FE-12345 de la IPS?")
+
+    assert query == "{cufe} ACCUM {factura} ACCUM {12345}"
+
+
+def test_consulta_de_texto_conserva_codigos_alfanumericos_y_medicamentos():
+    assert build_text_query("Ceftriaxona 1 GR código 7028_M") == "{ceftriaxona} ACCUM {código} ACCUM {7028_m}"
+
+
+@pytest.mark.parametrize("text", ["", None, "¿Cómo está todo esto?", "de la el en y o para como"])
+def test_consulta_de_texto_vacia_sin_terminos_utiles(text):
+    assert build_text_query(text) == ""
+
+
+def test_consulta_de_texto_sin_repetidos():
+    assert build_text_query("Factura factura FACTURA") == "{factura}"
+
+
+def test_rrf_prioriza_los_documentos_presentes_en_ambas_listas():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d", "a"]], k=60)
+
+    assert [key for key, _ in fused] == ["a", "c", "b", "d"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 63)
+
+
+def test_rrf_sin_listas():
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_mmr_evita_candidatos_redundantes():
+    query = [1.0, 0.0]
+    candidates = [[1.0, 0.0], [0.99, 0.01], [0.7, 0.7]]
+
+    assert mmr_select(query, candidates, k=2, lambda_mult=0.3) == [0, 2]
+    assert mmr_select(query, candidates, k=2, lambda_mult=1.0) == [0, 1]
+
+
+def test_mmr_k_mayor_que_candidatos():
+    candidates = np.eye(3).tolist()
+
+    assert sorted(mmr_select([1.0, 0.0, 0.0], candidates, k=10)) == [0, 1, 2]
+    assert mmr_select([1.0, 0.0, 0.0], [], k=3) == []
@@ -4,6 +4,7 @@ from fastapi import UploadFile
 from typing import Annotated, List
 from pathlib import Path
 import json
+import shutil
 import tempfile
 import zipfile
 
@@ -166,6 +167,29 @@ class Utils:
 
         return extracted_metadata
 
+    @staticmethod
+    def cleanup_extracted_zip(zip_file_path: Path, extracted_metadata: List[dict] = None,
+                              temp_dir_name: str = ".agent_files") -> None:
+        """
+        Elimina lo creado por `extract_zip_to_temp`: la carpeta "<stem>_unzipped" del ZIP
+        y las copias temporales indicadas en extracted_metadata (temp_path).
+
+        Args:
+            zip_file_path: Ruta del archivo .zip descomprimido
+            extracted_metadata: Metadatos retornados por extract_zip_to_temp (opcional)
+            temp_dir_name: Subcarpeta dentro de settings.TEMP_DIR usada al descomprimir
+        """
+        for file_info in extracted_metadata or []:
+            try:
+                Path(file_info["temp_path"]).unlink(missing_ok=True)
+            except Exception as e:
+                logger.warning(f"[UTILS][ZIP] No se pudo eliminar {file_info.get('temp_path')}: {e}")
+
+        extract_dir = Path(settings.TEMP_DIR) / temp_dir_name / f"{Path(zip_file_path).stem}_unzipped"
+        if extract_dir.exists():
+            shutil.rmtree(extract_dir, ignore_errors=True)
+            logger.info(f"[UTILS][ZIP] Archivos temporales de [{Path(zip_file_path).name}] eliminados [SUCCESS]")
+
         
     def read_file_content(self, file_path: str) -> str:
         """